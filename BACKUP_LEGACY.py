@@ -1,77 +1,152 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import argparse
 import sys
 from pathlib import Path
-from datetime import datetime
 
-sys.stdout.reconfigure(encoding='utf-8')
+import doc_fs
+import doc_metrics
+from backup_store import INDEX_NAME, BackupArchive, BackupStore
+from corpus_index import DB_NAME, CorpusIndex
 
-ROOT = Path(r'E:\Jerry_python\腳本平台\doc\鏡界')
-BACKUP_ROOT = ROOT / '_backup_legacy'
+# 文件樹根目錄由環境變數 DOC_ROOT 或 --root 參數決定（見 doc_fs.py）
+ROOT = doc_fs.BOOK_ROOT
+BACKUP_NAME = '_backup_legacy'
+BACKUP_ROOT = ROOT / BACKUP_NAME
 
 # 需要處理的章節及其子節數量（ch9 只有 7 個）
 CHAPTER_SIZES = {1: 9, 5: 9, 6: 9, 7: 9, 8: 9, 9: 7}
 
 BANNER_TMPL = (
-    
     "<!-- LEGACY FILE NOTICE -->\n"
-    "> ⚠️ 此檔案為舊版備份，已被新檔取代： [{new_name}]({new_name})\\n"
-    "> 備份時間：{ts}\\n"
+    "> ⚠️ 此檔案為舊版備份，已被新檔取代： [{new_name}]({new_name})\n"
+    "> 備份時間：{ts}\n"
     "\n---\n\n"
 )
 
-def find_new_file(ch_dir: Path, chapter: int, idx: int) -> str | None:
-    # 透過 glob 尋找 chX-i-*.md 新檔名
-    pattern = f'ch{chapter}-{idx}-*.md'
-    matches = list(ch_dir.glob(pattern))
-    if matches:
-        # 取最先匹配的
-        return matches[0].name
+def index_db(root: Path, db_path=None):
+    # 查新檔名用的連結索引：指定路徑 > 文件樹中已有的索引 > 只在記憶體中建立（不在文件樹留下檔案）
+    if db_path:
+        return Path(db_path)
+    existing = root / DB_NAME
+    return existing if existing.exists() else ':memory:'
+
+
+def find_new_file(index: CorpusIndex, chapter: int, idx: int) -> str | None:
+    # 透過索引查詢 chX-i-*.md 新檔名（不再逐次 glob 目錄）
+    found = index.find_section(chapter, idx)
+    if found:
+        return found.rsplit('/', 1)[-1]
     return None
 
 
-def backup_legacy_file(chapter: int, idx: int) -> bool:
-    ch_dir = ROOT / f'ch{chapter}'
-    src = ch_dir / f'ch{chapter}-{idx}.md'
-    if not src.exists():
-        return False
+def legacy_path(root: Path, chapter: int, idx: int) -> Path:
+    return root / f'ch{chapter}' / f'ch{chapter}-{idx}.md'
+
+
+def legacy_source(index: CorpusIndex, chapter: int, idx: int, root: Path = ROOT,
+                  present: dict = None) -> tuple | None:
+    # present 為預先平行 stat 的結果 {路徑: stat 或 None}；未提供時逐檔檢查
+    src = legacy_path(root, chapter, idx)
+    if not (present[src] is not None if present is not None else src.exists()):
+        return None
 
     # 找新檔名
-    new_name = find_new_file(ch_dir, chapter, idx)
+    new_name = find_new_file(index, chapter, idx)
     if new_name is None:
         # 若找不到新檔，仍然備份但標記沒有新檔資訊
         new_name = f'ch{chapter}-{idx}-<未找到新檔名>.md'
+    return src, new_name
+
+
+def export_archive(archive_path, backup_root: Path = BACKUP_ROOT) -> None:
+    # 將備份庫附加成封存檔的新世代（串流寫入，不改寫前面的世代）
+    metrics = doc_metrics.current()
+    with metrics.stage('archive'):
+        result = BackupArchive(archive_path).append(BackupStore(backup_root))
+    metrics.count('archive_bytes_written', result['bytes'])
+    if result['records']:
+        print(f'📦 封存第 {result["generation"]} 世代: {archive_path}'
+              f'（{result["records"]} 筆紀錄、{result["objects"]} 個新物件，{result["bytes"] / 1024:.1f} KB）')
+    else:
+        print(f'⏭️ 沒有新的備份，封存檔維持第 {result["generation"]} 世代: {archive_path}')
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='備份並移除舊格式檔案 (chX-Y.md)')
+    parser.add_argument('--root', default=str(ROOT),
+                        help='文件樹根目錄（預設由環境變數 DOC_ROOT 決定）')
+    parser.add_argument('--archive', metavar='PATH',
+                        help='備份後將備份庫附加到單一封存檔（供異地保存）')
+    parser.add_argument('--archive-only', action='store_true',
+                        help='只更新封存檔，不處理舊格式檔案')
+    parser.add_argument('--index', metavar='PATH',
+                        help=f'連結索引檔（預設沿用 <root>/{DB_NAME}，不存在時只在記憶體中建立）')
+    doc_fs.add_arguments(parser)
+    doc_metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    if args.archive_only:
+        if not args.archive:
+            parser.error('--archive-only 需要同時指定 --archive')
+        with doc_metrics.session('backup_legacy', args):
+            export_archive(args.archive, Path(args.root) / BACKUP_NAME)
+        return
+
+    with doc_metrics.session('backup_legacy', args):
+        backup_legacy(args)
+
+
+def backup_legacy(args) -> None:
+    metrics = doc_metrics.current()
+    root = Path(args.root)
+    backup_root = root / BACKUP_NAME
+    print('開始備份舊格式檔案 (chX-Y.md) 到 _backup_legacy 備份庫 ...')
+    with doc_fs.FileIO(args.io_workers) as io:
+        items = []
+        db_path = index_db(root, args.index)
+        if db_path != ':memory:':
+            print(f'📇 使用連結索引: {db_path}')
+        with metrics.stage('index'), CorpusIndex(root, db_path) as index:
+            index.refresh()
+            # 所有候選舊檔一次平行 stat，不再逐檔往返
+            present = io.stat_many(legacy_path(root, ch, i)
+                                   for ch, size in CHAPTER_SIZES.items() for i in range(1, size + 1))
+            for ch, size in CHAPTER_SIZES.items():
+                for i in range(1, size + 1):
+                    found = legacy_source(index, ch, i, root, present)
+                    if found:
+                        src, new_name = found
+                        items.append((f'ch{ch}/{src.name}', src, {'new_name': new_name}))
+
+        # 內容以雜湊定址、壓縮後存入備份庫；讀檔與雜湊在執行緒池中平行計算
+        store = BackupStore(backup_root)
+        try:
+            with metrics.stage('store'):
+                result = store.put_many(items, io=io)
+        except Exception as e:
+            print(f'❌ 備份失敗，未刪除任何舊檔: {e}')
+            return
+        metrics.count('bytes_read', sum(present[src].st_size for _rel, src, _meta in items))
+        metrics.count('bytes_written', result['bytes'])
+        metrics.count('objects_written', result['objects'])
 
-    # 讀舊檔內容
-    content = src.read_text(encoding='utf-8', errors='ignore')
-
-    # 建立備份目錄 chX
-    backup_dir = BACKUP_ROOT / f'ch{chapter}'
-    backup_dir.mkdir(parents=True, exist_ok=True)
-
-    # 寫入備份檔（加上醒目標記）
-    backup_path = backup_dir / src.name
-    ts = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-    banner = BANNER_TMPL.format(new_name=new_name, ts=ts)
-    backup_path.write_text(banner + content, encoding='utf-8')
-
-    # 刪除原始舊檔
-    src.unlink(missing_ok=True)
-    print(f'✅ 備份並移除: {src} -> {backup_path}')
-    return True
-
-
-def main():
-    print('開始備份舊格式檔案 (chX-Y.md) 到 _backup_legacy ...')
-    total = 0
-    for ch, size in CHAPTER_SIZES.items():
-        for i in range(1, size + 1):
-            try:
-                if backup_legacy_file(ch, i):
-                    total += 1
-            except Exception as e:
-                print(f'❌ 處理 ch{ch}-{i}.md 失敗: {e}')
-    print(f'完成。共移動 {total} 個舊檔至 {BACKUP_ROOT}')
+        # 全部寫入備份庫之後才刪除原始舊檔（平行刪除，依原順序回報）
+        total = 0
+        with metrics.stage('remove'):
+            removals = io.imap(Path.unlink, ((src, True) for _rel, src, _meta in items))
+            for (rel, src, _meta), error in zip(items, removals):
+                if isinstance(error, BaseException):
+                    print(f'❌ 移除 {src} 失敗: {error}')
+                    continue
+                total += 1
+                entry = store.latest(rel)
+                print(f'✅ 備份並移除: {src} -> {store.object_path(entry["hash"])}')
+    metrics.count('files_removed', total)
+    print(f'完成。共備份並移除 {total} 個舊檔，索引: {backup_root / INDEX_NAME}'
+          f'（新增 {result["objects"]} 個物件，{result["bytes"] / 1024:.1f} KB）')
+    if args.archive:
+        export_archive(args.archive, backup_root)
 
 if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
     main()
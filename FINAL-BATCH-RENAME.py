@@ -5,13 +5,20 @@
 完成 Ch6-Ch9 的文件重命名 (36 個文件)
 """
 
-import os
+import argparse
 import sys
 from pathlib import Path
 
+import doc_fs
+import doc_metrics
+from rename_engine import apply_renames, print_stats
+
 # 設置編碼
 sys.stdout.reconfigure(encoding='utf-8')
 
+# 文件樹根目錄由環境變數 DOC_ROOT 或 --root 參數決定（見 doc_fs.py）
+BASE_PATH = doc_fs.BOOK_ROOT
+
 # 章節配置
 CHAPTERS_CONFIG = {
     6: ['模块概述', '详细功能清单', '技术架构', '核心组件详细实现', '数据模型详细定义', 'API详细规范', '性能优化策略', '安全考虑', '与其他模块的交互'],
@@ -20,62 +27,42 @@ CHAPTERS_CONFIG = {
     9: ['模块概述', '详细功能清单', '技术架构', '核心组件详细实现', '数据模型详细定义', 'API详细规范', '性能优化策略']
 }
 
-def rename_chapter_files(ch_num):
-    """為指定章節重命名所有文件"""
-    base_path = Path(r'E:\Jerry_python\腳本平台\doc\鏡界') / f'ch{ch_num}'
-    
-    if not base_path.exists():
-        print(f"❌ 目錄不存在: {base_path}")
-        return 0
-    
+def build_rename_map(ch_num):
+    """產生指定章節的重命名對應 {舊相對路徑: 新相對路徑}"""
     titles = CHAPTERS_CONFIG.get(ch_num, [])
-    count = 0
-    
-    for idx, title in enumerate(titles, 1):
-        old_file = base_path / f'ch{ch_num}-{idx}.md'
-        new_file = base_path / f'ch{ch_num}-{idx}-{title}.md'
-        
-        if old_file.exists() and not new_file.exists():
-            try:
-                # 讀取舊文件
-                with open(old_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 更新所有內部鏈接
-                for i in range(1, 10):
-                    if i <= len(titles):
-                        old_link = f'ch{ch_num}-{i}.md'
-                        new_link = f'ch{ch_num}-{i}-{titles[i-1]}.md'
-                        content = content.replace(old_link, new_link)
-                
-                # 寫入新文件
-                with open(new_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                print(f"  ✅ ch{ch_num}-{idx}-{title}.md")
-                count += 1
-                
-            except Exception as e:
-                print(f"  ❌ 錯誤: {old_file.name} - {str(e)}")
-    
-    return count
+    return {
+        f'ch{ch_num}/ch{ch_num}-{idx}.md': f'ch{ch_num}/ch{ch_num}-{idx}-{title}.md'
+        for idx, title in enumerate(titles, 1)
+    }
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='完成 Ch6-Ch9 的文件重命名')
+    parser.add_argument('--root', default=str(BASE_PATH),
+                        help='文件樹根目錄（預設由環境變數 DOC_ROOT 決定）')
+    doc_metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    base_path = Path(args.root)
 
-def main():
     print("=" * 60)
     print("鏡界平台最終批量重命名")
     print("=" * 60)
     
-    total = 0
+    if not base_path.exists():
+        print(f"❌ 目錄不存在: {base_path}")
+        return
     
+    rename_map = {}
     for ch in [6, 7, 8, 9]:
-        print(f"\n🔄 處理 Ch{ch}...")
-        count = rename_chapter_files(ch)
-        total += count
-        expected = len(CHAPTERS_CONFIG.get(ch, []))
-        print(f"  完成: {count}/{expected} 個文件")
+        rename_map.update(build_rename_map(ch))
+    
+    # 一次重命名所有章節，並修正整個文件樹中指向這些文件的連結
+    # 尚未建立的子節也登記為連結別名，讓指向它們的舊格式連結一併改成新檔名
+    with doc_metrics.session('final_batch_rename', args):
+        stats = apply_renames(base_path, rename_map, link_aliases=rename_map, skip_existing=True)
+    print_stats(stats)
     
     print("\n" + "=" * 60)
-    print(f"✅ 總計完成: {total}/36 個文件")
+    print(f"✅ 總計完成: {stats['moved']}/{len(rename_map)} 個文件")
     print("=" * 60)
 
 if __name__ == '__main__':
@@ -1,11 +1,14 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+import argparse
 import sys
 from pathlib import Path
 
-sys.stdout.reconfigure(encoding='utf-8')
+import doc_fs
+import doc_metrics
+from rename_engine import apply_renames, print_stats
 
-base_path = Path(r'E:\Jerry_python\腳本平台\doc\鏡界\ch9')
+sys.stdout.reconfigure(encoding='utf-8')
 
 # Ch9 的正確標題
 ch9_titles = [
@@ -29,29 +32,23 @@ wrong_titles = [
     '性能优化策略'
 ]
 
+# 錯誤標題 -> 正確標題；舊格式 ch9-i.md 的殘留連結也一併指向新檔名
+rename_map = {}
+link_aliases = {}
 for idx, (wrong, correct) in enumerate(zip(wrong_titles, ch9_titles), 1):
-    old_file = base_path / f'ch9-{idx}-{wrong}.md'
-    new_file = base_path / f'ch9-{idx}-{correct}.md'
-    
-    if old_file.exists() and not new_file.exists():
-        # 讀取舊文件
-        with open(old_file, 'r', encoding='utf-8') as f:
-            content = f.read()
-        
-        # 更新所有內部鏈接
-        for i in range(1, 8):
-            if i <= len(ch9_titles):
-                old_link = f'ch9-{i}-{wrong_titles[i-1]}.md'
-                new_link = f'ch9-{i}-{ch9_titles[i-1]}.md'
-                content = content.replace(old_link, new_link)
-                # 也更新舊格式鏈接
-                content = content.replace(f'ch9-{i}.md', new_link)
-        
-        # 寫入新文件
-        with open(new_file, 'w', encoding='utf-8') as f:
-            f.write(content)
-        
-        print(f"✅ {old_file.name} → {new_file.name}")
+    new_name = f'ch9-{idx}-{correct}.md'
+    rename_map[f'ch9/ch9-{idx}-{wrong}.md'] = f'ch9/{new_name}'
+    link_aliases[f'ch9/ch9-{idx}.md'] = f'ch9/{new_name}'
 
-print("\n完成 Ch9 文件重命名！")
+parser = argparse.ArgumentParser(description='修正 Ch9 文件的標題與檔名')
+parser.add_argument('--root', default=str(doc_fs.BOOK_ROOT),
+                    help='文件樹根目錄（預設由環境變數 DOC_ROOT 決定）')
+doc_metrics.add_arguments(parser)
+args = parser.parse_args()
+base_path = Path(args.root)
 
+with doc_metrics.session('fix_ch9_rename', args):
+    stats = apply_renames(base_path, rename_map, link_aliases=link_aliases, skip_existing=True)
+print_stats(stats)
+
+print("\n完成 Ch9 文件重命名！")
@@ -1,33 +1,143 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
+"""
+驗證文件樹：重命名完成度、失效連結與失效錨點
+
+- 以單次走訪收集所有文件（doc_fs：同一層目錄平行列出，適用於網路磁碟）；
+- 連結與錨點交給 link_checker.DocTreeChecker 檢查：平行解析、依內容雜湊快取文件與每條連結的結果
+  （快取與 link_checker.py 相同，位於 <root>/.link_cache.json），
+  檢查每個相對連結的目標是否存在、每個 #錨點 是否對應目標文件的標題或 HTML id
+  （與 GitHub 相容的 slug，含中文標題）。
+
+用法：
+    python VERIFY-COMPLETION.py [--root doc/鏡界] [-j 8] [--io-workers 16] [--report report.json] [--json]
+
+結束碼（可組合）：0 全部通過、1 有失效連結、2 有失效錨點、4 仍有舊格式檔名。
+"""
+
+import argparse
+import json
+import os
+import re
 import sys
+import time
 from pathlib import Path
 
-sys.stdout.reconfigure(encoding='utf-8')
+import doc_fs
+import link_checker
+from doc_io import atomic_write_text
+
+# build_site.py、build_search_index.py 與 doc_pipeline.py 以此名稱取用文件樹走訪
+walk_tree = link_checker.walk_tree
+
+EXIT_BROKEN_LINKS = link_checker.EXIT_BROKEN_LINKS
+EXIT_BROKEN_ANCHORS = link_checker.EXIT_BROKEN_ANCHORS
+EXIT_LEGACY_NAMES = 4
+
+_NEW_NAME = re.compile(r'^ch(\d+)-\d+-.+\.md$')
+_OLD_NAME = re.compile(r'^ch(\d+)-\d+\.md$')
+
+
+def rename_status(md_files: dict) -> dict:
+    """統計各章新舊格式檔名數量"""
+    chapters = {}
+    for rel in md_files:
+        name = rel.rsplit('/', 1)[-1]
+        for kind, pattern in (('new', _NEW_NAME), ('old', _OLD_NAME)):
+            m = pattern.match(name)
+            if m:
+                counts = chapters.setdefault(int(m.group(1)), {'new': 0, 'old': 0, 'old_files': []})
+                counts[kind] += 1
+                if kind == 'old':
+                    counts['old_files'].append(rel)
+    return {f'ch{ch}': chapters[ch] for ch in sorted(chapters)}
+
+
+def verify(root, jobs: int = None, cache_path=None, io_workers: int = None) -> dict:
+    """執行完整驗證並回傳報告（dict）"""
+    start = time.perf_counter()
+    root = Path(os.path.normpath(Path(root).resolve()))
+    with doc_fs.FileIO(io_workers) as io:
+        md_files, existing = walk_tree(root, io=io)
+    links = link_checker.DocTreeChecker(root, cache_path).check(jobs, documents=md_files, existing=existing)
+    chapters = rename_status(md_files)
+    old_total = sum(c['old'] for c in chapters.values())
+
+    exit_code = links['exit_code']
+    if old_total:
+        exit_code |= EXIT_LEGACY_NAMES
+
+    return {
+        'root': str(root),
+        'files': len(md_files),
+        'reparsed': links['reparsed'],
+        'links_checked': links['links_checked'],
+        'broken_links': links['broken_links'],
+        'broken_anchors': links['broken_anchors'],
+        'chapters': chapters,
+        'new_names': sum(c['new'] for c in chapters.values()),
+        'old_names': old_total,
+        'seconds': round(time.perf_counter() - start, 3),
+        'exit_code': exit_code,
+    }
+
+
+def print_report(report: dict, limit: int = 50) -> None:
+    print(f"✅ 新文件名（已重命名）: {report['new_names']} 個")
+    print(f"⚠️ 舊文件名（未重命名）: {report['old_names']} 個")
+    print(f"\n📊 章節詳情：")
+    for ch, counts in report['chapters'].items():
+        status = "✅" if counts['old'] == 0 else "⚠️"
+        print(f"  {status} {ch.capitalize()}: {counts['new']} 個新文件, {counts['old']} 個舊文件")
+
+    print(f"\n🔗 檢查 {report['files']} 個文件中的 {report['links_checked']} 個連結"
+          f"（重新解析 {report['reparsed']} 個，耗時 {report['seconds']:.2f} 秒）")
+    for key, label in (('broken_links', '失效連結'), ('broken_anchors', '失效錨點')):
+        items = report[key]
+        if not items:
+            print(f"  ✅ 沒有{label}")
+            continue
+        print(f"  ❌ {label}: {len(items)} 個")
+        for item in items[:limit]:
+            hint = f"（是否指 {item['suggestion']}？）" if item.get('suggestion') else ''
+            print(f"     {item['source']}:{item['line']} -> {item['target']}{hint}")
+        if len(items) > limit:
+            print(f"     ... 另有 {len(items) - limit} 個")
 
-base_path = Path(r'E:\Jerry_python\腳本平台\doc\鏡界')
+    print(f"\n{'=' * 50}")
+    if report['exit_code'] == 0:
+        print("🎉 所有文件已完成重命名，且所有連結與錨點皆有效！")
+    else:
+        if report['old_names']:
+            print(f"⚠️ 還有 {report['old_names']} 個文件待重命名")
+        if report['broken_links'] or report['broken_anchors']:
+            print(f"❌ 有 {len(report['broken_links'])} 個失效連結、"
+                  f"{len(report['broken_anchors'])} 個失效錨點待修正")
+    print(f"{'=' * 50}")
 
-# 統計新文件名的文件
-new_files = list(base_path.glob('ch*/ch*-[0-9]-*.md'))
-old_files = list(base_path.glob('ch*/ch*-[0-9].md'))
 
-print(f"✅ 新文件名（已重命名）: {len(new_files)} 個")
-print(f"⚠️ 舊文件名（未重命名）: {len(old_files)} 個")
-print(f"\n📊 章節詳情：")
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='驗證重命名完成度與文件中的連結、錨點')
+    parser.add_argument('--root', default=str(doc_fs.BOOK_ROOT),
+                        help='文件樹根目錄（預設由環境變數 DOC_ROOT 決定）')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='平行解析的行程數')
+    parser.add_argument('--cache', help=f'連結檢查快取路徑（預設 <root>/{link_checker.CACHE_NAME}）')
+    parser.add_argument('--report', help='將機器可讀的報告寫成 JSON 檔')
+    parser.add_argument('--json', action='store_true', help='以 JSON 輸出報告到標準輸出')
+    doc_fs.add_arguments(parser)
+    args = parser.parse_args(argv)
 
-for ch in range(1, 10):
-    ch_dir = base_path / f'ch{ch}'
-    if ch_dir.exists():
-        new = len(list(ch_dir.glob('ch*-[0-9]-*.md')))
-        old = len(list(ch_dir.glob('ch*-[0-9].md')))
-        status = "✅" if old == 0 else "⚠️"
-        print(f"  {status} Ch{ch}: {new} 個新文件, {old} 個舊文件")
+    report = verify(args.root, args.jobs, args.cache, args.io_workers)
+    if args.report:
+        atomic_write_text(args.report, json.dumps(report, ensure_ascii=False, indent=2))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+    return report['exit_code']
 
-print(f"\n{'='*50}")
-print(f"✅ 總計: {len(new_files)} 個文件已成功重命名")
-print(f"{'='*50}
 
-if len(old_files) == 0:
-    print("\n🎉 所有文件已完成重命名！項目完成度: 100%")
-else:
-    print(f"\n⚠️ 還有 {len(old_files)} 個文件待重命名")
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
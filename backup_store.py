@@ -0,0 +1,461 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+舊版文件的內容定址備份庫
+
+取代在 _backup_legacy/chX/ 下保存完整純文字副本的做法：
+    _backup_legacy/objects/ab/cdef...   以內容雜湊（sha256）命名的 zlib 壓縮內容
+    _backup_legacy/index.jsonl          每次備份一行：原路徑、時間、雜湊、大小、新檔名
+
+- 內容相同的檔案只存一份；同一路徑重複備份相同內容時不新增任何東西。
+- 讀檔、計算雜湊與壓縮在執行緒池中平行進行（hashlib 與 zlib 處理時會釋放 GIL）。
+- 還原單一檔案只需查索引、讀一個物件並解壓縮。
+
+用法：
+    python backup_store.py [--store DIR] list [pattern]
+    python backup_store.py [--store DIR] restore ch6/ch6-4.md [--at 時間] [-o 輸出檔]
+    python backup_store.py [--store DIR] import DIR     # 匯入既有的純文字備份後刪除
+    python backup_store.py [--store DIR] stats
+    python backup_store.py [--store DIR] archive backups.bka   # 附加一個世代到封存檔
+    python backup_store.py extract backups.bka ch6/ch6-4.md [--at 時間] [-o 輸出檔]
+
+封存檔（供異地保存的單一檔案）：
+    檔頭 BKARCH01
+    世代 1：物件 ... 索引（zlib 壓縮的 JSON） 結尾（魔術字、索引位移、索引長度、CRC32）
+    世代 2：新增的物件 ... 索引 結尾
+    ...
+物件直接沿用備份庫中的 zlib 壓縮內容；每個世代只附加前面世代沒有的物件，
+索引也只列出該世代新增的紀錄與物件的 (位移, 長度)，另記前一世代結尾的位置，
+因此每次附加的索引大小只與新增內容有關。讀取時從檔尾的結尾沿著 previous 往前讀各世代的索引，
+再 seek 到物件位置解壓縮單一物件。舊版的索引列出截至該世代的全部內容，讀到時就不再往前。
+中斷附加留下的殘尾以固定大小的區塊從檔尾往前搜尋結尾魔術字，不讀入整個封存檔。
+"""
+
+import argparse
+import fnmatch
+import json
+import os
+import re
+import struct
+import sys
+import zlib
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import doc_fs
+from doc_io import atomic_write_bytes, content_hash
+
+DEFAULT_STORE = doc_fs.BOOK_ROOT / '_backup_legacy'
+OBJECTS_DIR = 'objects'
+INDEX_NAME = 'index.jsonl'
+TIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+COMPRESS_LEVEL = 9
+
+ARCHIVE_MAGIC = b'BKARCH01'
+TRAILER_MAGIC = b'BKIDX001'
+_TRAILER = struct.Struct('<8sQQI')  # 魔術字、索引位移、索引長度、索引 CRC32
+_SCAN_BLOCK = 1 << 16  # 往前搜尋結尾時每次讀取的位元組數
+
+# BACKUP_LEGACY.py 舊版加在純文字備份開頭的說明（換行可能是字面上的 \n）
+_LEGACY_BANNER = re.compile(
+    r'\A<!-- LEGACY FILE NOTICE -->\n'
+    r'> ⚠️ 此檔案為舊版備份，已被新檔取代： \[(?P<new_name>[^\]]*)\]\([^)]*\)(?:\\n|\n)'
+    r'> 備份時間：(?P<time>[^\n\\]*)(?:\\n|\n)'
+    r'\n---\n\n')
+
+
+class BackupStore:
+    """內容定址的備份庫；索引在第一次使用時載入並常駐記憶體"""
+
+    def __init__(self, root=DEFAULT_STORE):
+        self.root = Path(root)
+        self.objects = self.root / OBJECTS_DIR
+        self.index_path = self.root / INDEX_NAME
+        self._records: Optional[List[dict]] = None
+        self._latest: Dict[str, dict] = {}
+
+    def _load(self) -> None:
+        if self._records is not None:
+            return
+        self._records = []
+        try:
+            with open(self.index_path, encoding='utf-8') as f:
+                for line in f:
+                    if line.strip():
+                        self._add(json.loads(line))
+        except FileNotFoundError:
+            pass
+
+    def _add(self, record: dict) -> None:
+        self._records.append(record)
+        self._latest[record['path']] = record
+
+    def records(self, pattern: str = None) -> List[dict]:
+        """所有備份紀錄（依備份先後）；pattern 為 fnmatch 樣式"""
+        self._load()
+        if pattern is None:
+            return list(self._records)
+        return [r for r in self._records if fnmatch.fnmatchcase(r['path'], pattern)]
+
+    def latest(self, path: str) -> Optional[dict]:
+        self._load()
+        return self._latest.get(path)
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects / digest[:2] / digest[2:]
+
+    def _store_object(self, data: bytes) -> tuple:
+        """寫入物件（已存在則略過）；回傳 (雜湊, 是否新寫入)"""
+        digest = content_hash(data)
+        path = self.object_path(digest)
+        if path.exists():
+            return digest, False
+        path.parent.mkdir(parents=True, exist_ok=True)
+        atomic_write_bytes(path, zlib.compress(data, COMPRESS_LEVEL))
+        return digest, True
+
+    def _prepare(self, item: tuple) -> tuple:
+        path, source, meta = item
+        data = Path(source).read_bytes() if not isinstance(source, bytes) else source
+        digest, written = self._store_object(data)
+        return path, digest, len(data), written, meta
+
+    def put_many(self, items, jobs: int = None, timestamp: str = None,
+                 io: doc_fs.FileIO = None) -> dict:
+        """備份多個檔案；items 為 [(原相對路徑, 來源路徑或內容 bytes, 額外欄位 dict), ...]
+
+        io 為共用的 doc_fs.FileIO 時改在它的執行緒池中進行（暫時性錯誤會重試），jobs 不使用。
+        回傳 {'records': [新增的紀錄], 'objects': 新寫入物件數, 'bytes': 新寫入壓縮位元組數}
+        """
+        self._load()
+        items = list(items)
+        jobs = jobs or min(8, os.cpu_count() or 1)
+        if io is not None:
+            prepared = io.gather(self._prepare, [(item,) for item in items])
+            for result in prepared:
+                if isinstance(result, BaseException):
+                    raise result
+        elif jobs > 1 and len(items) > 1:
+            with ThreadPoolExecutor(max_workers=jobs) as pool:
+                prepared = list(pool.map(self._prepare, items))
+        else:
+            prepared = [self._prepare(item) for item in items]
+
+        timestamp = timestamp or datetime.now().strftime(TIME_FORMAT)
+        added, new_objects, new_bytes = [], 0, 0
+        created = set()  # 同一批中內容相同的文件可能由多個執行緒各寫一次，物件只算一次
+        for path, digest, size, written, meta in prepared:
+            if written and digest not in created:
+                created.add(digest)
+                new_objects += 1
+                new_bytes += self.object_path(digest).stat().st_size
+            previous = self._latest.get(path)
+            if previous is not None and previous['hash'] == digest:
+                continue  # 同一路徑、相同內容：不必再記一次
+            record = {'path': path, 'time': (meta or {}).get('time', timestamp),
+                      'hash': digest, 'size': size}
+            record.update({k: v for k, v in (meta or {}).items() if k != 'time'})
+            added.append(record)
+
+        if added:
+            self.root.mkdir(parents=True, exist_ok=True)
+            with open(self.index_path, 'a', encoding='utf-8') as f:
+                for record in added:
+                    f.write(json.dumps(record, ensure_ascii=False, separators=(',', ':')) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            for record in added:
+                self._add(record)
+        return {'records': added, 'objects': new_objects, 'bytes': new_bytes}
+
+    def put(self, path: str, source, **meta) -> Optional[dict]:
+        """備份單一檔案；內容與該路徑最近一次備份相同時回傳 None"""
+        records = self.put_many([(path, source, meta)], jobs=1)['records']
+        return records[0] if records else None
+
+    def read_object(self, digest: str) -> bytes:
+        data = zlib.decompress(self.object_path(digest).read_bytes())
+        if content_hash(data) != digest:
+            raise ValueError(f'備份物件內容與雜湊不符: {digest}')
+        return data
+
+    def find(self, path: str, at: str = None) -> Optional[dict]:
+        """取得 path 最近一次（或在 at 時間當下或之前最近一次）的備份紀錄"""
+        if at is None:
+            return self.latest(path)
+        found = None
+        for record in self.records():
+            if record['path'] == path and record['time'] <= at:
+                found = record
+        return found
+
+    def restore(self, path: str, at: str = None) -> bytes:
+        record = self.find(path, at)
+        if record is None:
+            raise FileNotFoundError(f'找不到備份: {path}' + (f'（{at} 之前）' if at else ''))
+        return self.read_object(record['hash'])
+
+    def stats(self) -> dict:
+        self._load()
+        stored = sum(p.stat().st_size for p in self.objects.glob('*/*')) if self.objects.exists() else 0
+        hashes = {r['hash']: r['size'] for r in self._records}
+        return {'records': len(self._records), 'paths': len(self._latest), 'objects': len(hashes),
+                'original_bytes': sum(r['size'] for r in self._records),
+                'unique_bytes': sum(hashes.values()), 'stored_bytes': stored}
+
+    def import_plain(self, directory, jobs: int = None, paths=None) -> dict:
+        """匯入舊版純文字備份（去掉說明標頭）；成功後刪除原檔
+
+        指定 paths 時只匯入這些檔案（須位於 directory 之下），不動其他既有的備份。
+        """
+        directory = Path(directory)
+        items, sources = [], []
+        found = sorted(directory.rglob('*.md')) if paths is None else sorted(Path(p) for p in paths)
+        for source in found:
+            rel = source.relative_to(directory)
+            if rel.parts[0] == OBJECTS_DIR:
+                continue
+            data = source.read_bytes()
+            meta = {}
+            m = _LEGACY_BANNER.match(data.decode('utf-8', errors='ignore'))
+            if m:
+                meta = {'time': m.group('time'), 'new_name': m.group('new_name')}
+                data = data[len(m.group(0).encode('utf-8')):]
+            items.append((rel.as_posix(), data, meta))
+            sources.append(source)
+        result = self.put_many(items, jobs)
+        for source in sources:
+            source.unlink()
+        for path in sorted({s.parent for s in sources}, key=lambda p: len(p.parts), reverse=True):
+            if path != directory and not any(path.iterdir()):
+                path.rmdir()
+        result['imported'] = len(sources)
+        return result
+
+
+class BackupArchive:
+    """可附加世代的單一封存檔；以檔尾索引隨機存取單一備份"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._index: Optional[dict] = None
+        self._end = 0
+
+    def _read_trailer(self, f, end: int) -> Optional[dict]:
+        if end < len(ARCHIVE_MAGIC) + _TRAILER.size:
+            return None
+        f.seek(end - _TRAILER.size)
+        magic, offset, length, crc = _TRAILER.unpack(f.read(_TRAILER.size))
+        if magic != TRAILER_MAGIC or offset + length != end - _TRAILER.size:
+            return None
+        f.seek(offset)
+        data = f.read(length)
+        if zlib.crc32(data) != crc:
+            return None
+        return json.loads(zlib.decompress(data))
+
+    def _trailer_ends(self, f, end: int):
+        """由 end 往前逐區塊搜尋結尾魔術字，依序產生可能的世代結尾位置"""
+        keep = len(TRAILER_MAGIC) - 1
+        tail = b''
+        pos = end
+        while pos > len(ARCHIVE_MAGIC):
+            start = max(len(ARCHIVE_MAGIC), pos - _SCAN_BLOCK)
+            f.seek(start)
+            block = f.read(pos - start) + tail
+            hit = block.rfind(TRAILER_MAGIC)
+            while hit >= 0:
+                if start + hit + _TRAILER.size <= end:
+                    yield start + hit + _TRAILER.size
+                hit = block.rfind(TRAILER_MAGIC, 0, hit)
+            tail = block[:keep]
+            pos = start
+
+    def _load(self) -> dict:
+        """由最後一個完整世代的結尾沿鏈讀取各世代的索引；中斷附加留下的殘尾會往前搜尋略過"""
+        if self._index is not None:
+            return self._index
+        self._index = {'generation': 0, 'records': [], 'objects': {}}
+        self._end = 0
+        try:
+            f = open(self.path, 'rb')
+        except FileNotFoundError:
+            return self._index
+        with f:
+            if f.read(len(ARCHIVE_MAGIC)) != ARCHIVE_MAGIC:
+                raise ValueError(f'不是備份封存檔: {self.path}')
+            end = f.seek(0, os.SEEK_END)
+            self._end = len(ARCHIVE_MAGIC)
+            last = self._read_trailer(f, end)
+            if last is None:
+                for end in self._trailer_ends(f, end):
+                    last = self._read_trailer(f, end)
+                    if last is not None:
+                        break
+            if last is None:
+                return self._index
+
+            chain = [last]
+            while chain[-1].get('delta') and chain[-1].get('previous'):
+                previous = self._read_trailer(f, chain[-1]['previous'])
+                if previous is None:
+                    raise ValueError(f'封存檔第 {chain[-1]["generation"] - 1} 世代的索引已損毀: {self.path}')
+                chain.append(previous)
+        records: List[dict] = []
+        objects: Dict[str, list] = {}
+        for index in reversed(chain):
+            records.extend(index['records'])
+            objects.update(index['objects'])
+        self._index = {'generation': last['generation'], 'records': records, 'objects': objects}
+        self._end = end
+        return self._index
+
+    @property
+    def generation(self) -> int:
+        return self._load()['generation']
+
+    def records(self, pattern: str = None) -> List[dict]:
+        records = self._load()['records']
+        if pattern is None:
+            return list(records)
+        return [r for r in records if fnmatch.fnmatchcase(r['path'], pattern)]
+
+    def find(self, path: str, at: str = None) -> Optional[dict]:
+        found = None
+        for record in self._load()['records']:
+            if record['path'] == path and (at is None or record['time'] <= at):
+                found = record
+        return found
+
+    def read_object(self, digest: str) -> bytes:
+        offset, length = self._load()['objects'][digest]
+        with open(self.path, 'rb') as f:
+            f.seek(offset)
+            data = zlib.decompress(f.read(length))
+        if content_hash(data) != digest:
+            raise ValueError(f'封存物件內容與雜湊不符: {digest}')
+        return data
+
+    def extract(self, path: str, at: str = None) -> bytes:
+        record = self.find(path, at)
+        if record is None:
+            raise FileNotFoundError(f'封存檔中找不到: {path}' + (f'（{at} 之前）' if at else ''))
+        return self.read_object(record['hash'])
+
+    def append(self, store: BackupStore) -> dict:
+        """將備份庫的紀錄附加成新世代；只寫入前面世代沒有的物件，不改寫既有內容"""
+        index = self._load()
+        objects = {}
+        known = {(r['path'], r['time'], r['hash']) for r in index['records']}
+        new_records = [r for r in store.records() if (r['path'], r['time'], r['hash']) not in known]
+        if not new_records:
+            return {'generation': index['generation'], 'records': 0, 'objects': 0, 'bytes': 0}
+
+        mode = 'r+b' if self.path.exists() else 'w+b'
+        added = written = 0
+        with open(self.path, mode) as f:
+            if mode == 'w+b':
+                f.write(ARCHIVE_MAGIC)
+                self._end = len(ARCHIVE_MAGIC)
+            f.truncate(self._end)  # 去掉中斷附加留下的殘尾
+            f.seek(self._end)
+            try:
+                for record in new_records:
+                    if record['hash'] in objects or record['hash'] in index['objects']:
+                        continue
+                    blob = store.object_path(record['hash']).read_bytes()
+                    objects[record['hash']] = [f.tell(), len(blob)]
+                    f.write(blob)
+                    added += 1
+                    written += len(blob)
+                generation = index['generation'] + 1
+                # 只記錄本世代新增的內容，前面的世代由 previous 串起
+                delta = {'generation': generation,
+                         'created': datetime.now().strftime(TIME_FORMAT),
+                         'delta': True,
+                         'previous': self._end if index['generation'] else None,
+                         'records': new_records,
+                         'objects': objects}
+                data = zlib.compress(json.dumps(delta, ensure_ascii=False,
+                                                separators=(',', ':')).encode('utf-8'))
+                offset = f.tell()
+                f.write(data)
+                f.write(_TRAILER.pack(TRAILER_MAGIC, offset, len(data), zlib.crc32(data)))
+                f.flush()
+                os.fsync(f.fileno())
+            except BaseException:
+                f.truncate(self._end)
+                raise
+            self._end = f.tell()
+        self._index = {'generation': generation, 'records': index['records'] + new_records,
+                       'objects': {**index['objects'], **objects}}
+        return {'generation': generation, 'records': len(new_records), 'objects': added,
+                'bytes': written}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='內容定址的舊版文件備份庫')
+    parser.add_argument('--store', default=str(DEFAULT_STORE), help='備份庫目錄')
+    sub = parser.add_subparsers(dest='command', required=True)
+    p = sub.add_parser('list', help='列出備份紀錄')
+    p.add_argument('pattern', nargs='?', help='路徑樣式，例如 ch6/*')
+    p = sub.add_parser('restore', help='還原單一檔案')
+    p.add_argument('path', help='原相對路徑，例如 ch6/ch6-4.md')
+    p.add_argument('--at', help=f'還原此時間（{TIME_FORMAT}）當下或之前最近的版本')
+    p.add_argument('-o', '--output', help='輸出檔（預設寫到標準輸出）')
+    p = sub.add_parser('import', help='匯入既有的純文字備份目錄')
+    p.add_argument('directory')
+    p.add_argument('-j', '--jobs', type=int, default=None, help='平行處理的執行緒數')
+    sub.add_parser('stats', help='顯示備份庫統計')
+    p = sub.add_parser('archive', help='將備份庫附加成封存檔的新世代')
+    p.add_argument('archive')
+    p = sub.add_parser('extract', help='從封存檔取出單一檔案')
+    p.add_argument('archive')
+    p.add_argument('path')
+    p.add_argument('--at', help=f'取出此時間（{TIME_FORMAT}）當下或之前最近的版本')
+    p.add_argument('-o', '--output', help='輸出檔（預設寫到標準輸出）')
+    args = parser.parse_args(argv)
+
+    store = BackupStore(args.store)
+    if args.command == 'list':
+        for record in store.records(args.pattern):
+            extra = f" -> {record['new_name']}" if record.get('new_name') else ''
+            print(f"{record['time']}  {record['hash'][:12]}  {record['size']:>8}  {record['path']}{extra}")
+    elif args.command in ('restore', 'extract'):
+        try:
+            if args.command == 'restore':
+                data = store.restore(args.path, args.at)
+            else:
+                data = BackupArchive(args.archive).extract(args.path, args.at)
+        except FileNotFoundError as e:
+            print(f"❌ {e}")
+            return 1
+        if args.output:
+            atomic_write_bytes(args.output, data)
+            print(f"✅ 已還原: {args.path} -> {args.output}")
+        else:
+            sys.stdout.buffer.write(data)
+    elif args.command == 'import':
+        result = store.import_plain(args.directory, args.jobs)
+        print(f"✅ 匯入 {result['imported']} 個檔案：新增 {len(result['records'])} 筆紀錄、"
+              f"{result['objects']} 個物件（{result['bytes'] / 1024:.1f} KB）")
+    elif args.command == 'archive':
+        result = BackupArchive(args.archive).append(store)
+        if result['records']:
+            print(f"✅ 第 {result['generation']} 世代：{result['records']} 筆紀錄、"
+                  f"{result['objects']} 個新物件（{result['bytes'] / 1024:.1f} KB）")
+        else:
+            print(f"⏭️ 沒有新的備份，封存檔維持第 {result['generation']} 世代")
+    elif args.command == 'stats':
+        s = store.stats()
+        print(f"📊 {s['records']} 筆紀錄、{s['paths']} 個路徑、{s['objects']} 個不重複內容")
+        print(f"   原始 {s['original_bytes'] / 1024:.1f} KB，不重複 {s['unique_bytes'] / 1024:.1f} KB，"
+              f"實際儲存 {s['stored_bytes'] / 1024:.1f} KB")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
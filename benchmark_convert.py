@@ -0,0 +1,405 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+簡繁轉換引擎效能基準測試
+
+以 doc/鏡界 的真實文件為樣本（標題、表格、程式碼區塊、中文段落），
+產生 1 MB ~ 1 GB 的合成語料，量測各轉換模式的 chars/sec、files/sec 與峰值 RSS，
+結果存成 JSON，可與基準結果比較並在效能退步超過門檻時回傳非零值。
+
+用法：
+    python benchmark_convert.py --sizes 1MB,10MB --save bench.json
+    python benchmark_convert.py --sizes 1MB,10MB --baseline bench.json --threshold 0.1
+"""
+
+import argparse
+import codecs
+import contextlib
+import io
+import json
+import os
+import platform
+import random
+import re
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime
+from multiprocessing import get_context
+from pathlib import Path
+
+import convert_to_traditional
+from build_convert_dict import prune_entries
+from convert_table import write_table
+from md_tokenizer import HeadingScanner
+
+try:
+    import resource
+except ImportError:  # Windows 沒有 resource 模組，改以 tracemalloc 量測
+    resource = None
+
+SAMPLE_ROOT = Path(__file__).parent / 'doc' / '鏡界'
+
+# 模式名稱 -> (轉換表, Markdown 感知, 串流, 平行, 記憶體映射略過 ASCII)
+MODES = {
+    'trie-raw': ('builtin', False, False, False, False),
+    'trie-markdown': ('builtin', True, False, False, False),
+    'table-raw': ('compiled', False, False, False, False),
+    'table-markdown': ('compiled', True, False, False, False),
+    'stream-markdown': ('compiled', True, True, False, False),
+    'jobs-markdown': ('compiled', True, False, True, False),
+    'mapped-markdown': ('compiled', True, False, False, True),
+}
+
+_SIZE_RE = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMG]?B)?\s*$', re.IGNORECASE)
+_UNITS = {'B': 1, 'KB': 2**10, 'MB': 2**20, 'GB': 2**30}
+
+
+def parse_size(text: str) -> int:
+    m = _SIZE_RE.match(text)
+    if not m:
+        raise argparse.ArgumentTypeError(f'無法解析大小: {text}')
+    return int(float(m.group(1)) * _UNITS[(m.group(2) or 'B').upper()])
+
+
+def split_blocks(text: str) -> list:
+    """以空行切出區塊；圍欄程式碼區塊內的空行不切開"""
+    scanner = HeadingScanner()
+    blocks = []
+    current = []
+    for line in text.split('\n'):
+        if not line.strip() and not scanner.in_fence:
+            if current:
+                blocks.append('\n'.join(current))
+                current = []
+            continue
+        scanner.feed(line)
+        current.append(line)
+    if current:
+        blocks.append('\n'.join(current))
+    return blocks
+
+
+def load_sample_blocks(sample_root: Path = SAMPLE_ROOT) -> dict:
+    """將真實文件切成區塊並分類：heading / table / code / prose"""
+    blocks = {'heading': [], 'table': [], 'code': [], 'prose': []}
+    sizes = []
+    for md_file in sorted(sample_root.rglob('*.md')):
+        if '_backup_legacy' in md_file.parts:
+            continue
+        text = md_file.read_text(encoding='utf-8', errors='ignore')
+        sizes.append(len(text.encode('utf-8')))
+        for block in split_blocks(text):
+            if block.lstrip().startswith(('```', '~~~')):
+                kind = 'code'
+            elif block.startswith('#'):
+                kind = 'heading'
+            elif block.lstrip().startswith('|'):
+                kind = 'table'
+            else:
+                kind = 'prose'
+            blocks[kind].append(block)
+    if not sizes:
+        raise SystemExit(f'❌ 找不到樣本文件: {sample_root}')
+    blocks['file_sizes'] = sizes
+    return blocks
+
+
+def _simplify(text: str, reverse: list) -> str:
+    """把部分繁體詞換回簡體，讓合成語料有轉換工作可做"""
+    for traditional, simple in reverse:
+        if traditional in text:
+            text = text.replace(traditional, simple)
+    return text
+
+
+def generate_corpus(out_dir: Path, total_bytes: int, seed: int = 0, blocks: dict = None) -> dict:
+    """依樣本區塊的比例產生合成語料，回傳 {'files': N, 'bytes': M}"""
+    blocks = blocks or load_sample_blocks()
+    rnd = random.Random(seed)
+    kinds = [k for k in ('heading', 'table', 'code', 'prose') if blocks[k]]
+    weights = [sum(len(b) for b in blocks[k]) for k in kinds]
+    reverse = sorted(((t, s) for s, t in convert_to_traditional.CONVERT_DICT.items() if s != t),
+                     key=lambda x: -len(x[0]))
+    simplified = {k: [_simplify(b, reverse) if k in ('heading', 'prose', 'table') else b
+                      for b in blocks[k]] for k in kinds}
+
+    out_dir.mkdir(parents=True, exist_ok=True)
+    written = 0
+    n_files = 0
+    while written < total_bytes:
+        target = min(rnd.choice(blocks['file_sizes']), total_bytes - written)
+        parts = []
+        size = 0
+        while size < target:
+            kind = rnd.choices(kinds, weights)[0]
+            block = rnd.choice(simplified[kind])
+            parts.append(block)
+            size += len(block.encode('utf-8')) + 2
+        data = ('\n\n'.join(parts) + '\n').encode('utf-8')
+        sub = out_dir / f'ch{n_files % 12 + 1}'
+        sub.mkdir(exist_ok=True)
+        (sub / f'doc-{n_files:06d}.md').write_bytes(data)
+        written += len(data)
+        n_files += 1
+    return {'files': n_files, 'bytes': written}
+
+
+def ensure_corpus(workdir: Path, total_bytes: int, seed: int, blocks: dict) -> Path:
+    """產生（或重用已產生的）語料目錄"""
+    corpus = workdir / f'corpus-{total_bytes}-s{seed}'
+    marker = corpus / '.complete'
+    if not marker.exists():
+        shutil.rmtree(corpus, ignore_errors=True)
+        info = generate_corpus(corpus, total_bytes, seed, blocks)
+        marker.write_text(json.dumps(info), encoding='utf-8')
+    return corpus
+
+
+class _NullSink:
+    """丟棄寫入內容的輸出目標，只讓串流轉換量測引擎本身"""
+
+    def write(self, data):
+        return len(data)
+
+
+def _count_chars(path: Path, chunk_size: int = 2**20) -> int:
+    """分段解碼計算字元數，不把整個文件讀入記憶體"""
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    count = 0
+    with open(path, 'rb') as f:
+        while True:
+            raw = f.read(chunk_size)
+            count += len(decoder.decode(raw, not raw))
+            if not raw:
+                return count
+
+
+def _use_table(table: str, table_path: str) -> None:
+    if table == 'compiled':
+        matcher = convert_to_traditional.load_matcher(table_path)
+    else:
+        matcher = convert_to_traditional.PhraseMatcher(convert_to_traditional.CONVERT_DICT)
+    convert_to_traditional.set_matcher(matcher)
+
+
+def memory_source() -> str:
+    """峰值記憶體的量測方式：rusage（行程 RSS）或 tracemalloc（僅 Python 配置的記憶體）"""
+    return 'rusage' if resource is not None else 'tracemalloc'
+
+
+def _start_peak() -> None:
+    """沒有 resource 模組時開始以 tracemalloc 追蹤，須在階段開始時呼叫"""
+    if resource is None and not tracemalloc.is_tracing():
+        tracemalloc.start()
+
+
+def _peak_rss_kb(children: bool = False) -> int:
+    """本行程（或已回收的子行程）的峰值記憶體（KB）；tracemalloc 無法量測子行程，回傳 0"""
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_CHILDREN if children else resource.RUSAGE_SELF).ru_maxrss
+    if children:
+        return 0
+    return tracemalloc.get_traced_memory()[1] // 1024
+
+
+def _engine_phase(mode: str, corpus: str, table_path: str) -> dict:
+    """量測轉換引擎的吞吐量；串流模式以串流轉換逐段讀取，不會整檔讀入"""
+    table, markdown, stream, parallel, ascii_skip = MODES[mode]
+    _start_peak()
+    _use_table(table, table_path)
+    files = convert_to_traditional.iter_md_files(Path(corpus), [])
+    chunk_size = convert_to_traditional.stream_chunk_size(convert_to_traditional.MAX_MEMORY)
+    chars = 0
+    engine_seconds = 0.0
+    for md_file in files:
+        if stream:
+            chars += _count_chars(md_file)
+            start = time.perf_counter()
+            convert_to_traditional.convert_stream(md_file, _NullSink(), chunk_size, markdown)
+        elif ascii_skip:
+            data = md_file.read_bytes()
+            chars += len(data.decode('utf-8'))
+            start = time.perf_counter()
+            convert_to_traditional.convert_mapped(data, markdown)
+        else:
+            text = md_file.read_text(encoding='utf-8')
+            chars += len(text)
+            start = time.perf_counter()
+            convert_to_traditional.convert_text(text, markdown)
+        engine_seconds += time.perf_counter() - start
+    return {'files': len(files), 'chars': chars, 'engine_seconds': engine_seconds,
+            'peak_rss_kb': _peak_rss_kb()}
+
+
+def _run_phase(mode: str, corpus: str, table_path: str, scratch: str, jobs: int) -> dict:
+    """量測 convert_md_files 的完整執行
+
+    平行模式的工作行程在 convert_md_files 返回前已結束並回收，
+    RUSAGE_CHILDREN 即為其中峰值最大的工作行程。
+    """
+    table, markdown, stream, parallel, ascii_skip = MODES[mode]
+    _start_peak()
+    _use_table(table, table_path)
+    scratch = Path(scratch)
+    shutil.rmtree(scratch, ignore_errors=True)
+    shutil.copytree(corpus, scratch)
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        convert_to_traditional.convert_md_files(
+            str(scratch), exclude_patterns=[], manifest_path=False,
+            jobs=jobs if parallel else 1,
+            table_path=table_path if table == 'compiled' else None,
+            stream_threshold=0 if stream else convert_to_traditional.STREAM_THRESHOLD,
+            markdown=markdown, ascii_skip=ascii_skip)
+    run_seconds = time.perf_counter() - start
+    shutil.rmtree(scratch, ignore_errors=True)
+    return {
+        'run_seconds': run_seconds,
+        'peak_rss_kb': _peak_rss_kb(),
+        'worker_peak_rss_kb': _peak_rss_kb(children=True) if parallel else 0,
+    }
+
+
+def _in_child(func, *args) -> dict:
+    """在全新的行程中執行 func，確保各階段的峰值 RSS 互不影響"""
+    with ProcessPoolExecutor(max_workers=1, mp_context=get_context('spawn')) as pool:
+        return pool.submit(func, *args).result()
+
+
+def _run_mode(mode: str, corpus: str, table_path: str, scratch: str, jobs: int) -> dict:
+    """分別在獨立行程中量測引擎與完整執行兩個階段"""
+    engine = _in_child(_engine_phase, mode, corpus, table_path)
+    run = _in_child(_run_phase, mode, corpus, table_path, scratch, jobs)
+    return {
+        'mode': mode,
+        'files': engine['files'],
+        'chars': engine['chars'],
+        'engine_seconds': engine['engine_seconds'],
+        'chars_per_sec': engine['chars'] / engine['engine_seconds'] if engine['engine_seconds'] else 0.0,
+        'engine_peak_rss_kb': engine['peak_rss_kb'],
+        'run_seconds': run['run_seconds'],
+        'files_per_sec': engine['files'] / run['run_seconds'] if run['run_seconds'] else 0.0,
+        'peak_rss_kb': run['peak_rss_kb'],
+        'worker_peak_rss_kb': run['worker_peak_rss_kb'],
+    }
+
+
+def run_benchmarks(sizes: list, modes: list, workdir: Path, seed: int, jobs: int) -> dict:
+    blocks = load_sample_blocks()
+    table_path = workdir / 'bench.ctd'
+    write_table(prune_entries(convert_to_traditional.CONVERT_DICT)[0], table_path)
+    results = []
+    for size in sizes:
+        corpus = ensure_corpus(workdir, size, seed, blocks)
+        for mode in modes:
+            result = _run_mode(mode, str(corpus), str(table_path), str(workdir / 'scratch'), jobs)
+            result['corpus_bytes'] = size
+            results.append(result)
+            workers = result['worker_peak_rss_kb']
+            print(f"  {format_size(size):>7} {mode:<16} {result['chars_per_sec'] / 1e6:8.2f} Mchar/s"
+                  f" {result['files_per_sec']:9.1f} files/s {result['peak_rss_kb'] / 1024:8.1f} MB RSS"
+                  + (f" (工作行程 {workers / 1024:.1f} MB × {jobs})" if workers else ''))
+    return {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpu_count': os.cpu_count(),
+            'jobs': jobs,
+            'seed': seed,
+            'memory': memory_source(),
+        },
+        'results': results,
+    }
+
+
+def format_size(size: int) -> str:
+    for unit in ('GB', 'MB', 'KB'):
+        if size >= _UNITS[unit] and size % _UNITS[unit] == 0:
+            return f'{size // _UNITS[unit]}{unit}'
+    return f'{size}B'
+
+
+def compare(current: dict, baseline: dict, threshold: float) -> list:
+    """比較吞吐量與峰值記憶體，回傳退步超過門檻的項目
+
+    峰值記憶體只在兩份結果以相同方式量測時比較（見 memory_source）。
+    """
+    base = {(r['corpus_bytes'], r['mode']): r for r in baseline.get('results', [])}
+    same_memory = current.get('meta', {}).get('memory', 'rusage') == baseline.get('meta', {}).get('memory', 'rusage')
+    regressions = []
+    for result in current['results']:
+        ref = base.get((result['corpus_bytes'], result['mode']))
+        if ref is None:
+            continue
+        for metric in ('chars_per_sec', 'files_per_sec', 'peak_rss_kb', 'engine_peak_rss_kb'):
+            if not ref.get(metric) or metric not in result:
+                continue
+            if metric.endswith('_kb'):
+                worse = same_memory and result[metric] > ref[metric] * (1 + threshold)
+            else:
+                worse = result[metric] < ref[metric] * (1 - threshold)
+            if worse:
+                regressions.append({
+                    'corpus': format_size(result['corpus_bytes']), 'mode': result['mode'],
+                    'metric': metric, 'baseline': ref[metric], 'current': result[metric],
+                    'change': result[metric] / ref[metric] - 1,
+                })
+    return regressions
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='簡繁轉換引擎效能基準測試')
+    parser.add_argument('--sizes', default='1MB,10MB',
+                        help='語料大小，以逗號分隔（例如 1MB,10MB,100MB,1GB）')
+    parser.add_argument('--modes', default=','.join(MODES),
+                        help=f'要量測的模式（可選：{", ".join(MODES)}）')
+    parser.add_argument('--workdir', help='語料與暫存目錄（預設為系統暫存目錄，結束後刪除）')
+    parser.add_argument('--seed', type=int, default=0, help='語料產生的亂數種子')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='jobs-markdown 模式使用的行程數')
+    parser.add_argument('--save', help='將結果寫成 JSON')
+    parser.add_argument('--baseline', help='與此 JSON 基準結果比較')
+    parser.add_argument('--threshold', type=float, default=0.10,
+                        help='允許的吞吐量下降與峰值記憶體增加比例（預設 0.10）')
+    args = parser.parse_args(argv)
+
+    sizes = [parse_size(s) for s in args.sizes.split(',') if s.strip()]
+    modes = [m.strip() for m in args.modes.split(',') if m.strip()]
+    unknown = [m for m in modes if m not in MODES]
+    if unknown:
+        parser.error(f'未知的模式: {", ".join(unknown)}')
+
+    with contextlib.ExitStack() as stack:
+        if args.workdir:
+            workdir = Path(args.workdir)
+            workdir.mkdir(parents=True, exist_ok=True)
+        else:
+            workdir = Path(stack.enter_context(tempfile.TemporaryDirectory(prefix='bench-convert-')))
+        print(f'開始基準測試（工作目錄: {workdir}）')
+        report = run_benchmarks(sizes, modes, workdir, args.seed, args.jobs)
+
+    if args.save:
+        Path(args.save).write_text(json.dumps(report, ensure_ascii=False, indent=2), encoding='utf-8')
+        print(f'✅ 結果已寫入 {args.save}')
+
+    if args.baseline:
+        baseline = json.loads(Path(args.baseline).read_text(encoding='utf-8'))
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f'\n❌ 效能退步超過 {args.threshold:.0%}:')
+            for r in regressions:
+                print(f"  - {r['corpus']} {r['mode']} {r['metric']}: "
+                      f"{r['baseline']:.1f} -> {r['current']:.1f} ({r['change']:+.1%})")
+            return 1
+        print(f'\n✅ 與基準相比沒有超過 {args.threshold:.0%} 的退步')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
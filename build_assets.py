@@ -0,0 +1,257 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+網站資源建置：壓縮、內容雜湊命名、預先壓縮與資源清單
+
+對網站根目錄的頁面與資源做一次平行處理，輸出到 dist/：
+    1. 以 minify.py 壓縮 JS、CSS、HTML
+    2. JS / CSS 檔名加上內容雜湊（script.js → script.1a2b3c4d5e.js；已含雜湊的
+       css/site.<雜湊>.css 保留原名），並改寫 HTML 的 src/href 與 CSS 的 @import/url() 引用；
+       頁面與 components/*.html 模板（由 JS 依固定網址載入）保留原名
+    3. 每個輸出檔另寫 .gz，有安裝 brotli 模組時再寫 .br（壓縮後沒有變小則不寫）
+    4. 寫出 asset-manifest.json：原路徑 → 輸出檔名、雜湊、各版本大小，以及建議的 Cache-Control
+       （含雜湊的檔案可設為一年且 immutable，頁面則需每次重新驗證）
+
+每個資源是 doc_pipeline.run_dag 的兩個任務：壓縮完成後，只要它引用的資源都已決定檔名，
+就立即改寫引用、計算雜湊並寫出，所有資源共用同一個行程池。
+含雜湊的輸出檔內容不會改變，已存在時直接沿用；上一次清單中不再使用的舊檔預設會移除。
+
+用法：
+    python build_assets.py [--site .] [--out dist] [-j 4] [--keep-old]
+"""
+
+import argparse
+import gzip
+import json
+import os
+import posixpath
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from doc_io import atomic_write_bytes, atomic_write_text, content_hash
+from doc_pipeline import Task, _InlineExecutor, run_dag
+from minify import MINIFIERS
+
+try:
+    import brotli
+except ImportError:  # 選用：沒有安裝時只產生 .gz
+    brotli = None
+
+SITE_ROOT = Path(__file__).parent
+DEFAULT_OUT = SITE_ROOT / 'dist'
+MANIFEST_NAME = 'asset-manifest.json'
+ASSET_GLOBS = ('*.js', '*.css', 'components/*.js', 'styles/*.css', 'css/*.css')
+DOCUMENT_GLOBS = ('*.html', 'components/*.html')
+HASH_LENGTH = 10
+CACHE_CONTROL = {'immutable': 'public, max-age=31536000, immutable', 'document': 'no-cache'}
+
+_FINGERPRINTED = re.compile(r'\.[0-9a-f]{8,}\.[a-z]+$')
+_EXTERNAL = re.compile(r'^(?:[a-zA-Z][a-zA-Z0-9+.-]*:|//|#)|\$\{|\{\{')
+_HTML_REF = re.compile(r'''(\b(?:src|href)\s*=\s*)(["'])(.*?)\2''', re.IGNORECASE)
+_CSS_REF = re.compile(r'''(url\(\s*)(["']?)([^"')\s]+)\2(?=\s*\))|(@import\s+)(["'])([^"']+)\5''')
+
+
+def collect(site: Path) -> Tuple[List[str], List[str]]:
+    """回傳 (資源, 頁面)；皆為相對於網站根目錄的 POSIX 路徑"""
+    def glob(patterns):
+        found = set()
+        for pattern in patterns:
+            found.update(p.relative_to(site).as_posix() for p in site.glob(pattern) if p.is_file())
+        return sorted(found)
+    return glob(ASSET_GLOBS), glob(DOCUMENT_GLOBS)
+
+
+def _refs(text: str, rel: str) -> Iterator[Tuple[int, int, str]]:
+    """列出 (起點, 終點, 引用字串)"""
+    if rel.endswith('.html'):
+        for m in _HTML_REF.finditer(text):
+            yield m.start(3), m.end(3), m.group(3)
+    elif rel.endswith('.css'):
+        for m in _CSS_REF.finditer(text):
+            group = 3 if m.group(3) is not None else 6
+            yield m.start(group), m.end(group), m.group(group)
+
+
+def resolve_ref(rel: str, ref: str, known) -> Optional[str]:
+    """引用字串 → 資源路徑；不是本站資源則回傳 None"""
+    path = re.split(r'[?#]', ref, maxsplit=1)[0]
+    if not path or _EXTERNAL.search(path):
+        return None
+    if path.startswith('/'):
+        candidates = [posixpath.normpath(path.lstrip('/'))]
+    else:
+        # components/ 的模板是渲染到根目錄的頁面中，找不到時改以網站根目錄為基準
+        candidates = [posixpath.normpath(posixpath.join(posixpath.dirname(rel), path)),
+                      posixpath.normpath(path)]
+    for candidate in candidates:
+        if candidate in known:
+            return candidate
+    return None
+
+
+def scan_dependencies(site: Path, rel: str, known) -> List[str]:
+    text = (site / rel).read_text(encoding='utf-8', errors='replace')
+    deps = {resolve_ref(rel, ref, known) for _, _, ref in _refs(text, rel)}
+    deps.discard(None)
+    deps.discard(rel)
+    return sorted(deps)
+
+
+def rewrite_refs(text: str, rel: str, names: Dict[str, str]) -> str:
+    """將引用的資源檔名換成輸出檔名（輸出檔與原檔在同一目錄，只需替換最後一段）"""
+    out, pos = [], 0
+    for start, end, ref in _refs(text, rel):
+        target = resolve_ref(rel, ref, names)
+        if target is None:
+            continue
+        path = re.split(r'[?#]', ref, maxsplit=1)[0]
+        base = posixpath.basename(path)
+        new_ref = path[:len(path) - len(base)] + posixpath.basename(names[target]) + ref[len(path):]
+        out.append(text[pos:start])
+        out.append(new_ref)
+        pos = end
+    out.append(text[pos:])
+    return ''.join(out)
+
+
+def output_name(rel: str, digest: str, immutable: bool) -> str:
+    if not immutable or _FINGERPRINTED.search(rel):
+        return rel
+    stem, ext = posixpath.splitext(rel)
+    return f'{stem}.{digest[:HASH_LENGTH]}{ext}'
+
+
+def _minify_task(site: str, rel: str) -> Tuple[int, str]:
+    text = (Path(site) / rel).read_text(encoding='utf-8')
+    return len(text.encode('utf-8')), MINIFIERS[posixpath.splitext(rel)[1]](text)
+
+
+def _write_variant(path: Path, data: Optional[bytes]) -> Optional[int]:
+    """寫出壓縮版本；沒有變小（data 為 None）時移除舊檔"""
+    if data is None:
+        if path.exists():
+            path.unlink()
+        return None
+    atomic_write_bytes(path, data)
+    return len(data)
+
+
+def _emit_task(out: str, rel: str, immutable: bool, minified: Tuple[int, str], *deps) -> dict:
+    """改寫引用、命名並寫出檔案與預先壓縮版本；回傳清單項目"""
+    source_bytes, text = minified
+    names = {dep['rel']: dep['file'] for dep in deps}
+    data = rewrite_refs(text, rel, names).encode('utf-8')
+    digest = content_hash(data)
+    name = output_name(rel, digest, immutable)
+    target = Path(out) / name
+    variants = {'gzip': target.with_name(target.name + '.gz'),
+                'br': target.with_name(target.name + '.br')}
+
+    reused = (immutable and name != rel and target.exists() and target.stat().st_size == len(data)
+              and variants['gzip'].exists() and (brotli is None or variants['br'].exists()))
+    sizes: Dict[str, Optional[int]] = {}
+    if reused:
+        # 含雜湊的檔名代表內容相同，直接沿用上次的輸出
+        for key, path in variants.items():
+            sizes[key] = path.stat().st_size if path.exists() else None
+    else:
+        target.parent.mkdir(parents=True, exist_ok=True)
+        if not target.exists() or target.read_bytes() != data:
+            atomic_write_bytes(target, data)
+        gz = gzip.compress(data, compresslevel=9, mtime=0)
+        sizes['gzip'] = _write_variant(variants['gzip'], gz if len(gz) < len(data) else None)
+        if brotli is not None:
+            br = brotli.compress(data, quality=11)
+            sizes['br'] = _write_variant(variants['br'], br if len(br) < len(data) else None)
+        else:
+            sizes['br'] = None
+    return {'rel': rel, 'file': name, 'sha256': digest, 'source_bytes': source_bytes,
+            'bytes': len(data), 'gzip': sizes['gzip'], 'br': sizes['br'], 'immutable': immutable,
+            'reused': bool(reused)}
+
+
+def build(site=SITE_ROOT, out=DEFAULT_OUT, jobs: int = None, keep_old: bool = False) -> dict:
+    start = time.perf_counter()
+    site, out = Path(site).resolve(), Path(out).resolve()
+    jobs = jobs or os.cpu_count() or 1
+    assets, documents = collect(site)
+    known = set(assets)
+
+    tasks: Dict[str, Task] = {}
+    for rel in assets + documents:
+        deps = tuple(f'emit:{d}' for d in scan_dependencies(site, rel, known))
+        tasks[f'minify:{rel}'] = Task(_minify_task, args=(str(site), rel))
+        tasks[f'emit:{rel}'] = Task(_emit_task, deps=(f'minify:{rel}',) + deps,
+                                    args=(str(out), rel, rel in known))
+
+    out.mkdir(parents=True, exist_ok=True)
+    if jobs > 1 and len(tasks) > 2:
+        with ProcessPoolExecutor(max_workers=jobs) as pool:
+            results = run_dag(tasks, pool, pool)
+    else:
+        inline = _InlineExecutor()
+        results = run_dag(tasks, inline, inline)
+
+    entries = {rel: results[f'emit:{rel}'] for rel in assets + documents}
+    manifest_path = out / MANIFEST_NAME
+    removed = []
+    if manifest_path.exists() and not keep_old:
+        previous = json.loads(manifest_path.read_text(encoding='utf-8')).get('assets', {})
+        current = {e['file'] for e in entries.values()}
+        for entry in previous.values():
+            if entry['file'] in current:
+                continue
+            for suffix in ('', '.gz', '.br'):
+                path = out / (entry['file'] + suffix)
+                if path.exists():
+                    path.unlink()
+            removed.append(entry['file'])
+
+    manifest = {
+        'version': 1,
+        'cache_control': CACHE_CONTROL,
+        'assets': {rel: {key: e[key] for key in ('file', 'sha256', 'bytes', 'gzip', 'br', 'immutable')}
+                   for rel, e in entries.items()},
+    }
+    atomic_write_text(manifest_path, json.dumps(manifest, ensure_ascii=False, indent=2) + '\n')
+
+    values = list(entries.values())
+    return {'out': str(out), 'files': len(values), 'assets': len(assets), 'documents': len(documents),
+            'reused': sum(e['reused'] for e in values),
+            'source_bytes': sum(e['source_bytes'] for e in values),
+            'bytes': sum(e['bytes'] for e in values),
+            'gzip_bytes': sum(e['gzip'] or e['bytes'] for e in values),
+            'br_bytes': sum(e['br'] or e['bytes'] for e in values) if brotli is not None else None,
+            'removed': removed, 'seconds': round(time.perf_counter() - start, 3)}
+
+
+def _kb(n: int) -> str:
+    return f'{n / 1024:.1f} KB'
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='壓縮網站資源、加上內容雜湊並預先壓縮')
+    parser.add_argument('--site', default=str(SITE_ROOT), help='網站根目錄')
+    parser.add_argument('--out', default=str(DEFAULT_OUT), help='輸出目錄')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='平行處理的行程數')
+    parser.add_argument('--keep-old', action='store_true', help='保留上一次建置中已不再使用的檔案')
+    args = parser.parse_args(argv)
+
+    result = build(args.site, args.out, args.jobs, args.keep_old)
+    print(f"✅ {result['assets']} 個資源、{result['documents']} 個頁面 -> {result['out']}"
+          f"（沿用 {result['reused']} 個，{result['seconds']:.2f} 秒）")
+    print(f"📊 原始 {_kb(result['source_bytes'])} → 壓縮 {_kb(result['bytes'])} → gzip {_kb(result['gzip_bytes'])}"
+          + (f" / br {_kb(result['br_bytes'])}" if result['br_bytes'] is not None else '（未安裝 brotli，略過 .br）'))
+    for name in result['removed']:
+        print(f"🗑️ 移除舊檔 {name}")
+    print(f"📋 資源清單：{Path(result['out']) / MANIFEST_NAME}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
@@ -0,0 +1,149 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+建置簡繁轉換表：合併內建對應表與外部 OpenCC 格式字典，
+剔除恆等與被遮蔽的詞條、回報衝突，並輸出可 mmap 載入的編譯轉換表。
+
+用法：
+    python build_convert_dict.py [-d STPhrases.txt ...] [-o convert_dict.ctd] [--report report.json]
+"""
+
+import argparse
+import ast
+import json
+import sys
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import convert_to_traditional
+from convert_table import write_table
+from convert_to_traditional import PhraseMatcher
+
+BUILTIN_TABLES = ('CONVERT_DICT', 'SINGLE_CHAR_CONVERT')
+
+# (key, value, 來源描述)
+Entry = Tuple[str, str, str]
+
+
+def load_builtin_entries(source_path=None) -> List[Entry]:
+    """從 convert_to_traditional.py 原始碼讀取內建表（保留字面量中的重複鍵）"""
+    source_path = Path(source_path or convert_to_traditional.__file__)
+    tree = ast.parse(source_path.read_text(encoding='utf-8'))
+    entries: List[Entry] = []
+    for table in BUILTIN_TABLES:
+        for node in tree.body:
+            if not (isinstance(node, ast.Assign) and isinstance(node.value, ast.Dict)):
+                continue
+            if not any(isinstance(t, ast.Name) and t.id == table for t in node.targets):
+                continue
+            for k, v in zip(node.value.keys, node.value.values):
+                if isinstance(k, ast.Constant) and isinstance(v, ast.Constant):
+                    entries.append((k.value, v.value, f'{source_path.name}:{k.lineno} ({table})'))
+    return entries
+
+
+def load_opencc_file(path) -> List[Entry]:
+    """讀取 OpenCC 格式字典：每行「詞<TAB>候選1 候選2 ...」，取第一個候選"""
+    path = Path(path)
+    entries: List[Entry] = []
+    with open(path, 'r', encoding='utf-8') as f:
+        for lineno, line in enumerate(f, 1):
+            line = line.rstrip('\r\n')
+            if not line or line.startswith('#'):
+                continue
+            key, sep, candidates = line.partition('\t')
+            if not sep or not candidates.split():
+                raise ValueError(f'{path}:{lineno}: 格式錯誤: {line!r}')
+            entries.append((key, candidates.split()[0], f'{path.name}:{lineno}'))
+    return entries
+
+
+def merge_entries(sources: List[List[Entry]]) -> Tuple[Dict[str, str], List[dict]]:
+    """依序合併詞條，後者覆蓋前者；回報重複與衝突"""
+    merged: Dict[str, str] = {}
+    origin: Dict[str, str] = {}
+    issues: List[dict] = []
+    for entries in sources:
+        for key, value, where in entries:
+            if key in merged:
+                issues.append({
+                    'kind': 'duplicate' if merged[key] == value else 'conflict',
+                    'key': key,
+                    'old': merged[key], 'old_source': origin[key],
+                    'new': value, 'new_source': where,
+                })
+            merged[key] = value
+            origin[key] = where
+    return merged, issues
+
+
+def prune_entries(mapping: Dict[str, str]) -> Tuple[Dict[str, str], List[str], List[str]]:
+    """剔除不影響任何轉換結果的詞條
+
+    詞條 K→V 可安全移除的條件：
+      1. 移除後，單獨轉換 K 仍得到 V；
+      2. K 內部（第 2 個字元起）開始的任何後綴，都不是其他詞的真前綴，
+         因此移除後的掃描不會跨出 K 的邊界。
+    恆等的單字詞條是此規則的特例。
+    """
+    matcher = PhraseMatcher(mapping)
+    end = PhraseMatcher._END
+    proper_prefixes = {key[:i] for key in mapping for i in range(1, len(key))}
+
+    kept = dict(mapping)
+    identity: List[str] = []
+    shadowed: List[str] = []
+    for key in sorted(mapping, key=lambda k: (-len(k), k)):
+        value = mapping[key]
+        if any(key[o:] in proper_prefixes for o in range(1, len(key))):
+            continue
+        node = matcher.root
+        for ch in key:
+            node = node[ch]
+        del node[end]
+        if matcher.convert(key) == value:
+            del kept[key]
+            (identity if key == value else shadowed).append(key)
+        else:
+            node[end] = value
+    return kept, identity, shadowed
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='建置編譯後的簡繁轉換表')
+    parser.add_argument('-d', '--dict', dest='dicts', action='append', default=[],
+                        help='外部 OpenCC 格式字典檔（可重複指定，後者覆蓋前者）')
+    parser.add_argument('-o', '--output', default=str(convert_to_traditional.DEFAULT_TABLE),
+                        help='輸出的轉換表路徑')
+    parser.add_argument('--no-builtin', action='store_true', help='不合併內建對應表')
+    parser.add_argument('--report', help='將重複、衝突與剔除結果寫成 JSON')
+    args = parser.parse_args(argv)
+
+    # 外部字典先合併，內建表最後覆蓋，以專案自訂譯法為準
+    sources = [load_opencc_file(p) for p in args.dicts]
+    if not args.no_builtin:
+        sources.append(load_builtin_entries())
+    merged, issues = merge_entries(sources)
+    kept, identity, shadowed = prune_entries(merged)
+    path = write_table(kept, args.output)
+
+    conflicts = [i for i in issues if i['kind'] == 'conflict']
+    duplicates = [i for i in issues if i['kind'] == 'duplicate']
+    for issue in conflicts:
+        print(f"⚠️ 衝突: {issue['key']!r} {issue['old']!r} ({issue['old_source']})"
+              f" -> {issue['new']!r} ({issue['new_source']})")
+    print(f'合併詞條: {len(merged)} 個（重複 {len(duplicates)}，衝突 {len(conflicts)}）')
+    print(f'剔除恆等詞條: {len(identity)} 個，剔除被遮蔽詞條: {len(shadowed)} 個')
+    print(f'✅ 已寫入 {path}（{len(kept)} 個詞條，{path.stat().st_size} bytes）')
+
+    if args.report:
+        report = {'issues': issues, 'identity': identity, 'shadowed': shadowed,
+                  'entries': len(kept)}
+        Path(args.report).write_text(json.dumps(report, ensure_ascii=False, indent=2),
+                                     encoding='utf-8')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
@@ -0,0 +1,191 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+建置時產生靜態樣式表，取代頁面上的 cdn.tailwindcss.com 執行期腳本
+
+流程：
+    1. 掃描根目錄的 *.html / *.js、components/ 的 *.html / *.js，以及產生文件頁面的
+       build_site.py / md_render.py（頁面的類別寫在 Python 原始碼中），收集所有可能是類別名稱的字詞
+       （與 Tailwind 的內容掃描相同，不只看 class 屬性，JS 字串裡的 'bg-blue-600' 也會收集）；
+       模板中的動態片段（`bg-${color}-900/30`、`hover:border-{{ FEATURE_COLOR }}-500`）
+       以色盤顏色與尺寸名稱展開
+    2. 以 css_utilities.py 的離線規則產生用到的工具類別（含 Preflight）
+    3. 將 style.css 及其 @import 的 styles/*.css 依原順序內嵌在前，工具類別接在後
+       （與原本「先載入 style.css、CDN 再插入樣式」的層疊順序相同）
+    4. 以內容雜湊命名寫出 css/site.<雜湊>.css，並移除舊版本
+    5. 改寫載入 CDN 腳本的頁面：移除 CDN 腳本，style.css 連結改為新的樣式表；
+       已改寫過的頁面只更新雜湊
+
+不需要網路；重複執行時若內容未變，不會改動任何檔案。
+
+用法：
+    python build_css.py [--site .] [--dry-run] [--check]
+"""
+
+import argparse
+import os
+import re
+import sys
+from pathlib import Path
+from typing import List, Set, Tuple
+
+from css_utilities import COLOR_NAMES, MAX_WIDTH, generate_css
+from doc_io import atomic_write_text, content_hash
+
+SITE_ROOT = Path(__file__).parent
+CSS_DIR = 'css'
+ENTRY_STYLESHEET = 'style.css'
+CONTENT_GLOBS = ('*.html', '*.js', 'components/*.html', 'components/*.js',
+                 # 靜態網站產生器輸出的頁面不在網站根目錄，直接掃描產生它們的原始碼
+                 'build_site.py', 'md_render.py')
+
+_CDN_SCRIPT = re.compile(r'[ \t]*<script\s+src="https://cdn\.tailwindcss\.com[^"]*"\s*>\s*</script>[ \t]*\r?\n?')
+_STYLE_LINK = re.compile(
+    r'<link\b[^>]*?\bhref="(?:\./)?(?:' + re.escape(ENTRY_STYLESHEET)
+    + r'|' + CSS_DIR + r'/site\.[0-9a-f]+\.css)"[^>]*>')
+_BUILT_LINK = re.compile(r'\bhref="(?:\./)?' + CSS_DIR + r'/site\.[0-9a-f]+\.css"')
+_IMPORT = re.compile(r'''@import\s+(?:url\(\s*)?['"]?([^'")\s]+)['"]?\s*\)?\s*;''')
+
+# 模板中的動態片段：${...}（可含一層巢狀大括號）與 {{ ... }}
+_DYNAMIC = re.compile(r'\$\{(?:[^{}]|\{[^{}]*\})*\}|\{\{[^{}]*\}\}')
+_HOLE = '\x01'
+# 類別名稱候選：允許變體冒號、斜線透明度與 [任意值]
+_CANDIDATE = re.compile(r'(?:[\w\-:./%#!\x01]|\[[^\]\s<>]*\])+')
+# 動態片段可能代入的值：色盤名稱與尺寸名稱
+_HOLE_VALUES = tuple(COLOR_NAMES) + tuple(MAX_WIDTH) + ('black', 'white', 'transparent')
+
+
+def content_files(site: Path) -> List[Path]:
+    files = []
+    for pattern in CONTENT_GLOBS:
+        files.extend(sorted(site.glob(pattern)))
+    return files
+
+
+def extract_candidates(text: str) -> Set[str]:
+    """從 HTML/JS 原始碼收集類別名稱候選字詞（寧多勿漏，不認得的由產生器略過）"""
+    text = _DYNAMIC.sub(_HOLE, text)
+    found: Set[str] = set()
+    for m in _CANDIDATE.finditer(text):
+        token = m.group().strip('.:/')
+        if not token or token.count(_HOLE) > 1:
+            continue
+        if _HOLE in token:
+            found.update(token.replace(_HOLE, value) for value in _HOLE_VALUES)
+        else:
+            found.add(token)
+    return found
+
+
+def inline_imports(path: Path, seen=None) -> str:
+    """展開 @import，回傳單一樣式表內容（每個檔案只內嵌一次）"""
+    seen = set() if seen is None else seen
+    path = path.resolve()
+    if path in seen:
+        return ''
+    seen.add(path)
+    text = path.read_text(encoding='utf-8')
+
+    def repl(m: 're.Match') -> str:
+        target = m.group(1)
+        if re.match(r'^[a-z]+:|^//', target):
+            return m.group()
+        return inline_imports(path.parent / target, seen)
+
+    return _IMPORT.sub(repl, text)
+
+
+def build_stylesheet(site: Path) -> Tuple[str, int, int]:
+    """回傳 (樣式表內容, 候選字詞數, 產生的工具類別數)"""
+    candidates: Set[str] = set()
+    for path in content_files(site):
+        candidates |= extract_candidates(path.read_text(encoding='utf-8', errors='replace'))
+    utilities, matched = generate_css(candidates)
+    base = inline_imports(site / ENTRY_STYLESHEET)
+    css = (f'/* {ENTRY_STYLESHEET} */\n{base.rstrip()}\n\n'
+           f'/* utilities (build_css.py) */\n{utilities}')
+    return css, len(candidates), len(matched)
+
+
+def rewrite_page(text: str, href: str) -> str:
+    """將頁面改為載入 href 的靜態樣式表；不需改寫時原樣回傳"""
+    link = f'<link rel="stylesheet" href="{href}">'
+    if _CDN_SCRIPT.search(text):
+        if _STYLE_LINK.search(text):
+            text = _STYLE_LINK.sub(lambda m: link, text, count=1)
+            return _CDN_SCRIPT.sub('', text, count=1)
+        return _CDN_SCRIPT.sub(lambda m: m.group().replace(m.group().strip(), link), text, count=1)
+    if _BUILT_LINK.search(text):
+        return _BUILT_LINK.sub(f'href="{href}"', text)
+    return text
+
+
+def build(site=SITE_ROOT, dry_run: bool = False) -> dict:
+    site = Path(site)
+    css, candidates, utilities = build_stylesheet(site)
+    name = f'site.{content_hash(css.encode("utf-8"))[:10]}.css'
+    out_dir = site / CSS_DIR
+    target = out_dir / name
+
+    stale = [p for p in out_dir.glob('site.*.css') if p.name != name] if out_dir.is_dir() else []
+    css_changed = not target.exists() or target.read_text(encoding='utf-8') != css
+
+    # 頁面一律以網站根目錄為基準引用（components/ 的模板也是渲染到根目錄的頁面中）
+    href = f'{CSS_DIR}/{name}'
+    pages = []
+    for path in sorted(site.glob('*.html')) + sorted(site.glob('components/*.html')):
+        with open(path, encoding='utf-8', newline='') as f:
+            text = f.read()
+        new = rewrite_page(text, href)
+        if new != text:
+            pages.append((path, new))
+
+    if not dry_run:
+        if css_changed:
+            out_dir.mkdir(exist_ok=True)
+            atomic_write_text(target, css)
+        for path, new in pages:
+            _write_keep_newlines(path, new)
+        for path in stale:
+            path.unlink()
+
+    return {'css': str(target), 'bytes': len(css.encode('utf-8')), 'candidates': candidates,
+            'utilities': utilities, 'css_changed': css_changed,
+            'pages': [os.path.relpath(p, site) for p, _ in pages],
+            'stale': [p.name for p in stale]}
+
+
+def _write_keep_newlines(path: Path, text: str) -> None:
+    # newline='' 讀入的內容保留原本的換行字元，寫回時也不轉換
+    tmp = path.with_name(path.name + '.tmp')
+    with open(tmp, 'w', encoding='utf-8', newline='') as f:
+        f.write(text)
+    os.replace(tmp, path)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='產生靜態工具類別樣式表並取代 Tailwind CDN 腳本')
+    parser.add_argument('--site', default=str(SITE_ROOT), help='網站根目錄（含 style.css 與頁面）')
+    parser.add_argument('--dry-run', action='store_true', help='只列出會變更的檔案')
+    parser.add_argument('--check', action='store_true', help='樣式表或頁面不是最新時以非零結束碼結束')
+    args = parser.parse_args(argv)
+
+    result = build(args.site, dry_run=args.dry_run or args.check)
+    print(f"📊 {result['candidates']} 個候選字詞 → {result['utilities']} 個工具類別，"
+          f"樣式表 {result['bytes'] / 1024:.1f} KB")
+    verb = '將' if args.dry_run or args.check else '已'
+    if result['css_changed']:
+        print(f"✅ {verb}寫出 {result['css']}")
+    for page in result['pages']:
+        print(f"🔄 {verb}改寫 {page}")
+    for name in result['stale']:
+        print(f"🗑️ {verb}移除舊樣式表 {name}")
+    outdated = result['css_changed'] or result['pages'] or result['stale']
+    if not outdated:
+        print('✅ 樣式表與頁面皆為最新')
+    return 1 if args.check and outdated else 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
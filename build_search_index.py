@@ -0,0 +1,230 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+為文件網站預先建立全文檢索索引（中文友善、依詞條分片、瀏覽器延遲載入）
+
+詞條：連續中文字切成二字詞（bigram；單獨一個中文字則保留單字），英數字依單字切分並轉小寫。
+每個詞條依文件記錄出現位置（同一文件內連續編號），查詢時以位置相鄰判斷片語；
+每個文件另記錄各標題開始的位置，命中位置可對應回最近的標題錨點。
+
+輸出（預設 site/search/，搭配 build_site.py 產生的頁面）：
+    meta.json          版本、各分片的第一個詞條、各文件資訊分塊的第一個文件編號
+                       （瀏覽器以二分搜尋找出所在分片）
+    s00000.json ...    詞條分片：{詞條: [[文件編號差, 位置差, 位置差, ...], ...]}（差值編碼）
+    b00000.json ...    過長的出現清單依文件編號切成區塊，分片中只記錄
+                       {"n": 文件數, "blocks": [[首文件, 末文件, 區塊編號], ...]}
+    d00000.json ...    文件資訊分塊：[[頁面路徑, 標題, [[起始位置, 錨點, 標題], ...]], ...]
+詞條依字典序排序後連續裝入分片，分片、區塊與文件資訊分塊都不超過 --shard-kb（單一過大的項目除外）。
+查詢只需下載 meta.json、查詢詞所在的少數分片、與候選文件重疊的區塊，
+以及排名在前的文件所在的文件資訊分塊；語料再大，單次查詢的下載量也只有數個分片。
+
+用法：
+    python build_search_index.py [--root doc/鏡界] [--out site/search] [--shard-kb 16]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import re
+import shutil
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from build_site import DEFAULT_OUT, SEARCH_DIR, page_path
+import doc_fs
+from doc_io import atomic_write_text, content_hash
+from md_tokenizer import Slugger
+
+DEFAULT_ROOT = doc_fs.BOOK_ROOT
+INDEX_VERSION = 1
+SHARD_BYTES = 16 * 1024
+
+# 與 script.js 的 DocSearch 相同的切詞規則
+CJK = '\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff'
+_TOKEN = re.compile(f'[{CJK}]+|[0-9a-z]+')
+_CJK_RUN = re.compile(f'[{CJK}]')
+
+_FENCE = re.compile(r'^[ ]{0,3}(`{3,}|~{3,})')
+_HEADING = re.compile(r'^[ ]{0,3}(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$')
+# 不列入索引的非正文：連結目標、HTML 標籤、URL
+_NOISE = re.compile(r'\]\([^)]*\)|<[^<>]*>|https?://\S+')
+
+
+def _verifier():
+    # VERIFY-COMPLETION.py 的檔名含連字號，無法以 import 陳述式載入
+    return importlib.import_module('VERIFY-COMPLETION')
+
+
+def tokenize(text: str, start: int = 0) -> tuple:
+    """回傳 ([(詞條, 位置)], 下一個位置)"""
+    tokens = []
+    pos = start
+    for m in _TOKEN.finditer(text.lower()):
+        token = m.group()
+        if _CJK_RUN.match(token) and len(token) > 1:
+            tokens.extend((token[i:i + 2], pos + i) for i in range(len(token) - 1))
+            pos += len(token) - 1
+        else:
+            tokens.append((token, pos))
+            pos += 1
+    return tokens, pos
+
+
+def index_document(text: str) -> tuple:
+    """回傳 ({詞條: [位置]}, [(起始位置, 錨點, 標題)], 標題)"""
+    postings: Dict[str, List[int]] = {}
+    sections = []
+    slugger = Slugger()
+    titles = {}
+    pos = 0
+    fence = None
+    for line in text.splitlines():
+        m = _FENCE.match(line)
+        if fence is not None:
+            if m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence) \
+                    and not line.strip().strip(fence[0]):
+                fence = None
+            continue
+        if m:
+            fence = m.group(1)
+            continue
+        m = _HEADING.match(line)
+        if m:
+            title = m.group(2).strip()
+            level = len(m.group(1))
+            titles.setdefault(level, title)
+            sections.append((pos, slugger.slug(title), _NOISE.sub('', title)))
+            line = title
+        tokens, pos = tokenize(_NOISE.sub(' ', line), pos)
+        for token, p in tokens:
+            postings.setdefault(token, []).append(p)
+    return postings, sections, titles.get(2) or titles.get(1)
+
+
+def _delta(values: List[int]) -> List[int]:
+    out, prev = [], 0
+    for v in values:
+        out.append(v - prev)
+        prev = v
+    return out
+
+
+def _encode(postings: List[tuple]) -> list:
+    """[(文件編號, [位置])] → [[文件編號差, 位置差, ...], ...]"""
+    entry, prev_doc = [], 0
+    for doc_id, positions in postings:
+        entry.append([doc_id - prev_doc] + _delta(positions))
+        prev_doc = doc_id
+    return entry
+
+
+def _json_size(value) -> int:
+    return len(json.dumps(value, ensure_ascii=False, separators=(',', ':')).encode('utf-8'))
+
+
+def _pack(items: List[tuple], budget: int) -> List[list]:
+    """依序將 (項目, 大小) 裝入不超過 budget 的分組"""
+    groups, current, size = [], [], 0
+    for item, item_size in items:
+        if current and size + item_size > budget:
+            groups.append(current)
+            current, size = [], 0
+        current.append(item)
+        size += item_size
+    if current:
+        groups.append(current)
+    return groups
+
+
+def build_index(root=DEFAULT_ROOT, out=DEFAULT_OUT / SEARCH_DIR, shard_bytes: int = SHARD_BYTES,
+                site_root=None) -> dict:
+    """建立索引；site_root 為頁面路徑的基準目錄（預設為 out 的上一層）"""
+    start = time.perf_counter()
+    root = Path(os.path.normpath(Path(root).resolve()))
+    out = Path(out)
+    site_root = Path(site_root) if site_root else out.parent
+    md_files, _existing = _verifier().walk_tree(root)
+
+    docs = []
+    inverted: Dict[str, List[tuple]] = {}
+    for doc_id, rel in enumerate(sorted(md_files)):
+        text = (root / rel).read_text(encoding='utf-8', errors='replace')
+        postings, sections, title = index_document(text)
+        docs.append([page_path(rel), title or Path(rel).stem, [list(s) for s in sections]])
+        for token, positions in postings.items():
+            inverted.setdefault(token, []).append((doc_id, positions))
+
+    # 過長的出現清單切成區塊；詞條依字典序連續裝入分片
+    blocks = []
+    entries = []
+    for token in sorted(inverted):
+        postings = inverted[token]
+        entry = _encode(postings)
+        if _json_size(entry) > shard_bytes:
+            refs = []
+            for group in _pack([(p, _json_size(_encode([p]))) for p in postings], shard_bytes):
+                refs.append([group[0][0], group[-1][0], len(blocks)])
+                blocks.append(_encode(group))
+            entry = {'n': len(postings), 'blocks': refs}
+        entries.append(((token, entry), _json_size(entry) + len(token.encode('utf-8')) + 6))
+    shards = [dict(group) for group in _pack(entries, shard_bytes)]
+    firsts = [next(iter(shard)) for shard in shards]
+    doc_chunks = _pack([(doc, _json_size(doc)) for doc in docs], shard_bytes)
+
+    # 先寫到暫存目錄再整個換上，瀏覽器不會讀到新舊混雜的分片
+    tmp = out.with_name(out.name + '.tmp')
+    if tmp.exists():
+        shutil.rmtree(tmp)
+    tmp.mkdir(parents=True)
+    total = 0
+    for i, shard in enumerate(shards):
+        data = json.dumps(shard, ensure_ascii=False, separators=(',', ':'))
+        (tmp / f's{i:05d}.json').write_text(data, encoding='utf-8')
+        total += len(data.encode('utf-8'))
+    for i, block in enumerate(blocks):
+        data = json.dumps(block, ensure_ascii=False, separators=(',', ':'))
+        (tmp / f'b{i:05d}.json').write_text(data, encoding='utf-8')
+        total += len(data.encode('utf-8'))
+    chunk_firsts, first = [], 0
+    for i, chunk in enumerate(doc_chunks):
+        data = json.dumps(chunk, ensure_ascii=False, separators=(',', ':'))
+        (tmp / f'd{i:05d}.json').write_text(data, encoding='utf-8')
+        total += len(data.encode('utf-8'))
+        chunk_firsts.append(first)
+        first += len(chunk)
+    meta = {'version': INDEX_VERSION, 'docs': len(docs),
+            'site': Path(os.path.relpath(site_root.resolve(), out.resolve())).as_posix() + '/',
+            'shards': firsts, 'doc_chunks': chunk_firsts}
+    meta['build'] = content_hash(json.dumps(meta, ensure_ascii=False).encode('utf-8')
+                                 + str(total).encode())[:12]
+    atomic_write_text(tmp / 'meta.json', json.dumps(meta, ensure_ascii=False, separators=(',', ':')))
+    if out.exists():
+        shutil.rmtree(out)
+    os.replace(tmp, out)
+
+    return {'out': str(out), 'docs': len(docs), 'tokens': len(inverted), 'shards': len(shards),
+            'blocks': len(blocks),
+            'bytes': total, 'meta_bytes': (out / 'meta.json').stat().st_size,
+            'seconds': round(time.perf_counter() - start, 3)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='建立文件網站的分片全文檢索索引')
+    parser.add_argument('--root', default=str(DEFAULT_ROOT), help='文件樹根目錄')
+    parser.add_argument('--out', default=str(DEFAULT_OUT / SEARCH_DIR), help='索引輸出目錄')
+    parser.add_argument('--shard-kb', type=int, default=SHARD_BYTES // 1024, help='每個分片的大小上限（KB）')
+    args = parser.parse_args(argv)
+
+    result = build_index(args.root, args.out, args.shard_kb * 1024)
+    print(f"✅ 索引 {result['docs']} 個文件、{result['tokens']} 個詞條 -> {result['out']}")
+    print(f"📊 {result['shards']} 個分片、{result['blocks']} 個區塊，共 {result['bytes'] / 1024:.1f} KB，"
+          f"meta.json {result['meta_bytes'] / 1024:.1f} KB（{result['seconds']:.2f} 秒）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
@@ -0,0 +1,357 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+由 doc/鏡界 的 Markdown 產生靜態網站
+
+每個 .md 文件產生一個同名 .html 頁面（目錄結構不變），套用 components/base.html 與
+components/page-header.html，樣式沿用 style.css（styles/*.css，文件頁面的樣式在 styles/docs.css）。
+同章節的頁面附有章節目錄側欄；側欄的搜尋框使用 build_search_index.py 產生的 <out>/search/ 索引。
+模板引用的本站資源（build_css.py 產生的樣式表、導航列腳本等）複製到輸出目錄的相同位置，
+頁面以相對於網站根目錄的路徑引用，輸出目錄可以單獨部署。
+
+增量建置：
+- Markdown 轉譯結果（片段）依內容雜湊快取在 <out>/.fragments/，內容不變就不再轉譯；
+- 資源內容不變就不再複製，模板不再引用的資源從輸出目錄移除；
+- 每個頁面記錄組成它的鍵：內容雜湊、模板雜湊、章節目錄、失效連結集合，
+  鍵相同且輸出存在時不重建；因此只會重建內容、模板或連結目標有變動的頁面；
+- 需要轉譯的文件在行程池中平行處理。
+
+用法：
+    python build_site.py [--root doc/鏡界] [--out site] [-j 8] [--force] [--clean]
+"""
+
+import argparse
+import html
+import importlib
+import json
+import os
+import posixpath
+import re
+import shutil
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional
+from urllib.parse import unquote
+
+import doc_fs
+from doc_io import atomic_write_bytes, atomic_write_text, content_hash
+from format_chapters import group_sections
+from md_render import render_markdown
+from rename_engine import is_external, split_target
+
+SITE_ROOT = Path(__file__).parent
+DEFAULT_ROOT = doc_fs.BOOK_ROOT
+DEFAULT_OUT = SITE_ROOT / 'site'
+COMPONENTS_DIR = SITE_ROOT / 'components'
+
+CACHE_NAME = '.build_cache.json'
+FRAGMENTS_DIR = '.fragments'
+# 轉譯器或頁面組裝方式改變時遞增，讓所有快取失效
+BUILD_VERSION = 3
+SEARCH_DIR = 'search'
+
+_ASSET_REF = re.compile(r'(\b(?:href|src)=")(?!https?:|data:|#|/|\{\{)([^"]+)(")')
+_TEMPLATE_VAR = re.compile(r'\{\{\s*(\w+)\s*\}\}')
+_FIRST_H1 = re.compile(r'\A<h1 [^>]*>.*?</h1>\n')
+_ANCHOR_HREF = re.compile(r'<a href="([^"]*)"')
+_CHAPTER_DIR = re.compile(r'^ch(\d+)$')
+
+
+def _verifier():
+    # VERIFY-COMPLETION.py 的檔名含連字號，無法以 import 陳述式載入
+    return importlib.import_module('VERIFY-COMPLETION')
+
+
+def page_path(rel: str) -> str:
+    """Markdown 相對路徑 → 頁面相對路徑"""
+    return rel[:-3] + '.html' if rel.endswith('.md') else rel
+
+
+def md_href(target: str) -> str:
+    """連結目標中的 .md 改為 .html（保留錨點與查詢字串）"""
+    if is_external(target):
+        return target
+    path, fragment = split_target(target)
+    base, sep, query = path.partition('?')
+    if base.endswith('.md'):
+        base = base[:-3] + '.html'
+    return base + sep + query + fragment
+
+
+def render_fragment(text: str) -> dict:
+    fragment, links, headings = render_markdown(text, md_href)
+    return {'html': fragment, 'links': links, 'headings': headings}
+
+
+def _render_item(args: tuple) -> tuple:
+    """工作行程：轉譯單一文件"""
+    digest, text = args
+    return digest, render_fragment(text)
+
+
+def fill(template: str, values: Dict[str, str]) -> str:
+    """以 {{ NAME }} 為變數的簡單模板（與 components/template-processor.js 相同規則）"""
+    return _TEMPLATE_VAR.sub(lambda m: values.get(m.group(1), ''), template)
+
+
+class SiteBuilder:
+    def __init__(self, root=DEFAULT_ROOT, out=DEFAULT_OUT, components=COMPONENTS_DIR,
+                 assets=SITE_ROOT):
+        self.root = Path(os.path.normpath(Path(root).resolve()))
+        self.out = Path(os.path.normpath(Path(out).resolve()))
+        self.assets = Path(os.path.normpath(Path(assets).resolve()))
+        self.base = (Path(components) / 'base.html').read_text(encoding='utf-8')
+        self.header = (Path(components) / 'page-header.html').read_text(encoding='utf-8')
+        self.template_hash = content_hash(
+            f'{BUILD_VERSION}\0{self.base}\0{self.header}'.encode('utf-8'))
+        self.fragments = self.out / FRAGMENTS_DIR
+        self.cache_path = self.out / CACHE_NAME
+
+    # ---- 快取 ----
+
+    def load_cache(self) -> dict:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return {}
+        return data if data.get('version') == BUILD_VERSION else {}
+
+    def load_fragment(self, digest: str) -> Optional[dict]:
+        try:
+            return json.loads((self.fragments / f'{digest}.json').read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return None
+
+    def save_fragment(self, digest: str, fragment: dict) -> None:
+        atomic_write_text(self.fragments / f'{digest}.json',
+                          json.dumps(fragment, ensure_ascii=False, separators=(',', ':')))
+
+    # ---- 資源 ----
+
+    def asset_refs(self) -> List[str]:
+        """模板引用的本站資源（相對於資源目錄的 POSIX 路徑）；超出資源目錄的引用不計"""
+        refs = set()
+        for m in _ASSET_REF.finditer(self.base):
+            ref = posixpath.normpath(unquote(split_target(m.group(2))[0].split('?', 1)[0]))
+            if ref and not ref.startswith('../') and ref != '..':
+                refs.add(ref)
+        return sorted(refs)
+
+    def copy_assets(self, previous: List[str]) -> tuple:
+        """把模板引用的資源複製到輸出目錄；回傳 (資源清單, 已複製, 找不到的資源)"""
+        assets, copied, missing = [], [], []
+        if self.out == self.assets:  # 直接輸出在資源目錄：資源已在原位，不能刪除
+            return self.asset_refs(), copied, missing
+        for ref in self.asset_refs():
+            try:
+                data = (self.assets / ref).read_bytes()
+            except FileNotFoundError:
+                missing.append(ref)
+                continue
+            assets.append(ref)
+            dst = self.out / ref
+            try:
+                if dst.read_bytes() == data:
+                    continue
+            except FileNotFoundError:
+                dst.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_bytes(dst, data)
+            copied.append(ref)
+        # 模板不再引用的舊資源（例如換了雜湊的樣式表）
+        for ref in set(previous) - set(assets):
+            try:
+                (self.out / ref).unlink()
+            except FileNotFoundError:
+                pass
+        return assets, copied, missing
+
+    # ---- 頁面組裝 ----
+
+    def broken_targets(self, rel: str, links: List[str], existing: set) -> List[str]:
+        """回傳在文件樹中找不到目標的連結（原始目標字串）"""
+        source_dir = posixpath.dirname(rel)
+        broken = []
+        for target in links:
+            path = split_target(target)[0]
+            if not path or is_external(target):
+                continue
+            target_rel = posixpath.normpath(posixpath.join(source_dir, unquote(path.split('?', 1)[0])))
+            if target_rel not in existing and not (
+                    target_rel.startswith('../') and (self.root / target_rel).exists()):
+                broken.append(target)
+        return sorted(set(broken))
+
+    def sidebar(self, rel: str, chapters: dict) -> tuple:
+        """章節目錄側欄；回傳 (HTML, 組成側欄的鍵)"""
+        ch_dir, _, name = rel.rpartition('/')
+        m = _CHAPTER_DIR.match(ch_dir)
+        sections = chapters.get(int(m.group(1))) if m else None
+        if not sections:
+            return '', ''
+        n = int(m.group(1))
+        items = [(f'ch{n}-index.md', f'第{n}章首頁')]
+        items += [(path.name, f'{n}.{idx} {title}') for idx, title, path in sections]
+        key = '\n'.join(f'{target}\t{label}' for target, label in items)
+        lines = ['<nav class="doc-sidebar">', '<ul>']
+        for target, label in items:
+            if target == name:
+                lines.append(f'<li><strong>{html.escape(label)}</strong></li>')
+            else:
+                lines.append(f'<li><a href="{html.escape(page_path(target))}">{html.escape(label)}</a></li>')
+        lines += ['</ul>', '</nav>']
+        return '\n'.join(lines), key
+
+    def assemble(self, rel: str, fragment: dict, sidebar: str, broken: List[str]) -> bytes:
+        body = fragment['html']
+        headings = fragment['headings']
+        title = next((h[1] for h in headings if h[0] == 1), Path(rel).stem)
+        subtitle = next((h[1] for h in headings if h[0] == 2), '')
+        body = _FIRST_H1.sub('', body, count=1)
+        if broken:
+            hrefs = {html.escape(md_href(target)) for target in broken}
+            body = _ANCHOR_HREF.sub(
+                lambda m: (f'<a class="status-broken" title="失效連結" href="{m.group(1)}"'
+                           if m.group(1) in hrefs else m.group(0)), body)
+
+        page_dir = posixpath.dirname(page_path(rel))
+        # 資源已複製到輸出目錄，依頁面深度回到網站根目錄
+        prefix = posixpath.relpath('.', page_dir) if page_dir else '.'
+        base = _ASSET_REF.sub(lambda m: f'{m.group(1)}{prefix}/{m.group(2)}{m.group(3)}', self.base)
+        header = fill(self.header, {'PAGE_HEADER_TITLE': html.escape(title),
+                                    'PAGE_HEADER_SUBTITLE': html.escape(subtitle)})
+        search_url = Path(os.path.relpath(self.out / SEARCH_DIR, self.out / page_dir)).as_posix() + '/'
+        aside = ('<aside class="doc-aside w-64 shrink-0">\n'
+                 f'<input type="search" data-doc-search="{search_url}" placeholder="搜尋文件…" '
+                 'class="w-full px-3 py-2 mb-2 bg-gray-800 border border-gray-700 rounded-lg">\n'
+                 '<ul data-doc-search-results class="mb-6 space-y-1"></ul>\n'
+                 f'{sidebar}\n</aside>')
+        content = (f'{header}\n<main class="container mx-auto px-4 py-12 flex gap-8">\n'
+                   f'{aside}\n<article class="doc-content flex-1 min-w-0">\n{body}</article>\n</main>')
+        page = fill(base, {'PAGE_TITLE': html.escape(subtitle or title),
+                           'PAGE_DESCRIPTION': html.escape(title),
+                           'PAGE_KEYWORDS': html.escape(', '.join(h[1] for h in headings[:5])),
+                           'PAGE_ICON': '📖',
+                           'PAGE_CONTENT': content})
+        return page.encode('utf-8')
+
+    # ---- 建置 ----
+
+    def build(self, jobs: int = None, force: bool = False) -> dict:
+        start = time.perf_counter()
+        jobs = jobs or os.cpu_count() or 1
+        md_files, existing = _verifier().walk_tree(self.root)
+        state = {} if force else self.load_cache()
+        cache = state.get('pages', {})
+        assets, copied, missing = self.copy_assets(state.get('assets', []))
+        chapters = group_sections(self.root / rel for rel in md_files)
+
+        # 1. 找出需要轉譯的文件：stat 與快取相同就沿用雜湊，片段不在快取中才轉譯
+        hashes: Dict[str, str] = {}
+        fragments: Dict[str, dict] = {}
+        todo: Dict[str, str] = {}
+        for rel, st in md_files.items():
+            entry = cache.get(rel)
+            if entry and entry['size'] == st.st_size and entry['mtime_ns'] == st.st_mtime_ns:
+                fragment = self.load_fragment(entry['hash'])
+                if fragment is not None:
+                    hashes[rel] = entry['hash']
+                    fragments[entry['hash']] = fragment
+                    continue
+            data = (self.root / rel).read_bytes()
+            digest = content_hash(data)
+            hashes[rel] = digest
+            if digest not in fragments and digest not in todo:
+                fragment = self.load_fragment(digest)
+                if fragment is not None:
+                    fragments[digest] = fragment
+                else:
+                    todo[digest] = data.decode('utf-8', errors='replace')
+
+        if todo:
+            self.fragments.mkdir(parents=True, exist_ok=True)
+            if jobs > 1 and len(todo) > 1:
+                with ProcessPoolExecutor(max_workers=jobs) as pool:
+                    outputs = list(pool.map(_render_item, todo.items(),
+                                            chunksize=max(1, len(todo) // (jobs * 4))))
+            else:
+                outputs = [_render_item(item) for item in todo.items()]
+            for digest, fragment in outputs:
+                self.save_fragment(digest, fragment)
+                fragments[digest] = fragment
+
+        # 2. 組裝頁面：組成頁面的鍵沒變且輸出存在就略過
+        pages = {}
+        written = []
+        for rel in sorted(md_files):
+            st = md_files[rel]
+            digest = hashes[rel]
+            fragment = fragments[digest]
+            sidebar, sidebar_key = self.sidebar(rel, chapters)
+            broken = self.broken_targets(rel, fragment['links'], existing)
+            key = content_hash('\0'.join([self.template_hash, digest, sidebar_key, *broken])
+                               .encode('utf-8'))
+            out_path = self.out / page_path(rel)
+            pages[rel] = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns, 'hash': digest, 'key': key}
+            if cache.get(rel, {}).get('key') == key and out_path.exists():
+                continue
+            data = self.assemble(rel, fragment, sidebar, broken)
+            out_path.parent.mkdir(parents=True, exist_ok=True)
+            atomic_write_bytes(out_path, data)
+            written.append(rel)
+
+        # 3. 刪除來源已不存在的頁面與不再使用的片段
+        removed = []
+        for rel in set(cache) - set(pages):
+            try:
+                (self.out / page_path(rel)).unlink()
+                removed.append(rel)
+            except FileNotFoundError:
+                pass
+        used = {entry['hash'] for entry in pages.values()}
+        if self.fragments.exists():
+            for path in self.fragments.glob('*.json'):
+                if path.stem not in used:
+                    path.unlink()
+
+        if pages != cache or assets != state.get('assets'):
+            self.out.mkdir(parents=True, exist_ok=True)
+            atomic_write_text(self.cache_path, json.dumps(
+                {'version': BUILD_VERSION, 'pages': pages, 'assets': assets},
+                ensure_ascii=False, separators=(',', ':')))
+        return {'root': str(self.root), 'out': str(self.out), 'pages': len(pages),
+                'rendered': len(todo), 'written': written, 'removed': sorted(removed),
+                'assets': copied, 'missing_assets': missing,
+                'seconds': round(time.perf_counter() - start, 3)}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='由 Markdown 文件樹產生靜態網站（增量、平行）')
+    parser.add_argument('--root', default=str(DEFAULT_ROOT), help='文件樹根目錄')
+    parser.add_argument('--out', default=str(DEFAULT_OUT), help='輸出目錄')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='平行轉譯的行程數')
+    parser.add_argument('--force', action='store_true', help='忽略快取，重建所有頁面')
+    parser.add_argument('--clean', action='store_true', help='建置前清空輸出目錄')
+    args = parser.parse_args(argv)
+
+    if args.clean and Path(args.out).exists():
+        shutil.rmtree(args.out)
+    result = SiteBuilder(args.root, args.out).build(args.jobs, args.force)
+    for rel in result['written']:
+        print(f"✅ 已產生: {page_path(rel)}")
+    for rel in result['removed']:
+        print(f"🗑️ 已刪除: {page_path(rel)}")
+    for ref in result['assets']:
+        print(f"📦 已複製資源: {ref}")
+    for ref in result['missing_assets']:
+        print(f"⚠️ 找不到模板引用的資源: {ref}")
+    print(f"\n📊 {result['pages']} 個頁面：轉譯 {result['rendered']} 個、寫入 {len(result['written'])} 個"
+          f"（{result['seconds']:.2f} 秒）")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
@@ -0,0 +1,273 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+編譯後的簡繁轉換表（雙陣列字典樹）
+
+檔案格式（皆為 little-endian）：
+
+    header   CTDT 標記、版本、字母表大小、狀態數、最長詞長、字串池大小、內容摘要
+    alphabet uint32[n_alpha]  依出現頻率排序的字元碼位，編號 = 索引 + 1
+    base     int32[n_states]
+    check    int32[n_states]  子狀態 t 的 check[t] 為父狀態，空位為 -1
+    value    int32[n_states]  對應字串在字串池中的偏移，非詞尾為 -1
+    pool     每筆為 uint16 長度 + UTF-8 內容
+
+載入時以 mmap 對映，狀態陣列不會複製進記憶體。
+"""
+
+import array
+import hashlib
+import mmap
+import re
+import struct
+import sys
+from collections import Counter
+from pathlib import Path
+from typing import Dict
+
+MAGIC = b'CTDT'
+FORMAT_VERSION = 1
+HEADER = struct.Struct('<4sHHIIII16s')
+MAX_FIT_WINDOW = 1024  # 尋找 base 時一次最多檢查的候選數
+
+
+def _pack_int32(values) -> bytes:
+    arr = array.array('i', values)
+    if sys.byteorder != 'little':
+        arr.byteswap()
+    return arr.tobytes()
+
+
+def _first_fit(used: bytearray, children: list, start: int) -> int:
+    """最小的 base >= start，使每個子狀態 base + c 都落在空位（used 之外視為空位）
+
+    一次檢查一段連續的候選 base：各子狀態對應的 used 區段以整數 OR 起來，
+    結果中第一個 0 位元組就是可用的 base，不必逐一嘗試。區段從小開始，找不到就加倍。
+    """
+    b = start
+    window = 16
+    while True:
+        full = int.from_bytes(b'\x01' * window, 'little')
+        busy = 0
+        for c in children:
+            busy |= int.from_bytes(used[b + c:b + c + window], 'little')
+            if busy == full:
+                break
+        hit = busy.to_bytes(window, 'little').find(0)
+        if hit >= 0:
+            return b + hit
+        b += window
+        window = min(window * 2, MAX_FIT_WINDOW)
+
+
+def build_table(mapping: Dict[str, str]) -> bytes:
+    """將轉換表編譯為雙陣列字典樹的位元組內容"""
+    freq = Counter(ch for key in mapping for ch in key)
+    alphabet = sorted(freq, key=lambda c: (-freq[c], c))
+    codes = {ch: i + 1 for i, ch in enumerate(alphabet)}
+
+    # 先建立以字元編號為鍵的巢狀字典樹，0 存放詞尾對應值
+    trie: dict = {}
+    max_key_len = 0
+    for key, value in mapping.items():
+        if not key:
+            continue
+        node = trie
+        for ch in key:
+            node = node.setdefault(codes[ch], {})
+        node[0] = value
+        max_key_len = max(max_key_len, len(key))
+
+    base = [0]
+    check = [-1]
+    values = [-1]
+    used = bytearray(1)
+    used[0] = 1
+    pool = bytearray()
+    pool_offsets: Dict[str, int] = {}
+    next_free = 1
+
+    def ensure(size: int) -> None:
+        if size > len(base):
+            grow = size - len(base)
+            base.extend([0] * grow)
+            check.extend([-1] * grow)
+            values.extend([-1] * grow)
+            used.extend(bytes(grow))
+
+    queue = [(0, trie)]
+    while queue:
+        state, node = queue.pop()
+        if 0 in node:
+            text = node[0]
+            offset = pool_offsets.get(text)
+            if offset is None:
+                data = text.encode('utf-8')
+                offset = len(pool)
+                pool_offsets[text] = offset
+                pool += struct.pack('<H', len(data)) + data
+            values[state] = offset
+        children = sorted(c for c in node if c)
+        if not children:
+            continue
+
+        while next_free < len(used) and used[next_free]:
+            next_free += 1
+        b = _first_fit(used, children, max(next_free - children[0], 0))
+        ensure(b + children[-1] + 1)
+        base[state] = b
+        for c in children:
+            t = b + c
+            used[t] = 1
+            check[t] = state
+            queue.append((t, node[c]))
+
+    payload = b''.join([
+        struct.pack('<%dI' % len(alphabet), *(ord(ch) for ch in alphabet)),
+        _pack_int32(base),
+        _pack_int32(check),
+        _pack_int32(values),
+        bytes(pool),
+    ])
+    digest = hashlib.blake2b(payload, digest_size=16).digest()
+    header = HEADER.pack(MAGIC, FORMAT_VERSION, 0, len(alphabet), len(base),
+                         max_key_len, len(pool), digest)
+    return header + payload
+
+
+def write_table(mapping: Dict[str, str], path) -> Path:
+    """編譯轉換表並寫入檔案"""
+    path = Path(path)
+    tmp = path.with_name(path.name + '.tmp')
+    tmp.write_bytes(build_table(mapping))
+    tmp.replace(path)
+    return path
+
+
+class CompiledTable:
+    """以 mmap 載入的編譯轉換表，介面與 PhraseMatcher 相同"""
+
+    def __init__(self, path):
+        self.path = Path(path)
+        with open(self.path, 'rb') as f:
+            self._mm = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        (magic, version, _flags, n_alpha, n_states,
+         self.max_key_len, pool_size, digest) = HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC or version != FORMAT_VERSION:
+            self._mm.close()
+            raise ValueError(f'不是有效的轉換表檔案: {self.path}')
+        self.version = digest.hex()
+
+        view = memoryview(self._mm)
+        offset = HEADER.size
+        alphabet = view[offset:offset + 4 * n_alpha].cast('I')
+        offset += 4 * n_alpha
+        sections = []
+        for _ in range(3):
+            sections.append(self._int32_view(view, offset, n_states))
+            offset += 4 * n_states
+        self._base, self._check, self._value = sections
+        self._pool = view[offset:offset + pool_size]
+
+        self._codes = {chr(cp): i + 1 for i, cp in enumerate(alphabet)}
+        # 字母表即所有詞用到的字元；都不是 ASCII 時 convert_mapped 可略過 ASCII 片段
+        self.ascii_free = all(cp >= 0x80 for cp in alphabet)
+        alphabet.release()
+        self._decoded: Dict[int, str] = {}
+
+        root_base = self._base[0]
+        first_chars = ''.join(
+            ch for ch, code in self._codes.items()
+            if root_base + code < n_states and self._check[root_base + code] == 0
+        )
+        self._first = re.compile('[%s]' % re.escape(first_chars)) if first_chars else None
+        # 累計的掃描次數與替換次數（供 doc_metrics 量測）
+        self.passes = 0
+        self.replacements = 0
+
+    @staticmethod
+    def _int32_view(view: memoryview, offset: int, count: int):
+        raw = view[offset:offset + 4 * count]
+        if sys.byteorder == 'little':
+            return raw.cast('i')
+        arr = array.array('i', raw.tobytes())
+        arr.byteswap()
+        return arr
+
+    def _lookup_value(self, offset: int) -> str:
+        text = self._decoded.get(offset)
+        if text is None:
+            (size,) = struct.unpack_from('<H', self._pool, offset)
+            text = bytes(self._pool[offset + 2:offset + 2 + size]).decode('utf-8')
+            self._decoded[offset] = text
+        return text
+
+    def convert(self, text: str) -> str:
+        """單次掃描轉換文本（最長詞優先）"""
+        return self.scan(text)[0]
+
+    def scan(self, text: str, stop: int = None) -> tuple:
+        """轉換文本，遇到位於 stop 之後的詞首時停止
+
+        回傳 (已轉換部分, 續接位置)；text[續接位置:] 尚未處理，
+        串流轉換時與下一段內容接起來再掃描。
+        """
+        n = len(text)
+        if stop is None:
+            stop = n
+        if self._first is None:
+            return text, n
+        codes = self._codes
+        base = self._base
+        check = self._check
+        value = self._value
+        n_states = len(check)
+        search = self._first.search
+        out = []
+        append = out.append
+        pos = 0
+        hits = 0
+        self.passes += 1
+        while True:
+            m = search(text, pos)
+            if m is None:
+                resume = n
+                break
+            start = m.start()
+            if start >= stop:
+                resume = start
+                break
+            state = 0
+            j = start
+            match_end = -1
+            match_offset = -1
+            while j < n:
+                code = codes.get(text[j])
+                if code is None:
+                    break
+                t = base[state] + code
+                if t >= n_states or check[t] != state:
+                    break
+                state = t
+                j += 1
+                if value[state] >= 0:
+                    match_end = j
+                    match_offset = value[state]
+            if match_end < 0:
+                append(text[pos:start + 1])
+                pos = start + 1
+                continue
+            if start > pos:
+                append(text[pos:start])
+            append(self._lookup_value(match_offset))
+            hits += 1
+            pos = match_end
+        self.replacements += hits
+        if pos == 0 and resume == n:
+            return text, n
+        append(text[pos:resume])
+        return ''.join(out), resume
+
+    def close(self) -> None:
+        self._base = self._check = self._value = self._pool = None
+        self._mm.close()
@@ -4,14 +4,38 @@
 將所有 Markdown 文件從簡體中文轉換為繁體中文
 """
 
+import argparse
+import codecs
+import hashlib
+import heapq
+import json
+import mmap
 import os
 import sys
-import io
+import re
+import time
+import tracemalloc
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
 from pathlib import Path
-from typing import Dict
+from typing import Dict, Iterator, Optional
 
-# 確保 stdout 能夠正確輸出中文
-sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+import doc_fs
+import doc_metrics
+from doc_io import AtomicFile, atomic_write_bytes, atomic_write_text, content_hash
+from md_tokenizer import MarkdownSplitter, convert_prose, inline_safe_cut, split_markdown
+
+# 增量轉換清單檔名（位於轉換根目錄）
+MANIFEST_NAME = '.convert_manifest.json'
+
+# 超過此大小的文件改用串流轉換；串流時每讀入 1 位元組約需 16 位元組工作記憶體（解碼、接續、轉換、編碼各一份）
+STREAM_THRESHOLD = 32 * 2**20
+MAX_MEMORY = 64 * 2**20
+_STREAM_BYTES_FACTOR = 16
+
+# 由 build_convert_dict.py 產生的編譯轉換表；不存在時使用下方內建表
+DEFAULT_TABLE = Path(__file__).with_name('convert_dict.ctd')
 
 # 簡繁轉換對應表（常見詞彙）
 CONVERT_DICT = {
@@ -454,62 +478,636 @@ SINGLE_CHAR_CONVERT = {
 # 合併兩個字典
 CONVERT_DICT.update(SINGLE_CHAR_CONVERT)
 
+class PhraseMatcher:
+    """最長詞優先的多模式匹配器（字典樹）
+
+    建構一次後即可重複使用，每次轉換只從左到右掃描一遍文本。
+    """
+
+    _END = ''  # 終點標記；單一字元永遠不會是空字串
+
+    def __init__(self, mapping: Dict[str, str]):
+        self.root: dict = {}
+        self.max_key_len = 0
+        for key, value in mapping.items():
+            if not key:
+                continue
+            node = self.root
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node[self._END] = value
+            self.max_key_len = max(self.max_key_len, len(key))
+        # 所有詞都不含 ASCII 字元時，ASCII 片段不可能被轉換（convert_mapped 據此略過）
+        self.ascii_free = all(ord(ch) >= 0x80 for key in mapping for ch in key)
+        # 轉換表版本：內容相同的表得到相同版本，供增量轉換判斷
+        digest = hashlib.blake2b(digest_size=16)
+        for key in sorted(mapping):
+            digest.update(f'{key}\t{mapping[key]}\n'.encode('utf-8'))
+        self.version = digest.hexdigest()
+        # 只在可能成為詞首的字元停下，其餘片段交由 re 以 C 速度略過
+        first_chars = ''.join(sorted(self.root))
+        self._first = re.compile('[%s]' % re.escape(first_chars)) if first_chars else None
+        # 累計的掃描次數與替換次數（供 doc_metrics 量測）
+        self.passes = 0
+        self.replacements = 0
+
+    def convert(self, text: str) -> str:
+        """單次掃描轉換文本（最長詞優先）"""
+        return self.scan(text)[0]
+
+    def scan(self, text: str, stop: int = None) -> tuple:
+        """轉換文本，遇到位於 stop 之後的詞首時停止
+
+        回傳 (已轉換部分, 續接位置)；text[續接位置:] 尚未處理，
+        串流轉換時與下一段內容接起來再掃描。
+        """
+        n = len(text)
+        if stop is None:
+            stop = n
+        if self._first is None:
+            return text, n
+        root = self.root
+        end_key = self._END
+        search = self._first.search
+        out = []
+        append = out.append
+        pos = 0
+        hits = 0
+        self.passes += 1
+        while True:
+            m = search(text, pos)
+            if m is None:
+                resume = n
+                break
+            start = m.start()
+            if start >= stop:
+                resume = start
+                break
+            node = root
+            j = start
+            match_end = -1
+            match_value = None
+            while j < n:
+                node = node.get(text[j])
+                if node is None:
+                    break
+                j += 1
+                value = node.get(end_key)
+                if value is not None:
+                    match_end = j
+                    match_value = value
+            if match_end < 0:
+                # 詞首字元但沒有完整匹配，原樣保留
+                append(text[pos:start + 1])
+                pos = start + 1
+                continue
+            if start > pos:
+                append(text[pos:start])
+            append(match_value)
+            hits += 1
+            pos = match_end
+        self.replacements += hits
+        if pos == 0 and resume == n:
+            return text, n
+        append(text[pos:resume])
+        return ''.join(out), resume
+
+
+def load_matcher(table_path=None):
+    """載入匹配器：優先使用編譯轉換表，否則以內建表建構"""
+    table_path = Path(table_path) if table_path else DEFAULT_TABLE
+    if table_path.exists():
+        from convert_table import CompiledTable
+        return CompiledTable(table_path)
+    return PhraseMatcher(CONVERT_DICT)
+
+
+_matcher = None
+
+
+def get_matcher():
+    """取得行程內共用的匹配器（首次呼叫時載入）"""
+    global _matcher
+    if _matcher is None:
+        _matcher = load_matcher()
+    return _matcher
+
+
+def set_matcher(matcher) -> None:
+    """指定行程內共用的匹配器（例如改用其他轉換表）"""
+    global _matcher
+    _matcher = matcher
+
+
 def simple_to_traditional(text: str) -> str:
     """簡繁轉換函數"""
-    result = text
-    # 按長度排序（降序），優先轉換長詞彙以避免部分轉換
-    sorted_dict = sorted(CONVERT_DICT.items(), key=lambda x: -len(x[0]))
-    for simple, traditional in sorted_dict:
-        result = result.replace(simple, traditional)
-    return result
-
-def convert_md_files(root_dir: str, exclude_patterns: list = None) -> None:
-    """轉換根目錄下所有 MD 文件"""
+    # 最長詞優先，避免部分轉換
+    return get_matcher().convert(text)
+
+def iter_md_files(root_path: Path, exclude_patterns: list, io: doc_fs.FileIO = None) -> list:
+    """列出需要轉換的 MD 文件（依路徑排序，確保輸出順序固定）"""
+    return list(scan_md_files(root_path, exclude_patterns, io))
+
+def scan_md_files(root_path: Path, exclude_patterns: list, io: doc_fs.FileIO = None) -> dict:
+    """列出需要轉換的 MD 文件及其 stat：{路徑: stat}，依路徑排序
+
+    目錄列表由 doc_fs 平行取回，stat 隨列表一併取得，之後判斷是否略過不必再逐檔 stat。
+    """
+    if io is None:
+        with doc_fs.FileIO() as io:
+            return scan_md_files(root_path, exclude_patterns, io)
+    found, _dirs = io.walk(root_path, stat_suffix='.md')
+    files = {}
+    for rel, st in found.items():
+        md_file = root_path.joinpath(*rel.split('/'))
+        # 跳過排除的目錄
+        if st is None or any(pattern in str(md_file) for pattern in exclude_patterns):
+            continue
+        files[md_file] = st
+    return dict(sorted(files.items()))
+
+def stream_chunk_size(max_memory: int) -> int:
+    """依記憶體預算決定串流轉換每次讀取的位元組數"""
+    return max(64 * 1024, max_memory // _STREAM_BYTES_FACTOR)
+
+def convert_text(text: str, markdown: bool = True) -> tuple:
+    """轉換文本；markdown 為 True 時只轉換正文片段
+
+    回傳 (結果, 略過的非正文位元組數)。
+    """
+    if not markdown:
+        return simple_to_traditional(text), 0
+    return convert_prose(split_markdown(text), get_matcher().convert)
+
+def convert_stream(src_path: Path, dst, chunk_size: int, markdown: bool = True) -> tuple:
+    """以固定大小分段串流轉換，邊轉換邊寫入 dst
+
+    純文字模式下每段結尾保留最多（最長詞長 - 1）個字元，與下一段接起來再掃描，
+    因此詞彙不會在分段邊界被切開；Markdown 模式則讓每段補到行尾再切分，
+    但最多只多讀 chunk_size 位元組：超長的行（或沒有換行的文件）改在行內的安全切點分段，
+    切點之前的行內非正文都已完整，最後一段正文再如純文字模式保留結尾，記憶體用量維持有上限。
+    回傳 (輸入 sha256, 輸出 sha256, 略過的非正文位元組數)。
+    """
+    matcher = get_matcher()
+    margin = max(matcher.max_key_len - 1, 0)
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    splitter = MarkdownSplitter() if markdown else None
+    in_hash = hashlib.sha256()
+    out_hash = hashlib.sha256()
+    skipped = 0
+    carry = ''
+    continued = False  # carry 是否從行的中間開始
+    with open(src_path, 'rb') as f:
+        while True:
+            raw = f.read(chunk_size)
+            if splitter is not None and raw and not raw.endswith(b'\n'):
+                raw += f.readline(chunk_size)
+            final = not raw
+            in_hash.update(raw)
+            text = carry + decoder.decode(raw, final)
+            if splitter is not None:
+                complete = final or text.endswith('\n')
+                end = len(text) if complete else _stream_cut(text, chunk_size)
+                segments = splitter.split(text[:end], continued)
+                partial = not complete and end > 0 and text[end - 1] != '\n'
+                last = segments.pop() if partial and segments and segments[-1][0] else None
+                converted, chunk_skipped = convert_prose(segments, matcher.convert)
+                skipped += chunk_skipped
+                resume = end
+                if last is not None:
+                    # 行內切點前的最後一段正文：與純文字模式一樣保留結尾，避免切開詞彙
+                    piece = last[1]
+                    stop = len(piece) - margin
+                    head, used = matcher.scan(piece, stop) if stop > 0 else ('', 0)
+                    converted += head
+                    resume = end - len(piece) + used
+                if resume:
+                    continued = text[resume - 1] != '\n'
+            else:
+                stop = len(text) if final else len(text) - margin
+                converted, resume = matcher.scan(text, stop) if stop > 0 else ('', 0)
+            data = converted.encode('utf-8')
+            out_hash.update(data)
+            dst.write(data)
+            carry = text[resume:]
+            del text, converted, data
+            if final:
+                break
+    return in_hash.hexdigest(), out_hash.hexdigest(), skipped
+
+
+def _stream_cut(text: str, limit: int) -> int:
+    """串流 Markdown 模式中，text 結尾是尚未讀完的一行時的切分位置
+
+    完整的行都處理；未完的行只處理到行內安全切點。該行已累積 limit 字元以上仍找不到切點時
+    （例如未結束的行內程式碼）強制在結尾切開，寧可把它當正文，也不讓記憶體無限制成長。
+    """
+    line_start = text.rfind('\n') + 1
+    cut = line_start + inline_safe_cut(text[line_start:])
+    if cut == line_start and len(text) - line_start >= limit:
+        return len(text)
+    return cut
+
+
+# 記憶體映射快速路徑每次檢查的區段大小（延伸到行尾）；越小越能略過夾在中文之間的 ASCII，但迴圈次數越多
+MAPPED_CHUNK = 2048
+
+def convert_mapped(buf, markdown: bool = True, chunk_size: int = MAPPED_CHUNK) -> Optional[tuple]:
+    """在位元組層級略過 ASCII 的轉換；buf 為 mmap（或任何支援緩衝區協定的位元組內容）
+
+    轉換表的詞都不含 ASCII 字元時，純 ASCII 的內容不可能改變。以行為邊界切成小區段，
+    只解碼、轉換含非 ASCII 位元組的區段，其餘原樣從 buf 複製到輸出緩衝區：
+    Markdown 模式以同一個切分器依序處理各區段（圍欄狀態跨區段保留）；純 ASCII 區段若不含
+    ``` 或 ~~~ 就不會開關圍欄，可以直接略過；位於圍欄內、不含 ``` 或 ~~~ 的區段即使有中文
+    也不需解碼。判斷只用 bytes.isascii() 與子字串搜尋，都以 C 速度完成。
+    回傳 (新內容 bytearray 或 None（內容不變）, 略過的非正文位元組數, 未解碼的位元組數)；
+    略過的非正文不含未解碼的純 ASCII 區段。轉換表含 ASCII 字元時回傳 None，改走一般路徑。
+    """
+    matcher = get_matcher()
+    if not getattr(matcher, 'ascii_free', False):
+        return None
+    convert = matcher.convert
+    splitter = MarkdownSplitter() if markdown else None
+    n = len(buf)
+    out = bytearray()
+    copied = 0
+    decoded = 0
+    skipped = 0
+    view = memoryview(buf)
+    try:
+        start = 0
+        while start < n:
+            end = buf.find(b'\n', min(start + chunk_size, n) - 1)
+            end = n if end < 0 else end + 1
+            chunk = buf[start:end]
+            if splitter is None:
+                if not chunk.isascii():
+                    text = chunk.decode('utf-8')
+                    converted = convert(text)
+                    decoded += end - start
+                    if converted != text:
+                        out += view[copied:start]
+                        out += converted.encode('utf-8')
+                        copied = end
+            elif b'```' in chunk or b'~~~' in chunk or not (splitter.in_fence or chunk.isascii()):
+                text = chunk.decode('utf-8')
+                converted, chunk_skipped = convert_prose(splitter.split(text), convert)
+                decoded += end - start
+                skipped += chunk_skipped
+                if converted != text:
+                    out += view[copied:start]
+                    out += converted.encode('utf-8')
+                    copied = end
+            elif splitter.in_fence:
+                skipped += end - start
+            start = end
+        if copied == 0:
+            return None, skipped, n - decoded
+        out += view[copied:]
+        return out, skipped, n - decoded
+    finally:
+        view.release()
+
+def convert_file(md_file: Path, entry: dict = None,
+                 stream_threshold: int = STREAM_THRESHOLD, max_memory: int = MAX_MEMORY,
+                 markdown: bool = True, ascii_skip: bool = False, st: os.stat_result = None) -> tuple:
+    """轉換單一文件，只有內容改變時才寫回
+
+    entry 為上次記錄的清單項目；大小、修改時間與轉換表版本都相同時直接略過。
+    大於 stream_threshold 的文件改用串流轉換，記憶體用量受 max_memory 限制。
+    markdown 為 True 時程式碼、URL 與連結目標原樣保留。
+    ascii_skip 為 True 時以記憶體映射讀取，只解碼、轉換含非 ASCII 字元的部分（見 convert_mapped）。
+    st 為走訪目錄時取得的 stat，省去一次 stat。
+    回傳 (狀態, 新清單項目, 統計)，狀態為 'skipped'、'unchanged' 或 'converted'；
+    統計含耗時、讀寫位元組數、替換次數與比對掃描次數（在工作行程中量測，交由主行程登記）。
+    """
+    matcher = get_matcher()
+    passes, replacements = matcher.passes, matcher.replacements
+    start = time.perf_counter()
+    status, new_entry, stats = _convert_file(md_file, entry, stream_threshold, max_memory,
+                                             markdown, ascii_skip, st)
+    stats['seconds'] = time.perf_counter() - start
+    stats['regex_passes'] = matcher.passes - passes
+    stats['replacements'] = matcher.replacements - replacements
+    return status, new_entry, stats
+
+def _table_version(markdown: bool) -> str:
+    return get_matcher().version + ('' if markdown else ':raw')
+
+def _new_stats() -> dict:
+    return {'streamed': False, 'peak_memory': None, 'skipped_bytes': 0,
+            'bytes_read': 0, 'bytes_written': 0, 'undecoded_bytes': 0}
+
+def _unchanged_since(entry: dict, st: os.stat_result, version: str) -> bool:
+    """大小、修改時間與轉換表版本都與清單項目相同"""
+    return (entry is not None and entry.get('dict_version') == version
+            and entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns)
+
+def _convert_file(md_file: Path, entry: dict, stream_threshold: int, max_memory: int,
+                  markdown: bool, ascii_skip: bool, st: os.stat_result = None) -> tuple:
+    version = _table_version(markdown)
+    stats = _new_stats()
+    if st is None:
+        st = md_file.stat()
+    if _unchanged_since(entry, st, version):
+        return 'skipped', entry, stats
+    
+    if st.st_size > stream_threshold:
+        stats['streamed'] = True
+        tracing = tracemalloc.is_tracing()
+        if tracing:
+            tracemalloc.reset_peak()
+            baseline = tracemalloc.get_traced_memory()[0]
+        with AtomicFile(md_file) as out:
+            digest, out_digest, stats['skipped_bytes'] = convert_stream(
+                md_file, out, stream_chunk_size(max_memory), markdown)
+            stats['bytes_read'] = st.st_size
+            if entry is not None and entry.get('dict_version') == version and entry.get('sha256') == digest:
+                status = 'skipped'
+            elif out_digest == digest:
+                status = 'unchanged'
+            else:
+                out.commit()
+                status = 'converted'
+                stats['bytes_written'] = os.path.getsize(md_file)
+        if tracing:
+            stats['peak_memory'] = tracemalloc.get_traced_memory()[1] - baseline
+        if status == 'converted':
+            return status, _manifest_entry(md_file.stat(), out_digest, version), stats
+        return status, _manifest_entry(st, digest, version), stats
+    
+    if ascii_skip and st.st_size:
+        with open(md_file, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+            digest = content_hash(mm)
+            if entry is not None and entry.get('dict_version') == version and entry.get('sha256') == digest:
+                return 'skipped', _manifest_entry(st, digest, version), stats
+            result = convert_mapped(mm, markdown)
+        if result is not None:
+            converted, stats['skipped_bytes'], stats['undecoded_bytes'] = result
+            stats['bytes_read'] = st.st_size
+            if converted is None:
+                return 'unchanged', _manifest_entry(st, digest, version), stats
+            atomic_write_bytes(md_file, converted)
+            stats['bytes_written'] = len(converted)
+            return 'converted', _manifest_entry(md_file.stat(), content_hash(converted), version), stats
+    
+    # 讀取文件、進行轉換
+    status, new_entry, converted = _convert_data(md_file.read_bytes(), st, entry, version, markdown, stats)
+    if converted is not None:
+        # 寫回文件
+        new_entry = _write_converted(md_file, converted, version)
+    return status, new_entry, stats
+
+def _convert_data(data: bytes, st: os.stat_result, entry: dict, version: str, markdown: bool,
+                  stats: dict) -> tuple:
+    """在記憶體中轉換已讀入的內容；回傳 (狀態, 清單項目, 待寫回內容)
+
+    狀態為 'converted' 時清單項目為 None，需在寫回後由 _write_converted 建立。
+    """
+    stats['bytes_read'] = len(data)
+    digest = content_hash(data)
+    if entry is not None and entry.get('dict_version') == version and entry.get('sha256') == digest:
+        # 僅修改時間變動，內容仍是上次轉換的結果
+        return 'skipped', _manifest_entry(st, digest, version), None
+    
+    converted, stats['skipped_bytes'] = convert_text(data.decode('utf-8'), markdown)
+    converted = converted.encode('utf-8')
+    if converted == data:
+        return 'unchanged', _manifest_entry(st, digest, version), None
+    stats['bytes_written'] = len(converted)
+    return 'converted', None, converted
+
+def _write_converted(md_file: Path, converted: bytes, version: str) -> dict:
+    """原子寫回轉換結果，回傳新的清單項目"""
+    atomic_write_bytes(md_file, converted)
+    return _manifest_entry(md_file.stat(), content_hash(converted), version)
+
+def _read_if_needed(md_file: Path, st: os.stat_result, entry: dict, version: str,
+                    stream_threshold: int, ascii_skip: bool) -> Optional[bytes]:
+    """I/O 執行緒：需要在記憶體中轉換的文件預先讀入；其餘（略過、串流、記憶體映射）回傳 None"""
+    if _unchanged_since(entry, st, version) or st.st_size > stream_threshold or (ascii_skip and st.st_size):
+        return None
+    return md_file.read_bytes()
+
+def convert_pipelined(items: list, io: doc_fs.FileIO, stream_threshold: int = STREAM_THRESHOLD,
+                      max_memory: int = MAX_MEMORY, markdown: bool = True,
+                      ascii_skip: bool = False) -> Iterator[tuple]:
+    """單一行程轉換多個文件，讀檔與寫檔交給 I/O 執行緒，與轉換重疊進行
+
+    items 為 [(文件, 清單項目, stat)]；依輸入順序產生 (文件, 狀態, 清單項目, 統計, 錯誤訊息)，
+    與逐一呼叫 convert_file 的結果相同。轉換只在呼叫端的執行緒進行，
+    因此比對掃描次數等統計不受影響；串流與記憶體映射的文件在本執行緒直接處理。
+    """
+    matcher = get_matcher()
+    version = _table_version(markdown)
+    reads = io.imap(_read_if_needed, ((md_file, st, entry, version, stream_threshold, ascii_skip)
+                                      for md_file, entry, st in items))
+    pending = deque()  # (文件, 狀態, 清單項目, 統計, 寫回中的 Future 或 None, 錯誤訊息)
+
+    def ready() -> bool:
+        write = pending[0][4]
+        return write is None or write.done() or len(pending) > io.workers * 2
+
+    def finish() -> tuple:
+        md_file, status, new_entry, stats, write, error = pending.popleft()
+        if write is not None:
+            try:
+                new_entry = write.result()
+            except Exception as e:
+                return md_file, 'failed', None, None, str(e)
+        return md_file, status, new_entry, stats, error
+
+    for (md_file, entry, st), data in zip(items, reads):
+        write, error = None, None
+        passes, replacements = matcher.passes, matcher.replacements
+        start = time.perf_counter()
+        try:
+            if isinstance(data, BaseException):
+                raise data
+            if data is None:
+                status, new_entry, stats = _convert_file(md_file, entry, stream_threshold, max_memory,
+                                                         markdown, ascii_skip, st)
+            else:
+                stats = _new_stats()
+                status, new_entry, converted = _convert_data(data, st, entry, version, markdown, stats)
+                if converted is not None:
+                    write = io.submit(_write_converted, md_file, converted, version)
+        except Exception as e:
+            status, new_entry, stats, error = 'failed', None, None, str(e)
+        else:
+            # 耗時只計入本執行緒的時間，背景讀寫不計
+            stats['seconds'] = time.perf_counter() - start
+            stats['regex_passes'] = matcher.passes - passes
+            stats['replacements'] = matcher.replacements - replacements
+        pending.append((md_file, status, new_entry, stats, write, error))
+        while pending and ready():
+            yield finish()
+    while pending:
+        yield finish()
+
+def _manifest_entry(st: os.stat_result, digest: str, version: str) -> dict:
+    return {'size': st.st_size, 'mtime_ns': st.st_mtime_ns,
+            'sha256': digest, 'dict_version': version}
+
+def load_manifest(manifest_path: Path) -> dict:
+    """讀取增量轉換清單（相對路徑 -> 清單項目）"""
+    try:
+        with open(manifest_path, 'r', encoding='utf-8') as f:
+            return json.load(f).get('files', {})
+    except FileNotFoundError:
+        return {}
+    except (ValueError, AttributeError):
+        print(f"[WARN] 清單格式錯誤，將重新建立: {manifest_path}")
+        return {}
+
+def save_manifest(manifest_path: Path, files: dict) -> None:
+    atomic_write_text(manifest_path, json.dumps({'version': 1, 'files': files},
+                                                ensure_ascii=False, sort_keys=True))
+
+def balance_chunks(files: list, n_chunks: int, sizes: dict = None) -> list:
+    """依檔案大小將文件分成總量相近的若干批（最大者優先放入最輕的批次）
+
+    sizes 為 {文件: 大小}（例如走訪目錄時取得的 stat），未提供時逐檔 stat。
+    """
+    sized = sorted(((sizes[f] if sizes is not None else f.stat().st_size, f) for f in files),
+                   key=lambda x: (-x[0], x[1]))
+    heap = [(0, i) for i in range(max(1, min(n_chunks, len(files))))]
+    chunks = [[] for _ in heap]
+    for size, md_file in sized:
+        total, i = heapq.heappop(heap)
+        chunks[i].append(md_file)
+        heapq.heappush(heap, (total + size, i))
+    return [c for c in chunks if c]
+
+def _init_worker(table_path, trace_memory: bool = False) -> None:
+    """工作行程初始化：每個行程只載入一次轉換表"""
+    set_matcher(load_matcher(table_path))
+    if trace_memory:
+        tracemalloc.start()
+
+def _convert_chunk(items: list, options: dict = None) -> list:
+    results = []
+    for md_file, entry, st in items:
+        try:
+            status, new_entry, stats = convert_file(md_file, entry, st=st, **(options or {}))
+            results.append((md_file, status, new_entry, stats, None))
+        except Exception as e:
+            results.append((md_file, 'failed', None, None, str(e)))
+    return results
+
+def convert_md_files(root_dir: str, exclude_patterns: list = None,
+                     jobs: int = 1, table_path=None, manifest_path=None,
+                     stream_threshold: int = STREAM_THRESHOLD, max_memory: int = MAX_MEMORY,
+                     trace_memory: bool = False, markdown: bool = True,
+                     ascii_skip: bool = False, io_workers: int = None) -> None:
+    """轉換根目錄下所有 MD 文件
+
+    jobs > 1 時以多行程平行轉換，結果仍依路徑順序輸出。
+    manifest_path 指定增量轉換清單，未變更的文件直接略過；傳入 False 則停用。
+    大於 stream_threshold 位元組的文件以串流方式轉換，峰值記憶體受 max_memory 限制；
+    trace_memory 為 True 時以 tracemalloc 量測並回報每個串流文件的峰值。
+    markdown 為 True 時只轉換正文，程式碼區塊、行內程式碼、URL 與連結目標原樣保留。
+    ascii_skip 為 True 時以記憶體映射讀取文件，純 ASCII 的部分不解碼、直接複製。
+    io_workers 為同時進行的檔案 I/O 數（doc_fs）：目錄平行列出，單一行程時讀寫與轉換重疊進行。
+    """
     if exclude_patterns is None:
         exclude_patterns = ['_backup_legacy']
     
+    metrics = doc_metrics.current()
     root_path = Path(root_dir)
-    converted_count = 0
+    if manifest_path is None:
+        manifest_path = root_path / MANIFEST_NAME
+    with metrics.stage('manifest'):
+        manifest = load_manifest(Path(manifest_path)) if manifest_path else {}
+    new_manifest = {}
+    counts = {'converted': 0, 'unchanged': 0, 'skipped': 0, 'streamed': 0, 'over_budget': 0,
+              'skipped_bytes': 0, 'undecoded_bytes': 0}
     failed_files = []
+    options = {'stream_threshold': stream_threshold, 'max_memory': max_memory,
+               'markdown': markdown, 'ascii_skip': ascii_skip}
     
     print(f"開始掃描目錄: {root_dir}")
+    io = doc_fs.FileIO(io_workers)
+    with metrics.stage('scan'):
+        found = scan_md_files(root_path, exclude_patterns, io)
+    files = list(found)
+    keys = {md_file: md_file.relative_to(root_path).as_posix() for md_file in files}
     
-    for md_file in root_path.rglob('*.md'):
-        # 跳過排除的目錄
-        skip_file = False
-        for pattern in exclude_patterns:
-            if pattern in str(md_file):
-                skip_file = True
-                break
-        
-        if skip_file:
-            continue
-        
-        try:
-            print(f"處理: {md_file.relative_to(root_path)}")
-            
-            # 讀取文件
-            with open(md_file, 'r', encoding='utf-8') as f:
-                content = f.read()
-            
-            # 進行轉換
-            converted_content = simple_to_traditional(content)
-            
-            # 寫回文件
-            with open(md_file, 'w', encoding='utf-8') as f:
-                f.write(converted_content)
-            
-            converted_count += 1
-            print(f"[OK] 已轉換: {md_file.name}")
-            
-        except Exception as e:
-            failed_files.append((str(md_file), str(e)))
-            print(f"[FAIL] 失敗: {md_file.name} - {e}")
+    def fail(md_file, error):
+        # 與 [OK] 相同以相對路徑顯示，不同章節的同名文件才能分辨
+        failed_files.append((str(md_file), error))
+        metrics.count('files_failed')
+        print(f"[FAIL] 失敗: {keys[md_file]} - {error}")
+
+    def record(md_file, status, entry, stats):
+        counts[status] += 1
+        metrics.count(f'files_{status}')
+        metrics.add_file(keys[md_file], stats['seconds'], stage='convert',
+                         **{name: stats[name] for name in
+                            ('bytes_read', 'bytes_written', 'replacements', 'regex_passes',
+                             'undecoded_bytes')})
+        new_manifest[keys[md_file]] = entry
+        if status != 'skipped':
+            print(f"[OK] 已轉換: {keys[md_file]}")
+        if stats['streamed']:
+            counts['streamed'] += 1
+        counts['skipped_bytes'] += stats['skipped_bytes']
+        counts['undecoded_bytes'] += stats['undecoded_bytes']
+        if stats['peak_memory'] is not None:
+            peak = stats['peak_memory']
+            over = peak > max_memory
+            counts['over_budget'] += over
+            print(f"[MEM] {keys[md_file]}: 峰值 {peak / 2**20:.1f} MB"
+                  f" / 預算 {max_memory / 2**20:.1f} MB{' [超出預算]' if over else ''}")
+    
+    with metrics.stage('convert'), io:
+        if jobs > 1 and len(files) > 1:
+            print(f"平行模式: {jobs} 個行程")
+            results = {}
+            # 每個行程分到數批，讓較快結束的行程能接手剩餘批次
+            chunks = balance_chunks(files, jobs * 4, {f: st.st_size for f, st in found.items()})
+            chunks = [[(f, manifest.get(keys[f]), found[f]) for f in chunk] for chunk in chunks]
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                     initargs=(table_path, trace_memory)) as pool:
+                for chunk_results in pool.map(partial(_convert_chunk, options=options), chunks):
+                    for md_file, status, entry, stats, error in chunk_results:
+                        results[md_file] = (status, entry, stats, error)
+            for md_file in files:
+                status, entry, stats, error = results[md_file]
+                if error is None:
+                    record(md_file, status, entry, stats)
+                else:
+                    fail(md_file, error)
+        else:
+            if table_path:
+                set_matcher(load_matcher(table_path))
+            if trace_memory and not tracemalloc.is_tracing():
+                tracemalloc.start()
+            items = [(f, manifest.get(keys[f]), found[f]) for f in files]
+            for md_file, status, entry, stats, error in convert_pipelined(items, io, **options):
+                if error is None:
+                    record(md_file, status, entry, stats)
+                else:
+                    fail(md_file, error)
+    
+    if manifest_path:
+        with metrics.stage('manifest'):
+            save_manifest(Path(manifest_path), new_manifest)
     
     # 打印總結
     print(f"\n{'='*60}")
     print(f"轉換完成!")
-    print(f"成功轉換: {converted_count} 個文件")
+    print(f"成功轉換: {counts['converted'] + counts['unchanged']} 個文件"
+          f"（寫回 {counts['converted']}，內容未變 {counts['unchanged']}）")
+    print(f"略過（未變更）: {counts['skipped']} 個文件")
+    if counts['streamed']:
+        print(f"串流轉換: {counts['streamed']} 個文件")
+    if markdown:
+        print(f"略過非正文（程式碼、URL、連結目標）: {counts['skipped_bytes']} bytes")
+    if ascii_skip:
+        print(f"未解碼直接複製（純 ASCII 或圍欄內）: {counts['undecoded_bytes']} bytes")
+    if counts['over_budget']:
+        print(f"[WARN] 超出記憶體預算: {counts['over_budget']} 個文件")
     print(f"失敗: {len(failed_files)} 個文件")
     
     if failed_files:
@@ -517,7 +1115,39 @@ def convert_md_files(root_dir: str, exclude_patterns: list = None) -> None:
         for file_path, error in failed_files:
             print(f"  - {file_path}: {error}")
 
-if __name__ == '__main__':
-    doc_dir = r'e:\Jerry_python\腳本平台\doc'
-    convert_md_files(doc_dir, exclude_patterns=['_backup_legacy'])
+def main(argv=None) -> None:
+    parser = argparse.ArgumentParser(description='將 MD 文件從簡體中文轉換為繁體中文')
+    parser.add_argument('root', nargs='?', default=str(doc_fs.DOC_ROOT),
+                        help='要轉換的根目錄（預設由環境變數 DOC_ROOT 決定）')
+    parser.add_argument('-j', '--jobs', type=int, default=1,
+                        help='平行轉換的行程數（預設 1）')
+    parser.add_argument('--table', help='編譯轉換表路徑（預設 convert_dict.ctd）')
+    parser.add_argument('--manifest', help=f'增量轉換清單路徑（預設 <root>/{MANIFEST_NAME}）')
+    parser.add_argument('--no-manifest', action='store_true', help='停用增量轉換，全部重新轉換')
+    parser.add_argument('--stream-threshold', type=float, default=STREAM_THRESHOLD / 2**20,
+                        help='超過此大小 (MB) 的文件改用串流轉換')
+    parser.add_argument('--max-memory', type=float, default=MAX_MEMORY / 2**20,
+                        help='串流轉換的峰值記憶體預算 (MB)')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='以 tracemalloc 量測並回報串流轉換的記憶體峰值')
+    parser.add_argument('--raw', action='store_true',
+                        help='不辨識 Markdown 結構，連同程式碼與連結一併轉換')
+    parser.add_argument('--ascii-skip', action='store_true',
+                        help='以記憶體映射讀取，只解碼、轉換含非 ASCII 字元的部分（程式碼多的文件較快）')
+    doc_fs.add_arguments(parser)
+    doc_metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+    manifest_path = False if args.no_manifest else args.manifest
+    with doc_metrics.session('convert_to_traditional', args):
+        convert_md_files(args.root, exclude_patterns=['_backup_legacy'],
+                         jobs=args.jobs, table_path=args.table, manifest_path=manifest_path,
+                         stream_threshold=int(args.stream_threshold * 2**20),
+                         max_memory=int(args.max_memory * 2**20),
+                         trace_memory=args.trace_memory, markdown=not args.raw,
+                         ascii_skip=args.ascii_skip, io_workers=args.io_workers)
     print("\n所有 MD 文件已完成轉換!")
+
+if __name__ == '__main__':
+    # 確保 stdout 能夠正確輸出中文
+    sys.stdout.reconfigure(encoding='utf-8')
+    main()
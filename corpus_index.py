@@ -0,0 +1,319 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+文件樹的持久化索引（SQLite）
+
+每個文件一列（路徑、雜湊、大小、標題），另外記錄每個標題（層級、文字、slug）
+與每個連結（來源、目標、錨點）。依修改時間與雜湊增量更新，
+「誰連到 X」、「chX-i-*.md 的新檔名是什麼」等查詢都走索引，不必再掃描檔案系統。
+
+用法：
+    python corpus_index.py --root doc/鏡界 refresh
+    python corpus_index.py --root doc/鏡界 links-to ch9/ch9-14-持續整合與持續部署.md
+    python corpus_index.py --root doc/鏡界 find 9 14
+"""
+
+import argparse
+import os
+import sqlite3
+import sys
+from pathlib import Path
+from typing import List, Optional
+
+import doc_fs
+from doc_io import content_hash
+from md_tokenizer import iter_headings, iter_links
+from rename_engine import DEFAULT_EXCLUDE, resolve_link, split_target
+
+DB_NAME = '.corpus_index.sqlite'
+SCHEMA_VERSION = 1
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS documents (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    dir TEXT NOT NULL,
+    name TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    mtime_ns INTEGER NOT NULL,
+    hash TEXT NOT NULL,
+    title TEXT
+);
+CREATE INDEX IF NOT EXISTS documents_name ON documents (dir, name);
+CREATE TABLE IF NOT EXISTS headings (
+    doc_id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    line INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    text TEXT NOT NULL,
+    slug TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS headings_doc ON headings (doc_id, slug);
+CREATE TABLE IF NOT EXISTS links (
+    doc_id INTEGER NOT NULL REFERENCES documents (id) ON DELETE CASCADE,
+    line INTEGER NOT NULL,
+    target TEXT NOT NULL,
+    target_path TEXT,
+    anchor TEXT
+);
+CREATE INDEX IF NOT EXISTS links_doc ON links (doc_id);
+CREATE INDEX IF NOT EXISTS links_target ON links (target_path);
+'''
+
+
+def parse_document(path: Path, root: Path, text: str) -> tuple:
+    """解析單一文件，回傳 (標題, [標題列], [連結列])"""
+    headings = list(iter_headings(text))
+    title = next((h[2] for h in headings if h[1] == 1), headings[0][2] if headings else None)
+
+    links = []
+    line, pos = 1, 0
+    for start, _end, target in iter_links(text):
+        line += text.count('\n', pos, start)
+        pos = start
+        anchor = split_target(target)[1][1:] or None
+        resolved = resolve_link(path, target)
+        if resolved is None:
+            # 外部連結或同文件錨點
+            target_path = None if split_target(target)[0] else _rel(path, root)
+        else:
+            target_path = _rel(resolved, root)
+        links.append((line, target, target_path, anchor))
+    return title, headings, links
+
+
+def _rel(path: Path, root: Path) -> str:
+    return Path(os.path.relpath(path, root)).as_posix()
+
+
+class CorpusIndex:
+    """文件樹索引；路徑一律為相對於 root 的 POSIX 路徑"""
+
+    def __init__(self, root, db_path=None):
+        self.root = Path(os.path.normpath(Path(root).resolve()))
+        self.db_path = Path(db_path) if db_path else self.root / DB_NAME
+        self.conn = sqlite3.connect(self.db_path)
+        self.conn.execute('PRAGMA foreign_keys = ON')
+        self.conn.execute('PRAGMA journal_mode = WAL')
+        self.conn.execute('PRAGMA synchronous = NORMAL')
+        version = self._schema_version()
+        if version not in (None, SCHEMA_VERSION):
+            self.conn.executescript('DROP TABLE IF EXISTS links; DROP TABLE IF EXISTS headings;'
+                                    'DROP TABLE IF EXISTS documents; DROP TABLE IF EXISTS meta;')
+        self.conn.executescript(_SCHEMA)
+        self.conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)',
+                          ('schema_version', str(SCHEMA_VERSION)))
+        self.conn.commit()
+
+    def _schema_version(self) -> Optional[int]:
+        try:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+        except sqlite3.OperationalError:
+            return None
+        return int(row[0]) if row else None
+
+    def close(self) -> None:
+        self.conn.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # ---- 更新 ----
+
+    def _scan(self, exclude_patterns) -> dict:
+        """以 os.scandir 走訪文件樹，回傳 {相對路徑: stat}"""
+        found = {}
+        stack = [self.root]
+        while stack:
+            directory = stack.pop()
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if entry.is_dir(follow_symlinks=False):
+                        if not entry.name.startswith('.') and \
+                                not any(p in entry.name for p in exclude_patterns):
+                            stack.append(Path(entry.path))
+                    elif entry.name.endswith('.md') and entry.is_file():
+                        found[_rel(Path(entry.path), self.root)] = entry.stat()
+        return found
+
+    def refresh(self, exclude_patterns=DEFAULT_EXCLUDE) -> dict:
+        """增量更新：大小與修改時間未變者略過；內容雜湊相同者只更新 stat"""
+        stats = {'added': 0, 'updated': 0, 'touched': 0, 'removed': 0, 'unchanged': 0}
+        found = self._scan(exclude_patterns)
+        known = {row[0]: row[1:] for row in self.conn.execute(
+            'SELECT path, id, size, mtime_ns, hash FROM documents')}
+
+        with self.conn:
+            for rel in set(known) - set(found):
+                self.conn.execute('DELETE FROM documents WHERE id = ?', (known[rel][0],))
+                stats['removed'] += 1
+            for rel, st in sorted(found.items()):
+                stats[self._update(rel, st, known.get(rel))] += 1
+        return stats
+
+    def update_paths(self, rels) -> dict:
+        """只更新指定的文件（相對路徑）；已不存在的文件從索引中移除"""
+        stats = {'added': 0, 'updated': 0, 'touched': 0, 'removed': 0, 'unchanged': 0}
+        with self.conn:
+            for rel in sorted(set(rels)):
+                row = self.conn.execute('SELECT id, size, mtime_ns, hash FROM documents WHERE path = ?',
+                                        (rel,)).fetchone()
+                try:
+                    st = (self.root / rel).stat()
+                    stats[self._update(rel, st, row)] += 1
+                except FileNotFoundError:  # 包括 stat 之後、讀取之前才被刪除
+                    if row is not None:
+                        self.conn.execute('DELETE FROM documents WHERE id = ?', (row[0],))
+                        stats['removed'] += 1
+        return stats
+
+    def _update(self, rel: str, st: os.stat_result, row: Optional[tuple]) -> str:
+        """更新單一文件的索引資料；row 為 (id, size, mtime_ns, hash) 或 None，回傳統計類別"""
+        if row is not None and row[1] == st.st_size and row[2] == st.st_mtime_ns:
+            return 'unchanged'
+        path = self.root / rel
+        data = path.read_bytes()
+        digest = content_hash(data)
+        if row is not None and row[3] == digest:
+            self.conn.execute('UPDATE documents SET size = ?, mtime_ns = ? WHERE id = ?',
+                              (st.st_size, st.st_mtime_ns, row[0]))
+            return 'touched'
+
+        title, headings, links = parse_document(path, self.root, data.decode('utf-8', errors='ignore'))
+        if row is None:
+            cur = self.conn.execute(
+                'INSERT INTO documents (path, dir, name, size, mtime_ns, hash, title)'
+                ' VALUES (?, ?, ?, ?, ?, ?, ?)',
+                (rel, _parent(rel), rel.rsplit('/', 1)[-1],
+                 st.st_size, st.st_mtime_ns, digest, title))
+            doc_id = cur.lastrowid
+            status = 'added'
+        else:
+            doc_id = row[0]
+            self.conn.execute(
+                'UPDATE documents SET size = ?, mtime_ns = ?, hash = ?, title = ? WHERE id = ?',
+                (st.st_size, st.st_mtime_ns, digest, title, doc_id))
+            self.conn.execute('DELETE FROM headings WHERE doc_id = ?', (doc_id,))
+            self.conn.execute('DELETE FROM links WHERE doc_id = ?', (doc_id,))
+            status = 'updated'
+        self.conn.executemany(
+            'INSERT INTO headings VALUES (?, ?, ?, ?, ?)',
+            [(doc_id, line, level, text, slug) for line, level, text, slug in headings])
+        self.conn.executemany(
+            'INSERT INTO links VALUES (?, ?, ?, ?, ?)',
+            [(doc_id,) + link for link in links])
+        return status
+
+    # ---- 查詢 ----
+
+    def documents(self, pattern: str = None) -> List[str]:
+        """列出文件路徑；pattern 為 SQLite GLOB 樣式（例如 'ch9/*'）"""
+        if pattern is None:
+            rows = self.conn.execute('SELECT path FROM documents ORDER BY path')
+        else:
+            rows = self.conn.execute('SELECT path FROM documents WHERE path GLOB ? ORDER BY path',
+                                     (pattern,))
+        return [r[0] for r in rows]
+
+    def document(self, path: str) -> Optional[dict]:
+        row = self.conn.execute(
+            'SELECT path, size, mtime_ns, hash, title FROM documents WHERE path = ?',
+            (path,)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(('path', 'size', 'mtime_ns', 'hash', 'title'), row))
+
+    def find_section(self, chapter: int, idx: int, directory: str = None) -> Optional[str]:
+        """找出 chX-i-*.md 的新檔名（回傳相對路徑）"""
+        directory = directory if directory is not None else f'ch{chapter}'
+        row = self.conn.execute(
+            'SELECT path FROM documents WHERE dir = ? AND name GLOB ? ORDER BY name LIMIT 1',
+            (directory, f'ch{chapter}-{idx}-*.md')).fetchone()
+        return row[0] if row else None
+
+    def headings(self, path: str) -> List[tuple]:
+        """回傳 [(行號, 層級, 文字, slug), ...]"""
+        return self.conn.execute(
+            'SELECT h.line, h.level, h.text, h.slug FROM headings h'
+            ' JOIN documents d ON d.id = h.doc_id WHERE d.path = ? ORDER BY h.line',
+            (path,)).fetchall()
+
+    def has_anchor(self, path: str, slug: str) -> bool:
+        return self.conn.execute(
+            'SELECT 1 FROM headings h JOIN documents d ON d.id = h.doc_id'
+            ' WHERE d.path = ? AND h.slug = ? LIMIT 1', (path, slug)).fetchone() is not None
+
+    def links_from(self, path: str) -> List[tuple]:
+        """回傳 [(行號, 原始目標, 目標相對路徑, 錨點), ...]"""
+        return self.conn.execute(
+            'SELECT l.line, l.target, l.target_path, l.anchor FROM links l'
+            ' JOIN documents d ON d.id = l.doc_id WHERE d.path = ? ORDER BY l.line',
+            (path,)).fetchall()
+
+    def who_links_to(self, path: str) -> List[tuple]:
+        """回傳連到 path 的 [(來源相對路徑, 行號, 錨點), ...]"""
+        return self.conn.execute(
+            'SELECT d.path, l.line, l.anchor FROM links l JOIN documents d ON d.id = l.doc_id'
+            ' WHERE l.target_path = ? ORDER BY d.path, l.line', (path,)).fetchall()
+
+    # ---- 供 rename_engine 使用的 LinkIndex 介面 ----
+
+    @property
+    def files(self) -> List[Path]:
+        return [self.root / p for p in self.documents()]
+
+    def sources_linking_to(self, targets) -> set:
+        sources = set()
+        for target in targets:
+            for source, _line, _anchor in self.who_links_to(_rel(Path(target), self.root)):
+                sources.add(self.root / source)
+        return sources
+
+
+def _parent(rel: str) -> str:
+    return rel.rsplit('/', 1)[0] if '/' in rel else ''
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='文件樹 SQLite 索引')
+    parser.add_argument('--root', default=str(doc_fs.BOOK_ROOT),
+                        help='文件樹根目錄')
+    parser.add_argument('--db', help=f'索引檔路徑（預設 <root>/{DB_NAME}）')
+    sub = parser.add_subparsers(dest='command', required=True)
+    sub.add_parser('refresh', help='增量更新索引')
+    p = sub.add_parser('links-to', help='列出連到指定文件的連結')
+    p.add_argument('path')
+    p = sub.add_parser('find', help='找出 chX-i-*.md 的新檔名')
+    p.add_argument('chapter', type=int)
+    p.add_argument('idx', type=int)
+    p = sub.add_parser('headings', help='列出文件的標題與錨點')
+    p.add_argument('path')
+    args = parser.parse_args(argv)
+
+    with CorpusIndex(args.root, args.db) as index:
+        stats = index.refresh()
+        if args.command == 'refresh':
+            print(f"✅ 索引已更新：新增 {stats['added']}、更新 {stats['updated']}、"
+                  f"僅時間變動 {stats['touched']}、刪除 {stats['removed']}、未變 {stats['unchanged']}")
+        elif args.command == 'links-to':
+            for source, line, anchor in index.who_links_to(args.path):
+                print(f"{source}:{line}" + (f" #{anchor}" if anchor else ''))
+        elif args.command == 'find':
+            found = index.find_section(args.chapter, args.idx)
+            if found is None:
+                print(f"⚠️ 找不到 ch{args.chapter}-{args.idx}-*.md")
+                return 1
+            print(found)
+        elif args.command == 'headings':
+            for line, level, text, slug in index.headings(args.path):
+                print(f"{line:5d} {'#' * level} {text}  (#{slug})")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
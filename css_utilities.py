@@ -0,0 +1,829 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+離線的工具類別（utility class）樣式產生器（供 build_css.py 使用）
+
+內含 Tailwind CSS v3 預設主題的一份副本（色盤、間距、字級、斷點……）、Preflight 基礎樣式，
+以及頁面實際用到的工具類別規則；產生的 CSS 與 cdn.tailwindcss.com 在瀏覽器中產生的結果相同
+（同樣的 --tw-* 變數、同樣的規則順序：基礎規則 → 狀態變體 → 響應式斷點由小到大）。
+不認得的類別名稱直接略過（與 CDN 的行為一致），因此掃描時多收集一些候選字詞並無害處。
+
+用法：
+    from css_utilities import generate_css
+    css, matched = generate_css({'flex', 'md:grid-cols-3', 'hover:bg-blue-600/20'})
+"""
+
+import re
+import string
+from typing import Dict, Iterable, List, Optional, Tuple
+
+# ---- 預設主題（Tailwind CSS v3.4） ----
+
+_SHADES = ('50', '100', '200', '300', '400', '500', '600', '700', '800', '900', '950')
+_PALETTE = {
+    'slate': 'f8fafc f1f5f9 e2e8f0 cbd5e1 94a3b8 64748b 475569 334155 1e293b 0f172a 020617',
+    'gray': 'f9fafb f3f4f6 e5e7eb d1d5db 9ca3af 6b7280 4b5563 374151 1f2937 111827 030712',
+    'zinc': 'fafafa f4f4f5 e4e4e7 d4d4d8 a1a1aa 71717a 52525b 3f3f46 27272a 18181b 09090b',
+    'neutral': 'fafafa f5f5f5 e5e5e5 d4d4d4 a3a3a3 737373 525252 404040 262626 171717 0a0a0a',
+    'stone': 'fafaf9 f5f5f4 e7e5e4 d6d3d1 a8a29e 78716c 57534e 44403c 292524 1c1917 0c0a09',
+    'red': 'fef2f2 fee2e2 fecaca fca5a5 f87171 ef4444 dc2626 b91c1c 991b1b 7f1d1d 450a0a',
+    'orange': 'fff7ed ffedd5 fed7aa fdba74 fb923c f97316 ea580c c2410c 9a3412 7c2d12 431407',
+    'amber': 'fffbeb fef3c7 fde68a fcd34d fbbf24 f59e0b d97706 b45309 92400e 78350f 451a03',
+    'yellow': 'fefce8 fef9c3 fef08a fde047 facc15 eab308 ca8a04 a16207 854d0e 713f12 422006',
+    'lime': 'f7fee7 ecfccb d9f99d bef264 a3e635 84cc16 65a30d 4d7c0f 3f6212 365314 1a2e05',
+    'green': 'f0fdf4 dcfce7 bbf7d0 86efac 4ade80 22c55e 16a34a 15803d 166534 14532d 052e16',
+    'emerald': 'ecfdf5 d1fae5 a7f3d0 6ee7b7 34d399 10b981 059669 047857 065f46 064e3b 022c22',
+    'teal': 'f0fdfa ccfbf1 99f6e4 5eead4 2dd4bf 14b8a6 0d9488 0f766e 115e59 134e4a 042f2e',
+    'cyan': 'ecfeff cffafe a5f3fc 67e8f9 22d3ee 06b6d4 0891b2 0e7490 155e75 164e63 083344',
+    'sky': 'f0f9ff e0f2fe bae6fd 7dd3fc 38bdf8 0ea5e9 0284c7 0369a1 075985 0c4a6e 082f49',
+    'blue': 'eff6ff dbeafe bfdbfe 93c5fd 60a5fa 3b82f6 2563eb 1d4ed8 1e40af 1e3a8a 172554',
+    'indigo': 'eef2ff e0e7ff c7d2fe a5b4fc 818cf8 6366f1 4f46e5 4338ca 3730a3 312e81 1e1b4b',
+    'violet': 'f5f3ff ede9fe ddd6fe c4b5fd a78bfa 8b5cf6 7c3aed 6d28d9 5b21b6 4c1d95 2e1065',
+    'purple': 'faf5ff f3e8ff e9d5ff d8b4fe c084fc a855f7 9333ea 7e22ce 6b21a8 581c87 3b0764',
+    'fuchsia': 'fdf4ff fae8ff f5d0fe f0abfc e879f9 d946ef c026d3 a21caf 86198f 701a75 4a044e',
+    'pink': 'fdf2f8 fce7f3 fbcfe8 f9a8d4 f472b6 ec4899 db2777 be185d 9d174d 831843 500724',
+    'rose': 'fff1f2 ffe4e6 fecdd3 fda4af fb7185 f43f5e e11d48 be123c 9f1239 881337 4c0519',
+}
+COLOR_NAMES = tuple(_PALETTE)
+
+COLORS: Dict[str, str] = {'black': '#000', 'white': '#fff'}
+for _name, _hexes in _PALETTE.items():
+    for _shade, _hex in zip(_SHADES, _hexes.split()):
+        COLORS[f'{_name}-{_shade}'] = '#' + _hex
+_SPECIAL_COLORS = {'inherit': 'inherit', 'current': 'currentColor', 'transparent': 'transparent'}
+
+SCREENS = (('sm', '640px'), ('md', '768px'), ('lg', '1024px'), ('xl', '1280px'), ('2xl', '1536px'))
+
+SPACING = {'0': '0px', 'px': '1px'}
+for _n in ('0.5', '1', '1.5', '2', '2.5', '3', '3.5', '4', '5', '6', '7', '8', '9', '10', '11', '12',
+           '14', '16', '20', '24', '28', '32', '36', '40', '44', '48', '52', '56', '60', '64', '72',
+           '80', '96'):
+    SPACING[_n] = f'{float(_n) / 4:g}rem'
+
+FRACTIONS = {f'{a}/{b}': f'{a / b * 100:.6f}'.rstrip('0').rstrip('.') + '%'
+             for b in (2, 3, 4, 5, 6, 12) for a in range(1, b)}
+FRACTIONS['full'] = '100%'
+
+FONT_SIZES = {
+    'xs': ('0.75rem', '1rem'), 'sm': ('0.875rem', '1.25rem'), 'base': ('1rem', '1.5rem'),
+    'lg': ('1.125rem', '1.75rem'), 'xl': ('1.25rem', '1.75rem'), '2xl': ('1.5rem', '2rem'),
+    '3xl': ('1.875rem', '2.25rem'), '4xl': ('2.25rem', '2.5rem'), '5xl': ('3rem', '1'),
+    '6xl': ('3.75rem', '1'), '7xl': ('4.5rem', '1'), '8xl': ('6rem', '1'), '9xl': ('8rem', '1'),
+}
+FONT_WEIGHTS = {'thin': '100', 'extralight': '200', 'light': '300', 'normal': '400', 'medium': '500',
+                'semibold': '600', 'bold': '700', 'extrabold': '800', 'black': '900'}
+FONT_FAMILIES = {
+    'sans': 'ui-sans-serif, system-ui, sans-serif, "Apple Color Emoji", "Segoe UI Emoji", '
+            '"Segoe UI Symbol", "Noto Color Emoji"',
+    'serif': 'ui-serif, Georgia, Cambria, "Times New Roman", Times, serif',
+    'mono': 'ui-monospace, SFMono-Regular, Menlo, Monaco, Consolas, "Liberation Mono", '
+            '"Courier New", monospace',
+}
+LEADING = {'none': '1', 'tight': '1.25', 'snug': '1.375', 'normal': '1.5', 'relaxed': '1.625',
+           'loose': '2', '3': '.75rem', '4': '1rem', '5': '1.25rem', '6': '1.5rem', '7': '1.75rem',
+           '8': '2rem', '9': '2.25rem', '10': '2.5rem'}
+TRACKING = {'tighter': '-0.05em', 'tight': '-0.025em', 'normal': '0em', 'wide': '0.025em',
+            'wider': '0.05em', 'widest': '0.1em'}
+MAX_WIDTH = {'none': 'none', '0': '0rem', 'xs': '20rem', 'sm': '24rem', 'md': '28rem', 'lg': '32rem',
+             'xl': '36rem', '2xl': '42rem', '3xl': '48rem', '4xl': '56rem', '5xl': '64rem',
+             '6xl': '72rem', '7xl': '80rem', 'full': '100%', 'min': 'min-content',
+             'max': 'max-content', 'fit': 'fit-content', 'prose': '65ch'}
+MAX_WIDTH.update({f'screen-{k}': v for k, v in SCREENS})
+RADIUS = {'none': '0px', 'sm': '0.125rem', '': '0.25rem', 'md': '0.375rem', 'lg': '0.5rem',
+          'xl': '0.75rem', '2xl': '1rem', '3xl': '1.5rem', 'full': '9999px'}
+BORDER_WIDTH = {'': '1px', '0': '0px', '2': '2px', '4': '4px', '8': '8px'}
+SHADOWS = {
+    'sm': '0 1px 2px 0 rgb(0 0 0 / 0.05)',
+    '': '0 1px 3px 0 rgb(0 0 0 / 0.1), 0 1px 2px -1px rgb(0 0 0 / 0.1)',
+    'md': '0 4px 6px -1px rgb(0 0 0 / 0.1), 0 2px 4px -2px rgb(0 0 0 / 0.1)',
+    'lg': '0 10px 15px -3px rgb(0 0 0 / 0.1), 0 4px 6px -4px rgb(0 0 0 / 0.1)',
+    'xl': '0 20px 25px -5px rgb(0 0 0 / 0.1), 0 8px 10px -6px rgb(0 0 0 / 0.1)',
+    '2xl': '0 25px 50px -12px rgb(0 0 0 / 0.25)',
+    'inner': 'inset 0 2px 4px 0 rgb(0 0 0 / 0.05)',
+    'none': '0 0 #0000',
+}
+BLUR = {'none': '', 'sm': '4px', '': '8px', 'md': '12px', 'lg': '16px', 'xl': '24px', '2xl': '40px',
+        '3xl': '64px'}
+OPACITY = {str(n): f'{n / 100:g}' for n in range(0, 101, 5)}
+Z_INDEX = {'0': '0', '10': '10', '20': '20', '30': '30', '40': '40', '50': '50', 'auto': 'auto'}
+SCALE = {n: f'{int(n) / 100:g}' for n in ('0', '50', '75', '90', '95', '100', '105', '110', '125', '150')}
+ROTATE = {n: f'{n}deg' for n in ('0', '1', '2', '3', '6', '12', '45', '90', '180')}
+DURATION = {n: f'{n}ms' for n in ('0', '75', '100', '150', '200', '300', '500', '700', '1000')}
+EASE = {'linear': 'linear', 'in': 'cubic-bezier(0.4, 0, 1, 1)', 'out': 'cubic-bezier(0, 0, 0.2, 1)',
+        'in-out': 'cubic-bezier(0.4, 0, 0.2, 1)'}
+ANIMATIONS = {
+    'spin': ('spin 1s linear infinite', '@keyframes spin{to{transform:rotate(360deg)}}'),
+    'ping': ('ping 1s cubic-bezier(0, 0, 0.2, 1) infinite',
+             '@keyframes ping{75%,100%{transform:scale(2);opacity:0}}'),
+    'pulse': ('pulse 2s cubic-bezier(0.4, 0, 0.6, 1) infinite', '@keyframes pulse{50%{opacity:.5}}'),
+    'bounce': ('bounce 1s infinite',
+               '@keyframes bounce{0%,100%{transform:translateY(-25%);'
+               'animation-timing-function:cubic-bezier(0.8,0,1,1)}'
+               '50%{transform:none;animation-timing-function:cubic-bezier(0,0,0.2,1)}}'),
+    'none': ('none', ''),
+}
+TRANSITIONS = {
+    '': 'color, background-color, border-color, text-decoration-color, fill, stroke, opacity, '
+        'box-shadow, transform, filter, backdrop-filter',
+    'all': 'all',
+    'colors': 'color, background-color, border-color, text-decoration-color, fill, stroke',
+    'opacity': 'opacity',
+    'shadow': 'box-shadow',
+    'transform': 'transform',
+    'none': 'none',
+}
+CURSORS = ('auto', 'default', 'pointer', 'wait', 'text', 'move', 'help', 'not-allowed', 'none',
+           'context-menu', 'progress', 'cell', 'crosshair', 'vertical-text', 'alias', 'copy',
+           'no-drop', 'grab', 'grabbing', 'all-scroll', 'col-resize', 'row-resize', 'zoom-in',
+           'zoom-out')
+
+_TRANSFORM = ('translate(var(--tw-translate-x), var(--tw-translate-y)) rotate(var(--tw-rotate)) '
+              'skewX(var(--tw-skew-x)) skewY(var(--tw-skew-y)) scaleX(var(--tw-scale-x)) '
+              'scaleY(var(--tw-scale-y))')
+_BACKDROP = ('var(--tw-backdrop-blur) var(--tw-backdrop-brightness) var(--tw-backdrop-contrast) '
+             'var(--tw-backdrop-grayscale) var(--tw-backdrop-hue-rotate) var(--tw-backdrop-invert) '
+             'var(--tw-backdrop-opacity) var(--tw-backdrop-saturate) var(--tw-backdrop-sepia)')
+_FILTER = ('var(--tw-blur) var(--tw-brightness) var(--tw-contrast) var(--tw-grayscale) '
+           'var(--tw-hue-rotate) var(--tw-invert) var(--tw-saturate) var(--tw-sepia) '
+           'var(--tw-drop-shadow)')
+_BOX_SHADOW = 'var(--tw-ring-offset-shadow, 0 0 #0000), var(--tw-ring-shadow, 0 0 #0000), var(--tw-shadow)'
+_EASE_DEFAULT = 'cubic-bezier(0.4, 0, 0.2, 1)'
+
+PREFLIGHT = string.Template("""\
+*,::before,::after{box-sizing:border-box;border-width:0;border-style:solid;border-color:#e5e7eb}
+::before,::after{--tw-content:''}
+html,:host{line-height:1.5;-webkit-text-size-adjust:100%;-moz-tab-size:4;tab-size:4;font-family:$sans;font-feature-settings:normal;font-variation-settings:normal;-webkit-tap-highlight-color:transparent}
+body{margin:0;line-height:inherit}
+hr{height:0;color:inherit;border-top-width:1px}
+abbr:where([title]){-webkit-text-decoration:underline dotted;text-decoration:underline dotted}
+h1,h2,h3,h4,h5,h6{font-size:inherit;font-weight:inherit}
+a{color:inherit;text-decoration:inherit}
+b,strong{font-weight:bolder}
+code,kbd,samp,pre{font-family:$mono;font-feature-settings:normal;font-variation-settings:normal;font-size:1em}
+small{font-size:80%}
+sub,sup{font-size:75%;line-height:0;position:relative;vertical-align:baseline}
+sub{bottom:-0.25em}
+sup{top:-0.5em}
+table{text-indent:0;border-color:inherit;border-collapse:collapse}
+button,input,optgroup,select,textarea{font-family:inherit;font-feature-settings:inherit;font-variation-settings:inherit;font-size:100%;font-weight:inherit;line-height:inherit;letter-spacing:inherit;color:inherit;margin:0;padding:0}
+button,select{text-transform:none}
+button,input:where([type='button']),input:where([type='reset']),input:where([type='submit']){-webkit-appearance:button;background-color:transparent;background-image:none}
+:-moz-focusring{outline:auto}
+:-moz-ui-invalid{box-shadow:none}
+progress{vertical-align:baseline}
+::-webkit-inner-spin-button,::-webkit-outer-spin-button{height:auto}
+[type='search']{-webkit-appearance:textfield;outline-offset:-2px}
+::-webkit-search-decoration{-webkit-appearance:none}
+::-webkit-file-upload-button{-webkit-appearance:button;font:inherit}
+summary{display:list-item}
+blockquote,dl,dd,h1,h2,h3,h4,h5,h6,hr,figure,p,pre{margin:0}
+fieldset{margin:0;padding:0}
+legend{padding:0}
+ol,ul,menu{list-style:none;margin:0;padding:0}
+dialog{padding:0}
+textarea{resize:vertical}
+input::placeholder,textarea::placeholder{opacity:1;color:#9ca3af}
+button,[role="button"]{cursor:pointer}
+:disabled{cursor:default}
+img,svg,video,canvas,audio,iframe,embed,object{display:block;vertical-align:middle}
+img,video{max-width:100%;height:auto}
+[hidden]:where(:not([hidden="until-found"])){display:none}
+""").substitute(FONT_FAMILIES)
+
+# 各工具類別依賴的 --tw-* 變數預設值（與 CDN 相同，加在所有元素上）
+TW_DEFAULTS = """\
+*,::before,::after,::backdrop{--tw-border-spacing-x:0;--tw-border-spacing-y:0;--tw-translate-x:0;--tw-translate-y:0;--tw-rotate:0;--tw-skew-x:0;--tw-skew-y:0;--tw-scale-x:1;--tw-scale-y:1;--tw-pan-x: ;--tw-pan-y: ;--tw-pinch-zoom: ;--tw-scroll-snap-strictness:proximity;--tw-gradient-from-position: ;--tw-gradient-via-position: ;--tw-gradient-to-position: ;--tw-ordinal: ;--tw-slashed-zero: ;--tw-numeric-figure: ;--tw-numeric-spacing: ;--tw-numeric-fraction: ;--tw-ring-inset: ;--tw-ring-offset-width:0px;--tw-ring-offset-color:#fff;--tw-ring-color:rgb(59 130 246 / 0.5);--tw-ring-offset-shadow:0 0 #0000;--tw-ring-shadow:0 0 #0000;--tw-shadow:0 0 #0000;--tw-shadow-colored:0 0 #0000;--tw-blur: ;--tw-brightness: ;--tw-contrast: ;--tw-grayscale: ;--tw-hue-rotate: ;--tw-invert: ;--tw-saturate: ;--tw-sepia: ;--tw-drop-shadow: ;--tw-backdrop-blur: ;--tw-backdrop-brightness: ;--tw-backdrop-contrast: ;--tw-backdrop-grayscale: ;--tw-backdrop-hue-rotate: ;--tw-backdrop-invert: ;--tw-backdrop-opacity: ;--tw-backdrop-saturate: ;--tw-backdrop-sepia: ;--tw-contain-size: ;--tw-contain-layout: ;--tw-contain-paint: ;--tw-contain-style: }
+"""
+
+# ---- 變體 ----
+
+# 名稱 → (種類, 內容)；清單順序即輸出順序（與 Tailwind 相同：狀態變體在前、斷點在後）
+_VARIANTS = [
+    ('before', ('element', '::before')),
+    ('after', ('element', '::after')),
+    ('placeholder', ('element', '::placeholder')),
+    ('first', ('pseudo', ':first-child')),
+    ('last', ('pseudo', ':last-child')),
+    ('odd', ('pseudo', ':nth-child(odd)')),
+    ('even', ('pseudo', ':nth-child(even)')),
+    ('checked', ('pseudo', ':checked')),
+    ('focus-within', ('pseudo', ':focus-within')),
+    ('hover', ('pseudo', ':hover')),
+    ('focus', ('pseudo', ':focus')),
+    ('focus-visible', ('pseudo', ':focus-visible')),
+    ('active', ('pseudo', ':active')),
+    ('disabled', ('pseudo', ':disabled')),
+    ('group-hover', ('prefix', '.group:hover ')),
+    ('group-focus', ('prefix', '.group:focus ')),
+    ('peer-checked', ('prefix', '.peer:checked ~ ')),
+    ('peer-hover', ('prefix', '.peer:hover ~ ')),
+    ('peer-focus', ('prefix', '.peer:focus ~ ')),
+    ('dark', ('media', '(prefers-color-scheme: dark)')),
+] + [(name, ('media', f'(min-width: {width})')) for name, width in SCREENS]
+VARIANTS = dict(_VARIANTS)
+_VARIANT_ORDER = {name: i for i, (name, _) in enumerate(_VARIANTS)}
+_MEDIA_ORDER = [spec for _, (kind, spec) in _VARIANTS if kind == 'media']
+
+# ---- 工具類別 ----
+
+
+def _rgb(hex_color: str) -> Optional[str]:
+    h = hex_color.lstrip('#')
+    if len(h) == 3:
+        h = ''.join(c * 2 for c in h)
+    if not re.fullmatch(r'[0-9a-fA-F]{6}', h):
+        return None
+    return ' '.join(str(int(h[i:i + 2], 16)) for i in (0, 2, 4))
+
+
+def _arbitrary(value: str) -> Optional[str]:
+    if value.startswith('[') and value.endswith(']') and len(value) > 2:
+        return value[1:-1].replace('_', ' ')
+    return None
+
+
+def _scale(table: dict, value: str, negative: bool = False) -> Optional[str]:
+    result = _arbitrary(value)
+    if result is None:
+        result = table.get(value)
+    if result is None or not negative:
+        return result
+    if result in ('0px', '0', 'auto'):
+        return result if result != 'auto' else None
+    if result[0].isdigit() or result[0] == '.':
+        return '-' + result
+    return f'calc({result} * -1)'
+
+
+def _color(value: str) -> Optional[tuple]:
+    """回傳 (顏色字串, rgb 分量或 None, 透明度或 None)；value 可帶 /透明度"""
+    alpha = None
+    if '/' in value and not value.startswith('['):
+        value, alpha_text = value.rsplit('/', 1)
+        alpha = _arbitrary(alpha_text) or OPACITY.get(alpha_text)
+        if alpha is None:
+            return None
+    if value in _SPECIAL_COLORS:
+        return (_SPECIAL_COLORS[value], None, alpha) if alpha is None else None
+    color = _arbitrary(value) or COLORS.get(value)
+    if color is None:
+        return None
+    return color, _rgb(color), alpha
+
+
+def _color_decls(value: str, prop, opacity_var: Optional[str]) -> Optional[list]:
+    """單一顏色屬性：沒有指定透明度時透過 --tw-*-opacity 變數（與 CDN 一致）"""
+    parsed = _color(value)
+    if parsed is None:
+        return None
+    color, rgb, alpha = parsed
+    props = prop if isinstance(prop, tuple) else (prop,)
+    if rgb is None:
+        return [(p, color) for p in props]
+    if alpha is not None:
+        return [(p, f'rgb({rgb} / {alpha})') for p in props]
+    if opacity_var is None:
+        return [(p, color) for p in props]
+    return [(opacity_var, '1')] + [(p, f'rgb({rgb} / var({opacity_var}))') for p in props]
+
+
+def _transparent(value: str) -> str:
+    """漸層終點預設為起點顏色的全透明版本"""
+    parsed = _color(value)
+    return f'rgb({parsed[1]} / 0)' if parsed and parsed[1] else 'rgb(0 0 0 / 0)'
+
+
+def _color_value(value: str) -> Optional[str]:
+    parsed = _color(value)
+    if parsed is None:
+        return None
+    color, rgb, alpha = parsed
+    return f'rgb({rgb} / {alpha})' if rgb and alpha is not None else color
+
+
+def _gradient(kind: str, value: str) -> Optional[list]:
+    color = _color_value(value)
+    if color is None:
+        return None
+    if kind == 'from':
+        return [('--tw-gradient-from', f'{color} var(--tw-gradient-from-position)'),
+                ('--tw-gradient-to', f'{_transparent(value)} var(--tw-gradient-to-position)'),
+                ('--tw-gradient-stops', 'var(--tw-gradient-from), var(--tw-gradient-to)')]
+    if kind == 'via':
+        return [('--tw-gradient-to', f'{_transparent(value)} var(--tw-gradient-to-position)'),
+                ('--tw-gradient-stops', f'var(--tw-gradient-from), {color} '
+                                        'var(--tw-gradient-via-position), var(--tw-gradient-to)')]
+    return [('--tw-gradient-to', f'{color} var(--tw-gradient-to-position)')]
+
+
+def _props(*names):
+    """值為單一尺度的工具類別：將值套到一或多個屬性"""
+    def make(value):
+        return [(n, value) for n in names]
+    return make
+
+
+_SIDES = {'': ('',), 'x': ('-left', '-right'), 'y': ('-top', '-bottom'), 't': ('-top',),
+          'r': ('-right',), 'b': ('-bottom',), 'l': ('-left',)}
+_CORNERS = {'': ('',), 't': ('-top-left', '-top-right'), 'r': ('-top-right', '-bottom-right'),
+            'b': ('-bottom-right', '-bottom-left'), 'l': ('-top-left', '-bottom-left'),
+            'tl': ('-top-left',), 'tr': ('-top-right',), 'br': ('-bottom-right',),
+            'bl': ('-bottom-left',)}
+_SIZE_KEYWORDS = {'auto': 'auto', 'min': 'min-content', 'max': 'max-content', 'fit': 'fit-content'}
+
+
+def _build_functional() -> List[tuple]:
+    """(根名稱, 解析函式(值, 是否負值) → 宣告或 None, 額外選擇器後綴)；清單順序即規則輸出順序"""
+    rules: List[tuple] = []
+
+    def add(root, resolve, suffix=''):
+        rules.append((root, resolve, suffix))
+
+    def scaled(table, *props, negative=False):
+        def resolve(value, neg):
+            if neg and not negative:
+                return None
+            v = _scale(table, value, neg)
+            return None if v is None else [(p, v) for p in props]
+        return resolve
+
+    inset = {**SPACING, **FRACTIONS, 'auto': 'auto'}
+    add('inset', scaled(inset, 'inset', negative=True))
+    add('inset-x', scaled(inset, 'left', 'right', negative=True))
+    add('inset-y', scaled(inset, 'top', 'bottom', negative=True))
+    for side in ('top', 'right', 'bottom', 'left'):
+        add(side, scaled(inset, side, negative=True))
+    add('z', scaled(Z_INDEX, 'z-index'))
+    add('col-span', lambda v, n: None if n else (
+        [('grid-column', '1 / -1')] if v == 'full' else
+        [('grid-column', f'span {v} / span {v}')] if v.isdigit() and 1 <= int(v) <= 12 else None))
+
+    margin = {**SPACING, 'auto': 'auto'}
+    for key, sides in _SIDES.items():
+        add('m' + key, scaled(margin, *(f'margin{s}' for s in sides), negative=True))
+
+    add('line-clamp', lambda v, n: None if n or not v.isdigit() else [
+        ('overflow', 'hidden'), ('display', '-webkit-box'), ('-webkit-box-orient', 'vertical'),
+        ('-webkit-line-clamp', v)])
+
+    width = {**SPACING, **FRACTIONS, **_SIZE_KEYWORDS, 'screen': '100vw', 'svw': '100svw',
+             'lvw': '100lvw', 'dvw': '100dvw'}
+    height = {**SPACING, **FRACTIONS, **_SIZE_KEYWORDS, 'screen': '100vh', 'svh': '100svh',
+              'lvh': '100lvh', 'dvh': '100dvh'}
+    add('size', scaled({**SPACING, **FRACTIONS, **_SIZE_KEYWORDS}, 'width', 'height'))
+    add('h', scaled(height, 'height'))
+    add('max-h', scaled({**SPACING, **FRACTIONS, **_SIZE_KEYWORDS, 'none': 'none', 'screen': '100vh'},
+                        'max-height'))
+    add('min-h', scaled({**SPACING, **FRACTIONS, **_SIZE_KEYWORDS, 'screen': '100vh'}, 'min-height'))
+    add('w', scaled(width, 'width'))
+    add('min-w', scaled({**SPACING, **FRACTIONS, **_SIZE_KEYWORDS, 'screen': '100vw'}, 'min-width'))
+    add('max-w', scaled(MAX_WIDTH, 'max-width'))
+
+    add('basis', scaled({**SPACING, **FRACTIONS, 'auto': 'auto'}, 'flex-basis'))
+
+    def transform(var_names, table, negative=True):
+        def resolve(value, neg):
+            if neg and not negative:
+                return None
+            v = _scale(table, value, neg)
+            if v is None:
+                return None
+            return [(name, v) for name in var_names] + [('transform', _TRANSFORM)]
+        return resolve
+
+    translate = {**SPACING, **FRACTIONS}
+    add('translate-x', transform(('--tw-translate-x',), translate))
+    add('translate-y', transform(('--tw-translate-y',), translate))
+    add('rotate', transform(('--tw-rotate',), ROTATE))
+    add('scale', transform(('--tw-scale-x', '--tw-scale-y'), SCALE, negative=False))
+    add('scale-x', transform(('--tw-scale-x',), SCALE, negative=False))
+    add('scale-y', transform(('--tw-scale-y',), SCALE, negative=False))
+
+    def animate(value, neg):
+        if neg or value not in ANIMATIONS:
+            return None
+        return [('animation', ANIMATIONS[value][0])]
+    add('animate', animate)
+
+    add('grid-cols', lambda v, n: None if n else (
+        [('grid-template-columns', 'none')] if v == 'none' else
+        [('grid-template-columns', f'repeat({v}, minmax(0, 1fr))')] if v.isdigit() and 1 <= int(v) <= 12
+        else None))
+    add('gap', scaled(SPACING, 'gap'))
+    add('gap-x', scaled(SPACING, 'column-gap'))
+    add('gap-y', scaled(SPACING, 'row-gap'))
+
+    between = ' > :not([hidden]) ~ :not([hidden])'
+    add('space-x', lambda v, n: (lambda s: None if s is None else [
+        ('--tw-space-x-reverse', '0'), ('margin-right', f'calc({s} * var(--tw-space-x-reverse))'),
+        ('margin-left', f'calc({s} * calc(1 - var(--tw-space-x-reverse)))')])(_scale(SPACING, v, n)),
+        between)
+    add('space-y', lambda v, n: (lambda s: None if s is None else [
+        ('--tw-space-y-reverse', '0'), ('margin-top', f'calc({s} * calc(1 - var(--tw-space-y-reverse)))'),
+        ('margin-bottom', f'calc({s} * var(--tw-space-y-reverse))')])(_scale(SPACING, v, n)),
+        between)
+
+    for key, corners in _CORNERS.items():
+        root = 'rounded' + ('-' + key if key else '')
+        add(root, scaled(RADIUS, *(f'border{c}-radius' for c in corners)))
+
+    for key, sides in _SIDES.items():
+        root = 'border' + ('-' + key if key else '')
+        add(root, scaled(BORDER_WIDTH, *(f'border{s}-width' for s in sides)))
+    for key, sides in _SIDES.items():
+        root = 'border' + ('-' + key if key else '')
+        opacity_var = '--tw-border-opacity'
+        add(root, lambda v, n, sides=sides, opacity_var=opacity_var: None if n else _color_decls(
+            v, tuple(f'border{s}-color' for s in sides), opacity_var))
+
+    add('bg', lambda v, n: None if n else _color_decls(v, 'background-color', '--tw-bg-opacity'))
+    add('bg-opacity', scaled(OPACITY, '--tw-bg-opacity'))
+    for kind in ('from', 'via', 'to'):
+        add(kind, lambda v, n, kind=kind: None if n else _gradient(kind, v))
+
+    for key, sides in _SIDES.items():
+        add('p' + key, scaled(SPACING, *(f'padding{s}' for s in sides)))
+
+    def font_size(value, neg):
+        if neg:
+            return None
+        if value in FONT_SIZES:
+            size, line = FONT_SIZES[value]
+            return [('font-size', size), ('line-height', line)]
+        arbitrary = _arbitrary(value)
+        if arbitrary and re.match(r'^[\d.]+(px|r?em|%|vw|vh)$', arbitrary):
+            return [('font-size', arbitrary)]
+        return None
+    add('text', font_size)
+    add('font', lambda v, n: None if n else (
+        [('font-weight', FONT_WEIGHTS[v])] if v in FONT_WEIGHTS else
+        [('font-family', FONT_FAMILIES[v])] if v in FONT_FAMILIES else None))
+    add('leading', scaled(LEADING, 'line-height'))
+    add('tracking', scaled(TRACKING, 'letter-spacing', negative=True))
+    add('text', lambda v, n: None if n else _color_decls(v, 'color', '--tw-text-opacity'))
+    add('text-opacity', scaled(OPACITY, '--tw-text-opacity'))
+    add('placeholder', lambda v, n: None if n else _color_decls(v, 'color', '--tw-placeholder-opacity'),
+        '::placeholder')
+    add('opacity', scaled(OPACITY, 'opacity'))
+
+    def shadow(value, neg):
+        if neg or value not in SHADOWS:
+            return None
+        return [('--tw-shadow', SHADOWS[value]), ('box-shadow', _BOX_SHADOW)]
+    add('shadow', shadow)
+
+    def ring(value, neg):
+        width = {'': '3px', '0': '0px', '1': '1px', '2': '2px', '4': '4px', '8': '8px'}.get(value)
+        if neg or width is None:
+            return None
+        return [('--tw-ring-offset-shadow', 'var(--tw-ring-inset) 0 0 0 var(--tw-ring-offset-width) '
+                                            'var(--tw-ring-offset-color)'),
+                ('--tw-ring-shadow', f'var(--tw-ring-inset) 0 0 0 calc({width} + '
+                                     'var(--tw-ring-offset-width)) var(--tw-ring-color)'),
+                ('box-shadow', 'var(--tw-ring-offset-shadow), var(--tw-ring-shadow), '
+                               'var(--tw-shadow, 0 0 #0000)')]
+    add('ring', ring)
+    add('ring', lambda v, n: None if n else _color_decls(v, '--tw-ring-color', '--tw-ring-opacity'))
+    add('ring-offset', lambda v, n: None if n or v not in ('0', '1', '2', '4', '8') else [
+        ('--tw-ring-offset-width', f'{v}px')])
+
+    add('blur', lambda v, n: None if n or v not in BLUR else [
+        ('--tw-blur', f'blur({BLUR[v]})' if BLUR[v] else ''), ('filter', _FILTER)])
+    add('backdrop-blur', lambda v, n: None if n or v not in BLUR else [
+        ('--tw-backdrop-blur', f'blur({BLUR[v]})' if BLUR[v] else ''),
+        ('-webkit-backdrop-filter', _BACKDROP), ('backdrop-filter', _BACKDROP)])
+
+    def transition(value, neg):
+        if neg or value not in TRANSITIONS:
+            return None
+        if value == 'none':
+            return [('transition-property', 'none')]
+        return [('transition-property', TRANSITIONS[value]),
+                ('transition-timing-function', _EASE_DEFAULT), ('transition-duration', '150ms')]
+    add('transition', transition)
+    add('delay', scaled(DURATION, 'transition-delay'))
+    add('duration', scaled(DURATION, 'transition-duration'))
+    add('ease', scaled(EASE, 'transition-timing-function'))
+
+    add('content', lambda v, n: None if n or _arbitrary(v) is None else [
+        ('--tw-content', _arbitrary(v)), ('content', 'var(--tw-content)')])
+    return rules
+
+
+# 固定名稱的工具類別：名稱 → (排序群組, 宣告)；排序群組對應 _FUNCTIONAL 中同類規則的位置
+_STATIC_GROUPS = [
+    ('container', {}),
+    ('sr-only', {'sr-only': [('position', 'absolute'), ('width', '1px'), ('height', '1px'),
+                             ('padding', '0'), ('margin', '-1px'), ('overflow', 'hidden'),
+                             ('clip', 'rect(0, 0, 0, 0)'), ('white-space', 'nowrap'),
+                             ('border-width', '0')],
+                 'not-sr-only': [('position', 'static'), ('width', 'auto'), ('height', 'auto'),
+                                 ('padding', '0'), ('margin', '0'), ('overflow', 'visible'),
+                                 ('clip', 'auto'), ('white-space', 'normal')]}),
+    ('pointer-events', {'pointer-events-none': [('pointer-events', 'none')],
+                        'pointer-events-auto': [('pointer-events', 'auto')]}),
+    ('visibility', {'visible': [('visibility', 'visible')], 'invisible': [('visibility', 'hidden')]}),
+    ('position', {p: [('position', p)] for p in ('static', 'fixed', 'absolute', 'relative', 'sticky')}),
+    ('inset', None),
+    ('display', {**{d: [('display', d)] for d in (
+        'block', 'inline-block', 'inline', 'flex', 'inline-flex', 'table', 'table-row',
+        'table-cell', 'grid', 'inline-grid', 'contents', 'list-item', 'flow-root')},
+        'hidden': [('display', 'none')]}),
+    ('h', None),
+    ('flex', {'flex-1': [('flex', '1 1 0%')], 'flex-auto': [('flex', '1 1 auto')],
+              'flex-initial': [('flex', '0 1 auto')], 'flex-none': [('flex', 'none')],
+              'flex-shrink-0': [('flex-shrink', '0')], 'flex-shrink': [('flex-shrink', '1')],
+              'shrink-0': [('flex-shrink', '0')], 'shrink': [('flex-shrink', '1')],
+              'flex-grow': [('flex-grow', '1')], 'flex-grow-0': [('flex-grow', '0')],
+              'grow': [('flex-grow', '1')], 'grow-0': [('flex-grow', '0')]}),
+    ('transform', {'transform': [('transform', _TRANSFORM)], 'transform-none': [('transform', 'none')]}),
+    ('cursor', {f'cursor-{c}': [('cursor', c)] for c in CURSORS}),
+    ('resize', {'resize-none': [('resize', 'none')], 'resize': [('resize', 'both')],
+                'resize-x': [('resize', 'horizontal')], 'resize-y': [('resize', 'vertical')]}),
+    ('list', {'list-inside': [('list-style-position', 'inside')],
+              'list-outside': [('list-style-position', 'outside')],
+              'list-none': [('list-style-type', 'none')], 'list-disc': [('list-style-type', 'disc')],
+              'list-decimal': [('list-style-type', 'decimal')]}),
+    ('grid-cols', None),
+    ('flex-direction', {'flex-row': [('flex-direction', 'row')],
+                        'flex-row-reverse': [('flex-direction', 'row-reverse')],
+                        'flex-col': [('flex-direction', 'column')],
+                        'flex-col-reverse': [('flex-direction', 'column-reverse')],
+                        'flex-wrap': [('flex-wrap', 'wrap')], 'flex-nowrap': [('flex-wrap', 'nowrap')],
+                        'flex-wrap-reverse': [('flex-wrap', 'wrap-reverse')]}),
+    ('align', {'items-start': [('align-items', 'flex-start')], 'items-end': [('align-items', 'flex-end')],
+               'items-center': [('align-items', 'center')],
+               'items-baseline': [('align-items', 'baseline')],
+               'items-stretch': [('align-items', 'stretch')],
+               'justify-normal': [('justify-content', 'normal')],
+               'justify-start': [('justify-content', 'flex-start')],
+               'justify-end': [('justify-content', 'flex-end')],
+               'justify-center': [('justify-content', 'center')],
+               'justify-between': [('justify-content', 'space-between')],
+               'justify-around': [('justify-content', 'space-around')],
+               'justify-evenly': [('justify-content', 'space-evenly')],
+               'self-auto': [('align-self', 'auto')], 'self-start': [('align-self', 'flex-start')],
+               'self-end': [('align-self', 'flex-end')], 'self-center': [('align-self', 'center')],
+               'self-stretch': [('align-self', 'stretch')]}),
+    ('gap', None),
+    ('overflow', {f'{axis}-{v}': [(axis, v)] for axis in ('overflow', 'overflow-x', 'overflow-y')
+                  for v in ('auto', 'hidden', 'clip', 'visible', 'scroll')}),
+    ('text-wrap', {'truncate': [('overflow', 'hidden'), ('text-overflow', 'ellipsis'),
+                                ('white-space', 'nowrap')],
+                   'whitespace-normal': [('white-space', 'normal')],
+                   'whitespace-nowrap': [('white-space', 'nowrap')],
+                   'whitespace-pre': [('white-space', 'pre')],
+                   'whitespace-pre-line': [('white-space', 'pre-line')],
+                   'whitespace-pre-wrap': [('white-space', 'pre-wrap')],
+                   'break-normal': [('overflow-wrap', 'normal'), ('word-break', 'normal')],
+                   'break-words': [('overflow-wrap', 'break-word')],
+                   'break-all': [('word-break', 'break-all')]}),
+    ('rounded', None),
+    ('border', None),
+    ('border-style', {f'border-{s}': [('border-style', s)] for s in
+                      ('solid', 'dashed', 'dotted', 'double', 'hidden', 'none')}),
+    ('bg', None),
+    ('bg-image', {**{f'bg-gradient-to-{k}': [('background-image', f'linear-gradient(to {v}, '
+                                                                 'var(--tw-gradient-stops))')]
+                     for k, v in (('t', 'top'), ('tr', 'top right'), ('r', 'right'),
+                                  ('br', 'bottom right'), ('b', 'bottom'), ('bl', 'bottom left'),
+                                  ('l', 'left'), ('tl', 'top left'))},
+                  'bg-none': [('background-image', 'none')]}),
+    ('from', None),
+    ('bg-clip', {'bg-clip-text': [('-webkit-background-clip', 'text'), ('background-clip', 'text')],
+                 'bg-clip-border': [('background-clip', 'border-box')],
+                 'bg-clip-padding': [('background-clip', 'padding-box')],
+                 'bg-cover': [('background-size', 'cover')], 'bg-contain': [('background-size', 'contain')],
+                 'bg-center': [('background-position', 'center')],
+                 'bg-no-repeat': [('background-repeat', 'no-repeat')]}),
+    ('fill', {'fill-current': [('fill', 'currentColor')], 'stroke-current': [('stroke', 'currentColor')]}),
+    ('pt', None),
+    ('text-align', {f'text-{a}': [('text-align', a)] for a in
+                    ('left', 'center', 'right', 'justify', 'start', 'end')}),
+    ('align-middle', {'align-middle': [('vertical-align', 'middle')],
+                      'align-top': [('vertical-align', 'top')],
+                      'align-bottom': [('vertical-align', 'bottom')],
+                      'align-baseline': [('vertical-align', 'baseline')]}),
+    ('text', None),
+    ('text-transform', {'uppercase': [('text-transform', 'uppercase')],
+                        'lowercase': [('text-transform', 'lowercase')],
+                        'capitalize': [('text-transform', 'capitalize')],
+                        'normal-case': [('text-transform', 'none')],
+                        'italic': [('font-style', 'italic')], 'not-italic': [('font-style', 'normal')]}),
+    ('leading', None),
+    ('text-decoration', {'underline': [('text-decoration-line', 'underline')],
+                         'overline': [('text-decoration-line', 'overline')],
+                         'line-through': [('text-decoration-line', 'line-through')],
+                         'no-underline': [('text-decoration-line', 'none')],
+                         'antialiased': [('-webkit-font-smoothing', 'antialiased'),
+                                         ('-moz-osx-font-smoothing', 'grayscale')]}),
+    ('placeholder', None),
+    ('shadow', None),
+    ('outline', {'outline-none': [('outline', '2px solid transparent'), ('outline-offset', '2px')],
+                 'outline': [('outline-style', 'solid')]}),
+    ('ring', None),
+    ('blur', None),
+    ('transition', None),
+    ('will-change', {'will-change-transform': [('will-change', 'transform')]}),
+]
+
+_FUNCTIONAL = _build_functional()
+# 規則排序：固定名稱的群組與 _FUNCTIONAL 依照 Tailwind 的外掛順序交錯
+_GROUP_ANCHORS = {'inset': 'inset', 'h': 'size', 'grid-cols': 'grid-cols', 'gap': 'gap',
+                  'rounded': 'rounded', 'border': 'border', 'bg': 'bg', 'from': 'from', 'pt': 'p',
+                  'text': 'text', 'leading': 'leading', 'placeholder': 'placeholder',
+                  'shadow': 'shadow', 'ring': 'ring', 'blur': 'blur', 'transition': 'transition'}
+
+
+def _ordering() -> Tuple[Dict[str, tuple], List[tuple]]:
+    static: Dict[str, tuple] = {}
+    functional: List[tuple] = []
+    anchor_index = {}
+    for i, (root, _resolve, _suffix) in enumerate(_FUNCTIONAL):
+        anchor_index.setdefault(root, i)
+    # 固定群組插在對應的 _FUNCTIONAL 規則之後；未對應的群組沿用前一個群組的位置
+    position = -1.0
+    for g, (name, table) in enumerate(_STATIC_GROUPS):
+        if table is None:
+            position = anchor_index[_GROUP_ANCHORS[name]]
+            continue
+        for k, cls in enumerate(table):
+            static[cls] = (position + 0.5, g, k, table[cls])
+    for i, (root, resolve, suffix) in enumerate(_FUNCTIONAL):
+        functional.append((root, resolve, suffix, i))
+    functional.sort(key=lambda r: -len(r[0]))
+    return static, functional
+
+
+_STATIC, _FUNCTIONAL_BY_LENGTH = _ordering()
+
+
+def escape_class(name: str) -> str:
+    """類別名稱 → CSS 選擇器用的跳脫形式"""
+    out = []
+    for i, ch in enumerate(name):
+        if ch.isalnum() and ord(ch) < 128 or ch in '_-' or ord(ch) >= 128:
+            if i == 0 and ch.isdigit():
+                out.append(f'\\3{ch} ')
+            else:
+                out.append(ch)
+        else:
+            out.append('\\' + ch)
+    return ''.join(out)
+
+
+def _split_variants(name: str) -> List[str]:
+    parts, depth, current = [], 0, []
+    for ch in name:
+        if ch == '[':
+            depth += 1
+        elif ch == ']':
+            depth -= 1
+        if ch == ':' and depth == 0:
+            parts.append(''.join(current))
+            current = []
+        else:
+            current.append(ch)
+    parts.append(''.join(current))
+    return parts
+
+
+def resolve_utility(base: str) -> Optional[tuple]:
+    """不含變體的類別 → (排序鍵, [(屬性, 值)], 選擇器後綴)；不認得則回傳 None"""
+    important = base.startswith('!')
+    if important:
+        base = base[1:]
+    found = None
+    if base in _STATIC:
+        position, g, k, decls = _STATIC[base]
+        found = ((position, g, k), decls, '')
+    else:
+        negative = base.startswith('-')
+        body = base[1:] if negative else base
+        for root, resolve, suffix, order in _FUNCTIONAL_BY_LENGTH:
+            if body == root:
+                value = ''
+            elif body.startswith(root + '-'):
+                value = body[len(root) + 1:]
+            else:
+                continue
+            decls = resolve(value, negative)
+            if decls:
+                found = ((order, 0, 0), decls, suffix)
+                break
+    if found is None:
+        return None
+    key, decls, suffix = found
+    if important:
+        decls = [(p, v + ' !important') for p, v in decls]
+    return key, decls, suffix
+
+
+class Rule:
+    __slots__ = ('name', 'selector', 'decls', 'media', 'sort_key', 'keyframes')
+
+    def __init__(self, name, selector, decls, media, sort_key, keyframes):
+        self.name = name
+        self.selector = selector
+        self.decls = decls
+        self.media = media
+        self.sort_key = sort_key
+        self.keyframes = keyframes
+
+
+def build_rule(name: str) -> Optional[Rule]:
+    """完整類別名稱（可含 hover:、md: 等變體）→ Rule；不認得則回傳 None"""
+    parts = _split_variants(name)
+    variants, base = parts[:-1], parts[-1]
+    if not base or any(v not in VARIANTS for v in variants):
+        return None
+    resolved = resolve_utility(base)
+    if resolved is None:
+        return None
+    key, decls, suffix = resolved
+
+    prefix, pseudo, element, media = '', '', '', []
+    for variant in variants:
+        kind, spec = VARIANTS[variant]
+        if kind == 'element':
+            if element:
+                return None
+            element = spec
+        elif kind == 'pseudo':
+            pseudo += spec
+        elif kind == 'prefix':
+            prefix = spec + prefix
+        else:
+            media.append(spec)
+    if element in ('::before', '::after') and not any(p == 'content' for p, _ in decls):
+        decls = decls + [('content', 'var(--tw-content)')]
+    if suffix.startswith('::'):
+        if element:
+            return None
+        element, suffix = suffix, ''
+    selector = f'{prefix}.{escape_class(name)}{pseudo}{suffix}{element}'
+
+    # 斷點群組在最外層（所有基礎規則在前），其次依變體順序、工具類別順序
+    media_rank = max((_MEDIA_ORDER.index(m) + 1 for m in media), default=0)
+    variant_rank = tuple(sorted((_VARIANT_ORDER[v] for v in variants
+                                 if VARIANTS[v][0] != 'media'), reverse=True))
+    keyframes = ''
+    if base.lstrip('!').startswith('animate-'):
+        keyframes = ANIMATIONS.get(base.lstrip('!')[len('animate-'):], ('', ''))[1]
+    return Rule(name, selector, decls, tuple(media), (media_rank, variant_rank, key, name), keyframes)
+
+
+def _container_css() -> List[str]:
+    out = ['.container{width:100%}']
+    for _, width in SCREENS:
+        out.append(f'@media (min-width: {width}){{.container{{max-width:{width}}}}}')
+    return out
+
+
+def generate_css(candidates: Iterable[str], preflight: bool = True) -> Tuple[str, List[str]]:
+    """由候選類別名稱產生 CSS；回傳 (CSS 文字, 實際產生規則的類別名稱)"""
+    rules = []
+    container = False
+    for name in set(candidates):
+        if name == 'container':
+            container = True
+            continue
+        rule = build_rule(name)
+        if rule is not None:
+            rules.append(rule)
+    rules.sort(key=lambda r: r.sort_key)
+
+    out = []
+    if preflight:
+        out.append(PREFLIGHT.rstrip('\n'))
+    out.append(TW_DEFAULTS.rstrip('\n'))
+    if container:
+        out.extend(_container_css())
+    keyframes_done = set()
+    current_media: Tuple[str, ...] = ()
+    block: List[str] = []
+
+    def flush():
+        if not block:
+            return
+        if current_media:
+            inner = ''.join(block)
+            for m in reversed(current_media):
+                inner = f'@media {m}{{{inner}}}'
+            out.append(inner)
+        else:
+            out.extend(block)
+        block.clear()
+
+    for rule in rules:
+        if rule.media != current_media:
+            flush()
+            current_media = rule.media
+        if rule.keyframes and rule.keyframes not in keyframes_done:
+            keyframes_done.add(rule.keyframes)
+            flush()
+            out.append(rule.keyframes)
+        body = ';'.join(f'{p}:{v}' for p, v in rule.decls)
+        block.append(f'{rule.selector}{{{body}}}')
+    flush()
+    return '\n'.join(out) + '\n', sorted(r.name for r in rules) + (['container'] if container else [])
@@ -5,10 +5,12 @@
 快速完成 Ch3-Ch9 的所有文件重命名工作（62 個文件）
 """
 
-import os
-import re
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+from rename_engine import apply_renames, print_stats
+
 # 完整的章節配置
 CHAPTERS_CONFIG = {
     3: {
@@ -69,8 +71,16 @@ CHAPTERS_CONFIG = {
     }
 }
 
+def build_rename_map(chapter_num):
+    """產生指定章節的重命名對應 {舊相對路徑: 新相對路徑}"""
+    titles = CHAPTERS_CONFIG[chapter_num]['titles']
+    return {
+        f'ch{chapter_num}/ch{chapter_num}-{idx}.md': f'ch{chapter_num}/ch{chapter_num}-{idx}-{title}.md'
+        for idx, title in enumerate(titles, 1)
+    }
+
 def rename_chapter_files(chapter_num, base_path='./doc/鏡界'):
-    """為指定章節的所有文件重命名並更新鏈接"""
+    """為指定章節的所有文件重命名並更新整個文件樹中的鏈接"""
     if chapter_num not in CHAPTERS_CONFIG:
         print(f"❌ Ch{chapter_num} 配置不存在")
         return False
@@ -84,38 +94,12 @@ def rename_chapter_files(chapter_num, base_path='./doc/鏡界'):
         print(f"  ❌ 目錄不存在：{chapter_dir}")
         return False
     
-    count = 0
-    for idx, title in enumerate(config['titles'], 1):
-        old_file = chapter_dir / f'ch{chapter_num}-{idx}.md'
-        new_file = chapter_dir / f'ch{chapter_num}-{idx}-{title}.md'
-        
-        if old_file.exists():
-            try:
-                # 讀取原始文件
-                with open(old_file, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 批量更新所有鏈接
-                for i in range(1, 10):
-                    if i <= len(config['titles']):
-                        old_link = f'ch{chapter_num}-{i}.md'
-                        new_link = f'ch{chapter_num}-{i}-{config["titles"][i-1]}.md'
-                        content = content.replace(old_link, new_link)
-                
-                # 寫入新文件
-                with open(new_file, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                print(f"  ✅ {old_file.name} → {new_file.name}")
-                count += 1
-                
-            except Exception as e:
-                print(f"  ❌ 錯誤處理 {old_file.name}: {str(e)}")
-        else:
-            print(f"  ⚠️  文件不存在：{old_file.name}")
-    
-    print(f"  📊 Ch{chapter_num} 完成：{count}/{len(config['titles'])} 文件")
-    return count == len(config['titles'])
+    # 尚未建立的子節也登記為連結別名，讓指向它們的舊格式連結一併改成新檔名
+    rename_map = build_rename_map(chapter_num)
+    stats = apply_renames(base_path, rename_map, link_aliases=rename_map, skip_existing=True)
+    print_stats(stats)
+    print(f"  📊 Ch{chapter_num} 完成：{stats['moved']}/{len(config['titles'])} 文件")
+    return stats['moved'] == len(config['titles'])
 
 def main():
     """主程序"""
@@ -2,10 +2,13 @@
 # -*- coding: utf-8 -*-
 """批量重命名並統一繁體中文命名"""
 
-import os
-import shutil
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from doc_io import atomic_write_text
+from rename_engine import apply_renames, print_stats
+
 def rename_files():
     base_dir = Path(r"E:\Jerry_python\腳本平台\doc\鏡界")
     
@@ -122,52 +125,26 @@ def rename_files():
     print("批量重命名文件腳本")
     print("=" * 80)
     
-    # 第一階段：Ch9 部署相關文件 (編號調整)
-    print("\n階段一：Ch9 部署相關文件重命名 (編號 14-17)")
-    print("-" * 80)
-    for old_rel, new_rel in ch9_deployment_renames.items():
-        old_path = base_dir / old_rel
-        new_path = base_dir / new_rel
-        
-        if old_path.exists():
-            try:
-                # 讀取內容
-                with open(old_path, 'r', encoding='utf-8') as f:
-                    content = f.read()
-                
-                # 更新章節編號 (9.4->9.14, 9.5->9.15, etc.)
-                old_num = old_rel.split('-')[1]
-                new_num = new_rel.split('-')[1]
-                content = content.replace(f"## 9.{old_num} ", f"## 9.{new_num} ")
-                
-                # 寫入新文件
-                with open(new_path, 'w', encoding='utf-8') as f:
-                    f.write(content)
-                
-                # 刪除舊文件
-                old_path.unlink()
-                
-                print(f"✓ {old_rel} -> {new_rel}")
-            except Exception as e:
-                print(f"✗ 失敗: {old_rel} -> {e}")
-        else:
-            print(f"⚠ 文件不存在: {old_rel}")
+    # 兩個階段合併為一次重命名：只掃描一次文件樹，並修正所有章節、README 與報告中的連結
+    rename_map = dict(ch9_deployment_renames)
+    rename_map.update(unified_renames)
+    stats = apply_renames(base_dir, rename_map, skip_existing=True)
+    print_stats(stats)
     
-    # 第二階段：統一繁體命名
-    print("\n階段二：統一繁體中文命名")
+    # Ch9 部署相關文件的章節編號隨檔名調整 (9.4->9.14, 9.5->9.15, etc.)
+    print("\n更新 Ch9 部署相關文件的章節編號")
     print("-" * 80)
-    for old_rel, new_rel in unified_renames.items():
-        old_path = base_dir / old_rel
+    for old_rel, new_rel in ch9_deployment_renames.items():
         new_path = base_dir / new_rel
-        
-        if old_path.exists():
-            try:
-                shutil.move(str(old_path), str(new_path))
-                print(f"✓ {old_rel} -> {new_rel}")
-            except Exception as e:
-                print(f"✗ 失敗: {old_rel} -> {e}")
-        else:
-            print(f"⚠ 文件不存在: {old_rel}")
+        if not new_path.exists():
+            continue
+        old_num = old_rel.split('-')[1]
+        new_num = new_rel.split('-')[1]
+        content = new_path.read_text(encoding='utf-8')
+        updated = content.replace(f"## 9.{old_num} ", f"## 9.{new_num} ")
+        if updated != content:
+            atomic_write_text(new_path, updated)
+            print(f"✓ {new_rel}: 9.{old_num} -> 9.{new_num}")
     
     print("\n" + "=" * 80)
     print("重命名完成！")
@@ -175,4 +152,3 @@ def rename_files():
 
 if __name__ == "__main__":
     rename_files()
-
@@ -2,9 +2,12 @@
 # -*- coding: utf-8 -*-
 """重命名 ch9 文件以解決編號衝突問題"""
 
-import os
+import sys
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parents[2]))
+from rename_engine import apply_renames, print_stats
+
 # 定義重命名映射
 renames = {
     "ch9-1-部署架构.md": "ch9-11-部署架構.md",
@@ -35,35 +38,11 @@ def main():
     print("開始重命名 ch9 文件...")
     print("=" * 60)
     
-    # 第一階段：重命名部署相關文件
-    print("\n階段一：解決編號衝突")
-    for old_name, new_name in renames.items():
-        old_path = ch9_dir / old_name
-        new_path = ch9_dir / new_name
-        
-        if old_path.exists():
-            try:
-                old_path.rename(new_path)
-                print(f"✓ {old_name} -> {new_name}")
-            except Exception as e:
-                print(f"✗ 重命名失敗: {old_name} -> {e}")
-        else:
-            print(f"⚠ 文件不存在: {old_name}")
-    
-    # 第二階段：統一命名為繁體
-    print("\n階段二：統一繁體命名")
-    for old_name, new_name in other_renames.items():
-        old_path = ch9_dir / old_name
-        new_path = ch9_dir / new_name
-        
-        if old_path.exists():
-            try:
-                old_path.rename(new_path)
-                print(f"✓ {old_name} -> {new_name}")
-            except Exception as e:
-                print(f"✗ 重命名失敗: {old_name} -> {e}")
-        else:
-            print(f"⚠ 文件不存在: {old_name}")
+    # 兩個階段的對應一起交給重命名引擎，並修正所有指向這些文件的連結
+    rename_map = {f"ch9/{old}": f"ch9/{new}" for old, new in renames.items()}
+    rename_map.update({f"ch9/{old}": f"ch9/{new}" for old, new in other_renames.items()})
+    stats = apply_renames(ch9_dir.parent, rename_map, skip_existing=True)
+    print_stats(stats)
     
     print("\n" + "=" * 60)
     print("重命名完成！")
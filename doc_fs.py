@@ -0,0 +1,244 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+文件工具共用的 I/O 層（針對網路磁碟等高延遲儲存）
+
+- 根目錄由設定決定，不再寫死在腳本中：
+      DOC_ROOT    文件根目錄（原本的 <平台>\\doc）：環境變數 DOC_ROOT，預設為本目錄下的 doc
+      BOOK_ROOT   鏡界文件樹：DOC_ROOT / 鏡界（各工具的 --root 參數可再覆寫）
+- FileIO：以執行緒池執行 stat、讀、寫，同時進行的請求數有上限；
+  每次呼叫遇到暫時性錯誤（逾時、網路中斷、共用違規等）時以指數退避重試，其餘錯誤直接拋出
+- asyncio 介面（astat、aread_bytes、awalk、agather ...）在同一個執行緒池上執行，
+  另以 Semaphore 限制排隊中的請求；同步工具則使用 walk、gather、imap 等包裝
+- 目錄列表一次取回整個目錄（os.scandir 的項目已含檔案類型，Windows 上也含 stat），
+  同一層的子目錄平行列出
+
+併發數與重試次數可由環境變數 DOC_IO_WORKERS、DOC_IO_RETRIES 調整；
+併發數為 1 時等同於逐一呼叫，結果與平行時完全相同。
+"""
+
+import asyncio
+import errno
+import os
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+from doc_io import atomic_write_bytes
+
+DOC_ROOT = Path(os.environ.get('DOC_ROOT') or Path(__file__).parent / 'doc')
+BOOK_NAME = '鏡界'
+BOOK_ROOT = DOC_ROOT / BOOK_NAME
+
+DEFAULT_WORKERS = int(os.environ.get('DOC_IO_WORKERS') or 8)
+DEFAULT_RETRIES = int(os.environ.get('DOC_IO_RETRIES') or 3)
+DEFAULT_BACKOFF = 0.05
+
+_TRANSIENT_ERRNOS = {getattr(errno, name) for name in (
+    'EAGAIN', 'EBUSY', 'EINTR', 'EIO', 'ETIMEDOUT', 'ECONNRESET', 'ECONNABORTED',
+    'ENETRESET', 'ENETUNREACH', 'EHOSTUNREACH', 'ESTALE') if hasattr(errno, name)}
+# Windows：共用違規、鎖定違規、網路路徑找不到、非預期的網路錯誤、網路名稱已刪除、
+# 號誌逾時、無法連線到網路位置
+_TRANSIENT_WINERRORS = {32, 33, 53, 59, 64, 121, 1231}
+# 與 Path.exists() 相同：這些錯誤視為路徑不存在
+_MISSING_ERRNOS = {errno.ENOENT, errno.ENOTDIR, errno.EBADF, errno.ELOOP}
+
+
+def is_transient(exc: BaseException) -> bool:
+    """是否為值得重試的暫時性 I/O 錯誤"""
+    if not isinstance(exc, OSError):
+        return False
+    if getattr(exc, 'winerror', None) in _TRANSIENT_WINERRORS:
+        return True
+    return exc.errno in _TRANSIENT_ERRNOS
+
+
+def book_root(override=None) -> Path:
+    """鏡界文件樹根目錄：參數 > 環境變數 DOC_ROOT 下的 鏡界 > 本目錄下的 doc/鏡界"""
+    return Path(override) if override else BOOK_ROOT
+
+
+def _read_bytes(path) -> bytes:
+    with open(path, 'rb') as f:
+        return f.read()
+
+
+def _list_dir(path, stat_suffix: str = '') -> List[Tuple[str, bool, Optional[os.stat_result]]]:
+    """一次列出整個目錄：[(名稱, 是否為目錄, stat)]；只有名稱以 stat_suffix 結尾的檔案取 stat"""
+    listing = []
+    with os.scandir(path) as it:
+        for entry in it:
+            is_dir = entry.is_dir(follow_symlinks=False)
+            st = entry.stat() if not is_dir and entry.name.endswith(stat_suffix) else None
+            listing.append((entry.name, is_dir, st))
+    return listing
+
+
+class FileIO:
+    """以執行緒池執行檔案系統呼叫：併發數有上限，暫時性錯誤自動重試"""
+
+    def __init__(self, workers: int = None, retries: int = None, backoff: float = DEFAULT_BACKOFF):
+        self.workers = max(1, workers or DEFAULT_WORKERS)
+        self.retries = DEFAULT_RETRIES if retries is None else retries
+        self.backoff = backoff
+        self.retried = 0
+        self._pool = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix='doc-io')
+        self._limits: Dict[asyncio.AbstractEventLoop, asyncio.Semaphore] = {}
+
+    def close(self) -> None:
+        self._pool.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+        return False
+
+    # ---- 同步介面 ----
+
+    def call(self, func: Callable, *args):
+        """在目前的執行緒呼叫 func，暫時性錯誤以指數退避重試"""
+        for attempt in range(self.retries + 1):
+            try:
+                return func(*args)
+            except OSError as e:
+                if attempt >= self.retries or not is_transient(e):
+                    raise
+                self.retried += 1
+                time.sleep(self.backoff * 2 ** attempt)
+
+    def submit(self, func: Callable, *args):
+        """交給執行緒池執行（含重試），回傳 concurrent.futures.Future"""
+        return self._pool.submit(self.call, func, *args)
+
+    def imap(self, func: Callable, items: Iterable[tuple], window: int = None) -> Iterator:
+        """依輸入順序產生 func(*item) 的結果，最多 window 個呼叫同時進行
+
+        失敗的呼叫產生例外物件而不拋出（同 asyncio.gather(return_exceptions=True)），
+        呼叫端可以邊處理前面的結果、邊讓後面的讀寫在背景進行。
+        """
+        window = window or self.workers * 2
+        items = iter(items)
+        pending = deque()
+
+        def fill():
+            while len(pending) < window:
+                item = next(items, None)
+                if item is None:
+                    return
+                pending.append(self.submit(func, *item))
+
+        fill()
+        while pending:
+            future = pending.popleft()
+            fill()
+            try:
+                yield future.result()
+            except Exception as e:
+                yield e
+
+    def gather(self, func: Callable, items: Iterable[tuple]) -> list:
+        """平行執行 func(*item)，依輸入順序回傳結果；失敗者為例外物件"""
+        return self.run(self.agather(func, items))
+
+    def stat_many(self, paths: Iterable) -> Dict[Path, Optional[os.stat_result]]:
+        """平行 stat；不存在的路徑為 None（判斷規則同 Path.exists），其他錯誤照常拋出"""
+        paths = [Path(p) for p in paths]
+        results = self.gather(os.stat, [(p,) for p in paths])
+        out = {}
+        for path, result in zip(paths, results):
+            if isinstance(result, OSError) and result.errno in _MISSING_ERRNOS:
+                result = None
+            elif isinstance(result, BaseException):
+                raise result
+            out[path] = result
+        return out
+
+    def walk(self, root, skip_dir: Callable[[str], bool] = None, stat_suffix: str = '',
+             onerror: Callable[[OSError], None] = None) -> Tuple[Dict[str, Optional[os.stat_result]], Set[str]]:
+        """同步版的 awalk"""
+        return self.run(self.awalk(root, skip_dir, stat_suffix, onerror))
+
+    def run(self, coro):
+        """在新的事件迴圈中執行 asyncio 介面的協程（供同步工具使用）"""
+        return asyncio.run(coro)
+
+    # ---- asyncio 介面 ----
+
+    def _limit(self) -> asyncio.Semaphore:
+        loop = asyncio.get_running_loop()
+        limit = self._limits.get(loop)
+        if limit is None:
+            self._limits = {l: s for l, s in self._limits.items() if not l.is_closed()}
+            limit = self._limits[loop] = asyncio.Semaphore(self.workers)
+        return limit
+
+    async def arun(self, func: Callable, *args):
+        async with self._limit():
+            return await asyncio.get_running_loop().run_in_executor(self._pool, self.call, func, *args)
+
+    async def astat(self, path) -> os.stat_result:
+        return await self.arun(os.stat, path)
+
+    async def aread_bytes(self, path) -> bytes:
+        return await self.arun(_read_bytes, path)
+
+    async def awrite_bytes(self, path, data: bytes) -> None:
+        await self.arun(atomic_write_bytes, path, data)
+
+    async def aunlink(self, path, missing_ok: bool = False) -> None:
+        await self.arun(Path(path).unlink, missing_ok)
+
+    async def alistdir(self, path, stat_suffix: str = '') -> List[Tuple[str, bool, Optional[os.stat_result]]]:
+        return await self.arun(_list_dir, path, stat_suffix)
+
+    async def agather(self, func: Callable, items: Iterable[tuple]) -> list:
+        return await asyncio.gather(*(self.arun(func, *item) for item in items), return_exceptions=True)
+
+    async def awalk(self, root, skip_dir: Callable[[str], bool] = None, stat_suffix: str = '',
+                    onerror: Callable[[OSError], None] = None
+                    ) -> Tuple[Dict[str, Optional[os.stat_result]], Set[str]]:
+        """走訪目錄樹，回傳 ({檔案相對路徑: stat}, {目錄相對路徑})；相對路徑為 POSIX 格式、依路徑排序
+
+        同一層的目錄平行列出；skip_dir(名稱) 為 True 的子目錄不進入也不列入結果。
+        只有名稱以 stat_suffix 結尾的檔案附 stat，其餘為 None（預設全部附上）。
+        與 os.walk 相同，無法列出的子目錄（沒有權限、走訪途中被刪除）略過，
+        例外交給 onerror(例外)；已不存在的目錄不列入結果。根目錄無法列出時直接拋出。
+        """
+        root = Path(root)
+        files: Dict[str, Optional[os.stat_result]] = {}
+        dirs: Set[str] = set()
+        level = ['']
+        while level:
+            listings = await asyncio.gather(*(self.alistdir(root / rel if rel else root, stat_suffix)
+                                              for rel in level), return_exceptions=True)
+            next_level = []
+            for rel_dir, listing in zip(level, listings):
+                if isinstance(listing, BaseException):
+                    if not rel_dir or not isinstance(listing, OSError):
+                        raise listing
+                    if listing.errno in _MISSING_ERRNOS:
+                        dirs.discard(rel_dir)
+                    if onerror is not None:
+                        onerror(listing)
+                    continue
+                for name, is_dir, st in listing:
+                    rel = f'{rel_dir}/{name}' if rel_dir else name
+                    if is_dir:
+                        if skip_dir is None or not skip_dir(name):
+                            dirs.add(rel)
+                            next_level.append(rel)
+                    else:
+                        files[rel] = st
+            level = next_level
+        return dict(sorted(files.items())), dirs
+
+
+def add_arguments(parser) -> None:
+    """加入 --io-workers 參數"""
+    parser.add_argument('--io-workers', type=int, default=DEFAULT_WORKERS,
+                        help=f'同時進行的檔案 I/O 數（網路磁碟可調高；預設 {DEFAULT_WORKERS}，'
+                             '可由環境變數 DOC_IO_WORKERS 設定）')
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+文件工具共用的 I/O 輔助函數
+"""
+
+import hashlib
+import os
+import tempfile
+from pathlib import Path
+
+
+# 匯入時讀取一次 umask（os.umask 只能先設定再還原，不宜在多執行緒寫入時呼叫）
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+
+class AtomicFile:
+    """寫入同目錄暫存檔，commit() 時以 rename 原子取代目標（保留原權限）
+
+    未呼叫 commit() 就離開 with 區塊時，暫存檔會被刪除，目標保持不變。
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        fd, self.tmp_path = tempfile.mkstemp(dir=self.path.parent,
+                                             prefix=f'.{self.path.name}.', suffix='.tmp')
+        self._file = os.fdopen(fd, 'wb')
+
+    def write(self, data: bytes) -> int:
+        return self._file.write(data)
+
+    def commit(self) -> None:
+        self._file.close()
+        try:
+            mode = os.stat(self.path).st_mode & 0o7777
+        except FileNotFoundError:
+            mode = 0o666 & ~_UMASK  # 新檔案：與 open() 建立的檔案相同
+        os.chmod(self.tmp_path, mode)
+        os.replace(self.tmp_path, self.path)
+        self.tmp_path = None
+
+    def abort(self) -> None:
+        self._file.close()
+        if self.tmp_path is not None:
+            try:
+                os.unlink(self.tmp_path)
+            except FileNotFoundError:
+                pass
+            self.tmp_path = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if self.tmp_path is not None:
+            self.abort()
+        return False
+
+
+def atomic_write_bytes(path, data: bytes) -> None:
+    """原子寫入：先寫入同目錄暫存檔，再以 rename 取代目標（保留原權限）"""
+    with AtomicFile(path) as f:
+        f.write(data)
+        f.commit()
+
+
+def atomic_write_text(path, text: str, encoding: str = 'utf-8') -> None:
+    atomic_write_bytes(path, text.encode(encoding))
+
+
+def content_hash(data: bytes) -> str:
+    """內容雜湊（sha256 十六進位）"""
+    return hashlib.sha256(data).hexdigest()
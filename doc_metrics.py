@@ -0,0 +1,330 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+文件工具共用的效能量測：階段與單一文件計時、計數器、剖析器，輸出 JSON 與 Prometheus textfile
+
+各腳本在 main() 中以 session() 包住整次執行，函式庫程式碼以 current() 取得目前的量測物件：
+    with metrics.stage('convert'):          # 階段耗時（可重複進入，累計次數與秒數）
+        with metrics.file('ch1/ch1-1.md'):  # 單一文件耗時（會同時計入目前所在的階段）
+            ...
+    metrics.count('bytes_read', len(data))  # 計數器：bytes_read、bytes_written、replacements、regex_passes ...
+    metrics.add_file(rel, seconds, bytes_read=n)  # 由工作行程量測、回傳後再登記
+
+沒有要求輸出時 current() 回傳停用的量測物件，所有呼叫都不做事，不影響一般執行。
+
+命令列參數（由 add_arguments() 加入）：
+    --metrics-json PATH   寫出完整量測結果（各階段、計數器、每個文件）
+    --metrics-prom PATH   寫出 Prometheus textfile collector 格式（原子寫入）
+    --profile cprofile    以 cProfile 剖析主行程，寫出 .prof（可用 snakeviz / pstats 檢視）
+    --profile sample      每隔數毫秒取樣主執行緒的呼叫堆疊，寫出 flamegraph 用的 folded 格式
+    --profile-out PATH    剖析結果路徑（預設 <工具名>.prof / <工具名>.folded）
+"""
+
+import cProfile
+import json
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from doc_io import atomic_write_text
+
+PROFILERS = ('cprofile', 'sample')
+SAMPLE_INTERVAL = 0.005
+PROM_PREFIX = 'doc_tool'
+PROM_TOP_FILES = 20  # Prometheus 只輸出最慢的數個文件，避免標籤數量無限增加
+SUMMARY_TOP = 5
+
+_METRIC_NAME = re.compile(r'[^a-zA-Z0-9_]')
+
+
+class _NullContext:
+    def __enter__(self):
+        return None
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_CONTEXT = _NullContext()
+
+
+class Metrics:
+    """一次執行的量測結果"""
+
+    def __init__(self, tool: str, enabled: bool = True):
+        self.tool = tool
+        self.enabled = enabled
+        self.started = datetime.now(timezone.utc)
+        self._start = time.perf_counter()
+        self.seconds: Optional[float] = None
+        self.stages: Dict[str, dict] = {}
+        self.counters: Counter = Counter()
+        self.files: Dict[str, dict] = {}
+        self._stack = []
+
+    # ---- 記錄 ----
+
+    def stage(self, name: str):
+        """計時一個階段；巢狀的階段以 / 連接名稱（例如 convert/ch1）"""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._stage(name)
+
+    @contextmanager
+    def _stage(self, name: str):
+        full = '/'.join(self._stack + [name])
+        self._stack.append(name)
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self._stack.pop()
+            entry = self.stages.setdefault(full, {'seconds': 0.0, 'calls': 0})
+            entry['seconds'] += time.perf_counter() - start
+            entry['calls'] += 1
+
+    def file(self, rel: str):
+        """計時處理單一文件的時間（歸入目前所在的階段）"""
+        if not self.enabled:
+            return _NULL_CONTEXT
+        return self._file(rel)
+
+    @contextmanager
+    def _file(self, rel: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.add_file(rel, time.perf_counter() - start)
+
+    def add_file(self, rel: str, seconds: float, stage: str = None, **counters) -> None:
+        """登記單一文件的耗時與計數（計數同時加到全域計數器）"""
+        if not self.enabled:
+            return
+        stage = stage or '/'.join(self._stack) or '-'
+        entry = self.files.setdefault(rel, {'seconds': 0.0, 'stages': {}, 'counters': {}})
+        entry['seconds'] += seconds
+        entry['stages'][stage] = entry['stages'].get(stage, 0.0) + seconds
+        for name, value in counters.items():
+            if value:
+                entry['counters'][name] = entry['counters'].get(name, 0) + value
+                self.counters[name] += value
+
+    def count(self, name: str, value: int = 1) -> None:
+        if self.enabled and value:
+            self.counters[name] += value
+
+    def finish(self) -> None:
+        self.seconds = time.perf_counter() - self._start
+
+    # ---- 輸出 ----
+
+    def slowest_files(self, n: int = SUMMARY_TOP) -> list:
+        return sorted(self.files.items(), key=lambda item: -item[1]['seconds'])[:n]
+
+    def to_dict(self) -> dict:
+        seconds = self.seconds if self.seconds is not None else time.perf_counter() - self._start
+        return {
+            'tool': self.tool,
+            'started': self.started.isoformat(timespec='seconds'),
+            'seconds': round(seconds, 6),
+            'stages': {name: {'seconds': round(e['seconds'], 6), 'calls': e['calls']}
+                       for name, e in self.stages.items()},
+            'counters': dict(sorted(self.counters.items())),
+            'files': {rel: {'seconds': round(e['seconds'], 6),
+                            'stages': {k: round(v, 6) for k, v in e['stages'].items()},
+                            'counters': e['counters']}
+                      for rel, e in sorted(self.files.items())},
+        }
+
+    def to_prometheus(self, top_files: int = PROM_TOP_FILES) -> str:
+        data = self.to_dict()
+        lines = []
+
+        def metric(name: str, kind: str, help_text: str, samples) -> None:
+            lines.append(f'# HELP {PROM_PREFIX}_{name} {help_text}')
+            lines.append(f'# TYPE {PROM_PREFIX}_{name} {kind}')
+            for labels, value in samples:
+                label_text = ','.join(f'{k}="{_label(v)}"' for k, v in [('tool', self.tool)] + labels)
+                lines.append(f'{PROM_PREFIX}_{name}{{{label_text}}} {_number(value)}')
+
+        metric('run_seconds', 'gauge', 'Wall-clock seconds of the whole run.', [([], data['seconds'])])
+        metric('last_run_timestamp_seconds', 'gauge', 'Unix time when the run started.',
+               [([], int(self.started.timestamp()))])
+        metric('files', 'gauge', 'Number of files with recorded timings.', [([], len(self.files))])
+        if data['stages']:
+            metric('stage_seconds', 'gauge', 'Wall-clock seconds spent in each stage.',
+                   [([('stage', name)], e['seconds']) for name, e in data['stages'].items()])
+            metric('stage_calls', 'gauge', 'Number of times each stage was entered.',
+                   [([('stage', name)], e['calls']) for name, e in data['stages'].items()])
+        for name, value in data['counters'].items():
+            # 每次執行都重新寫出檔案，數值只代表這一次，因此以 gauge 表示
+            metric(_METRIC_NAME.sub('_', name), 'gauge', f'Total {name} in the last run.',
+                   [([], value)])
+        slowest = self.slowest_files(top_files)
+        if slowest:
+            metric('file_seconds', 'gauge', f'Seconds spent on the {top_files} slowest files.',
+                   [([('file', rel)], e['seconds']) for rel, e in slowest])
+        return '\n'.join(lines) + '\n'
+
+    def write_json(self, path) -> None:
+        atomic_write_text(path, json.dumps(self.to_dict(), ensure_ascii=False, indent=2) + '\n')
+
+    def write_prometheus(self, path) -> None:
+        # node_exporter 的 textfile collector 可能隨時讀取，必須原子取代
+        atomic_write_text(path, self.to_prometheus())
+
+    def print_summary(self, top: int = SUMMARY_TOP) -> None:
+        data = self.to_dict()
+        print(f"\n⏱️ {self.tool}: 共 {data['seconds']:.3f} 秒")
+        for name, e in sorted(data['stages'].items(), key=lambda item: -item[1]['seconds'])[:top]:
+            print(f"   階段 {name}: {e['seconds']:.3f} 秒（{e['calls']} 次）")
+        for rel, e in self.slowest_files(top):
+            print(f"   文件 {rel}: {e['seconds']:.3f} 秒")
+        if data['counters']:
+            print('   ' + '，'.join(f'{k}={v}' for k, v in data['counters'].items()))
+
+
+def _label(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _number(value) -> str:
+    if isinstance(value, float):
+        return repr(round(value, 6))
+    return str(value)
+
+
+_DISABLED = Metrics('-', enabled=False)
+_current = _DISABLED
+
+
+def current() -> Metrics:
+    """目前執行中的量測物件；沒有啟用時回傳停用的物件"""
+    return _current
+
+
+# ---- 剖析器 ----
+
+class SamplingProfiler:
+    """以背景執行緒定時取樣目標執行緒的呼叫堆疊（不需外部套件，開銷與函式呼叫數無關）"""
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL, thread_id: int = None):
+        self.interval = interval
+        self.thread_id = thread_id or threading.get_ident()
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            if frame is None:
+                continue
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{os.path.basename(code.co_filename)}:{code.co_name}')
+                frame = frame.f_back
+            self.stacks[';'.join(reversed(stack))] += 1
+            self.samples += 1
+
+    def write_folded(self, path) -> None:
+        """寫出 folded 格式（每行「呼叫堆疊 次數」），可直接交給 flamegraph.pl / speedscope"""
+        atomic_write_text(path, ''.join(f'{stack} {n}\n' for stack, n in self.stacks.most_common()))
+
+    def top_functions(self, n: int = 10) -> list:
+        """依自身取樣數（堆疊最內層）排序的函式"""
+        leaves = Counter()
+        for stack, count in self.stacks.items():
+            leaves[stack.rsplit(';', 1)[-1]] += count
+        return leaves.most_common(n)
+
+
+@contextmanager
+def profiled(mode: Optional[str], out_path, top: int = 10):
+    """在 with 區塊內啟用剖析器；mode 為 None 時不做事"""
+    if mode is None:
+        yield
+        return
+    if mode == 'cprofile':
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield
+        finally:
+            profiler.disable()
+            profiler.dump_stats(str(out_path))
+            print(f"\n🔬 cProfile 結果已寫入 {out_path}（依累計時間前 {top} 名）")
+            pstats.Stats(profiler, stream=sys.stdout).sort_stats('cumulative').print_stats(top)
+    elif mode == 'sample':
+        profiler = SamplingProfiler()
+        profiler.start()
+        try:
+            yield
+        finally:
+            profiler.stop()
+            profiler.write_folded(out_path)
+            print(f"\n🔬 取樣 {profiler.samples} 次（每 {profiler.interval * 1000:.0f} 毫秒），"
+                  f"堆疊已寫入 {out_path}")
+            for name, count in profiler.top_functions(top):
+                print(f"   {count / max(profiler.samples, 1):6.1%}  {name}")
+    else:
+        raise ValueError(f'未知的剖析器: {mode}')
+
+
+# ---- 命令列整合 ----
+
+def add_arguments(parser) -> None:
+    group = parser.add_argument_group('效能量測')
+    group.add_argument('--metrics-json', metavar='PATH', help='寫出各階段、各文件耗時與計數器（JSON）')
+    group.add_argument('--metrics-prom', metavar='PATH',
+                       help='寫出 Prometheus textfile collector 格式的量測結果')
+    group.add_argument('--profile', choices=PROFILERS,
+                       help='剖析主行程：cprofile 為完整呼叫統計，sample 為低開銷的堆疊取樣')
+    group.add_argument('--profile-out', metavar='PATH',
+                       help='剖析結果路徑（預設 <工具名>.prof 或 <工具名>.folded）')
+
+
+@contextmanager
+def session(tool: str, args=None):
+    """依命令列參數啟用量測與剖析，結束時寫出結果；args 為 None 或未要求輸出時不量測"""
+    global _current
+    json_path = getattr(args, 'metrics_json', None)
+    prom_path = getattr(args, 'metrics_prom', None)
+    mode = getattr(args, 'profile', None)
+    enabled = bool(json_path or prom_path or mode)
+    metrics = Metrics(tool, enabled=enabled)
+    if not enabled:
+        yield metrics
+        return
+    out_path = getattr(args, 'profile_out', None) or f"{tool}.{'prof' if mode == 'cprofile' else 'folded'}"
+    previous, _current = _current, metrics
+    try:
+        with profiled(mode, out_path):
+            yield metrics
+    finally:
+        _current = previous
+        metrics.finish()
+        metrics.print_summary()
+        if json_path:
+            metrics.write_json(json_path)
+            print(f"📈 量測結果已寫入 {json_path}")
+        if prom_path:
+            metrics.write_prometheus(prom_path)
+            print(f"📈 Prometheus 指標已寫入 {prom_path}")
@@ -0,0 +1,545 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+文件維護管線：每個文件只讀一次、套用所有階段、最多寫一次
+
+原本一次完整維護要依序執行 convert_to_traditional.py、重命名腳本、
+FORMAT-CH7-CH9.py、BACKUP_LEGACY.py、VERIFY-COMPLETION.py，每個腳本都重新啟動直譯器、
+重新讀寫同一批文件。這裡把它們改寫成記憶體中文件上的可組合階段：
+
+  rename   依對應表重命名並修正整個文件樹的連結
+  format   統一章節標題區塊與導航（依重命名後的檔名）
+  convert  簡體轉繁體（只轉換 Markdown 正文；排在 rename、format 之後，涵蓋它們產生的文字）
+  backup   將舊格式 chX-Y.md 移出文件樹，存入 _backup_legacy/ 的內容定址備份庫
+  verify   以最終內容檢查失效連結與錨點
+
+執行時以單次走訪列出文件，每個章節目錄是一個工作單元；各單元的轉換任務互不相依，
+在行程池中平行執行（轉換表每個行程只載入一次），寫回與驗證則依 DAG 相依關係排程。
+有文件需要移動時，所有寫回經由 rename_engine 的預寫日誌一次提交，
+中斷後可用 `python rename_engine.py --resume` 或 `--rollback` 處理。
+
+用法：
+    python doc_pipeline.py [--root doc/鏡界] [--stages convert,format,backup,verify]
+                           [--rename-map renames.json] [-j 8] [--dry-run] [--report report.json]
+"""
+
+import argparse
+import importlib
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, ThreadPoolExecutor, wait
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+import convert_to_traditional
+import doc_fs
+import link_checker
+from BACKUP_LEGACY import BANNER_TMPL
+from backup_store import BackupStore
+from doc_io import atomic_write_bytes, atomic_write_text
+from format_chapters import ChapterFormatter, chapter_title, group_sections, section_titles
+from rename_engine import RenameJournal, _normalize_map, plan_moves, resume_renames, rewrite_for_moves
+
+DEFAULT_ROOT = doc_fs.BOOK_ROOT
+DEFAULT_STAGES = ('convert', 'format', 'backup', 'verify')
+
+_LEGACY_NAME = re.compile(r'^ch(\d+)-(\d+)\.md$')
+
+
+def _verifier():
+    # VERIFY-COMPLETION.py 的檔名含連字號，無法以 import 陳述式載入
+    return importlib.import_module('VERIFY-COMPLETION')
+
+
+class Document:
+    """管線中的文件；所有階段都在記憶體中修改 text 與 dest（相對於 root 的 POSIX 路徑）"""
+
+    def __init__(self, root: Path, rel: str, data: bytes):
+        self.root = root
+        self.rel = rel
+        self.dest = rel
+        self.data = data
+        self.text = data.decode('utf-8')
+        self.meta: Dict[str, Any] = {}
+
+    @property
+    def path(self) -> Path:
+        return self.root / self.rel
+
+
+class Stage:
+    """管線階段
+
+    prepare() 在主行程中執行一次，可讀取整個文件清單（例如計算重命名對應）；
+    apply() 在工作行程中逐文件執行；finish() 在所有文件處理完後於主行程彙整結果。
+    after 列出必須排在此階段之前的階段（若有啟用）。
+    """
+
+    name = ''
+    after: Tuple[str, ...] = ()
+
+    def prepare(self, ctx: 'RunContext') -> None:
+        pass
+
+    def init_worker(self) -> None:
+        pass
+
+    def apply(self, doc: Document) -> None:
+        pass
+
+    def finish(self, ctx: 'RunContext', results: list) -> Optional[dict]:
+        return None
+
+
+class ConvertStage(Stage):
+    name = 'convert'
+    # 格式化會從檔名取用尚未轉換的標題，轉換排在最後才能涵蓋它們
+    after = ('rename', 'format')
+
+    def __init__(self, table_path=None, markdown: bool = True):
+        self.table_path = table_path
+        self.markdown = markdown
+
+    def init_worker(self) -> None:
+        convert_to_traditional.set_matcher(convert_to_traditional.load_matcher(self.table_path))
+
+    def apply(self, doc: Document) -> None:
+        doc.text = convert_to_traditional.convert_text(doc.text, self.markdown)[0]
+
+
+class RenameStage(Stage):
+    name = 'rename'
+
+    def __init__(self, rename_map: Dict[str, str], link_aliases: Dict[str, str] = None,
+                 skip_existing: bool = True):
+        self.rename_map = rename_map
+        self.link_aliases = link_aliases or {}
+        self.skip_existing = skip_existing
+        self.moves: Dict[Path, Path] = {}
+        self.link_moves: Dict[Path, Path] = {}
+
+    def prepare(self, ctx: 'RunContext') -> None:
+        requested = {old: new for old, new in _normalize_map(ctx.root, self.rename_map).items()
+                     if ctx.rel(old) in ctx.dest and old != new}
+        sources = {ctx.rel(old) for old in requested}
+        for old, new in requested.items():
+            new_rel = ctx.rel(new)
+            if new_rel in ctx.existing and new_rel not in sources:
+                if not self.skip_existing:
+                    raise FileExistsError(f'目標已存在: {new}')
+                print(f"⏭️ 目標已存在，略過: {new_rel}")
+                continue
+            self.moves[old] = new
+        if len(set(self.moves.values())) != len(self.moves):
+            raise ValueError('重命名對應中有多個文件指向同一目標')
+        self.link_moves = dict(_normalize_map(ctx.root, self.link_aliases))
+        self.link_moves.update(self.moves)
+        for old, new in self.moves.items():
+            ctx.dest[ctx.rel(old)] = ctx.rel(new)
+
+    def apply(self, doc: Document) -> None:
+        doc.text = rewrite_for_moves(doc.text, doc.path, self.link_moves)[0]
+        new = self.moves.get(doc.path)
+        if new is not None:
+            doc.dest = Path(os.path.relpath(new, doc.root)).as_posix()
+
+
+class FormatStage(Stage):
+    name = 'format'
+    after = ('rename',)
+
+    def __init__(self, chapters=None):
+        self.chapters = chapters
+        self.targets: Dict[str, Tuple[ChapterFormatter, int]] = {}
+
+    def prepare(self, ctx: 'RunContext') -> None:
+        # 依重命名後的最終檔名計算每章的前後節
+        by_final = {ctx.root / dest: rel for rel, dest in ctx.dest.items()}
+        for n, sections in sorted(group_sections(by_final).items()):
+            if self.chapters and n not in self.chapters:
+                continue
+            title = chapter_title(n, [(i, t, ctx.root / by_final[p]) for i, t, p in sections])
+            if title is None:
+                print(f"⚠️ 第{n}章沒有設定章標題，略過")
+                continue
+            sections = section_titles(n, sections, lambda p: ctx.read(by_final[p]).decode('utf-8'))
+            formatter = ChapterFormatter(n, title, sections)
+            for pos, (_idx, _title, path) in enumerate(formatter.sections):
+                self.targets[by_final[path]] = (formatter, pos)
+
+    def apply(self, doc: Document) -> None:
+        target = self.targets.get(doc.rel)
+        if target is not None:
+            formatter, pos = target
+            doc.text = formatter.format(doc.text, pos)
+
+
+class BackupLegacyStage(Stage):
+    """與 BACKUP_LEGACY.py 相同：舊格式 chX-Y.md 移出文件樹並存入備份庫
+
+    文件先隨其他改寫一起經由預寫日誌移到 _backup_legacy/chX/，
+    全部提交後再匯入內容定址備份庫（去掉說明標頭、壓縮、去重）。
+    """
+
+    name = 'backup'
+    after = ('rename', 'format')
+
+    def __init__(self, backup_dir: str = '_backup_legacy'):
+        self.backup_dir = backup_dir
+        self.targets: Dict[str, Tuple[str, str]] = {}
+        self.timestamp = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+
+    def prepare(self, ctx: 'RunContext') -> None:
+        finals = set(ctx.dest.values())
+        for rel, dest in sorted(ctx.dest.items()):
+            ch_dir, _, name = dest.rpartition('/')
+            m = _LEGACY_NAME.match(name)
+            if not m or ch_dir != f'ch{m.group(1)}':
+                continue
+            prefix = f'{ch_dir}/ch{m.group(1)}-{m.group(2)}-'
+            new_name = next((f.rsplit('/', 1)[1] for f in sorted(finals)
+                             if f.startswith(prefix) and f.endswith('.md')),
+                            f'ch{m.group(1)}-{m.group(2)}-<未找到新檔名>.md')
+            backup = f'{self.backup_dir}/{dest}'
+            if (ctx.root / backup).exists():
+                print(f"⏭️ 備份已存在，略過: {backup}")
+                continue
+            self.targets[rel] = (backup, new_name)
+            ctx.dest[rel] = backup
+
+    def apply(self, doc: Document) -> None:
+        target = self.targets.get(doc.rel)
+        if target is not None:
+            backup, new_name = target
+            doc.text = BANNER_TMPL.format(new_name=new_name, ts=self.timestamp) + doc.text
+            doc.dest = backup
+
+    def finish(self, ctx: 'RunContext', results: list) -> Optional[dict]:
+        if ctx.dry_run or not self.targets:
+            return None
+        store = BackupStore(ctx.root / self.backup_dir)
+        # 只匯入這次移入的文件，先前執行留下的純文字備份不動
+        moved = [ctx.root / backup for backup, _new_name in self.targets.values()]
+        result = store.import_plain(store.root, paths=moved)
+        return {'imported': result['imported'], 'objects': result['objects'],
+                'bytes': result['bytes']}
+
+
+class VerifyStage(Stage):
+    name = 'verify'
+    after = ('convert', 'rename', 'format', 'backup')
+
+    def apply(self, doc: Document) -> None:
+        if not doc.dest.startswith('_backup_legacy/'):
+            doc.meta['verify'] = link_checker.parse_markdown(doc.text)
+
+    def finish(self, ctx: 'RunContext', results: list) -> dict:
+        parsed = {r['dest']: r['meta']['verify'] for r in results if 'verify' in r['meta']}
+        existing = set(ctx.existing)
+        for rel, dest in ctx.dest.items():
+            if rel != dest:
+                existing.discard(rel)
+                parts = dest.split('/')
+                existing.update('/'.join(parts[:i]) for i in range(1, len(parts) + 1))
+        report = link_checker.DocTreeChecker(ctx.root).check_parsed(parsed, existing)
+        return {key: report[key] for key in
+                ('links_checked', 'broken_links', 'broken_anchors', 'exit_code')}
+
+
+STAGES: Dict[str, Callable[..., Stage]] = {
+    'convert': ConvertStage,
+    'rename': RenameStage,
+    'format': FormatStage,
+    'backup': BackupLegacyStage,
+    'verify': VerifyStage,
+}
+
+
+def order_stages(stages: List[Stage]) -> List[Stage]:
+    """依 after 相依關係排出階段順序（拓撲排序，同層維持原順序）"""
+    by_name = {stage.name: stage for stage in stages}
+    ordered, visiting, done = [], set(), set()
+
+    def visit(stage: Stage) -> None:
+        if stage.name in done:
+            return
+        if stage.name in visiting:
+            raise ValueError(f'階段相依關係有循環: {stage.name}')
+        visiting.add(stage.name)
+        for dep in stage.after:
+            if dep in by_name:
+                visit(by_name[dep])
+        visiting.discard(stage.name)
+        done.add(stage.name)
+        ordered.append(stage)
+
+    for stage in stages:
+        visit(stage)
+    return ordered
+
+
+class Task(NamedTuple):
+    """DAG 中的任務；func 以 (*args, *相依任務的結果) 呼叫"""
+    func: Callable
+    deps: Tuple[str, ...] = ()
+    args: tuple = ()
+    kind: str = 'cpu'  # 'cpu' 在行程池執行，'io' 在執行緒池執行
+
+
+class _InlineExecutor:
+    """單行程模式：直接在目前執行緒執行"""
+
+    def submit(self, func, *args) -> Future:
+        future = Future()
+        try:
+            future.set_result(func(*args))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
+
+
+def run_dag(tasks: Dict[str, Task], cpu_executor, io_executor) -> Dict[str, Any]:
+    """依相依關係執行任務；所有相依任務完成後立即提交，回傳 {任務名稱: 結果}"""
+    for name, task in tasks.items():
+        unknown = [d for d in task.deps if d not in tasks]
+        if unknown:
+            raise ValueError(f'任務 {name} 依賴不存在的任務: {unknown}')
+    results: Dict[str, Any] = {}
+    pending = dict(tasks)
+    running: Dict[Future, str] = {}
+    while pending or running:
+        ready = [name for name, task in pending.items() if all(d in results for d in task.deps)]
+        for name in ready:
+            task = pending.pop(name)
+            executor = cpu_executor if task.kind == 'cpu' else io_executor
+            args = task.args + tuple(results[d] for d in task.deps)
+            running[executor.submit(task.func, *args)] = name
+        if not running:
+            raise ValueError(f'任務相依關係有循環: {sorted(pending)}')
+        done, _ = wait(running, return_when=FIRST_COMPLETED)
+        for future in done:
+            results[running.pop(future)] = future.result()
+    return results
+
+
+class RunContext:
+    """一次執行的共用狀態：文件清單與每個文件的最終路徑"""
+
+    def __init__(self, root: Path, md_files: List[str], existing: set):
+        self.root = root
+        self.existing = existing
+        self.dry_run = False
+        self.dest: Dict[str, str] = {rel: rel for rel in md_files}
+        # prepare() 讀過的文件內容；轉換任務直接使用，每個文件仍只讀一次
+        self.documents: Dict[str, bytes] = {}
+
+    def rel(self, path: Path) -> str:
+        return Path(os.path.relpath(path, self.root)).as_posix()
+
+    def read(self, rel: str) -> bytes:
+        """讀取文件內容並保留在 documents 中"""
+        data = self.documents.get(rel)
+        if data is None:
+            data = self.documents[rel] = (self.root / rel).read_bytes()
+        return data
+
+
+# 工作行程的全域狀態：階段物件只在初始化時傳送一次
+_worker_stages: List[Stage] = []
+_worker_root: Optional[Path] = None
+
+
+def _init_worker(root: Path, stages: List[Stage]) -> None:
+    global _worker_stages, _worker_root
+    _worker_root = root
+    _worker_stages = stages
+    for stage in stages:
+        stage.init_worker()
+
+
+def _transform_unit(rels: List[str], preloaded: Dict[str, bytes] = None) -> List[dict]:
+    """讀取一個單元的文件（prepare() 已讀過的直接使用）、依序套用所有階段；只回傳有變動的內容"""
+    preloaded = preloaded or {}
+    results = []
+    for rel in rels:
+        data = preloaded.get(rel)
+        doc = Document(_worker_root, rel, (_worker_root / rel).read_bytes() if data is None else data)
+        changed_by = []
+        for stage in _worker_stages:
+            before = (doc.text, doc.dest)
+            stage.apply(doc)
+            if (doc.text, doc.dest) != before:
+                changed_by.append(stage.name)
+        data = doc.text.encode('utf-8')
+        results.append({
+            'rel': rel, 'dest': doc.dest, 'meta': doc.meta, 'stages': changed_by,
+            'original': doc.data if data != doc.data else None,
+            'data': data if data != doc.data else None,
+        })
+    return results
+
+
+def _write_unit(root: Path, results: List[dict]) -> int:
+    written = 0
+    for result in results:
+        if result['data'] is not None:
+            atomic_write_bytes(root / result['rel'], result['data'])
+            written += 1
+    return written
+
+
+def _commit_with_journal(root: Path, *unit_results: List[dict]) -> int:
+    """有文件需要移動時：先將改寫與移動寫入預寫日誌，再依序執行"""
+    rewrites, moves = [], {}
+    for results in unit_results:
+        for result in results:
+            if result['data'] is not None:
+                rewrites.append((root / result['rel'], result['original'], result['data']))
+            if result['dest'] != result['rel']:
+                moves[root / result['rel']] = root / result['dest']
+    journal = RenameJournal(root)
+    journal.begin(rewrites, plan_moves(moves))
+    resume_renames(root)
+    return len(rewrites) + len(moves)
+
+
+def _unit_of(rel: str) -> str:
+    return rel.split('/', 1)[0] if '/' in rel else ''
+
+
+def run_pipeline(root=DEFAULT_ROOT, stages: List[Stage] = None, jobs: int = None,
+                 dry_run: bool = False) -> dict:
+    """執行管線並回傳報告"""
+    start = time.perf_counter()
+    root = Path(os.path.normpath(Path(root).resolve()))
+    jobs = jobs or os.cpu_count() or 1
+    stages = order_stages(stages if stages is not None else [STAGES[n]() for n in DEFAULT_STAGES])
+    if RenameJournal(root).exists():
+        raise RuntimeError(f'發現未完成的重命名日誌 {root / ".rename_journal"}，'
+                           '請先以 rename_engine.py --resume 或 --rollback 處理')
+
+    md_files, existing = _verifier().walk_tree(root)
+    ctx = RunContext(root, sorted(md_files), existing)
+    ctx.dry_run = dry_run
+    for stage in stages:
+        stage.prepare(ctx)
+
+    units: Dict[str, List[str]] = {}
+    for rel in sorted(md_files):
+        units.setdefault(_unit_of(rel), []).append(rel)
+
+    tasks: Dict[str, Task] = {
+        f'transform:{u}': Task(_transform_unit,
+                               args=(rels, {rel: ctx.documents[rel] for rel in rels if rel in ctx.documents}))
+        for u, rels in units.items()}
+    transforms = tuple(tasks)
+    moving = any(rel != dest for rel, dest in ctx.dest.items())
+    if not dry_run:
+        if moving:
+            tasks['commit'] = Task(_commit_with_journal, deps=transforms, args=(root,), kind='io')
+        else:
+            for u in units:
+                tasks[f'write:{u}'] = Task(_write_unit, deps=(f'transform:{u}',), args=(root,),
+                                           kind='io')
+
+    with ThreadPoolExecutor(max_workers=min(jobs, 8)) as io_pool:
+        if jobs > 1 and len(units) > 1:
+            with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker,
+                                     initargs=(root, stages)) as cpu_pool:
+                results = run_dag(tasks, cpu_pool, io_pool)
+        else:
+            _init_worker(root, stages)
+            results = run_dag(tasks, _InlineExecutor(), io_pool)
+
+    documents = [r for name in transforms for r in results[name]]
+    report = {
+        'root': str(root),
+        'files': len(documents),
+        'units': len(units),
+        'changed': sorted(r['rel'] for r in documents if r['data'] is not None or r['dest'] != r['rel']),
+        'moved': {r['rel']: r['dest'] for r in documents if r['dest'] != r['rel']},
+        'stages': {stage.name: sum(stage.name in r['stages'] for r in documents) for stage in stages},
+        'dry_run': dry_run,
+        'exit_code': 0,
+    }
+    for stage in stages:
+        summary = stage.finish(ctx, documents)
+        if summary is not None:
+            report[stage.name] = summary
+            report['exit_code'] |= summary.get('exit_code', 0)
+    report['seconds'] = round(time.perf_counter() - start, 3)
+    return report
+
+
+def build_stages(names: List[str], args) -> List[Stage]:
+    stages = []
+    for name in names:
+        if name == 'convert':
+            stages.append(ConvertStage(args.table, markdown=not args.raw))
+        elif name == 'rename':
+            if not args.rename_map:
+                raise SystemExit('❌ rename 階段需要 --rename-map')
+            rename_map = json.loads(Path(args.rename_map).read_text(encoding='utf-8'))
+            stages.append(RenameStage(rename_map, link_aliases=rename_map))
+        elif name == 'format':
+            stages.append(FormatStage(args.chapters))
+        else:
+            stages.append(STAGES[name]())
+    return stages
+
+
+def main(argv=None) -> int:
+    from format_chapters import parse_chapters
+
+    parser = argparse.ArgumentParser(description='文件維護管線：讀一次、套用所有階段、寫一次')
+    parser.add_argument('--root', default=str(DEFAULT_ROOT), help='文件樹根目錄')
+    parser.add_argument('--stages', default=None,
+                        help=f'啟用的階段，以逗號分隔（可選：{", ".join(STAGES)}；'
+                             f'預設 {",".join(DEFAULT_STAGES)}，指定 --rename-map 時加入 rename）')
+    parser.add_argument('--rename-map', help='重命名對應 JSON 檔 {舊路徑: 新路徑}')
+    parser.add_argument('--chapters', type=parse_chapters, help='format 階段只處理這些章節')
+    parser.add_argument('--table', help='convert 階段使用的已編譯轉換表')
+    parser.add_argument('--raw', action='store_true', help='convert 階段不區分 Markdown 正文')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1,
+                        help='平行處理章節的行程數')
+    parser.add_argument('--dry-run', action='store_true', help='只計算，不寫入也不移動')
+    parser.add_argument('--report', help='將報告寫成 JSON 檔')
+    args = parser.parse_args(argv)
+
+    if args.stages:
+        names = [n.strip() for n in args.stages.split(',') if n.strip()]
+    else:
+        names = list(DEFAULT_STAGES)
+        if args.rename_map:
+            names.insert(1, 'rename')
+    unknown = [n for n in names if n not in STAGES]
+    if unknown:
+        parser.error(f'未知的階段: {", ".join(unknown)}')
+
+    report = run_pipeline(args.root, build_stages(names, args), args.jobs, args.dry_run)
+
+    verb = '需要更新' if args.dry_run else '已更新'
+    for rel in report['changed']:
+        dest = report['moved'].get(rel)
+        print(f"✅ {verb}: {rel}" + (f" -> {dest}" if dest else ''))
+    print(f"\n📊 {report['files']} 個文件、{report['units']} 個單元，{verb} {len(report['changed'])} 個"
+          f"（{report['seconds']:.2f} 秒）")
+    for name, count in report['stages'].items():
+        print(f"  - {name}: {count} 個文件")
+    verify = report.get('verify')
+    if verify:
+        status = '✅' if verify['exit_code'] == 0 else '❌'
+        print(f"{status} 檢查 {verify['links_checked']} 個連結：失效連結 {len(verify['broken_links'])} 個、"
+              f"失效錨點 {len(verify['broken_anchors'])} 個")
+    if args.report:
+        atomic_write_text(args.report, json.dumps(report, ensure_ascii=False, indent=2))
+    return report['exit_code']
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
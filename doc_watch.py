@@ -0,0 +1,434 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+文件樹監看常駐程式：只重新處理有變動的文件
+
+- Linux 以 inotify（ctypes）監看整個文件樹，閒置時阻塞在 select 上，幾乎不耗 CPU；
+  其他平台或 inotify 無法使用時改為定期輪詢 stat。
+- 一連串的存檔事件會先合併（debounce），再一次處理。
+- 只對有變動的文件做簡繁轉換與章節導航格式化；新增或刪除章節文件時重排同章所有文件的導航。
+- 以 corpus_index 找出連到這些文件的其他文件，只檢查它們的連結與錨點。
+- 轉換表、章節格式化器與 SQLite 索引在整個執行期間保持載入。
+- 單一文件無法處理（例如不是 UTF-8）時只記錄錯誤；處理途中被刪除或改名的文件視為已刪除。
+
+用法：
+    python doc_watch.py [--root doc/鏡界] [--debounce 0.2] [--poll] [--no-convert] [--no-format] [--no-check]
+"""
+
+import argparse
+import ctypes
+import ctypes.util
+import os
+import re
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Optional, Set
+from urllib.parse import unquote
+
+import convert_to_traditional
+import doc_fs
+from corpus_index import CorpusIndex
+from doc_io import atomic_write_bytes, content_hash
+from format_chapters import ChapterFormatter, chapter_title, group_sections, section_heading, section_titles
+from rename_engine import DEFAULT_EXCLUDE
+
+DEFAULT_ROOT = doc_fs.BOOK_ROOT
+
+# inotify 事件旗標（<sys/inotify.h>）
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+WATCH_MASK = (IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+              | IN_DELETE_SELF | IN_ONLYDIR)
+
+_EVENT = struct.Struct('iIII')
+_CHAPTER_FILE = re.compile(r'^(ch(\d+))/ch\2-\d+-.+\.md$')
+
+# 事件佇列溢位時回傳，代表需要全面重新掃描
+RESCAN = None
+
+
+def _skip_dir(name: str, exclude_patterns) -> bool:
+    return name.startswith('.') or any(p in name for p in exclude_patterns)
+
+
+def _is_document(rel: str) -> bool:
+    name = rel.rsplit('/', 1)[-1]
+    return name.endswith('.md') and not name.startswith('.')
+
+
+class PollingWatcher:
+    """以 os.scandir 定期比對 (修改時間, 大小) 的監看器"""
+
+    def __init__(self, root: Path, interval: float = 1.0, exclude_patterns=DEFAULT_EXCLUDE):
+        self.root = root
+        self.interval = interval
+        self.exclude_patterns = exclude_patterns
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[str, tuple]:
+        snapshot = {}
+        stack = ['']
+        while stack:
+            rel_dir = stack.pop()
+            try:
+                it = os.scandir(self.root / rel_dir if rel_dir else self.root)
+            except FileNotFoundError:
+                continue
+            with it:
+                for entry in it:
+                    rel = f'{rel_dir}/{entry.name}' if rel_dir else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _skip_dir(entry.name, self.exclude_patterns):
+                            stack.append(rel)
+                    elif _is_document(rel):
+                        try:
+                            st = entry.stat()
+                        except FileNotFoundError:
+                            continue  # 列出後才被刪除或改名：視為已刪除
+                        snapshot[rel] = (st.st_mtime_ns, st.st_size)
+        return snapshot
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[str]]:
+        """等待最多 timeout 秒（None 為一個輪詢週期），回傳有變動的相對路徑"""
+        time.sleep(self.interval if timeout is None else min(timeout, self.interval))
+        snapshot = self._scan()
+        old = self._snapshot
+        self._snapshot = snapshot
+        return {rel for rel in old.keys() | snapshot.keys() if old.get(rel) != snapshot.get(rel)}
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """以 inotify 監看整個文件樹（僅限 Linux）"""
+
+    def __init__(self, root: Path, exclude_patterns=DEFAULT_EXCLUDE):
+        libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        if not hasattr(libc, 'inotify_init1'):
+            raise OSError('此平台不支援 inotify')
+        self.root = root
+        self.exclude_patterns = exclude_patterns
+        self._libc = libc
+        self._fd = libc.inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 失敗')
+        self._dirs: Dict[int, str] = {}
+        self._add_tree('')
+
+    def _add_watch(self, rel_dir: str) -> None:
+        path = os.fsencode(self.root / rel_dir if rel_dir else self.root)
+        wd = self._libc.inotify_add_watch(self._fd, path, WATCH_MASK)
+        if wd < 0:
+            errno = ctypes.get_errno()
+            raise OSError(errno, f'inotify_add_watch 失敗: {os.strerror(errno)}', rel_dir)
+        self._dirs[wd] = rel_dir
+
+    def _add_tree(self, rel_dir: str) -> Set[str]:
+        """監看目錄及其子目錄，回傳其中已存在的文件（新建目錄時可能已有文件搬入）"""
+        found = set()
+        stack = [rel_dir]
+        while stack:
+            current = stack.pop()
+            try:
+                self._add_watch(current)
+                it = os.scandir(self.root / current if current else self.root)
+            except FileNotFoundError:
+                continue
+            with it:
+                for entry in it:
+                    rel = f'{current}/{entry.name}' if current else entry.name
+                    if entry.is_dir(follow_symlinks=False):
+                        if not _skip_dir(entry.name, self.exclude_patterns):
+                            stack.append(rel)
+                    elif _is_document(rel):
+                        found.add(rel)
+        return found
+
+    def wait(self, timeout: Optional[float]) -> Optional[Set[str]]:
+        """等待事件最多 timeout 秒（None 為無限期），回傳有變動的相對路徑；佇列溢位時回傳 RESCAN"""
+        readable, _, _ = select.select([self._fd], [], [], timeout)
+        if not readable:
+            return set()
+        changed: Set[str] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                break
+            pos = 0
+            while pos < len(data):
+                wd, mask, _cookie, length = _EVENT.unpack_from(data, pos)
+                name = data[pos + _EVENT.size:pos + _EVENT.size + length].rstrip(b'\0')
+                pos += _EVENT.size + length
+                if mask & IN_Q_OVERFLOW:
+                    return RESCAN
+                if mask & IN_IGNORED:
+                    self._dirs.pop(wd, None)
+                    continue
+                rel_dir = self._dirs.get(wd)
+                if rel_dir is None or not name:
+                    continue
+                name = os.fsdecode(name)
+                rel = f'{rel_dir}/{name}' if rel_dir else name
+                if mask & IN_ISDIR:
+                    if mask & (IN_CREATE | IN_MOVED_TO) and not _skip_dir(name, self.exclude_patterns):
+                        changed |= self._add_tree(rel)
+                elif _is_document(rel):
+                    changed.add(rel)
+        return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+def make_watcher(root: Path, poll: bool = False, interval: float = 1.0):
+    if not poll and sys.platform.startswith('linux'):
+        try:
+            return InotifyWatcher(root)
+        except OSError as e:
+            print(f"⚠️ 無法使用 inotify（{e}），改為每 {interval} 秒輪詢")
+    return PollingWatcher(root, interval)
+
+
+class DocWatcher:
+    """監看常駐程式：合併事件後只處理變動的文件與連到它們的文件"""
+
+    def __init__(self, root, convert: bool = True, format_nav: bool = True, check: bool = True,
+                 table_path=None):
+        self.root = Path(os.path.normpath(Path(root).resolve()))
+        self.convert = convert
+        self.format_nav = format_nav
+        self.check = check
+        if convert:
+            convert_to_traditional.set_matcher(convert_to_traditional.load_matcher(table_path))
+        self.index = CorpusIndex(self.root)
+        self.index.refresh()
+        # 自己寫回或檢查過的內容雜湊，避免處理自己觸發的事件
+        self._seen: Dict[str, str] = {}
+        self._formatters: Dict[int, ChapterFormatter] = {}
+
+    def close(self) -> None:
+        self.index.close()
+
+    def _title_text(self, data: bytes) -> str:
+        """取節標題用的文件內容：與寫回時一樣先轉換，導航中的標題才會與文件一致"""
+        text = data.decode('utf-8', errors='replace')
+        return convert_to_traditional.convert_text(text)[0] if self.convert else text
+
+    def _formatter(self, chapter: int, rebuild: bool,
+                   contents: Dict[str, bytes] = None) -> Optional[ChapterFormatter]:
+        """取得章節格式化器；章節文件有增減或節標題改變時重建（contents 為本批已讀入的內容）"""
+        if rebuild or chapter not in self._formatters:
+            ch_dir = self.root / f'ch{chapter}'
+            paths = [p for p in ch_dir.iterdir() if p.is_file()] if ch_dir.is_dir() else []
+            sections = group_sections(paths).get(chapter)
+            title = chapter_title(chapter, sections) if sections else None
+            if title is None:
+                self._formatters.pop(chapter, None)
+                return None
+            contents = contents or {}
+
+            def read(path: Path) -> str:
+                data = contents.get(path.relative_to(self.root).as_posix())
+                return self._title_text(path.read_bytes() if data is None else data)
+
+            self._formatters[chapter] = ChapterFormatter(chapter, title, section_titles(chapter, sections, read))
+        return self._formatters[chapter]
+
+    def _title_changed(self, rel: str, data: bytes) -> bool:
+        """文件中的「## N.i 標題」是否與章節格式化器記住的標題不同"""
+        m = _CHAPTER_FILE.match(rel)
+        formatter = self._formatters.get(int(m.group(2))) if m else None
+        if formatter is None:
+            return False
+        path = self.root / rel
+        for idx, title, section_path in formatter.sections:
+            if section_path == path:
+                heading = section_heading(formatter.chapter, idx, self._title_text(data))
+                return heading is not None and heading != title
+        return False
+
+    def _transform(self, rel: str, text: str, formatter: Optional[ChapterFormatter]) -> str:
+        if self.convert:
+            text = convert_to_traditional.convert_text(text)[0]
+        if formatter is not None:
+            path = self.root / rel
+            for pos, (_idx, _title, section_path) in enumerate(formatter.sections):
+                if section_path == path:
+                    text = formatter.format(text, pos)
+                    break
+        return text
+
+    def process(self, changed: Optional[Set[str]]) -> dict:
+        """處理一批變動（相對路徑集合；RESCAN 代表全部重新檢查）"""
+        start = time.perf_counter()
+        if changed is RESCAN:
+            self.index.refresh()
+            changed = set(self.index.documents())
+        errors = []
+        contents: Dict[str, bytes] = {}
+        for rel in changed:
+            try:
+                contents[rel] = (self.root / rel).read_bytes()
+            except (FileNotFoundError, NotADirectoryError, IsADirectoryError):
+                pass  # 已刪除或改名（包括讀取前才消失的文件）
+            except OSError as e:
+                errors.append({'path': rel, 'error': str(e)})
+        removed = changed - contents.keys() - {e['path'] for e in errors}
+        existing = {rel for rel, data in contents.items() if self._seen.get(rel) != content_hash(data)}
+
+        # 章節文件增減時，同章其他文件的前後節導航也要更新
+        to_format: Set[str] = set(existing)
+        rebuild = set()
+        if self.format_nav:
+            known = set(self.index.documents())
+            for rel in existing | removed:
+                m = _CHAPTER_FILE.match(rel)
+                if m and ((rel in removed) != (rel not in known)):
+                    rebuild.add(int(m.group(2)))
+            # 節標題改了：同章前後節的導航要換成新標題，也不能把這個文件的標題改回舊的
+            for rel in existing:
+                m = _CHAPTER_FILE.match(rel)
+                if m and int(m.group(2)) not in rebuild and self._title_changed(rel, contents[rel]):
+                    rebuild.add(int(m.group(2)))
+            for chapter in rebuild:
+                formatter = self._formatter(chapter, True, contents)
+                if formatter is not None:
+                    to_format |= {p.relative_to(self.root).as_posix() for _i, _t, p in formatter.sections}
+
+        written = []
+        for rel in sorted(to_format):
+            try:
+                if self._process_file(rel, existing, contents.get(rel)):
+                    written.append(rel)
+            except FileNotFoundError:
+                removed.add(rel)  # 處理途中被刪除或改名
+            except (OSError, UnicodeDecodeError) as e:
+                errors.append({'path': rel, 'error': str(e)})
+        existing -= removed
+
+        touched = existing | removed | set(written)
+        self.index.update_paths(touched)
+        problems = []
+        checked: Set[str] = set()
+        if self.check:
+            checked = {rel for rel in touched if (self.root / rel).is_file()}
+            for rel in touched:
+                checked |= {source for source, _line, _anchor in self.index.who_links_to(rel)}
+            for rel in sorted(checked):
+                problems.extend(self.check_links(rel))
+        return {'changed': sorted(existing | removed), 'written': written, 'checked': len(checked),
+                'problems': problems, 'errors': errors, 'seconds': time.perf_counter() - start}
+
+    def _process_file(self, rel: str, existing: Set[str], data: Optional[bytes]) -> bool:
+        """轉換與格式化單一文件，回傳是否寫回"""
+        path = self.root / rel
+        formatter = None
+        m = _CHAPTER_FILE.match(rel)
+        if self.format_nav and m:
+            formatter = self._formatter(int(m.group(2)), False)
+        if rel not in existing and formatter is None:
+            return False
+        if data is None:
+            data = path.read_bytes()
+        new = self._transform(rel, data.decode('utf-8'), formatter).encode('utf-8')
+        if new != data:
+            atomic_write_bytes(path, new)
+        self._seen[rel] = content_hash(new)
+        return new != data
+
+    def check_links(self, rel: str) -> list:
+        """以索引檢查單一文件的連結目標與錨點"""
+        problems = []
+        for line, target, target_path, anchor in self.index.links_from(rel):
+            if target_path is None:
+                continue  # 外部連結
+            if self.index.document(target_path) is None and not (self.root / target_path).exists():
+                problems.append({'source': rel, 'line': line, 'target': target, 'kind': 'link'})
+                continue
+            if anchor and target_path.endswith('.md'):
+                slug = unquote(anchor)
+                if not self.index.has_anchor(target_path, slug) and \
+                        not self.index.has_anchor(target_path, slug.lower()):
+                    problems.append({'source': rel, 'line': line, 'target': target, 'kind': 'anchor'})
+        return problems
+
+    def run(self, watcher, debounce: float = 0.2) -> None:
+        """主迴圈：收到事件後等待 debounce 秒沒有新事件才處理"""
+        pending: Optional[Set[str]] = set()
+        deadline = None
+        while True:
+            timeout = None if deadline is None else max(0.0, deadline - time.monotonic())
+            events = watcher.wait(timeout)
+            if events is RESCAN:
+                pending = RESCAN
+                deadline = time.monotonic() + debounce
+            elif events:
+                if pending is not RESCAN:
+                    pending |= events
+                deadline = time.monotonic() + debounce
+            elif deadline is not None and time.monotonic() >= deadline:
+                try:
+                    self.report(self.process(pending))
+                except Exception as e:  # 單批處理失敗不應結束常駐程式
+                    print(f"❌ 處理變動時發生錯誤：{type(e).__name__}: {e}")
+                pending, deadline = set(), None
+
+    @staticmethod
+    def report(result: dict) -> None:
+        for error in result.get('errors', []):
+            print(f"❌ 無法處理: {error['path']}（{error['error']}）")
+        if not result['changed']:
+            return
+        for rel in result['written']:
+            print(f"✅ 已更新: {rel}")
+        for problem in result['problems']:
+            label = '失效連結' if problem['kind'] == 'link' else '失效錨點'
+            print(f"❌ {label}: {problem['source']}:{problem['line']} -> {problem['target']}")
+        print(f"🔄 {len(result['changed'])} 個文件變動，檢查 {result['checked']} 個文件"
+              f"（{result['seconds'] * 1000:.0f} ms）")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='監看文件樹，只重新處理有變動的文件')
+    parser.add_argument('--root', default=str(DEFAULT_ROOT), help='文件樹根目錄')
+    parser.add_argument('--debounce', type=float, default=0.2, help='合併事件的等待秒數')
+    parser.add_argument('--poll', action='store_true', help='強制使用輪詢（不使用 inotify）')
+    parser.add_argument('--interval', type=float, default=1.0, help='輪詢間隔秒數')
+    parser.add_argument('--table', help='已編譯的轉換表')
+    parser.add_argument('--no-convert', action='store_true', help='不做簡繁轉換')
+    parser.add_argument('--no-format', action='store_true', help='不整理章節導航')
+    parser.add_argument('--no-check', action='store_true', help='不檢查連結')
+    args = parser.parse_args(argv)
+
+    daemon = DocWatcher(args.root, convert=not args.no_convert, format_nav=not args.no_format,
+                        check=not args.no_check, table_path=args.table)
+    watcher = make_watcher(daemon.root, args.poll, args.interval)
+    print(f"👀 監看中（{type(watcher).__name__}）: {daemon.root}，按 Ctrl+C 結束")
+    try:
+        daemon.run(watcher, args.debounce)
+    except KeyboardInterrupt:
+        print("\n👋 已停止監看")
+    finally:
+        watcher.close()
+        daemon.close()
+    return 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
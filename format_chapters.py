@@ -0,0 +1,374 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+統一所有章節文件的標題區塊與導航
+
+每個 chN/chN-i-標題.md 會被整理成：
+    # 第N章：章名 (英文名)
+    ## N.i 標題
+    **[← 返回第N章首頁](chN-index.md)**
+    ---
+    ...正文...
+    ## 📑 相關章節
+    | 前序 | 當前 | 後續 |   （依檔名編號排序的前後節；本章第一節、最後一節保留原有的跨章鏈接）
+    **快速鏈接：**         （前序、後續、原有的其他鏈接、返回首頁）
+
+各節標題優先採用文件中既有的「## N.i 標題」，沒有時才取自檔名（檔名可能尚未轉換為繁體）。
+原有鏈接指向本章其他節時改為目前的檔名，並與前序、後續去重。
+每章的正規表示式只編譯一次，每個文件以單次逐行掃描改寫；內容有變動才寫回，並保留原有的換行符號。
+
+用法：
+    python format_chapters.py [--root doc/鏡界] [--chapters 7,8,9] [--check]
+"""
+
+import argparse
+import re
+import sys
+import time
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+import doc_fs
+import doc_metrics
+from doc_io import atomic_write_text
+
+DEFAULT_ROOT = doc_fs.BOOK_ROOT
+
+# 章號 -> (章名, 英文名)
+CHAPTER_TITLES = {
+    1: ('資料源註冊中心', 'Data Source Registry'),
+    2: ('網站指紋分析引擎', 'Website Fingerprint Engine'),
+    3: ('資料源健康監測系統', 'Data Source Health Monitoring'),
+    4: ('資料處理工作流引擎', 'Data Processing Workflow Engine'),
+    5: ('自動化媒體處理管道', 'Automated Media Processing Pipeline'),
+    6: ('AI輔助開發系統', 'AI-Assisted Development System'),
+    7: ('資料合規與安全中心', 'Data Compliance and Security Center'),
+    8: ('分布式爬蟲集群管理系統', 'Distributed Crawler Cluster Management System'),
+    9: ('系統整合與部署', ''),
+    10: ('實時數據處理引擎', 'Real-time Data Processing Engine'),
+    11: ('智能調度與資源管理系統', 'Intelligent Scheduling & Resource Management'),
+    12: ('數據質量管理中心', 'Data Quality Management Center'),
+}
+
+NAV_HEADING = '## 📑 相關章節'
+QUICK_LINKS = '**快速鏈接：**'
+
+_CHAPTER_DIR = re.compile(r'^ch(\d+)$')
+_FENCE = re.compile(r'^[ ]{0,3}(`{3,}|~{3,})')
+_BULLET_LINK = re.compile(r'^\s*[-*] \[([^\]]*)\]\(([^)\s]*)\)')
+_TABLE_LINE = re.compile(r'^\s*\|')
+_LEGACY_NAV = re.compile(r'^\*\*相關章節\*\*[:：]?\s*$')
+_QUICK_LINKS = re.compile(r'^\*\*快速(?:鏈接|链接|連結)[:：]\*\*\s*$')
+_OTHER_CHAPTER = re.compile(r'^\.\./ch\d+/')
+_CELL_LINK = re.compile(r'^\[([^\]]*)\]\(([^)\s]*)\)$')
+
+
+def read_text(path) -> str:
+    """讀取文件但不轉換換行符號（CRLF 文件寫回時仍為 CRLF）"""
+    with open(path, encoding='utf-8', newline='') as f:
+        return f.read()
+
+
+def is_nav_heading(line: str) -> bool:
+    """是否為章節導航區塊的標題（含舊格式的「**相關章節**」）"""
+    return line.strip() == NAV_HEADING or bool(_LEGACY_NAV.match(line))
+
+
+def is_nav_line(line: str) -> bool:
+    """是否為導航區塊標題之後的內容：表格、快速鏈接、鏈接清單或空行"""
+    return not line.strip() or bool(_TABLE_LINE.match(line) or _QUICK_LINKS.match(line)
+                                     or _BULLET_LINK.match(line))
+
+
+def section_heading(chapter: int, idx: int, text: str) -> Optional[str]:
+    """文件開頭標題區塊中的「## N.i 標題」的標題文字；沒有時回傳 None"""
+    h1 = re.compile(rf'^# 第{chapter}章(?:[：:]|\s|$)')
+    heading = re.compile(rf'^#{{1,4}} {chapter}\.{idx}\s+(.+?)\s*$')
+    for line in text.splitlines():
+        stripped = line.strip()
+        if not stripped or stripped == '---' or h1.match(line) or stripped.startswith('**[← 返回'):
+            continue
+        m = heading.match(line)
+        return m.group(1) if m else None
+    return None
+
+
+def section_titles(chapter: int, sections: List[Tuple[int, str, Path]],
+                   read: Callable[[Path], str] = None) -> List[Tuple[int, str, Path]]:
+    """以文件中既有的「## N.i 標題」取代取自檔名的標題；read(路徑) 預設讀取磁碟上的文件"""
+    read = read or (lambda path: path.read_text(encoding='utf-8', errors='replace'))
+    titled = []
+    for idx, title, path in sections:
+        try:
+            text = read(path)
+        except OSError:
+            text = ''
+        titled.append((idx, section_heading(chapter, idx, text) or title, path))
+    return titled
+
+
+class ChapterFormatter:
+    """單一章節的格式化器；正規表示式在建構時編譯一次"""
+
+    def __init__(self, chapter: int, title: str, sections: List[Tuple[int, str, Path]]):
+        self.chapter = chapter
+        self.title = title
+        self.sections = sorted(sections)
+        n = chapter
+        self._h1 = re.compile(rf'^# 第{n}章(?:[：:]|\s|$)')
+        self._section_heading = re.compile(rf'^#{{1,4}} {n}\.(\d+)(?:\s|$)')
+        self._back = re.compile(rf'^\*\*\[← 返回第{n}章首頁\]\([^)]*\)\*\*\s*$')
+        self._sibling = re.compile(rf'^(?:\./)?ch{n}-(\d+)(?:-[^/#]*)?\.md(#.*)?$')
+        self._files = {idx: path.name for idx, _title, path in self.sections}
+        self.back_link = f'[← 返回第{n}章首頁](ch{n}-index.md)'
+
+    def _link(self, pos: int) -> Optional[Tuple[str, str]]:
+        if 0 <= pos < len(self.sections):
+            idx, title, path = self.sections[pos]
+            return f'{self.chapter}.{idx} {title}', path.name
+        return None
+
+    def header(self, pos: int) -> List[str]:
+        idx, title, _path = self.sections[pos]
+        return [f'# 第{self.chapter}章：{self.title}', '',
+                f'## {self.chapter}.{idx} {title}', '',
+                f'**{self.back_link}**', '', '---', '']
+
+    def _key(self, target: str) -> str:
+        """鏈接的去重鍵：指向本章某一節的鏈接（不論舊檔名）以目前的檔名為準"""
+        m = self._sibling.match(target)
+        if m and int(m.group(1)) in self._files:
+            return self._files[int(m.group(1))] + (m.group(2) or '')
+        return target
+
+    def _outside(self, link: Optional[Tuple[str, str]]) -> Optional[Tuple[str, str]]:
+        """原表格中指向其他章的前序/後續（例如 ../ch10/...）"""
+        if link and _OTHER_CHAPTER.match(link[1]):
+            return link
+        return None
+
+    def nav(self, pos: int, extra_links: List[Tuple[str, str]],
+            cells: Tuple[Optional[Tuple[str, str]], Optional[Tuple[str, str]]] = (None, None)) -> List[str]:
+        idx, title, _path = self.sections[pos]
+        prev = self._link(pos - 1) or self._outside(cells[0])
+        nxt = self._link(pos + 1) or self._outside(cells[1])
+        cell = lambda link: f'[{link[0]}]({link[1]})' if link else '-'
+        lines = [NAV_HEADING, '',
+                 '| 前序 | 當前 | 後續 |',
+                 '|-----|------|------|',
+                 f'| {cell(prev)} | **{self.chapter}.{idx} {title}** | {cell(nxt)} |',
+                 '', QUICK_LINKS]
+        seen = {link[1] for link in (prev, nxt) if link}
+        seen.add(f'ch{self.chapter}-index.md')
+        for link in (prev, nxt):
+            if link:
+                lines.append(f'- [{link[0]}]({link[1]})')
+        for text, target in extra_links:
+            target = self._key(target)
+            if target not in seen:
+                seen.add(target)
+                lines.append(f'- [{text}]({target})')
+        lines.append(f'- {self.back_link}')
+        return lines
+
+    def _skip_header(self, lines: List[str], idx: int) -> int:
+        """略過檔首既有的標題區塊（章標題、本節標題、返回鏈接、分隔線與空行）"""
+        pos = 0
+        seen_section = False
+        while pos < len(lines):
+            line = lines[pos]
+            if not line.strip() or line.strip() == '---' or self._h1.match(line) \
+                    or self._back.match(line):
+                pos += 1
+                continue
+            m = self._section_heading.match(line)
+            if m and not seen_section and int(m.group(1)) == idx:
+                seen_section = True
+                pos += 1
+                continue
+            break
+        return pos
+
+    def _read_nav(self, lines: List[str], pos: int) -> Tuple[int, List[Tuple[str, str]], tuple]:
+        """讀取導航區塊（表格、快速鏈接清單），回傳 (結束位置, 原有的鏈接, 表格的 (前序, 後續))"""
+        links = []
+        cells = (None, None)
+        while pos < len(lines):
+            line = lines[pos]
+            if _TABLE_LINE.match(line):
+                row = [c.strip() for c in line.strip().strip('|').split('|')]
+                if len(row) == 3 and row[1].startswith('**'):
+                    found = [_CELL_LINK.match(row[0]), _CELL_LINK.match(row[2])]
+                    cells = tuple(m.group(1, 2) if m else None for m in found)
+                pos += 1
+                continue
+            if not line.strip() or _QUICK_LINKS.match(line):
+                pos += 1
+                continue
+            m = _BULLET_LINK.match(line)
+            if m:
+                links.append((m.group(1), m.group(2)))
+                pos += 1
+                continue
+            break
+        return pos, links, cells
+
+    def format(self, text: str, pos: int) -> str:
+        """以單次逐行掃描改寫第 pos 節的文件"""
+        idx = self.sections[pos][0]
+        newline = '\r\n' if '\r\n' in text.split('\n', 1)[0] + '\n' else '\n'
+        lines = text.splitlines()
+        out = self.header(pos)
+        i = self._skip_header(lines, idx)
+        fence = None
+        nav_written = False
+        while i < len(lines):
+            line = lines[i]
+            m = _FENCE.match(line)
+            if fence is not None:
+                if m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence) \
+                        and not line.strip().strip(fence[0]):
+                    fence = None
+                out.append(line)
+                i += 1
+                continue
+            if m:
+                fence = m.group(1)
+                out.append(line)
+                i += 1
+                continue
+            if is_nav_heading(line):
+                i, links, cells = self._read_nav(lines, i + 1)
+                if not nav_written:
+                    out.extend(self.nav(pos, links, cells))
+                    out.append('')
+                    nav_written = True
+                continue
+            out.append(line)
+            i += 1
+
+        while out and not out[-1].strip():
+            out.pop()
+        if fence is not None:
+            out.append(fence)  # 檔尾未關閉的圍欄，避免導航被當成程式碼
+        if not nav_written:
+            if out and out[-1].strip() != '---':
+                out.extend(['', '---'])
+            out.append('')
+            out.extend(self.nav(pos, []))
+        return newline.join(out) + newline
+
+
+def group_sections(paths) -> Dict[int, List[Tuple[int, str, Path]]]:
+    """將 chN/chN-i-標題.md 路徑依章節分組，回傳 {N: [(i, 標題, 路徑), ...]}"""
+    chapters = {}
+    for path in paths:
+        path = Path(path)
+        m = _CHAPTER_DIR.match(path.parent.name)
+        if not m:
+            continue
+        n = int(m.group(1))
+        m = re.match(rf'^ch{n}-(\d+)-(.+)\.md$', path.name)
+        if m:
+            chapters.setdefault(n, []).append((int(m.group(1)), m.group(2), path))
+    return {n: sorted(sections) for n, sections in chapters.items()}
+
+
+def discover_chapters(root: Path) -> Dict[int, List[Tuple[int, str, Path]]]:
+    """找出 root 下所有 chN/chN-i-標題.md，回傳 {N: [(i, 標題, 路徑), ...]}"""
+    paths = []
+    for ch_dir in root.iterdir():
+        if _CHAPTER_DIR.match(ch_dir.name) and ch_dir.is_dir():
+            paths.extend(path for path in ch_dir.iterdir() if path.is_file())
+    return group_sections(paths)
+
+
+def chapter_title(chapter: int, sections: List[Tuple[int, str, Path]]) -> Optional[str]:
+    """章標題：優先採用 CHAPTER_TITLES，否則沿用文件中既有的「# 第N章：」標題"""
+    if chapter in CHAPTER_TITLES:
+        title, subtitle = CHAPTER_TITLES[chapter]
+        return f'{title} ({subtitle})' if subtitle else title
+    h1 = re.compile(rf'^# 第{chapter}章[：:]\s*(.+?)\s*$', re.MULTILINE)
+    for _idx, _title, path in sections:
+        m = h1.search(path.read_text(encoding='utf-8', errors='ignore'))
+        if m:
+            return m.group(1)
+    return None
+
+
+def format_chapters(root=DEFAULT_ROOT, chapters=None, check: bool = False) -> List[Path]:
+    """格式化指定章節（預設全部）；回傳內容有變動的文件（check 時不寫回）"""
+    root = Path(root)
+    metrics = doc_metrics.current()
+    with metrics.stage('discover'):
+        found = discover_chapters(root)
+    changed = []
+    for n in sorted(chapters or found):
+        sections = found.get(n)
+        if not sections:
+            print(f"⚠️ 找不到第{n}章的文件")
+            continue
+        title = chapter_title(n, sections)
+        if title is None:
+            print(f"⚠️ 第{n}章沒有設定章標題，略過")
+            continue
+        with metrics.stage(f'ch{n}'):
+            formatter = ChapterFormatter(n, title, section_titles(n, sections))
+            for pos, (_idx, _title, path) in enumerate(formatter.sections):
+                start = time.perf_counter()
+                size = path.stat().st_size
+                text = read_text(path)
+                new_text = formatter.format(text, pos)
+                written = 0
+                if new_text != text:
+                    changed.append(path)
+                    if not check:
+                        atomic_write_text(path, new_text)
+                        written = len(new_text.encode('utf-8'))
+                # 每個文件以單次逐行掃描改寫，計為一次掃描
+                metrics.add_file(path.relative_to(root).as_posix(), time.perf_counter() - start,
+                                 bytes_read=size, bytes_written=written, regex_passes=1,
+                                 files_changed=int(new_text != text))
+    return changed
+
+
+def parse_chapters(text: str) -> List[int]:
+    """解析 '7,8,9' 或 '1-12' 形式的章節清單"""
+    result = []
+    for part in text.split(','):
+        part = part.strip()
+        if '-' in part:
+            start, end = part.split('-', 1)
+            result.extend(range(int(start), int(end) + 1))
+        elif part:
+            result.append(int(part))
+    return result
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='統一章節文件的標題區塊與導航')
+    parser.add_argument('--root', default=str(DEFAULT_ROOT), help='文件樹根目錄')
+    parser.add_argument('--chapters', type=parse_chapters,
+                        help='要處理的章節，例如 7,8,9 或 1-12（預設全部）')
+    parser.add_argument('--check', action='store_true',
+                        help='只檢查不寫回；有文件需要格式化時回傳 1')
+    doc_metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    start = time.perf_counter()
+    with doc_metrics.session('format_chapters', args):
+        changed = format_chapters(args.root, args.chapters, args.check)
+    root = Path(args.root)
+    for path in changed:
+        print(f"{'📝 需要格式化' if args.check else '✅ 已更新'}: {path.relative_to(root).as_posix()}")
+    elapsed = time.perf_counter() - start
+    if not changed:
+        print(f"✅ 所有文件格式皆已一致（{elapsed:.2f} 秒）")
+        return 0
+    print(f"\n📊 {'需要格式化' if args.check else '已更新'} {len(changed)} 個文件（{elapsed:.2f} 秒）")
+    return 1 if args.check else 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
@@ -0,0 +1,437 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+連結與錨點檢查（Markdown 與 HTML，平行處理、以邊為單位快取結果）
+
+- 收集 doc/ 下所有 Markdown / HTML 文件與網站根目錄的 *.html 頁面中的連結：
+  Markdown 的 [文字](目標)、參考式定義，以及文件內 HTML 標籤的 href/src（略過程式碼）；
+- 錨點：Markdown 為標題 slug（與 GitHub 相同，含中文與 emoji 開頭的標題）加上 HTML 的 id/name，
+  HTML 頁面為 id/name 屬性；
+- 相對路徑以來源文件所在目錄解析，以 / 開頭的路徑以網站根目錄解析；目標先做 URL 解碼，
+  找不到時再以 Unicode 正規化（NFC、去掉 emoji 變體選擇符 U+FE0F）比對，
+  以便對 emoji 開頭的報告檔名提供「是否指的是…」的建議；
+- 文件解析依 (大小, mtime) → 內容雜湊快取；每條連結（邊）的檢查結果以
+  (來源雜湊, 連結目標, 目標雜湊) 為鍵快取，小幅修改後只重新檢查變動的邊；
+  解析與未命中快取的檢查都分配到行程池執行。
+
+VERIFY-COMPLETION.py 與 doc_pipeline.py 的 verify 階段以 DocTreeChecker 檢查單一文件樹
+（以 / 開頭的連結視為外部連結、走出文件樹的目標只檢查存在性），解析、快取與判斷規則都在這裡，
+文件樹的快取一樣是 <文件樹>/.link_cache.json。
+
+用法：
+    python link_checker.py [--site .] [-j 8] [--report report.json] [--json] [--no-cache]
+
+結束碼（可組合）：0 全部通過、1 有失效連結、2 有失效錨點。
+"""
+
+import argparse
+import json
+import os
+import posixpath
+import re
+import sys
+import time
+import unicodedata
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import unquote
+
+import doc_fs
+from doc_io import atomic_write_text, content_hash
+from md_tokenizer import iter_headings, iter_links
+from rename_engine import DEFAULT_EXCLUDE, is_external, split_target
+
+SITE_ROOT = Path(__file__).parent
+DOC_DIR = 'doc'
+CACHE_NAME = '.link_cache.json'
+CACHE_VERSION = 2
+PARSED_SUFFIXES = ('.md', '.html')
+CHECK_CHUNK = 2000  # 每個工作行程一次檢查的連結數
+
+EXIT_BROKEN_LINKS = 1
+EXIT_BROKEN_ANCHORS = 2
+
+_HTML_LINK = re.compile(r'''<(?:a|img|link|script|iframe|source)\b[^<>]*?\s(?:href|src)\s*=\s*(["'])(.*?)\1''',
+                        re.IGNORECASE | re.DOTALL)
+_HTML_ANCHOR = re.compile(r'''<[A-Za-z][^<>]*?\s(?:id|name)\s*=\s*(["'])([^"'<>]+)\1''', re.DOTALL)
+# Markdown 中不掃描 HTML 的部分：圍欄程式碼區塊與行內程式碼（以同樣行數的空白取代以保留行號）
+_MD_CODE = re.compile(r'^[ ]{0,3}(`{3,}|~{3,})[^\n]*\n[\s\S]*?^[ ]{0,3}\1[`~]*[ \t]*$|(`+)[^`\n]+\2',
+                      re.MULTILINE)
+# HTML 中不掃描的部分：<script>、<style> 與註解（模板字串中的 href="${...}" 不是實際連結）
+_HTML_SKIP = re.compile(r'<script\b[\s\S]*?</script\s*>|<style\b[\s\S]*?</style\s*>|<!--[\s\S]*?-->',
+                        re.IGNORECASE)
+_DYNAMIC = re.compile(r'\$\{|\{\{|javascript:', re.IGNORECASE)
+
+
+def _blank(m: 're.Match') -> str:
+    return re.sub(r'[^\n]', ' ', m.group())
+
+
+def _line_of(text: str, positions: Iterable[int]) -> List[int]:
+    lines, line, pos = [], 1, 0
+    for start in positions:
+        line += text.count('\n', pos, start)
+        pos = start
+        lines.append(line)
+    return lines
+
+
+def parse_markdown(text: str) -> dict:
+    """回傳 {'anchors': [錨點], 'links': [(行號, 目標)]}"""
+    found = [(start, target) for start, _end, target in iter_links(text)]
+    html = _MD_CODE.sub(_blank, text)
+    found.extend((m.start(2), m.group(2)) for m in _HTML_LINK.finditer(html))
+    found.sort()
+    lines = _line_of(text, (start for start, _ in found))
+    anchors = {slug for _line, _level, _title, slug in iter_headings(text)}
+    anchors.update(m.group(2) for m in _HTML_ANCHOR.finditer(html))
+    return {'anchors': sorted(anchors), 'links': [(line, target) for line, (_, target) in zip(lines, found)]}
+
+
+def parse_html(text: str) -> dict:
+    """回傳 {'anchors': [id/name], 'links': [(行號, 目標)]}"""
+    text = _HTML_SKIP.sub(_blank, text)
+    found = [(m.start(2), m.group(2)) for m in _HTML_LINK.finditer(text)]
+    lines = _line_of(text, (start for start, _ in found))
+    # 依 HTML 規範，沒有對應元素的 #top 會捲動到頁首
+    anchors = sorted({m.group(2) for m in _HTML_ANCHOR.finditer(text)} | {'top'})
+    return {'anchors': anchors, 'links': [(line, target) for line, (_, target) in zip(lines, found)]}
+
+
+def parse_document(rel: str, text: str) -> dict:
+    return parse_html(text) if rel.endswith('.html') else parse_markdown(text)
+
+
+def resolve_target(source_rel: str, target: str, site_absolute: bool = False) -> Optional[tuple]:
+    """連結目標 → (目標相對路徑, 錨點)；外部連結、動態產生的連結回傳 None
+
+    site_absolute 為 True 時，以 / 開頭的路徑視為相對於根目錄（網站頁面）；
+    否則與 rename_engine 相同，視為外部連結略過。
+    """
+    target = target.strip()
+    if not target or _DYNAMIC.search(target):
+        return None
+    path_part, fragment = split_target(target)
+    if is_external(target) and path_part:
+        if not (site_absolute and path_part.startswith('/') and not path_part.startswith('//')):
+            return None
+    anchor = unquote(fragment[1:])
+    if not path_part:
+        return source_rel, anchor
+    path_part = unquote(path_part.split('?', 1)[0])
+    if path_part.startswith('/'):
+        target_rel = posixpath.normpath(path_part.lstrip('/') or '.')
+    else:
+        target_rel = posixpath.normpath(posixpath.join(posixpath.dirname(source_rel), path_part))
+    return ('' if target_rel == '.' else target_rel), anchor
+
+
+def check_link(target_rel: str, anchor: str, exists: Callable[[str], bool],
+               anchors_of: Callable[[str], Optional[Iterable[str]]]) -> Optional[str]:
+    """單一連結：None 表示有效，'link' 表示目標不存在，'anchor' 表示錨點不存在
+
+    anchors_of 回傳目標的錨點集合；目標不是可解析的文件時回傳 None（只檢查存在性）。
+    """
+    if not exists(target_rel):
+        return 'link'
+    if not anchor:
+        return None
+    anchors = anchors_of(target_rel)
+    if anchors is None or anchor in anchors or anchor.lower() in anchors:
+        return None
+    return 'anchor'
+
+
+def _normalize_name(rel: str) -> str:
+    return unicodedata.normalize('NFC', rel).replace('\ufe0f', '')
+
+
+# ---- 文件樹 ----
+
+def walk_site(site: Path, exclude_patterns=DEFAULT_EXCLUDE) -> tuple:
+    """回傳 ({要解析的文件相對路徑: stat}, {所有檔案與目錄的相對路徑})
+
+    範圍：doc/ 整個目錄樹與網站根目錄的 *.html；根目錄其他檔案只列入存在清單。
+    """
+    documents = {}
+    existing = {''}
+    with os.scandir(site) as it:
+        for entry in it:
+            existing.add(entry.name)
+            if entry.is_file() and entry.name.endswith('.html'):
+                documents[entry.name] = entry.stat()
+    stack = [DOC_DIR] if (site / DOC_DIR).is_dir() else []
+    while stack:
+        rel_dir = stack.pop()
+        with os.scandir(site / rel_dir) as it:
+            for entry in it:
+                rel = f'{rel_dir}/{entry.name}'
+                if entry.is_dir(follow_symlinks=False):
+                    if entry.name.startswith('.') or entry.name == '__pycache__' \
+                            or any(p in entry.name for p in exclude_patterns):
+                        continue
+                    existing.add(rel)
+                    stack.append(rel)
+                else:
+                    existing.add(rel)
+                    if entry.name.endswith(PARSED_SUFFIXES):
+                        documents[rel] = entry.stat()
+    return documents, existing
+
+
+def walk_tree(root: Path, exclude_patterns=DEFAULT_EXCLUDE, io: doc_fs.FileIO = None) -> tuple:
+    """單一文件樹的走訪：回傳 ({Markdown 相對路徑: stat}, {所有檔案與目錄的相對路徑})
+
+    以 doc_fs 在同一層目錄平行列出，適用於網路磁碟。
+    """
+    def skip_dir(name: str) -> bool:
+        return name.startswith('.') or any(p in name for p in exclude_patterns)
+
+    if io is None:
+        with doc_fs.FileIO() as io:
+            return walk_tree(root, exclude_patterns, io)
+    files, dirs = io.walk(root, skip_dir, stat_suffix='.md')
+    md_files = {rel: st for rel, st in files.items() if rel.endswith('.md')}
+    return md_files, {''} | dirs | set(files)
+
+
+def _parse_worker(args: tuple) -> tuple:
+    site, rel, cached_hash = args
+    data = (site / rel).read_bytes()
+    digest = content_hash(data)
+    if digest == cached_hash:
+        return rel, digest, None
+    return rel, digest, parse_document(rel, data.decode('utf-8', errors='ignore'))
+
+
+def _check_worker(edges: List[tuple], existing: set, anchors: Dict[str, list]) -> List[Optional[str]]:
+    """工作行程：檢查一批 (目標相對路徑, 錨點)"""
+    anchor_sets = {rel: set(values) for rel, values in anchors.items()}
+    return [check_link(target_rel, anchor, existing.__contains__, anchor_sets.get)
+            for target_rel, anchor in edges]
+
+
+class LinkChecker:
+    """檢查網站與文件樹中的所有連結；結果快取在 <site>/.link_cache.json"""
+
+    # 以 / 開頭的路徑是否以根目錄解析（網站頁面）；否則視為外部連結
+    site_absolute = True
+
+    def __init__(self, site=SITE_ROOT, cache_path=None):
+        self.site = Path(os.path.normpath(Path(site).resolve()))
+        self.cache_path = Path(cache_path) if cache_path else self.site / CACHE_NAME
+        self._outside: Dict[str, bool] = {}
+
+    def _load_cache(self) -> tuple:
+        try:
+            data = json.loads(self.cache_path.read_text(encoding='utf-8'))
+        except (FileNotFoundError, ValueError):
+            return {}, {}
+        if data.get('version') != CACHE_VERSION:
+            return {}, {}
+        return data.get('files', {}), data.get('edges', {})
+
+    def _save_cache(self, files: dict, edges: dict) -> None:
+        atomic_write_text(self.cache_path, json.dumps(
+            {'version': CACHE_VERSION, 'files': files, 'edges': edges},
+            ensure_ascii=False, separators=(',', ':')))
+
+    def walk(self) -> tuple:
+        return walk_site(self.site)
+
+    def _parse(self, documents: dict, cache: dict, jobs: int) -> Tuple[dict, int]:
+        parsed, todo = {}, []
+        for rel, st in documents.items():
+            entry = cache.get(rel)
+            if entry and entry.get('size') == st.st_size and entry.get('mtime_ns') == st.st_mtime_ns:
+                parsed[rel] = entry
+            else:
+                todo.append((self.site, rel, entry['hash'] if entry else None))
+        count = 0
+        if todo:
+            if jobs > 1 and len(todo) > 1:
+                with ProcessPoolExecutor(max_workers=jobs) as pool:
+                    outputs = list(pool.map(_parse_worker, todo,
+                                            chunksize=max(1, len(todo) // (jobs * 4))))
+            else:
+                outputs = [_parse_worker(item) for item in todo]
+            for rel, digest, info in outputs:
+                st = documents[rel]
+                if info is None:
+                    info = {'anchors': cache[rel]['anchors'], 'links': cache[rel]['links']}
+                else:
+                    count += 1
+                parsed[rel] = dict(info, hash=digest, size=st.st_size, mtime_ns=st.st_mtime_ns)
+        return parsed, count
+
+    def _outside_exists(self, rel: str) -> bool:
+        # doc/ 與根目錄以外的目標（例如 ../../readme.md 以外的路徑）只檢查實際存在性
+        return not rel.startswith('../') and '/' in rel \
+            and not rel.startswith(DOC_DIR + '/') and (self.site / rel).exists()
+
+    def _exists(self, rel: str, existing: set) -> bool:
+        if rel in existing:
+            return True
+        if rel not in self._outside:
+            self._outside[rel] = self._outside_exists(rel)
+        return self._outside[rel]
+
+    def check(self, jobs: int = None, use_cache: bool = True,
+              documents: dict = None, existing: set = None) -> dict:
+        """走訪、解析並檢查所有連結；documents/existing 為已走訪的結果時不再走訪"""
+        start = time.perf_counter()
+        jobs = jobs or os.cpu_count() or 1
+        if documents is None:
+            documents, existing = self.walk()
+        file_cache, edge_cache = self._load_cache() if use_cache else ({}, {})
+        parsed, reparsed = self._parse(documents, file_cache, jobs)
+        report, new_edges = self._check(parsed, existing, jobs, edge_cache)
+        if use_cache and (parsed != file_cache or new_edges != edge_cache):
+            self._save_cache(parsed, new_edges)
+        report.update(reparsed=reparsed, seconds=round(time.perf_counter() - start, 3))
+        return report
+
+    def check_parsed(self, parsed: dict, existing: set, jobs: int = 1) -> dict:
+        """檢查已解析的文件（{相對路徑: parse_document 的結果}），不讀寫快取"""
+        return self._check(parsed, existing, jobs, {})[0]
+
+    def _check(self, parsed: dict, existing: set, jobs: int, edge_cache: dict) -> tuple:
+        # 每條邊的狀態：目標是已解析文件時為其內容雜湊，否則為存在與否；
+        # 沒有雜湊的文件（check_parsed）以路徑代替，只用於同一次檢查中去除重複
+        edges, pending = [], []
+        new_edges: Dict[str, Optional[str]] = {}
+        external = 0
+        for rel in sorted(parsed):
+            info = parsed[rel]
+            for line, target in info['links']:
+                resolved = resolve_target(rel, target, site_absolute=self.site_absolute)
+                if resolved is None:
+                    external += 1
+                    continue
+                target_rel, anchor = resolved
+                exists = self._exists(target_rel, existing)
+                state = parsed[target_rel].get('hash', target_rel) if target_rel in parsed \
+                    else ('+' if exists else '-')
+                key = f"{info.get('hash', rel)}\t{target}\t{state}"
+                edges.append((rel, line, target, target_rel, anchor, key))
+                if key in new_edges:
+                    continue
+                if key in edge_cache:
+                    new_edges[key] = edge_cache[key]
+                else:
+                    new_edges[key] = None
+                    pending.append((key, target_rel, anchor, exists))
+
+        # 未命中快取的邊：不存在的目標不需檢查錨點，其餘分批交給工作行程
+        results: Dict[str, Optional[str]] = {}
+        work = []
+        for key, target_rel, anchor, exists in pending:
+            if not exists:
+                results[key] = 'link'
+            else:
+                work.append((key, target_rel, anchor))
+        if work:
+            chunks = [work[i:i + CHECK_CHUNK] for i in range(0, len(work), CHECK_CHUNK)]
+            payloads = []
+            for chunk in chunks:
+                # 只傳送這一批用到的目標與錨點，避免每個工作行程都複製整個文件樹
+                targets = {target_rel for _, target_rel, _ in chunk}
+                payloads.append(([(t, a) for _, t, a in chunk], targets,
+                                 {t: parsed[t]['anchors'] for t in targets if t in parsed}))
+            if jobs > 1 and len(chunks) > 1:
+                with ProcessPoolExecutor(max_workers=jobs) as pool:
+                    outputs = list(pool.map(_check_worker, *zip(*payloads)))
+            else:
+                outputs = [_check_worker(*payload) for payload in payloads]
+            for chunk, output in zip(chunks, outputs):
+                for (key, _, _), result in zip(chunk, output):
+                    results[key] = result
+        new_edges.update(results)
+
+        broken_links, broken_anchors = [], []
+        normalized = None
+        for rel, line, target, target_rel, anchor, key in edges:
+            result = new_edges[key]
+            if result is None:
+                continue
+            item = {'source': rel, 'line': line, 'target': target}
+            if result == 'link':
+                if normalized is None:
+                    normalized = {_normalize_name(p): p for p in existing}
+                suggestion = normalized.get(_normalize_name(target_rel))
+                if suggestion:
+                    item['suggestion'] = suggestion
+                broken_links.append(item)
+            else:
+                broken_anchors.append(item)
+
+        exit_code = (EXIT_BROKEN_LINKS if broken_links else 0) | \
+                    (EXIT_BROKEN_ANCHORS if broken_anchors else 0)
+        report = {
+            'site': str(self.site),
+            'files': len(parsed),
+            'links_checked': len(edges),
+            'external': external,
+            'edges_cached': len(edges) - sum(1 for e in edges if e[5] in results),
+            'edges_checked': len(results),
+            'broken_links': broken_links,
+            'broken_anchors': broken_anchors,
+            'exit_code': exit_code,
+        }
+        return report, new_edges
+
+
+class DocTreeChecker(LinkChecker):
+    """只檢查一個文件樹（例如 doc/鏡界）：以 / 開頭的連結視為外部連結，
+    走出文件樹（../）的目標只檢查實際存在性；快取在 <文件樹>/.link_cache.json"""
+
+    site_absolute = False
+
+    def walk(self) -> tuple:
+        return walk_tree(self.site)
+
+    def _outside_exists(self, rel: str) -> bool:
+        return rel.startswith('../') and (self.site / rel).exists()
+
+
+def print_report(report: dict, limit: int = 50) -> None:
+    print(f"🔗 檢查 {report['files']} 個文件中的 {report['links_checked']} 個連結"
+          f"（略過外部 {report['external']} 個；重新解析 {report['reparsed']} 個文件，"
+          f"重新檢查 {report['edges_checked']} 條，耗時 {report['seconds']:.2f} 秒）")
+    for key, label in (('broken_links', '失效連結'), ('broken_anchors', '失效錨點')):
+        items = report[key]
+        if not items:
+            print(f"  ✅ 沒有{label}")
+            continue
+        print(f"  ❌ {label}: {len(items)} 個")
+        for item in items[:limit]:
+            hint = f"（是否指 {item['suggestion']}？）" if item.get('suggestion') else ''
+            print(f"     {item['source']}:{item['line']} -> {item['target']}{hint}")
+        if len(items) > limit:
+            print(f"     ... 另有 {len(items) - limit} 個")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='檢查 doc/ 與網站頁面中的連結與錨點')
+    parser.add_argument('--site', default=str(SITE_ROOT), help='網站根目錄（含 doc/ 與 *.html）')
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count() or 1, help='平行處理的行程數')
+    parser.add_argument('--cache', help=f'結果快取路徑（預設 <site>/{CACHE_NAME}）')
+    parser.add_argument('--no-cache', action='store_true', help='不讀寫快取，全部重新檢查')
+    parser.add_argument('--report', help='將機器可讀的報告寫成 JSON 檔')
+    parser.add_argument('--json', action='store_true', help='以 JSON 輸出報告到標準輸出')
+    args = parser.parse_args(argv)
+
+    report = LinkChecker(args.site, args.cache).check(args.jobs, use_cache=not args.no_cache)
+    if args.report:
+        atomic_write_text(args.report, json.dumps(report, ensure_ascii=False, indent=2))
+    if args.json:
+        print(json.dumps(report, ensure_ascii=False, indent=2))
+    else:
+        print_report(report)
+    return report['exit_code']
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
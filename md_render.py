@@ -0,0 +1,272 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+輕量 Markdown → HTML 轉譯器（供靜態網站產生器使用）
+
+支援文件樹實際用到的語法：ATX 標題（id 與 md_tokenizer 的 slug 相同，錨點連結可直接對應）、
+圍欄程式碼、表格、巢狀清單、引用、分隔線、HTML 區塊，以及行內程式碼、粗體、斜體、
+刪除線、連結、圖片與自動連結。連結目標可由呼叫端改寫（例如 .md → .html）。
+"""
+
+import html
+import re
+from typing import Callable, List, Optional, Tuple
+
+from md_tokenizer import Slugger
+
+_FENCE = re.compile(r'^( {0,3})(`{3,}|~{3,})\s*([^`\s]*)')
+_HEADING = re.compile(r'^ {0,3}(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$')
+_HR = re.compile(r'^ {0,3}([-*_])(?:[ \t]*\1){2,}[ \t]*$')
+_LIST_ITEM = re.compile(r'^( *)([-*+]|\d{1,9}[.)])( +|$)(.*)$')
+_TABLE_SEP = re.compile(r'^ {0,3}\|?\s*:?-+:?\s*(?:\|\s*:?-+:?\s*)*\|?\s*$')
+_QUOTE = re.compile(r'^ {0,3}> ?(.*)$')
+_HTML_BLOCK = re.compile(r'^ {0,3}</?(?:div|details|summary|table|p|section|center|img|br|hr|!--)',
+                         re.IGNORECASE)
+
+_INLINE = re.compile(
+    r'(?P<code>`+)(?P<code_text>.+?)(?<!`)(?P=code)(?!`)'
+    r'|(?P<image>!)?\[(?P<text>(?:[^\[\]]|\[[^\]]*\])*)\]'
+    r'\((?P<target><[^>]*>|[^()\s]*(?:\([^()\s]*\)[^()\s]*)*)(?:\s+"(?P<title>[^"]*)")?\s*\)'
+    r'|<(?P<autolink>https?://[^>\s]+)>'
+    r'|(?P<url>https?://[^\s<>()\[\]`]+[^\s<>()\[\]`.,;:!?\'"])'
+    r'|(?P<tag></?[A-Za-z][A-Za-z0-9-]*(?:\s[^<>]*)?/?>|<!--.*?-->)'
+)
+_STRONG = re.compile(r'\*\*(?=\S)(.+?)(?<=\S)\*\*|__(?=\S)(.+?)(?<=\S)__')
+_EM = re.compile(r'(?<![*\w])\*(?=[^\s*])(.+?)(?<=[^\s*])\*(?![*\w])')
+_DEL = re.compile(r'~~(?=\S)(.+?)(?<=\S)~~')
+_PLACEHOLDER = re.compile('\x00(\\d+)\x00')
+
+
+class MarkdownRenderer:
+    """將 Markdown 轉成 HTML 片段；link_func 接收原連結目標並回傳 href"""
+
+    def __init__(self, link_func: Optional[Callable[[str], str]] = None):
+        self.link_func = link_func or (lambda target: target)
+        self.links: List[str] = []
+        self.headings: List[Tuple[int, str, str]] = []
+        self._slugger = Slugger()
+
+    # ---- 行內 ----
+
+    def inline(self, text: str) -> str:
+        stash: List[str] = []
+
+        def keep(fragment: str) -> str:
+            stash.append(fragment)
+            return f'\x00{len(stash) - 1}\x00'
+
+        def repl(m: 're.Match') -> str:
+            if m.group('code'):
+                return keep(f'<code>{html.escape(m.group("code_text").strip())}</code>')
+            if m.group('target') is not None:
+                target = m.group('target')
+                if target.startswith('<'):
+                    target = target[1:-1]
+                self.links.append(target)
+                href = html.escape(self.link_func(target))
+                title = f' title="{html.escape(m.group("title"))}"' if m.group('title') else ''
+                if m.group('image'):
+                    return keep(f'<img src="{href}" alt="{html.escape(m.group("text"))}"{title}>')
+                return keep(f'<a href="{href}"{title}>{self.inline(m.group("text"))}</a>')
+            url = m.group('autolink') or m.group('url')
+            if url:
+                url = html.escape(url)
+                return keep(f'<a href="{url}">{url}</a>')
+            return keep(m.group('tag'))
+
+        text = _INLINE.sub(repl, text)
+        text = html.escape(text, quote=False)
+        text = _STRONG.sub(lambda m: f'<strong>{m.group(1) or m.group(2)}</strong>', text)
+        text = _EM.sub(r'<em>\1</em>', text)
+        text = _DEL.sub(r'<del>\1</del>', text)
+        while '\x00' in text:
+            text = _PLACEHOLDER.sub(lambda m: stash[int(m.group(1))], text)
+        return text
+
+    # ---- 區塊 ----
+
+    def render(self, text: str) -> str:
+        return '\n'.join(self._blocks(text.expandtabs(4).splitlines(), tight=False)) + '\n'
+
+    def _blocks(self, lines: List[str], tight: bool) -> List[str]:
+        out: List[str] = []
+        i = 0
+        n = len(lines)
+        while i < n:
+            line = lines[i]
+            if not line.strip():
+                i += 1
+                continue
+
+            m = _FENCE.match(line)
+            if m:
+                indent, fence, lang = len(m.group(1)), m.group(2), m.group(3)
+                body = []
+                i += 1
+                while i < n:
+                    close = lines[i].strip()
+                    if close.startswith(fence) and not close.strip(fence[0]):
+                        i += 1
+                        break
+                    body.append(lines[i][indent:] if lines[i][:indent].isspace() else lines[i])
+                    i += 1
+                cls = f' class="language-{html.escape(lang)}"' if lang else ''
+                code = html.escape('\n'.join(body) + ('\n' if body else ''), quote=False)
+                out.append(f'<pre><code{cls}>{code}</code></pre>')
+                continue
+
+            m = _HEADING.match(line)
+            if m:
+                level, title = len(m.group(1)), m.group(2).strip()
+                slug = self._slugger.slug(title)
+                self.headings.append((level, title, slug))
+                out.append(f'<h{level} id="{html.escape(slug)}">{self.inline(title)}</h{level}>')
+                i += 1
+                continue
+
+            if _HR.match(line):
+                out.append('<hr>')
+                i += 1
+                continue
+
+            if line.lstrip().startswith('|') and i + 1 < n and _TABLE_SEP.match(lines[i + 1]):
+                i = self._table(lines, i, out)
+                continue
+
+            if _QUOTE.match(line):
+                quoted = []
+                while i < n and lines[i].strip() and _QUOTE.match(lines[i]):
+                    quoted.append(_QUOTE.match(lines[i]).group(1))
+                    i += 1
+                out.append('<blockquote>\n' + '\n'.join(self._blocks(quoted, False)) + '\n</blockquote>')
+                continue
+
+            m = _LIST_ITEM.match(line)
+            if m and not _HR.match(line):
+                i = self._list(lines, i, out)
+                continue
+
+            if _HTML_BLOCK.match(line):
+                while i < n and lines[i].strip():
+                    out.append(lines[i])
+                    i += 1
+                continue
+
+            para = []
+            while i < n and lines[i].strip() and not self._starts_block(lines, i):
+                para.append(lines[i].strip())
+                i += 1
+            if not para:  # 無法歸類的一行仍當作段落，避免無窮迴圈
+                para.append(lines[i].strip())
+                i += 1
+            text = self.inline('\n'.join(para))
+            out.append(text if tight else f'<p>{text}</p>')
+        return out
+
+    def _starts_block(self, lines: List[str], i: int) -> bool:
+        line = lines[i]
+        return bool(_FENCE.match(line) or _HEADING.match(line) or _HR.match(line)
+                    or _QUOTE.match(line) or _LIST_ITEM.match(line) or _HTML_BLOCK.match(line)
+                    or (line.lstrip().startswith('|') and i + 1 < len(lines)
+                        and _TABLE_SEP.match(lines[i + 1])))
+
+    @staticmethod
+    def _cells(line: str) -> List[str]:
+        line = line.strip()
+        if line.startswith('|'):
+            line = line[1:]
+        if line.endswith('|') and not line.endswith('\\|'):
+            line = line[:-1]
+        cells, current, code = [], [], False
+        for ch in line:
+            if ch == '`':
+                code = not code
+            if ch == '|' and not code and not (current and current[-1] == '\\'):
+                cells.append(''.join(current).strip())
+                current = []
+            else:
+                current.append(ch)
+        cells.append(''.join(current).strip())
+        return [c.replace('\\|', '|') for c in cells]
+
+    def _table(self, lines: List[str], i: int, out: List[str]) -> int:
+        head = self._cells(lines[i])
+        aligns = []
+        for spec in self._cells(lines[i + 1]):
+            left, right = spec.startswith(':'), spec.endswith(':')
+            aligns.append(' style="text-align:center"' if left and right else
+                          ' style="text-align:right"' if right else
+                          ' style="text-align:left"' if left else '')
+        rows = ['<table>', '<thead>', '<tr>' + ''.join(
+            f'<th{aligns[k] if k < len(aligns) else ""}>{self.inline(c)}</th>'
+            for k, c in enumerate(head)) + '</tr>', '</thead>', '<tbody>']
+        i += 2
+        while i < len(lines) and lines[i].strip() and '|' in lines[i]:
+            cells = self._cells(lines[i])
+            rows.append('<tr>' + ''.join(
+                f'<td{aligns[k] if k < len(aligns) else ""}>{self.inline(c)}</td>'
+                for k, c in enumerate(cells)) + '</tr>')
+            i += 1
+        rows.extend(['</tbody>', '</table>'])
+        out.append('\n'.join(rows))
+        return i
+
+    def _list(self, lines: List[str], i: int, out: List[str]) -> int:
+        first = _LIST_ITEM.match(lines[i])
+        base = len(first.group(1))
+        ordered = first.group(2)[0].isdigit()
+        tag = 'ol' if ordered else 'ul'
+        start = int(first.group(2)[:-1]) if ordered else 1
+        items: List[List[str]] = []
+        loose = False
+        n = len(lines)
+        while i < n:
+            m = _LIST_ITEM.match(lines[i])
+            if not m or len(m.group(1)) != base or m.group(2)[0].isdigit() != ordered \
+                    or _HR.match(lines[i]):
+                break
+            content_indent = len(m.group(1)) + len(m.group(2)) + max(1, min(len(m.group(3)), 4))
+            item = [m.group(4)]
+            i += 1
+            while i < n:
+                line = lines[i]
+                if not line.strip():
+                    # 空行之後仍縮排的內容屬於同一項目（鬆散清單）
+                    j = i
+                    while j < n and not lines[j].strip():
+                        j += 1
+                    if j < n and len(lines[j]) - len(lines[j].lstrip(' ')) > base:
+                        nxt = _LIST_ITEM.match(lines[j])
+                        if not (nxt and len(nxt.group(1)) == base):
+                            loose = True
+                            item.extend([''] * (j - i))
+                            i = j
+                            continue
+                    if j < n and _LIST_ITEM.match(lines[j]) and \
+                            len(_LIST_ITEM.match(lines[j]).group(1)) == base:
+                        loose = loose or j > i
+                    i = j
+                    break
+                indent = len(line) - len(line.lstrip(' '))
+                if indent <= base and (_LIST_ITEM.match(line) or self._starts_block(lines, i)):
+                    break
+                item.append(line[min(indent, content_indent):])
+                i += 1
+            items.append(item)
+            if i < n and not lines[i].strip():
+                break
+        start_attr = f' start="{start}"' if ordered and start != 1 else ''
+        body = [f'<{tag}{start_attr}>']
+        for item in items:
+            inner = self._blocks(item, tight=not loose)
+            body.append('<li>' + '\n'.join(inner) + '</li>')
+        body.append(f'</{tag}>')
+        out.append('\n'.join(body))
+        return i
+
+
+def render_markdown(text: str, link_func: Optional[Callable[[str], str]] = None) -> tuple:
+    """轉譯整份文件，回傳 (HTML 片段, [連結目標], [(層級, 標題, slug)])"""
+    renderer = MarkdownRenderer(link_func)
+    fragment = renderer.render(text)
+    return fragment, renderer.links, renderer.headings
@@ -0,0 +1,285 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+輕量 Markdown 解析工具
+
+- 逐行切分器：將文本切成「正文」與「非正文」片段。圍欄程式碼區塊、行內程式碼、
+  URL、連結目標與 HTML 標籤屬於非正文，其餘（含標題與表格儲存格）為正文。
+  簡繁轉換只處理正文片段，避免改壞程式碼與連結。
+- 連結掃描：列出或改寫連結目標，略過程式碼中的內容。
+- 標題解析：列出 ATX 標題並產生與 GitHub 相容的錨點 slug（含中文標題）；
+  HeadingScanner 可逐行餵入，供串流處理。
+"""
+
+import re
+import unicodedata
+from typing import Callable, List, Optional, Tuple
+
+# (是否為正文, 片段)
+Segment = Tuple[bool, str]
+
+_FENCE_OPEN = re.compile(r' {0,3}(`{3,}|~{3,})')
+_REF_DEF = re.compile(r' {0,3}\[[^\]]+\]:[ \t]*')
+
+# 行內的非正文片段
+_INLINE_SKIP = re.compile(
+    r'(`+)(?:.*?[^`])??\1(?!`)'                                  # 行內程式碼
+    r'|\]\([^()\s]*(?:\([^()\s]*\)[^()\s]*)*(?:\s+"[^"]*")?\)'  # 連結目標 ](target "title")
+    r'|<https?://[^>\s]+>'                                      # 自動連結
+    r'|https?://[^\s<>()\[\]`]+'                                # 裸 URL
+    r'|</?[A-Za-z][^<>]*>'                                      # HTML 標籤
+)
+# 可能開始一個尚未結束的行內非正文（裸 URL 以行尾的不完整前綴另外判斷）
+_INLINE_OPEN = re.compile(r'`|\](?=\(|$)|<')
+_PARTIAL_URL = re.compile(r'h(?:t(?:t(?:p(?:s?(?::/{0,2})?)?)?)?)?\Z')
+_LINE = re.compile(r'[^\n]*\n|[^\n]+')
+
+
+def split_lines(text: str) -> List[str]:
+    """只在 \n 分行並保留行尾（str.splitlines 還會在 \x0c、\x85、U+2028 等字元分行）"""
+    return _LINE.findall(text)
+
+
+class MarkdownSplitter:
+    """可跨多次呼叫保留圍欄狀態的切分器，供串流轉換逐段餵入完整行"""
+
+    def __init__(self):
+        self._fence = None  # 目前所在圍欄的 (字元, 長度)
+
+    @property
+    def in_fence(self) -> bool:
+        """目前是否位於圍欄程式碼區塊內"""
+        return self._fence is not None
+
+    def split(self, text: str, continued: bool = False) -> List[Segment]:
+        """切分文本；text 應以完整行為單位（最後一行可不含換行）
+
+        過長的行可以分段餵入：continued 為 True 代表 text 的第一行接續上一次呼叫的最後一行，
+        不再判斷圍欄與參考式定義等行首語法（切點由 inline_safe_cut 決定）。
+        """
+        segments: List[Segment] = []
+
+        def add(is_prose: bool, piece: str) -> None:
+            if not piece:
+                return
+            if segments and segments[-1][0] == is_prose:
+                segments[-1] = (is_prose, segments[-1][1] + piece)
+            else:
+                segments.append((is_prose, piece))
+
+        for line in split_lines(text):
+            line_start = not continued
+            continued = False
+            if self._fence is not None:
+                add(False, line)
+                if not line_start:
+                    continue
+                stripped = line.strip()
+                char, length = self._fence
+                if (stripped.startswith(char * length) and not stripped.strip(char)
+                        and len(line) - len(line.lstrip(' ')) <= 3):
+                    self._fence = None
+                continue
+
+            m = _FENCE_OPEN.match(line) if line_start else None
+            if m:
+                fence = m.group(1)
+                self._fence = (fence[0], len(fence))
+                add(False, line)
+                continue
+
+            m = _REF_DEF.match(line) if line_start else None
+            if m:
+                # 參考式連結定義：標籤為正文，目標與標題原樣保留
+                add(True, line[:m.end()])
+                add(False, line[m.end():])
+                continue
+
+            pos = 0
+            for m in _INLINE_SKIP.finditer(line):
+                start, end = m.span()
+                if m.group().startswith(']'):
+                    start += 1  # 保留連結文字的右括號在正文中
+                add(True, line[pos:start])
+                add(False, line[start:end])
+                pos = end
+            add(True, line[pos:])
+        return segments
+
+
+def inline_safe_cut(line: str) -> int:
+    """line 為一行的開頭部分（行尾尚未讀入）：回傳最大的切點，使切點之前的行內非正文都已完整
+
+    切點之後可能是尚未結束的行內程式碼、連結目標、HTML 標籤或裸 URL，
+    切開後再分別切分會與整行一起切分的結果不同，需與後續內容接起來再處理。
+    """
+    pos = 0
+    for m in _INLINE_SKIP.finditer(line):
+        opener = _INLINE_OPEN.search(line, pos, m.start())
+        if opener:
+            return opener.start()
+        if m.end() >= len(line):
+            return m.start()  # 延伸到行尾的片段可能還沒結束
+        pos = m.end()
+    opener = _INLINE_OPEN.search(line, pos)
+    if opener:
+        return opener.start()
+    m = _PARTIAL_URL.search(line, pos)
+    return m.start() if m else len(line)
+
+
+def split_markdown(text: str) -> List[Segment]:
+    """一次切分完整文件"""
+    return MarkdownSplitter().split(text)
+
+
+def convert_prose(segments: List[Segment], convert: Callable[[str], str]) -> Tuple[str, int]:
+    """只轉換正文片段；回傳 (結果, 略過的 UTF-8 位元組數)"""
+    out = []
+    skipped = 0
+    for is_prose, piece in segments:
+        if is_prose:
+            out.append(convert(piece))
+        else:
+            out.append(piece)
+            skipped += len(piece.encode('utf-8'))
+    return ''.join(out), skipped
+
+
+# 全文單次掃描用：圍欄區塊與行內程式碼只為了略過，連結目標與參考式定義才是目標
+_LINK_SCAN = re.compile(
+    r'^[ ]{0,3}(?P<fence>`{3,}|~{3,})[^\n]*'
+    r'(?:\n[\s\S]*?\n[ ]{0,3}(?P=fence)[`~]*[ \t]*(?=\n|\Z)|[\s\S]*\Z)'
+    r'|(?P<code>`+)(?!`)[^\n]*?(?<!`)(?P=code)(?!`)'
+    r'|\]\((?P<target><[^>\n]*>|[^()\s]*(?:\([^()\s]*\)[^()\s]*)*)'
+    r'(?:\s+(?:"[^"\n]*"|\'[^\'\n]*\'))?\s*\)'
+    r'|^[ ]{0,3}\[[^\]\n]+\]:[ \t]*(?P<ref><[^>\n]*>|\S+)',
+    re.MULTILINE,
+)
+
+
+def _link_group(m: 're.Match'):
+    for name in ('target', 'ref'):
+        if m.group(name) is not None:
+            return name
+    return None
+
+
+def iter_links(text: str):
+    """列出文件中的連結目標，產生 (起點, 終點, 目標)；略過程式碼中的內容"""
+    for m in _LINK_SCAN.finditer(text):
+        name = _link_group(m)
+        if name is None:
+            continue
+        start, end = m.span(name)
+        target = m.group(name)
+        if target.startswith('<') and target.endswith('>'):
+            start, end, target = start + 1, end - 1, target[1:-1]
+        yield start, end, target
+
+
+def rewrite_links(text: str, func: Callable[[str], str]) -> Tuple[str, int]:
+    """以單次正規表示式掃描改寫連結目標
+
+    func 接收原目標，回傳新目標；回傳 None 表示不變。
+    回傳 (新文本, 改寫的連結數)。
+    """
+    count = 0
+
+    def repl(m: 're.Match') -> str:
+        nonlocal count
+        name = _link_group(m)
+        if name is None:
+            return m.group()
+        target = m.group(name)
+        bracketed = target.startswith('<') and target.endswith('>')
+        new = func(target[1:-1] if bracketed else target)
+        if new is None:
+            return m.group()
+        count += 1
+        if bracketed:
+            new = f'<{new}>'
+        start, end = m.span(name)
+        base = m.start()
+        whole = m.group()
+        return whole[:start - base] + new + whole[end - base:]
+
+    return _LINK_SCAN.sub(repl, text), count
+
+
+_HEADING = re.compile(r'^[ ]{0,3}(#{1,6})[ \t]+(.*?)(?:[ \t]+#+)?[ \t]*$')
+_FENCE_LINE = re.compile(r'^[ ]{0,3}(`{3,}|~{3,})')
+_INLINE_LINK = re.compile(r'!?\[([^\]]*)\]\([^)]*\)')
+
+
+def heading_slug(text: str) -> str:
+    """產生與 GitHub 相容的標題錨點：轉小寫、移除標點與符號（保留中文），空白改為 '-'"""
+    text = _INLINE_LINK.sub(r'\1', text)
+    text = text.replace('`', '').replace('**', '').replace('~~', '').strip().lower()
+    kept = []
+    for ch in text:
+        if ch in ' -_':
+            kept.append('-' if ch == ' ' else ch)
+        elif unicodedata.category(ch)[0] in 'LNM':
+            kept.append(ch)
+    return ''.join(kept)
+
+
+class Slugger:
+    """同一文件內重複的標題依序加上 -1、-2 … 後綴（與 GitHub 相同）"""
+
+    def __init__(self):
+        self._seen = {}
+
+    def slug(self, text: str) -> str:
+        base = heading_slug(text)
+        count = self._seen.get(base)
+        if count is None:
+            self._seen[base] = 0
+            return base
+        count += 1
+        self._seen[base] = count
+        slug = f'{base}-{count}'
+        self._seen.setdefault(slug, 0)
+        return slug
+
+
+class HeadingScanner:
+    """逐行辨識圍欄區塊以外的 ATX 標題（規則同 iter_headings），供串流處理逐行餵入"""
+
+    def __init__(self):
+        self._fence = None
+        self.slugger = Slugger()
+
+    @property
+    def in_fence(self) -> bool:
+        """目前是否位於圍欄程式碼區塊內"""
+        return self._fence is not None
+
+    def feed(self, line: str) -> Optional[Tuple[int, str, str]]:
+        """餵入一行（可含行尾換行）；是標題時回傳 (層級, 標題文字, slug)，否則回傳 None"""
+        line = line.rstrip('\r\n')
+        m = _FENCE_LINE.match(line)
+        fence = self._fence
+        if fence is not None:
+            if m and m.group(1)[0] == fence[0] and len(m.group(1)) >= len(fence) \
+                    and not line.strip().strip(fence[0]):
+                self._fence = None
+            return None
+        if m:
+            self._fence = m.group(1)
+            return None
+        m = _HEADING.match(line)
+        if m:
+            title = m.group(2).strip()
+            return len(m.group(1)), title, self.slugger.slug(title)
+        return None
+
+
+def iter_headings(text: str):
+    """列出圍欄區塊以外的 ATX 標題，產生 (行號, 層級, 標題文字, slug)"""
+    scanner = HeadingScanner()
+    for lineno, line in enumerate(split_lines(text), 1):
+        found = scanner.feed(line)
+        if found is not None:
+            yield (lineno,) + found
@@ -0,0 +1,243 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+保守的 JS / CSS / HTML 壓縮器（供 build_assets.py 使用，不需外部套件）
+
+只做不改變語意的處理：
+    JS    移除註解與縮排、合併多餘空白；保留換行（不依賴自動分號插入的規則），
+          字串、樣板字串（含 ${...} 巢狀）與正規表示式字面值原樣保留
+    CSS   移除註解、合併空白、去掉符號兩側與區塊最後一個分號；字串原樣保留
+    HTML  移除註解（保留條件註解）、合併文字與標籤內的空白；<pre>、<textarea> 原樣保留，
+          行內 <script> / <style> 分別以 JS / CSS 規則壓縮
+"""
+
+import re
+
+# ---- JS ----
+
+_JS_IDENT = re.compile('[A-Za-z0-9_$\x80-\uffff]')
+# 其後出現的 / 是正規表示式而非除號
+_REGEX_PREFIX_CHARS = set('(,=:[!&|?{};+-*%<>~^')
+_REGEX_PREFIX_WORDS = {'return', 'typeof', 'instanceof', 'in', 'of', 'new', 'delete', 'void',
+                       'throw', 'case', 'do', 'else', 'yield', 'await'}
+# 這些符號兩側的空白可以安全移除（不含 + - / . 與引號，避免 a - -b、1 .x 之類的問題）
+_JS_TIGHT = set('{}()[];,:=<>?!&|*%^~')
+
+
+def minify_js(source: str) -> str:
+    out = []          # 目前這一行的輸出片段
+    lines = []        # 已完成的行
+    stack = []        # '{' 一般區塊；'`' 樣板字串中的 ${
+    i, n = 0, len(source)
+    pending_space = False
+    last = ''         # 最後一個輸出的非空白字元
+    last_word = ''
+
+    def emit(text: str):
+        nonlocal pending_space, last
+        if pending_space and out:
+            if not (last in _JS_TIGHT or text[0] in _JS_TIGHT):
+                out.append(' ')
+        pending_space = False
+        out.append(text)
+        last = text[-1]
+
+    def newline():
+        nonlocal pending_space, last
+        pending_space = False
+        if out:
+            line = ''.join(out)
+            # 前一行以這些符號結尾時，接續下一行不會改變自動分號插入的結果
+            if lines and lines[-1][-1] in '{;,' and line[0] not in '`':
+                lines[-1] += line
+            else:
+                lines.append(line)
+            out.clear()
+
+    def read_template(j: int) -> int:
+        """從樣板字串內容開始讀到結尾的 ` 或 ${；回傳下一個位置"""
+        while j < n:
+            ch = source[j]
+            if ch == '\\':
+                j += 2
+                continue
+            if ch == '`':
+                return j + 1
+            if ch == '$' and source.startswith('${', j):
+                stack.append('`')
+                return j + 2
+            j += 1
+        return j
+
+    while i < n:
+        ch = source[i]
+        if ch in ' \t\r\f\v':
+            pending_space = True
+            i += 1
+            continue
+        if ch == '\n':
+            newline()
+            i += 1
+            continue
+        if ch == '/' and source.startswith('//', i):
+            j = source.find('\n', i)
+            i = n if j < 0 else j
+            continue
+        if ch == '/' and source.startswith('/*', i):
+            j = source.find('*/', i + 2)
+            comment = source[i:n if j < 0 else j + 2]
+            i = n if j < 0 else j + 2
+            if '\n' in comment:
+                newline()
+            else:
+                pending_space = True
+            continue
+        if ch in '"\'':
+            j = i + 1
+            while j < n and source[j] != ch and source[j] != '\n':
+                j += 2 if source[j] == '\\' else 1
+            emit(source[i:j + 1])
+            last_word = ''
+            i = j + 1
+            continue
+        if ch == '`':
+            j = read_template(i + 1)
+            emit(source[i:j])
+            last_word = ''
+            i = j
+            continue
+        if ch == '}' and stack and stack[-1] == '`':
+            stack.pop()
+            j = read_template(i + 1)
+            emit(source[i:j])
+            i = j
+            continue
+        if ch == '/' and (not last or last in _REGEX_PREFIX_CHARS or last_word in _REGEX_PREFIX_WORDS):
+            j, in_class = i + 1, False
+            while j < n and source[j] != '\n':
+                c = source[j]
+                if c == '\\':
+                    j += 2
+                    continue
+                if c == '[':
+                    in_class = True
+                elif c == ']':
+                    in_class = False
+                elif c == '/' and not in_class:
+                    break
+                j += 1
+            j += 1
+            while j < n and source[j].isalpha():
+                j += 1
+            emit(source[i:j])
+            last_word = ''
+            i = j
+            continue
+        if _JS_IDENT.match(ch):
+            j = i + 1
+            while j < n and _JS_IDENT.match(source[j]):
+                j += 1
+            word = source[i:j]
+            emit(word)
+            last_word = word
+            i = j
+            continue
+        if ch == '{':
+            stack.append('{')
+        elif ch == '}' and stack:
+            stack.pop()
+        emit(ch)
+        last_word = ''
+        i += 1
+    newline()
+    return '\n'.join(lines) + ('\n' if lines else '')
+
+
+# ---- CSS ----
+
+_CSS_TIGHT_AFTER = set('{};,:>')
+_CSS_TIGHT_BEFORE = set('{};,>)!')
+
+
+def minify_css(source: str) -> str:
+    out = []
+    i, n = 0, len(source)
+    pending_space = False
+    while i < n:
+        ch = source[i]
+        if ch.isspace():
+            pending_space = True
+            i += 1
+            continue
+        if source.startswith('/*', i):
+            j = source.find('*/', i + 2)
+            i = n if j < 0 else j + 2
+            pending_space = True
+            continue
+        if pending_space and out and out[-1][-1] not in _CSS_TIGHT_AFTER and ch not in _CSS_TIGHT_BEFORE:
+            out.append(' ')
+        pending_space = False
+        if ch in '"\'':
+            j = i + 1
+            while j < n and source[j] != ch:
+                j += 2 if source[j] == '\\' else 1
+            out.append(source[i:j + 1])
+            i = j + 1
+            continue
+        if ch == '}' and out and out[-1] == ';':
+            out.pop()
+        out.append(ch)
+        i += 1
+    return ''.join(out)
+
+
+# ---- HTML ----
+
+_HTML_TOKEN = re.compile(
+    r'(?P<comment><!--.*?-->)'
+    r'|(?P<raw><(?P<raw_tag>pre|textarea)\b[^>]*>.*?</(?P=raw_tag)\s*>)'
+    r'|(?P<script><script\b(?P<script_attrs>(?:"[^"]*"|\'[^\']*\'|[^\'">])*)>)(?P<script_body>.*?)(?P<script_end></script\s*>)'
+    r'|(?P<style><style\b(?:"[^"]*"|\'[^\']*\'|[^\'">])*>)(?P<style_body>.*?)(?P<style_end></style\s*>)'
+    r'|(?P<tag><[!/]?[A-Za-z](?:"[^"]*"|\'[^\']*\'|[^\'">])*>)',
+    re.DOTALL | re.IGNORECASE)
+_JS_TYPES = re.compile(r'\btype\s*=\s*["\']?(?:text/javascript|module|application/javascript)["\']?', re.I)
+_TAG_PARTS = re.compile(r'("[^"]*"|\'[^\']*\')|\s+')
+
+
+def _collapse_text(text: str) -> str:
+    return re.sub(r'\s+', lambda m: '\n' if '\n' in m.group() else ' ', text)
+
+
+def _collapse_tag(tag: str) -> str:
+    tag = _TAG_PARTS.sub(lambda m: m.group(1) or ' ', tag)
+    return tag.replace(' >', '>').replace(' />', '/>')
+
+
+def minify_html(source: str) -> str:
+    out = []
+    pos = 0
+    for m in _HTML_TOKEN.finditer(source):
+        out.append(_collapse_text(source[pos:m.start()]))
+        pos = m.end()
+        if m.group('comment'):
+            comment = m.group('comment')
+            if comment.startswith('<!--[if') or comment.startswith('<![endif'):
+                out.append(comment)
+        elif m.group('raw'):
+            out.append(m.group('raw'))
+        elif m.group('script'):
+            attrs = m.group('script_attrs')
+            body = m.group('script_body')
+            if body.strip() and ('type' not in attrs.lower() or _JS_TYPES.search(attrs)):
+                body = minify_js(body)
+            out.append(_collapse_tag(m.group('script')) + body + m.group('script_end'))
+        elif m.group('style'):
+            out.append(_collapse_tag(m.group('style')) + minify_css(m.group('style_body'))
+                       + m.group('style_end'))
+        else:
+            out.append(_collapse_tag(m.group('tag')))
+    out.append(_collapse_text(source[pos:]))
+    return ''.join(out).strip() + '\n'
+
+
+MINIFIERS = {'.js': minify_js, '.css': minify_css, '.html': minify_html}
@@ -0,0 +1,441 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+全域重命名引擎：重命名文件並修正整個文件樹中指向它們的連結
+
+流程：
+  1. 掃描一次文件樹，建立「目標文件 -> 連結來源」的反向索引；
+  2. 只讀取含有受影響連結的文件，以單次正規表示式掃描改寫連結；
+  3. 規劃移動順序：鏈狀重命名（a->b、b->c）先移動下游，循環（a->b、b->a）經由暫存檔名；
+  4. 將整個計畫寫入預寫日誌（<root>/.rename_journal/），逐步執行並記錄；
+     中斷後可 --resume 從未完成的步驟繼續，或 --rollback 還原已完成的步驟。
+
+用法：
+    python rename_engine.py --root doc/鏡界 --map renames.json [--dry-run]
+    python rename_engine.py --root doc/鏡界 --resume
+    python rename_engine.py --root doc/鏡界 --rollback
+
+renames.json 為 {"舊相對路徑": "新相對路徑", ...}。
+"""
+
+import argparse
+import json
+import os
+import shutil
+import sys
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+from urllib.parse import quote, unquote
+
+import doc_fs
+import doc_metrics
+from doc_io import atomic_write_bytes, content_hash
+from md_tokenizer import iter_links, rewrite_links
+
+DEFAULT_EXCLUDE = ('_backup_legacy',)
+JOURNAL_DIR = '.rename_journal'
+
+
+def split_target(target: str):
+    """將連結目標拆成 (路徑, 錨點片段)；片段含 '#'"""
+    path, sep, fragment = target.partition('#')
+    return path, sep + fragment
+
+
+def is_external(target: str) -> bool:
+    path = split_target(target)[0]
+    return not path or '://' in path or path.startswith(('mailto:', 'tel:', 'data:', '/'))
+
+
+def resolve_link(source: Path, target: str) -> Optional[Path]:
+    """將相對連結解析成絕對路徑；外部連結與純錨點回傳 None"""
+    if is_external(target):
+        return None
+    path = split_target(target)[0].split('?', 1)[0]
+    return Path(os.path.normpath(source.parent / unquote(path)))
+
+
+def relative_link(source: Path, target: Path, original: str) -> str:
+    """產生從 source 指向 target 的相對連結，沿用原連結的編碼方式、查詢字串與錨點"""
+    rel = Path(os.path.relpath(target, source.parent)).as_posix()
+    path, fragment = split_target(original)
+    path, sep, query = path.partition('?')
+    if '%' in path:
+        rel = quote(rel, safe='/()')
+    elif path.startswith('./') and not rel.startswith('../'):
+        rel = './' + rel
+    return rel + sep + query + fragment
+
+
+class LinkIndex:
+    """文件樹的連結反向索引"""
+
+    def __init__(self, root):
+        self.root = Path(os.path.normpath(Path(root).resolve()))
+        self.files: Set[Path] = set()
+        self.inbound: Dict[Path, Set[Path]] = defaultdict(set)
+
+    def add_file(self, path: Path, text: str) -> None:
+        self.files.add(path)
+        for _start, _end, target in iter_links(text):
+            resolved = resolve_link(path, target)
+            if resolved is not None:
+                self.inbound[resolved].add(path)
+
+    def sources_linking_to(self, targets: Iterable[Path]) -> Set[Path]:
+        sources: Set[Path] = set()
+        for target in targets:
+            sources |= self.inbound.get(target, set())
+        return sources
+
+
+def build_link_index(root, exclude_patterns=DEFAULT_EXCLUDE) -> LinkIndex:
+    """掃描一次文件樹（*.md），建立連結反向索引"""
+    index = LinkIndex(root)
+    for dirpath, dirnames, filenames in os.walk(index.root):
+        dirnames[:] = [d for d in dirnames
+                       if not d.startswith('.') and not any(p in d for p in exclude_patterns)]
+        for name in filenames:
+            if not name.endswith('.md'):
+                continue
+            path = Path(dirpath) / name
+            index.add_file(path, path.read_text(encoding='utf-8', errors='ignore'))
+    return index
+
+
+def _normalize_map(root: Path, rename_map: Dict) -> Dict[Path, Path]:
+    return {Path(os.path.normpath(root / old)): Path(os.path.normpath(root / new))
+            for old, new in rename_map.items()}
+
+
+def rewrite_for_moves(text: str, source: Path, moves: Dict[Path, Path]) -> tuple:
+    """改寫 source（目前位置）中受移動影響的連結；回傳 (新文本, 改寫數)"""
+    new_source = moves.get(source, source)
+
+    def fix(target: str):
+        resolved = resolve_link(source, target)
+        if resolved is None:
+            return None
+        new_target = moves.get(resolved, resolved)
+        if new_target == resolved and new_source == source:
+            return None
+        new = relative_link(new_source, new_target, target)
+        return None if new == target else new
+
+    return rewrite_links(text, fix)
+
+
+def plan_moves(moves: Dict[Path, Path]) -> List[Tuple[Path, Path]]:
+    """排定移動順序
+
+    目標不是其他待移動文件的項目可以直接移動；全部受阻時代表剩下的是循環，
+    先把其中一個文件移到同目錄的暫存檔名，打開循環後再繼續。
+    """
+    pending = dict(moves)
+    steps = []
+    while pending:
+        ready = sorted(src for src, dst in pending.items() if dst not in pending)
+        if ready:
+            for src in ready:
+                steps.append((src, pending.pop(src)))
+            continue
+        src = min(pending)
+        n = 0
+        while True:
+            tmp = src.with_name(f'.{src.name}.renaming-{n}')
+            if not tmp.exists() and tmp not in pending:
+                break
+            n += 1
+        steps.append((src, tmp))
+        pending[tmp] = pending.pop(src)
+    return steps
+
+
+class RenameJournal:
+    """重命名的預寫日誌
+
+    journal.jsonl 第一筆記錄是完整計畫（改寫與移動步驟），之後每完成或還原一步
+    就附加一筆記錄並 fsync。改寫步驟的原始內容與新內容另存為 <序號>.orig / <序號>.new，
+    因此中斷後不需要重新掃描文件樹即可繼續或還原。
+    """
+
+    def __init__(self, root):
+        self.root = Path(root)
+        self.dir = self.root / JOURNAL_DIR
+        self.log_path = self.dir / 'journal.jsonl'
+
+    def exists(self) -> bool:
+        return self.log_path.exists()
+
+    def _rel(self, path: Path) -> str:
+        return Path(os.path.relpath(path, self.root)).as_posix()
+
+    def _append(self, record: dict) -> None:
+        with open(self.log_path, 'a', encoding='utf-8') as f:
+            f.write(json.dumps(record, ensure_ascii=False) + '\n')
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _write_blob(self, name: str, data: bytes) -> None:
+        with open(self.dir / name, 'wb') as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+
+    def begin(self, rewrites: List[tuple], moves: List[Tuple[Path, Path]]) -> None:
+        """寫入計畫；rewrites 為 [(路徑, 原內容, 新內容)]，moves 為排好順序的 [(來源, 目標)]"""
+        self.dir.mkdir(exist_ok=True)
+        steps = []
+        for path, before, after in rewrites:
+            i = len(steps)
+            self._write_blob(f'{i}.orig', before)
+            self._write_blob(f'{i}.new', after)
+            steps.append({'op': 'rewrite', 'path': self._rel(path),
+                          'before': content_hash(before), 'after': content_hash(after)})
+        for src, dst in moves:
+            steps.append({'op': 'move', 'src': self._rel(src), 'dst': self._rel(dst)})
+        self._append({'plan': steps})
+
+    def load(self) -> tuple:
+        """回傳 (步驟, 已完成序號, 已還原序號, 是否正在還原)"""
+        steps, done, undone, rolling_back = None, set(), set(), False
+        with open(self.log_path, encoding='utf-8') as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break  # 寫到一半中斷的最後一筆
+                if 'plan' in record:
+                    steps = record['plan']
+                elif 'done' in record:
+                    done.add(record['done'])
+                elif 'undone' in record:
+                    undone.add(record['undone'])
+                elif record.get('rollback'):
+                    rolling_back = True
+        if steps is None:
+            raise ValueError(f'重命名日誌沒有計畫記錄: {self.log_path}')
+        return steps, done, undone, rolling_back
+
+    def mark(self, key: str, i: int) -> None:
+        self._append({key: i})
+
+    def start_rollback(self) -> None:
+        self._append({'rollback': True})
+
+    def blob(self, name: str) -> bytes:
+        return (self.dir / name).read_bytes()
+
+    def clear(self) -> None:
+        shutil.rmtree(self.dir, ignore_errors=True)
+
+
+def _file_hash(path: Path) -> Optional[str]:
+    try:
+        return content_hash(path.read_bytes())
+    except FileNotFoundError:
+        return None
+
+
+def _step_applied(root: Path, step: dict) -> bool:
+    """依檔案狀態判斷步驟是否已執行
+
+    只對「已記錄完成的步驟」與緊接其後的一步（可能已執行但尚未記錄）有意義；
+    更後面的步驟所依賴的前置狀態尚未建立，不能以檔案狀態推斷。
+    """
+    if step['op'] == 'move':
+        return not (root / step['src']).exists() and (root / step['dst']).exists()
+    return _file_hash(root / step['path']) == step['after']
+
+
+def _do_step(root: Path, journal: RenameJournal, i: int, step: dict) -> None:
+    if step['op'] == 'move':
+        dst = root / step['dst']
+        dst.parent.mkdir(parents=True, exist_ok=True)
+        os.rename(root / step['src'], dst)
+    else:
+        atomic_write_bytes(root / step['path'], journal.blob(f'{i}.new'))
+
+
+def _undo_step(root: Path, journal: RenameJournal, i: int, step: dict) -> None:
+    if step['op'] == 'move':
+        os.rename(root / step['dst'], root / step['src'])
+    else:
+        atomic_write_bytes(root / step['path'], journal.blob(f'{i}.orig'))
+
+
+def _first_pending(steps: list, done: set) -> Optional[int]:
+    """第一個未記錄完成的步驟：中斷時可能已執行但尚未寫入日誌"""
+    return next((i for i in range(len(steps)) if i not in done), None)
+
+
+def resume_renames(root) -> int:
+    """從日誌中第一個未完成的步驟繼續；回傳本次執行的步驟數"""
+    root = Path(os.path.normpath(Path(root).resolve()))
+    journal = RenameJournal(root)
+    steps, done, _undone, rolling_back = journal.load()
+    if rolling_back:
+        raise RuntimeError('日誌已開始還原，請以 --rollback 完成還原')
+    window = _first_pending(steps, done)
+    executed = 0
+    for i, step in enumerate(steps):
+        if i in done:
+            continue
+        if i != window or not _step_applied(root, step):
+            _do_step(root, journal, i, step)
+            executed += 1
+        journal.mark('done', i)
+    journal.clear()
+    return executed
+
+
+def rollback_renames(root) -> int:
+    """依相反順序還原日誌中已完成的步驟；回傳本次還原的步驟數"""
+    root = Path(os.path.normpath(Path(root).resolve()))
+    journal = RenameJournal(root)
+    steps, done, undone, _rolling_back = journal.load()
+    window = _first_pending(steps, done)
+    journal.start_rollback()
+    reverted = 0
+    for i in reversed(range(len(steps))):
+        if i in undone:
+            continue
+        if (i in done or i == window) and _step_applied(root, steps[i]):
+            _undo_step(root, journal, i, steps[i])
+            reverted += 1
+        journal.mark('undone', i)
+    journal.clear()
+    return reverted
+
+
+def apply_renames(root, rename_map: Dict, index: LinkIndex = None,
+                  link_aliases: Dict = None, skip_existing: bool = False,
+                  dry_run: bool = False) -> dict:
+    """重命名文件並修正所有指向它們的連結
+
+    rename_map    {舊相對路徑: 新相對路徑}，相對於 root；可含鏈狀與循環重命名
+    link_aliases  只改寫連結、不移動文件的對應（例如早已不存在的舊檔名）
+    index         已建立的 LinkIndex；未提供時掃描 root 建立
+    skip_existing 目標已存在（且不是待移動的文件）時略過該項（預設視為錯誤）
+    """
+    root = Path(os.path.normpath(Path(root).resolve()))
+    journal = RenameJournal(root)
+    if journal.exists():
+        raise RuntimeError(f'發現未完成的重命名日誌 {journal.dir}，請先以 --resume 或 --rollback 處理')
+    requested = _normalize_map(root, rename_map)
+    moves = {old: new for old, new in requested.items() if old.exists() and old != new}
+    aliases = _normalize_map(root, link_aliases or {})
+    stats = {'moved': 0, 'files_rewritten': 0, 'links_rewritten': 0,
+             'missing': sorted(str(old) for old in requested if not old.exists()),
+             'skipped': [], 'temporary_moves': 0}
+
+    for old, new in list(moves.items()):
+        if new.exists() and new not in moves:
+            if not skip_existing:
+                raise FileExistsError(f'目標已存在: {new}')
+            stats['skipped'].append(str(new))
+            del moves[old]
+    if len(set(moves.values())) != len(moves):
+        raise ValueError('重命名對應中有多個文件指向同一目標')
+
+    metrics = doc_metrics.current()
+    if index is None:
+        with metrics.stage('index'):
+            index = build_link_index(root)
+        metrics.count('regex_passes', len(index.files))
+    link_moves = dict(aliases)
+    link_moves.update(moves)
+    affected = index.sources_linking_to(link_moves)
+    # 跨目錄移動的文件，自身的相對連結也要重算
+    affected |= {old for old, new in moves.items() if old.parent != new.parent}
+    stats['files_scanned'] = len(index.files)
+
+    rewrites = []
+    with metrics.stage('rewrite'):
+        for source in sorted(affected):
+            if not source.exists():
+                continue
+            start = time.perf_counter()
+            data = source.read_bytes()
+            new_text, count = rewrite_for_moves(data.decode('utf-8'), source, link_moves)
+            if count:
+                stats['files_rewritten'] += 1
+                stats['links_rewritten'] += count
+                rewrites.append((source, data, new_text.encode('utf-8')))
+            metrics.add_file(source.relative_to(root).as_posix(), time.perf_counter() - start,
+                             bytes_read=len(data), replacements=count, regex_passes=1)
+
+    steps = plan_moves(moves)
+    stats['moved'] = len(moves)
+    stats['temporary_moves'] = len(steps) - len(moves)
+    if dry_run or not (rewrites or steps):
+        return stats
+
+    # 先改寫連結（文件仍在原位置），再依序移動；每一步都先記錄計畫、完成後記錄進度
+    with metrics.stage('apply'):
+        journal.begin(rewrites, steps)
+        resume_renames(root)
+    metrics.count('bytes_written', sum(len(new) for _, _, new in rewrites))
+    metrics.count('files_moved', len(moves))
+    return stats
+
+
+def print_stats(stats: dict) -> None:
+    for path in stats['missing']:
+        print(f"⚠️ 文件不存在: {path}")
+    for path in stats['skipped']:
+        print(f"⏭️ 目標已存在，略過: {path}")
+    print(f"📊 掃描 {stats['files_scanned']} 個文件，改寫 {stats['files_rewritten']} 個文件中的"
+          f" {stats['links_rewritten']} 個連結，移動 {stats['moved']} 個文件")
+    if stats.get('temporary_moves'):
+        print(f"🔁 為解開循環重命名使用了 {stats['temporary_moves']} 次暫存檔名")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='重命名文件並修正整個文件樹中的連結')
+    parser.add_argument('--root', default=str(doc_fs.BOOK_ROOT),
+                        help='文件樹根目錄')
+    action = parser.add_mutually_exclusive_group(required=True)
+    action.add_argument('--map', help='重命名對應 JSON 檔 {舊路徑: 新路徑}')
+    action.add_argument('--resume', action='store_true', help='從重命名日誌中未完成的步驟繼續')
+    action.add_argument('--rollback', action='store_true', help='依重命名日誌還原已完成的步驟')
+    parser.add_argument('--skip-existing', action='store_true', help='目標已存在時略過該項')
+    parser.add_argument('--dry-run', action='store_true', help='只計算，不寫入也不移動')
+    parser.add_argument('--index', action='store_true',
+                        help='以持久化的 corpus_index 查詢連結來源，不重新掃描整個文件樹')
+    doc_metrics.add_arguments(parser)
+    args = parser.parse_args(argv)
+
+    if args.resume or args.rollback:
+        if not RenameJournal(args.root).exists():
+            print(f"⚠️ 找不到重命名日誌: {Path(args.root) / JOURNAL_DIR}")
+            return 1
+        if args.resume:
+            print(f"✅ 已繼續完成重命名（執行 {resume_renames(args.root)} 個步驟）")
+        else:
+            print(f"↩️ 已還原重命名（還原 {rollback_renames(args.root)} 個步驟）")
+        return 0
+
+    rename_map = json.loads(Path(args.map).read_text(encoding='utf-8'))
+    with doc_metrics.session('rename_engine', args) as metrics:
+        index = None
+        if args.index:
+            from corpus_index import CorpusIndex
+            with metrics.stage('index'):
+                index = CorpusIndex(args.root)
+                index.refresh()
+        try:
+            stats = apply_renames(args.root, rename_map, index=index,
+                                  skip_existing=args.skip_existing, dry_run=args.dry_run)
+        finally:
+            if index is not None:
+                index.close()
+    print_stats(stats)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
@@ -2,6 +2,7 @@
 document.addEventListener('DOMContentLoaded', function() {
     initRouter();
     initAuthSystem();
+    initDocSearch();
 
     // Smooth scrolling for anchor links
     document.querySelectorAll('a[href^="#"]').forEach(anchor => {
@@ -475,6 +476,219 @@ function debounce(func, wait) {
     };
 }
 
+// Documentation full-text search
+// 索引由 build_search_index.py 產生：meta.json + 依詞條分片的 JSON，查詢時只載入需要的分片
+const DOC_SEARCH_TOKEN = /[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+|[0-9a-z]+/g;
+const DOC_SEARCH_CJK = /^[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]/;
+
+class DocSearch {
+    constructor(indexUrl) {
+        this.indexUrl = new URL(indexUrl, document.baseURI);
+        this.meta = null;
+        this.files = new Map();
+    }
+
+    // 與 build_search_index.tokenize 相同：中文二字詞、英數字單字，回傳 [詞條, 位置]
+    static tokenize(text) {
+        const tokens = [];
+        let pos = 0;
+        for (const [token] of text.toLowerCase().matchAll(DOC_SEARCH_TOKEN)) {
+            if (DOC_SEARCH_CJK.test(token) && token.length > 1) {
+                for (let i = 0; i < token.length - 1; i++) {
+                    tokens.push([token.slice(i, i + 2), pos + i]);
+                }
+                pos += token.length - 1;
+            } else {
+                tokens.push([token, pos]);
+                pos += 1;
+            }
+        }
+        return tokens;
+    }
+
+    // 排序陣列中最後一個 <= value 的索引
+    static floorIndex(sorted, value) {
+        let lo = 0, hi = sorted.length - 1, found = 0;
+        while (lo <= hi) {
+            const mid = (lo + hi) >> 1;
+            if (sorted[mid] <= value) {
+                found = mid;
+                lo = mid + 1;
+            } else {
+                hi = mid - 1;
+            }
+        }
+        return found;
+    }
+
+    static fileName(prefix, index) {
+        return `${prefix}${String(index).padStart(5, '0')}.json`;
+    }
+
+    fetchJson(name) {
+        if (!this.files.has(name)) {
+            const url = new URL(name, this.indexUrl);
+            if (this.meta) url.searchParams.set('v', this.meta.build);
+            this.files.set(name, fetch(url).then(response => {
+                if (!response.ok) throw new Error(`Failed to load ${url}: ${response.status}`);
+                return response.json();
+            }));
+        }
+        return this.files.get(name);
+    }
+
+    async loadMeta() {
+        if (!this.meta) {
+            this.meta = await this.fetchJson('meta.json');
+        }
+        return this.meta;
+    }
+
+    // 差值編碼的出現清單 → Map(文件編號 -> [位置])
+    static decode(entry, docs = new Map()) {
+        let doc = 0;
+        for (const item of entry) {
+            doc += item[0];
+            const positions = [];
+            let pos = 0;
+            for (let i = 1; i < item.length; i++) {
+                pos += item[i];
+                positions.push(pos);
+            }
+            docs.set(doc, positions);
+        }
+        return docs;
+    }
+
+    async lookup(token) {
+        const shard = DocSearch.floorIndex(this.meta.shards, token);
+        const data = await this.fetchJson(DocSearch.fileName('s', shard));
+        return data[token] || null;
+    }
+
+    // 只載入與候選文件範圍重疊的區塊
+    async loadBlocks(entry, candidates) {
+        const docs = new Map();
+        const wanted = entry.blocks.filter(([first, last]) =>
+            !candidates || [...candidates].some(doc => doc >= first && doc <= last));
+        const blocks = await Promise.all(wanted.map(([, , index]) =>
+            this.fetchJson(DocSearch.fileName('b', index))));
+        blocks.forEach(block => DocSearch.decode(block, docs));
+        return docs;
+    }
+
+    async search(query, limit = 10) {
+        const meta = await this.loadMeta();
+        const phrases = query.split(/\s+/).map(part => DocSearch.tokenize(part)).filter(p => p.length);
+        if (!phrases.length) return [];
+
+        const tokens = [...new Set(phrases.flat().map(([token]) => token))];
+        const entries = await Promise.all(tokens.map(token => this.lookup(token)));
+        if (entries.some(entry => !entry)) return [];
+
+        // 先處理最短的清單，再用候選文件縮小需要下載的區塊
+        const order = tokens.map((token, i) => ({ token, entry: entries[i] }))
+            .sort((a, b) => (Array.isArray(a.entry) ? a.entry.length : a.entry.n) -
+                            (Array.isArray(b.entry) ? b.entry.length : b.entry.n));
+        const postings = new Map();
+        let candidates = null;
+        for (const { token, entry } of order) {
+            let docs;
+            if (Array.isArray(entry)) {
+                docs = DocSearch.decode(entry);
+            } else if (candidates) {
+                docs = await this.loadBlocks(entry, candidates);
+            } else {
+                // 全部都是常見詞：只取第一個區塊的文件作為候選
+                docs = await this.loadBlocks({ blocks: entry.blocks.slice(0, 1) }, null);
+            }
+            postings.set(token, docs);
+            candidates = new Set([...(candidates || docs.keys())].filter(doc => docs.has(doc)));
+            if (!candidates.size) return [];
+        }
+
+        // 片語：同一片語的詞條必須出現在相鄰位置
+        const scored = [];
+        for (const doc of candidates) {
+            let score = 0;
+            let firstHit = Infinity;
+            for (const phrase of phrases) {
+                const [head, headOffset] = phrase[0];
+                let hits = 0;
+                for (const start of postings.get(head).get(doc)) {
+                    const base = start - headOffset;
+                    if (phrase.every(([token, offset]) =>
+                        postings.get(token).get(doc).includes(base + offset))) {
+                        hits++;
+                        firstHit = Math.min(firstHit, base);
+                    }
+                }
+                if (!hits) {
+                    score = 0;
+                    break;
+                }
+                score += hits;
+            }
+            if (score) scored.push({ doc, score, firstHit });
+        }
+        scored.sort((a, b) => b.score - a.score || a.doc - b.doc);
+        const top = scored.slice(0, limit);
+
+        const siteUrl = new URL(meta.site, this.indexUrl);
+        return Promise.all(top.map(async ({ doc, score, firstHit }) => {
+            const chunk = DocSearch.floorIndex(meta.doc_chunks, doc);
+            const docs = await this.fetchJson(DocSearch.fileName('d', chunk));
+            const [path, title, sections] = docs[doc - meta.doc_chunks[chunk]];
+            let section = null;
+            for (const candidate of sections) {
+                if (candidate[0] > firstHit) break;
+                section = candidate;
+            }
+            const url = new URL(path, siteUrl);
+            if (section) url.hash = section[1];
+            return { url: url.href, title, heading: section ? section[2] : '', score };
+        }));
+    }
+}
+
+function initDocSearch() {
+    document.querySelectorAll('input[data-doc-search]').forEach(input => {
+        const search = new DocSearch(input.dataset.docSearch);
+        const results = document.querySelector(input.dataset.docSearchResults || '[data-doc-search-results]');
+        if (!results) return;
+
+        // 索引在第一次聚焦時才載入
+        input.addEventListener('focus', () => search.loadMeta().catch(() => {}), { once: true });
+        input.addEventListener('input', debounce(async () => {
+            const query = input.value.trim();
+            results.innerHTML = '';
+            if (!query) return;
+            try {
+                const hits = await search.search(query);
+                if (input.value.trim() !== query) return;
+                if (!hits.length) {
+                    const empty = document.createElement('li');
+                    empty.className = 'text-gray-400';
+                    empty.textContent = '沒有符合的結果（中文請輸入至少兩個字）';
+                    results.appendChild(empty);
+                    return;
+                }
+                hits.forEach(hit => {
+                    const item = document.createElement('li');
+                    const link = document.createElement('a');
+                    link.href = hit.url;
+                    link.textContent = hit.heading && hit.heading !== hit.title
+                        ? `${hit.title} › ${hit.heading}` : hit.title;
+                    item.appendChild(link);
+                    results.appendChild(item);
+                });
+            } catch (error) {
+                console.error('Doc search failed:', error);
+            }
+        }, 250));
+    });
+}
+
 // Optimized Resource Loading
 class ResourceOptimizer {
     constructor() {
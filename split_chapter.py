@@ -0,0 +1,437 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+"""
+依標題與大小預算切分過大的 Markdown 文件（單次串流，不把整個文件讀入記憶體）
+
+    chN.md              → chN/chN-1-標題.md ... chN/chN-index.md，原檔改為導引頁
+    chN/chN-i-標題.md   → chN/chN-i/chN-i-1-標題.md ... chN/chN-i/chN-i-index.md，原檔改為導引頁
+
+流程：
+    1. 逐行讀入原檔，在圍欄程式碼區塊以外、層級不深於切分層級的標題處分段；
+       各段依序裝入編號的部分文件，裝入下一段會超過預算時才換下一個部分。
+       記憶體中最多保留一段；單段超過預算時直接串流寫入獨立的部分（會另外提示）
+    2. 切分層級預設自動判斷：第一個編號比原檔多一層的標題（chN.md 找「N.k」，
+       chN-i-*.md 找「N.i.k」）的層級；也可以用 --level 指定。
+       第一個切分點之前的內容（章標題、原有目錄等）放進目錄文件開頭；
+       format_chapters.py 的章節導航區塊（「## 📑 相關章節」）不是一段內容，不放進任何部分，
+       連同緊接在它前面的分隔線一起移到目錄文件與導引頁的結尾
+    3. 逐一改寫各部分的連結：文件內錨點（#slug）改為指向標題所在的部分
+       （重複標題依新文件重新編號），相對連結改為以新目錄為基準
+    4. 寫出 <前綴>-index.md（原有開頭 + 各部分與其切分層級標題的目錄），
+       原檔改寫為導引頁：連到目錄，並為每個舊錨點保留 <a id> 與指向新位置的連結，
+       其他文件指向舊檔的連結與錨點仍然有效；原有的前後章節導航保留在導引頁結尾
+
+大小預算以 UTF-8 位元組計算，含每個部分開頭的返回連結，不含結尾的前後導航。
+
+用法：
+    python split_chapter.py doc/鏡界/ch6/ch6-4-核心組件詳細實現.md [--budget 32K] [--level 4]
+    python split_chapter.py doc/ch10.md --budget 1K --dry-run
+"""
+
+import argparse
+import os
+import re
+import sys
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+from urllib.parse import unquote
+
+from doc_io import AtomicFile, atomic_write_text
+from format_chapters import is_nav_heading, is_nav_line
+from md_tokenizer import HeadingScanner, Slugger, rewrite_links
+from rename_engine import is_external, relative_link, resolve_link, split_target
+
+DEFAULT_BUDGET = 32 * 1024
+INDEX_SUFFIX = '-index.md'
+SPOOL_SUFFIX = '.part'
+NAME_LIMIT = 40
+
+_SOURCE_NAME = re.compile(r'^(ch(\d+)(?:-(\d+))?)(?:-.+)?\.md$')
+_NUMBER_PREFIX = re.compile(r'^(?:\d+(?:\.\d+)*\.?|\d\ufe0f?\u20e3)\s*')
+_BUDGET = re.compile(r'^\s*(\d+(?:\.\d+)?)\s*([KMkm]?)[Bb]?\s*$')
+_SEPARATOR = re.compile(r'^[ ]{0,3}(?:-[ \t]*){3,}$|^\s*$')
+
+
+def parse_budget(text: str) -> int:
+    """'32K'、'1.5M'、'40000' → 位元組數"""
+    m = _BUDGET.match(str(text))
+    if not m:
+        raise ValueError(f'無法解析的大小：{text}')
+    return int(float(m.group(1)) * {'': 1, 'k': 1024, 'm': 2**20}[m.group(2).lower()])
+
+
+def numbering_patterns(prefix: str) -> Tuple[Optional['re.Pattern'], Optional['re.Pattern']]:
+    """依前綴回傳 (子節編號樣式, 原檔本身編號樣式)；chN → N.k，chN-i → N.i.k"""
+    m = _SOURCE_NAME.match(prefix + '.md')
+    if not m:
+        return None, None
+    number = re.escape('.'.join(g for g in m.group(2, 3) if g))
+    return re.compile(rf'^{number}\.\d+(?:\s|$)'), re.compile(rf'^{number}\.?(?:\s|$)')
+
+
+def part_name(prefix: str, k: int, title: str) -> str:
+    """部分文件名稱：<前綴>-k-標題.md（去掉編號、只保留文字、數字與 -_）"""
+    title = _NUMBER_PREFIX.sub('', re.sub(r'[`*~]|!?\[([^\]]*)\]\([^)]*\)', r'\1', title))
+    kept = []
+    for ch in title:
+        if ch.isspace():
+            kept.append('-')
+        elif ch in '-_' or ch.isalnum():
+            kept.append(ch)
+    name = re.sub(r'-{2,}', '-', ''.join(kept)).strip('-_')[:NAME_LIMIT].rstrip('-_')
+    return f'{prefix}-{k}-{name}.md' if name else f'{prefix}-{k}.md'
+
+
+class _Part:
+    """切分出的一個部分：名稱、標題、已寫入的位元組數與其中的標題"""
+
+    def __init__(self, name: str, title: str, spool: Optional[Path]):
+        self.name = name
+        self.title = title
+        self.spool = spool
+        self.file = open(spool, 'w', encoding='utf-8', newline='') if spool is not None else None
+        self.bytes = 0
+        self.content_bytes = 0
+        self.slugger = Slugger()
+        self.headings: List[Tuple[int, str, str]] = []  # (層級, 標題, 新文件中的 slug)
+
+    def write(self, text: str, content: bool = True) -> None:
+        size = len(text.encode('utf-8'))
+        self.bytes += size
+        if content:
+            self.content_bytes += size
+        if self.file is not None:
+            self.file.write(text)
+
+    def close(self) -> None:
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+
+
+class ChapterSplitter:
+    """單次串流切分一個 Markdown 文件（見模組說明）"""
+
+    def __init__(self, source, out_dir=None, prefix: str = None, budget: int = DEFAULT_BUDGET,
+                 level: int = None, dry_run: bool = False):
+        self.source = Path(os.path.normpath(Path(source).resolve()))
+        m = _SOURCE_NAME.match(self.source.name)
+        self.prefix = prefix or (m.group(1) if m else self.source.stem)
+        self.out_dir = Path(os.path.normpath(Path(out_dir).resolve())) if out_dir \
+            else self.source.parent / self.prefix
+        self.budget = budget
+        self.level = level
+        self.dry_run = dry_run
+        self.index_name = self.prefix + INDEX_SUFFIX
+        self.section_re, self.self_re = numbering_patterns(self.prefix)
+
+        self.parts: List[_Part] = []
+        self.preamble: Optional[_Part] = None
+        self.anchors: Dict[str, Tuple[str, str]] = {}    # 原 slug -> (新文件名稱, 新 slug)
+        self.headings: List[Tuple[int, str, str]] = []   # 原文件中的所有標題 (層級, 標題, 原 slug)
+        self.title: Optional[str] = None                 # 第一個切分點之前的第一個標題
+        self.oversized: List[str] = []
+        self.nav: List[str] = []                         # 原檔的章節導航區塊（各行，連結以原檔為基準）
+        self._block = None       # 尚未放入部分的一段：{'lines', 'bytes', 'headings'}
+        self._streaming = None   # 超過預算、正直接寫入的部分
+        self._last = ''          # 最後寫出的一行
+
+    # ---- 第一階段：串流切分 ----
+
+    def _spool(self, name: str) -> Optional[Path]:
+        return None if self.dry_run else self.out_dir / f'.{name}{SPOOL_SUFFIX}'
+
+    def _is_cut(self, level: int, title: str, started: bool) -> bool:
+        if self.level is None:
+            if self.section_re is None or not self.section_re.match(title):
+                return False
+            self.level = level
+        if level > self.level:
+            return False
+        if started:
+            return True
+        # 第一個切分點必須是切分層級的標題，且不是原檔本身的標題（例如「## 6.4 核心組件詳細實現」）
+        return level == self.level and not (self.self_re is not None and self.self_re.match(title))
+
+    def _register(self, part: _Part, heading: Tuple[int, str, str]) -> None:
+        level, title, slug = heading
+        local = part.slugger.slug(title)
+        part.headings.append((level, title, local))
+        self.anchors.setdefault(slug, (part.name, local))
+
+    def _link(self, name: str) -> str:
+        """寫入暫存檔的導覽連結：與原文一樣以原檔位置為基準，第二階段再統一改寫"""
+        return relative_link(self.source, self.out_dir / name, name)
+
+    def _new_part(self, title: str) -> _Part:
+        previous = self.parts[-1] if self.parts else None
+        name = part_name(self.prefix, len(self.parts) + 1, title)
+        part = _Part(name, _NUMBER_PREFIX.sub('', title) or title, self._spool(name))
+        if previous is not None:
+            self._close_part(previous, part)
+        part.write(f'**[← 返回目錄]({self._link(self.index_name)})**\n\n', content=False)
+        self.parts.append(part)
+        return part
+
+    def _close_part(self, part: _Part, following: Optional[_Part]) -> None:
+        pos = self.parts.index(part)
+        nav = [f'[📚 目錄]({self._link(self.index_name)})']
+        if pos > 0:
+            prev = self.parts[pos - 1]
+            nav.insert(0, f'[← {prev.title}]({self._link(prev.name)})')
+        if following is not None:
+            nav.append(f'[{following.title} →]({self._link(following.name)})')
+        part.write('\n---\n\n**' + '** | **'.join(nav) + '**\n', content=False)
+        part.close()
+
+    def _place(self, block: dict) -> _Part:
+        """將一段放入目前的部分；放不下（且目前部分已有內容）時開新部分"""
+        part = self.parts[-1] if self.parts else None
+        if part is None or (part.content_bytes and part.bytes + block['bytes'] > self.budget):
+            part = self._new_part(block['headings'][0][1])
+        for line in block['lines']:
+            part.write(line)
+        for heading in block['headings']:
+            self._register(part, heading)
+        return part
+
+    def _feed(self, line: str, heading) -> None:
+        """將一行放入目錄開頭、目前的一段或正串流寫入的部分"""
+        self._last = line
+        if heading is not None:
+            self.headings.append(heading)
+            started = self._block is not None or self._streaming is not None
+            if self._is_cut(heading[0], heading[1], started):
+                if self._block is not None:
+                    self._place(self._block)
+                self._block, self._streaming = {'lines': [], 'bytes': 0, 'headings': []}, None
+        if self._streaming is not None:
+            self._streaming.write(line)
+            if heading is not None:
+                self._register(self._streaming, heading)
+            return
+        block = self._block
+        if block is None:
+            self.preamble.write(line)
+            if heading is not None:
+                self._register(self.preamble, heading)
+                self.title = self.title or heading[1]
+            return
+        block['lines'].append(line)
+        block['bytes'] += len(line.encode('utf-8'))
+        if heading is not None:
+            block['headings'].append(heading)
+        if block['bytes'] > self.budget:
+            # 單段已超過預算：放入獨立的部分，其餘內容直接串流寫入
+            self._streaming = self._place(block)
+            self.oversized.append(self._streaming.name)
+            self._block = None
+
+    def scan(self) -> None:
+        """第一階段：單次讀過原檔，寫出各部分的暫存檔"""
+        if not self.dry_run:
+            self.out_dir.mkdir(parents=True, exist_ok=True)
+        self.preamble = _Part(self.index_name, '', self._spool(self.index_name))
+        scanner = HeadingScanner()
+        held: List[str] = []  # 圍欄外的空行與分隔線：後面接著導航區塊時一併移走
+        in_nav = False
+        try:
+            with open(self.source, encoding='utf-8', newline='') as f:
+                for line in f:
+                    fenced = scanner.in_fence
+                    heading = scanner.feed(line)
+                    prose = not (fenced or scanner.in_fence)
+                    if in_nav:
+                        if is_nav_line(line):
+                            self.nav.append(line)
+                            continue
+                        in_nav = False
+                    if prose and is_nav_heading(line):
+                        self.nav.append(line)
+                        held, in_nav = [], True
+                        continue
+                    if prose and heading is None and _SEPARATOR.match(line):
+                        held.append(line)
+                        continue
+                    for pending in held:
+                        self._feed(pending, None)
+                    held = []
+                    self._feed(line, heading)
+            for pending in held:
+                self._feed(pending, None)
+            if self._block is not None:
+                self._place(self._block)
+            if self.parts:
+                if not self._last.endswith(('\n', '\r')):
+                    self.parts[-1].write('\n', content=False)
+                self._close_part(self.parts[-1], None)
+        finally:
+            self.preamble.close()
+            for part in self.parts:
+                part.close()
+
+    # ---- 第二階段：改寫連結、寫出目錄與導引頁 ----
+
+    def _anchor(self, fragment: str, current: str) -> Optional[str]:
+        slug = unquote(fragment[1:])
+        found = self.anchors.get(slug) or self.anchors.get(slug.lower())
+        if found is None:
+            return None
+        name, local = found
+        return f'#{local}' if name == current else f'{name}#{local}'
+
+    def _fixer(self, current: str):
+        new_path = self.out_dir / current
+
+        def fix(target: str) -> Optional[str]:
+            path, fragment = split_target(target)
+            if not path:
+                new = self._anchor(fragment, current) if fragment else None
+            elif is_external(target):
+                return None
+            else:
+                resolved = resolve_link(self.source, target)
+                if resolved == self.source:
+                    new = (self._anchor(fragment, current) if fragment else None) or self.index_name
+                else:
+                    new = relative_link(new_path, resolved, target)
+            return None if new is None or new == target else new
+
+        return fix
+
+    def _rewrite_spool(self, part: _Part, tail: str = '') -> None:
+        """逐行改寫暫存檔中的連結（圍欄區塊內不動），原子寫成正式文件"""
+        fix = self._fixer(part.name)
+        scanner = HeadingScanner()
+        with open(part.spool, encoding='utf-8', newline='') as src, \
+                AtomicFile(self.out_dir / part.name) as out:
+            for line in src:
+                fenced = scanner.in_fence
+                scanner.feed(line)
+                if not (fenced or scanner.in_fence):
+                    line = rewrite_links(line, fix)[0]
+                out.write(line.encode('utf-8'))
+            out.write(tail.encode('utf-8'))
+            out.commit()
+        part.spool.unlink()
+
+    def nav_block(self, current: Optional[str] = None) -> str:
+        """原檔的章節導航區塊；current 為目錄文件名稱時連結改以新目錄為基準"""
+        if not self.nav:
+            return ''
+        text = ''.join(self.nav).rstrip('\r\n') + '\n'
+        if current is not None:
+            fix = self._fixer(current)
+            text = ''.join(rewrite_links(line, fix)[0] for line in text.splitlines(True))
+        return '\n---\n\n' + text
+
+    def index_toc(self) -> str:
+        """目錄文件的章節導航：各部分及其中切分層級的標題，之後接原檔的章節導航區塊"""
+        lines = ['', '## 📚 章節導航', '']
+        for k, part in enumerate(self.parts, 1):
+            lines.append(f'- [{k}. {part.title}]({part.name})')
+            for level, title, local in part.headings[1:]:
+                if level == self.level:
+                    lines.append(f'  - [{title}]({part.name}#{local})')
+        return '\n'.join(lines) + '\n' + self.nav_block(self.index_name)
+
+    def stub(self) -> str:
+        """原位置的導引頁：連到目錄，並為每個舊錨點保留 id 與新位置"""
+        title = self.title or self.source.stem
+        index = relative_link(self.source, self.out_dir / self.index_name, self.index_name)
+        lines = [f'# 📚 {title} - 已拆分成獨立文件', '',
+                 f'> **此文件已依標題拆分為 {len(self.parts)} 個部分（每個約 {self.budget // 1024} KB 以內），'
+                 '請前往目錄查看詳細內容。**', '',
+                 '---', '',
+                 f'### **[👉 點擊進入完整目錄 ({self.index_name})]({index})**', '',
+                 '## 🔗 原有段落的新位置', '']
+        seen = set()
+        for level, heading, slug in self.headings:
+            if slug in seen or slug not in self.anchors:
+                continue
+            seen.add(slug)
+            name, local = self.anchors[slug]
+            target = relative_link(self.source, self.out_dir / name, name)
+            indent = '  ' * max(0, level - (self.level or level))
+            lines.append(f'{indent}- <a id="{slug}"></a>[{heading}]({target}#{local})')
+        return '\n'.join(lines) + '\n' + self.nav_block()
+
+    def write(self) -> None:
+        """第二階段：改寫各部分與目錄的連結，最後將原檔改為導引頁"""
+        for part in self.parts:
+            self._rewrite_spool(part)
+        self._rewrite_spool(self.preamble, self.index_toc())
+        atomic_write_text(self.source, self.stub())
+
+    def discard(self) -> None:
+        for part in [self.preamble] + self.parts:
+            if part is not None and part.spool is not None and part.spool.exists():
+                part.spool.unlink()
+
+    def split(self) -> dict:
+        """執行切分並回傳摘要；找不到切分點時不做任何變更"""
+        try:
+            self.scan()
+            if not self.parts:
+                raise ValueError(f'{self.source.name} 找不到可切分的標題'
+                                 f'{"（請以 --level 指定切分層級）" if self.level is None else ""}')
+            existing = [p.name for p in self.parts + [self.preamble] if (self.out_dir / p.name).exists()]
+            if existing and not self.dry_run:
+                raise FileExistsError(f'目標文件已存在：{", ".join(existing)}')
+            if not self.dry_run:
+                self.write()
+        except BaseException:
+            self.discard()
+            raise
+        return {'source': str(self.source), 'out_dir': str(self.out_dir), 'level': self.level,
+                'index': self.index_name,
+                'parts': [{'name': p.name, 'bytes': p.bytes, 'headings': len(p.headings)} for p in self.parts],
+                'oversized': self.oversized}
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description='依標題與大小預算切分過大的 Markdown 文件')
+    parser.add_argument('source', help='要切分的文件（chN.md 或 chN/chN-i-標題.md）')
+    parser.add_argument('--budget', default=f'{DEFAULT_BUDGET // 1024}K',
+                        help='每個部分的大小上限（位元組，可加 K/M；預設 %(default)s）')
+    parser.add_argument('--level', type=int, choices=range(1, 7),
+                        help='切分的標題層級（預設依編號自動判斷）')
+    parser.add_argument('--out', help='輸出目錄（預設為原檔旁的 <前綴>/）')
+    parser.add_argument('--prefix', help='輸出檔名前綴（預設取自原檔名，例如 ch6-4）')
+    parser.add_argument('--dry-run', action='store_true', help='只列出切分結果，不寫入任何檔案')
+    parser.add_argument('--force', action='store_true', help='檔案未超過預算時也切分')
+    args = parser.parse_args(argv)
+
+    try:
+        budget = parse_budget(args.budget)
+    except ValueError as e:
+        parser.error(str(e))
+    source = Path(args.source)
+    if not source.is_file():
+        print(f'❌ 找不到文件：{source}')
+        return 1
+    size = source.stat().st_size
+    if size <= budget and not args.force:
+        print(f'ℹ️ {source.name}（{size / 1024:.1f} KB）未超過預算 {budget / 1024:.0f} KB，不需切分（可用 --force 強制切分）')
+        return 0
+    splitter = ChapterSplitter(args.source, args.out, args.prefix, budget, args.level, args.dry_run)
+    try:
+        result = splitter.split()
+    except (ValueError, FileExistsError) as e:
+        print(f'❌ {e}')
+        return 1
+
+    verb = '將' if args.dry_run else '已'
+    print(f"✂️ {verb}切分 {Path(result['source']).name}（第 {result['level']} 層標題）"
+          f"為 {len(result['parts'])} 個部分 -> {result['out_dir']}")
+    for part in result['parts']:
+        mark = ' ⚠️ 超出預算' if part['name'] in result['oversized'] else ''
+        print(f"   {part['name']}  {part['bytes'] / 1024:.1f} KB，{part['headings']} 個標題{mark}")
+    if not args.dry_run:
+        print(f"📋 目錄：{result['index']}；原檔已改為導引頁")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.stdout.reconfigure(encoding='utf-8')
+    sys.exit(main())
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+"""測試共用設定：各工具是專案根目錄下的腳本，將根目錄加入匯入路徑"""
+
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+if str(ROOT) not in sys.path:
+    sys.path.insert(0, str(ROOT))
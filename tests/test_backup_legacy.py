@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+"""BACKUP_LEGACY：說明標頭格式、輸出訊息與索引檔位置"""
+
+import importlib
+
+from backup_store import _LEGACY_BANNER, BackupStore
+from corpus_index import DB_NAME
+
+backup_legacy = importlib.import_module('BACKUP_LEGACY')
+
+
+def test_banner_uses_real_newlines_and_is_recognised():
+    banner = backup_legacy.BANNER_TMPL.format(new_name='ch6-4-新.md', ts='2024-01-01 00:00:00')
+    assert '\\n' not in banner
+    assert banner.count('\n') == 6
+    m = _LEGACY_BANNER.match(banner + '正文')
+    assert m and m.group('new_name') == 'ch6-4-新.md' and m.group('time') == '2024-01-01 00:00:00'
+
+
+def test_backup_reports_store_object_and_leaves_no_index_file(tmp_path, capsys):
+    (tmp_path / 'ch6').mkdir()
+    (tmp_path / 'ch6' / 'ch6-4.md').write_text('舊內容\n', encoding='utf-8')
+    (tmp_path / 'ch6' / 'ch6-4-新檔名.md').write_text('# 新\n', encoding='utf-8')
+
+    backup_legacy.main(['--root', str(tmp_path), '--io-workers', '2'])
+
+    out = capsys.readouterr().out
+    store = BackupStore(tmp_path / backup_legacy.BACKUP_NAME)
+    entry = store.latest('ch6/ch6-4.md')
+    assert entry['new_name'] == 'ch6-4-新檔名.md'
+    assert str(store.object_path(entry['hash'])) in out
+    assert store.object_path(entry['hash']).exists()
+    assert not (tmp_path / 'ch6' / 'ch6-4.md').exists()
+    assert not (tmp_path / DB_NAME).exists()
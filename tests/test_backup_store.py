@@ -0,0 +1,143 @@
+# -*- coding: utf-8 -*-
+"""backup_store：內容定址備份庫與可附加世代的封存檔"""
+
+import json
+import struct
+import threading
+import zlib
+
+import pytest
+
+import backup_store
+from backup_store import ARCHIVE_MAGIC, TRAILER_MAGIC, BackupArchive, BackupStore
+
+
+def read_indexes(path):
+    """依序列出封存檔中每個世代實際寫入的索引"""
+    data = path.read_bytes()
+    found = []
+    end = len(data)
+    while end:
+        magic, offset, length, _crc = struct.unpack('<8sQQI', data[end - 28:end])
+        assert magic == TRAILER_MAGIC
+        index = json.loads(zlib.decompress(data[offset:offset + length]))
+        found.append(index)
+        end = index.get('previous') or 0
+    return found[::-1]
+
+
+@pytest.fixture
+def store(tmp_path):
+    return BackupStore(tmp_path / 'store')
+
+
+def test_each_generation_writes_only_new_records(tmp_path, store):
+    archive = tmp_path / 'backups.bka'
+    for gen in range(1, 5):
+        store.put(f'ch{gen}/ch{gen}-1.md', f'第{gen}版\n'.encode('utf-8'), time=f'2024-01-0{gen} 00:00:00')
+        assert BackupArchive(archive).append(store)['generation'] == gen
+
+    indexes = read_indexes(archive)
+    assert [len(i['records']) for i in indexes] == [1, 1, 1, 1]
+    assert [len(i['objects']) for i in indexes] == [1, 1, 1, 1]
+    reopened = BackupArchive(archive)
+    assert reopened.generation == 4
+    assert [r['path'] for r in reopened.records()] == [f'ch{g}/ch{g}-1.md' for g in range(1, 5)]
+    assert reopened.extract('ch2/ch2-1.md') == '第2版\n'.encode('utf-8')
+
+
+def test_torn_tail_is_found_by_scanning_backwards(tmp_path, store, monkeypatch):
+    monkeypatch.setattr(backup_store, '_SCAN_BLOCK', 16)
+    archive = tmp_path / 'backups.bka'
+    store.put('ch1/ch1-1.md', b'one\n')
+    BackupArchive(archive).append(store)
+    store.put('ch1/ch1-2.md', b'two\n')
+    BackupArchive(archive).append(store)
+    good = archive.stat().st_size
+    with open(archive, 'ab') as f:  # 中斷的附加：物件寫了一半，還沒有結尾
+        f.write(b'x' * 200 + TRAILER_MAGIC[:5])
+
+    reopened = BackupArchive(archive)
+    assert reopened.generation == 2
+    assert reopened.extract('ch1/ch1-1.md') == b'one\n'
+    store.put('ch1/ch1-3.md', b'three\n')
+    assert reopened.append(store)['generation'] == 3
+    assert read_indexes(archive)[2]['previous'] == good
+    assert BackupArchive(archive).extract('ch1/ch1-3.md') == b'three\n'
+
+
+def test_archives_with_full_indexes_are_still_readable(tmp_path, store):
+    # 舊格式：索引列出截至該世代的全部內容，沒有 delta 標記
+    store.put('ch1/ch1-1.md', b'old\n', time='2024-01-01 00:00:00')
+    record = store.records()[0]
+    blob = store.object_path(record['hash']).read_bytes()
+    index = zlib.compress(json.dumps({'generation': 1, 'previous': None, 'records': [record],
+                                      'objects': {record['hash']: [len(ARCHIVE_MAGIC), len(blob)]}}).encode())
+    offset = len(ARCHIVE_MAGIC) + len(blob)
+    archive = tmp_path / 'old.bka'
+    archive.write_bytes(ARCHIVE_MAGIC + blob + index
+                        + struct.pack('<8sQQI', TRAILER_MAGIC, offset, len(index), zlib.crc32(index)))
+
+    store.put('ch1/ch1-1.md', b'new\n', time='2024-02-01 00:00:00')
+    assert BackupArchive(archive).append(store)['records'] == 1
+    reopened = BackupArchive(archive)
+    assert reopened.generation == 2
+    assert reopened.extract('ch1/ch1-1.md', at=record['time']) == b'old\n'
+    assert reopened.extract('ch1/ch1-1.md') == b'new\n'
+
+
+def test_identical_content_is_stored_once(store):
+    first = store.put('ch1/ch1-1.md', b'same\n', time='2024-01-01 00:00:00')
+    assert store.put('ch1/ch1-1.md', b'same\n') is None  # 同一路徑、相同內容不再記錄
+    second = store.put('ch2/ch2-1.md', b'same\n', time='2024-01-02 00:00:00')
+    assert first['hash'] == second['hash']
+    assert len(list(store.objects.glob('*/*'))) == 1
+    stats = BackupStore(store.root).stats()
+    assert (stats['records'], stats['paths'], stats['objects']) == (2, 2, 1)
+
+
+def test_duplicate_content_in_one_batch_counts_one_object(store, monkeypatch):
+    # 讓兩個執行緒都在對方寫入前檢查物件是否存在，兩者都會寫入
+    barrier = threading.Barrier(2, timeout=5)
+    write = backup_store.atomic_write_bytes
+
+    def racing_write(path, data):
+        barrier.wait()
+        write(path, data)
+
+    monkeypatch.setattr(backup_store, 'atomic_write_bytes', racing_write)
+    result = store.put_many([('ch1/ch1-1.md', b'same\n', None), ('ch2/ch2-1.md', b'same\n', None)], jobs=2)
+    assert len(result['records']) == 2
+    assert result['objects'] == 1
+    assert result['bytes'] == store.object_path(result['records'][0]['hash']).stat().st_size
+
+
+def test_restore_latest_or_at_time(store):
+    store.put('ch1/ch1-1.md', b'v1\n', time='2024-01-01 00:00:00')
+    store.put('ch1/ch1-1.md', b'v2\n', time='2024-02-01 00:00:00')
+    reopened = BackupStore(store.root)
+    assert reopened.restore('ch1/ch1-1.md') == b'v2\n'
+    assert reopened.restore('ch1/ch1-1.md', at='2024-01-15 00:00:00') == b'v1\n'
+    with pytest.raises(FileNotFoundError):
+        reopened.restore('ch1/ch1-1.md', at='2023-12-31 00:00:00')
+
+
+def test_corrupted_object_is_detected(store):
+    record = store.put('ch1/ch1-1.md', b'content\n')
+    store.object_path(record['hash']).write_bytes(zlib.compress(b'tampered\n'))
+    with pytest.raises(ValueError):
+        store.restore('ch1/ch1-1.md')
+
+
+def test_import_plain_strips_banner_and_removes_sources(store):
+    legacy = store.root / 'ch6' / 'ch6-4.md'
+    legacy.parent.mkdir(parents=True)
+    legacy.write_text('<!-- LEGACY FILE NOTICE -->\n'
+                      '> ⚠️ 此檔案為舊版備份，已被新檔取代： [ch6-4-新.md](../../ch6/ch6-4-新.md)\n'
+                      '> 備份時間：2024-01-01 12:00:00\n\n---\n\n舊內容\n', encoding='utf-8')
+    result = store.import_plain(store.root, jobs=2)
+    assert result['imported'] == 1
+    assert not legacy.exists() and not legacy.parent.exists()
+    record = store.latest('ch6/ch6-4.md')
+    assert record['time'] == '2024-01-01 12:00:00' and record['new_name'] == 'ch6-4-新.md'
+    assert store.restore('ch6/ch6-4.md') == '舊內容\n'.encode('utf-8')
@@ -0,0 +1,19 @@
+# -*- coding: utf-8 -*-
+"""build_css：靜態網站產生器使用的類別都要出現在樣式表中"""
+
+import re
+
+from build_css import SITE_ROOT, build_stylesheet
+
+_CLASS_ATTR = re.compile(r'class="([^"{]*)"')
+
+
+def test_generator_classes_are_styled():
+    css = build_stylesheet(SITE_ROOT)[0]
+    classes = set()
+    for name in ('build_site.py', 'md_render.py'):
+        for m in _CLASS_ATTR.finditer((SITE_ROOT / name).read_text(encoding='utf-8')):
+            classes.update(m.group(1).split())
+    assert {'shrink-0', 'doc-aside', 'doc-content', 'status-broken'} <= classes
+    missing = [c for c in sorted(classes) if not re.search(r'\.' + re.escape(c) + r'(?![\w-])', css)]
+    assert missing == []
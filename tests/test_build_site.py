@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+"""build_site：資源複製到輸出目錄，頁面以網站內的相對路徑引用"""
+
+import re
+
+from build_site import SiteBuilder
+
+
+def make_site(tmp_path):
+    root = tmp_path / 'docs'
+    (root / 'ch1').mkdir(parents=True)
+    (root / 'ch1' / 'ch1-1-概述.md').write_text('# 第1章\n\n## 1.1 概述\n\n- 項目\n', encoding='utf-8')
+    assets = tmp_path / 'assets'
+    (assets / 'css').mkdir(parents=True)
+    (assets / 'components').mkdir()
+    (assets / 'css' / 'site.0123456789.css').write_text('.doc-content{}', encoding='utf-8')
+    (assets / 'components' / 'navbar.js').write_text('//', encoding='utf-8')
+    (assets / 'components' / 'footer.js').write_text('//', encoding='utf-8')
+    (assets / 'script.js').write_text('//', encoding='utf-8')
+    components = tmp_path / 'components'
+    components.mkdir()
+    (components / 'base.html').write_text(
+        '<link rel="stylesheet" href="css/site.0123456789.css">\n'
+        '<script src="components/navbar.js"></script><script src="script.js"></script>\n'
+        '{{ PAGE_CONTENT }}', encoding='utf-8')
+    (components / 'page-header.html').write_text('<h1>{{ PAGE_HEADER_TITLE }}</h1>', encoding='utf-8')
+    return root, assets, components
+
+
+def test_assets_are_copied_and_linked_inside_the_site(tmp_path):
+    root, assets, components = make_site(tmp_path)
+    out = tmp_path / 'elsewhere' / 'site'
+    result = SiteBuilder(root, out, components, assets).build(jobs=1)
+
+    assert result['assets'] == ['components/navbar.js', 'css/site.0123456789.css', 'script.js']
+    assert result['missing_assets'] == []
+    page = (out / 'ch1' / 'ch1-1-概述.html').read_text(encoding='utf-8')
+    refs = re.findall(r'(?:href|src)="([^"]+)"', page)
+    assert '../css/site.0123456789.css' in refs and '../script.js' in refs
+    for ref in refs:
+        if ref.startswith('../'):
+            assert (out / 'ch1' / ref).resolve().is_file()
+    assert str(assets) not in page
+
+
+def test_unused_assets_are_removed_and_unchanged_ones_kept(tmp_path):
+    root, assets, components = make_site(tmp_path)
+    out = tmp_path / 'site'
+    SiteBuilder(root, out, components, assets).build(jobs=1)
+    assert SiteBuilder(root, out, components, assets).build(jobs=1)['assets'] == []
+
+    base = components / 'base.html'
+    base.write_text(base.read_text(encoding='utf-8').replace('0123456789', 'abcdefabcd'), encoding='utf-8')
+    (assets / 'css' / 'site.abcdefabcd.css').write_text('.doc-aside{}', encoding='utf-8')
+    result = SiteBuilder(root, out, components, assets).build(jobs=1)
+    assert result['assets'] == ['css/site.abcdefabcd.css']
+    assert not (out / 'css' / 'site.0123456789.css').exists()
+    assert 'site.abcdefabcd.css' in (out / 'ch1' / 'ch1-1-概述.html').read_text(encoding='utf-8')
@@ -0,0 +1,82 @@
+# -*- coding: utf-8 -*-
+"""convert_stream：分段邊界不影響結果，超長的行不會整行讀入記憶體，只在換行字元分行"""
+
+import io
+
+import pytest
+
+import convert_to_traditional
+from md_tokenizer import inline_safe_cut
+
+
+@pytest.fixture(autouse=True, scope='module')
+def matcher():
+    convert_to_traditional.set_matcher(convert_to_traditional.load_matcher(None))
+
+
+PIECES = ['数据', '详细内容', '实现', ' ', '`代码 数据`', '[数据](ch1-数据.md)', 'https://数据.com/a',
+          '<a id="数据">', '，', 'abc']
+
+
+def stream(path, chunk_size, markdown=True):
+    out = io.BytesIO()
+    convert_to_traditional.convert_stream(path, out, chunk_size, markdown)
+    return out.getvalue().decode('utf-8')
+
+
+@pytest.mark.parametrize('markdown', [True, False])
+@pytest.mark.parametrize('newlines', [True, False])
+def test_stream_matches_in_memory_conversion(tmp_path, markdown, newlines):
+    # 每種片段輪流出現，行長遠大於分段大小；沒有換行時整個文件只有一行
+    text = ''.join(PIECES[i % len(PIECES)] + ('\n' if newlines and i % 97 == 0 else '')
+                   for i in range(3000))
+    path = tmp_path / 'big.md'
+    path.write_text(text, encoding='utf-8')
+    expected = convert_to_traditional.convert_text(text, markdown)[0]
+    for chunk_size in (256, 1000, 4096):
+        assert stream(path, chunk_size, markdown) == expected
+
+
+def test_long_line_is_processed_in_bounded_pieces(tmp_path, monkeypatch):
+    path = tmp_path / 'one-line.md'
+    path.write_text('数据详细内容，' * 50000, encoding='utf-8')
+    seen = []
+    cut = convert_to_traditional._stream_cut
+
+    def record(text, limit):
+        seen.append(len(text))
+        return cut(text, limit)
+
+    monkeypatch.setattr(convert_to_traditional, '_stream_cut', record)
+    stream(path, 4096)
+    assert len(seen) > 50 and max(seen) <= 2 * 4096
+
+
+def test_inline_safe_cut_stops_before_unfinished_constructs():
+    assert inline_safe_cut('文字 `程式碼') == 3
+    assert inline_safe_cut('文字 [連結](目標') == 6
+    assert inline_safe_cut('文字 [連結](a.md) 其他') == len('文字 [連結](a.md) 其他')
+    assert inline_safe_cut('文字 https://example.com/a') == 3
+    assert inline_safe_cut('文字 http') == 3
+    assert inline_safe_cut('文字 <a href="x"') == 3
+
+
+def test_only_newline_ends_a_line(tmp_path):
+    # U+2028、\x0c、\x85 不是 Markdown 的行尾：後面的 ``` 不會開始圍欄區塊
+    text = '数据\u2028```\n数据\x0c```\x85数据\n'
+    converted = convert_to_traditional.convert_text(text)[0]
+    assert converted == '資料\u2028```\n資料\x0c```\x85資料\n'
+    path = tmp_path / 'doc.md'
+    path.write_bytes(text.encode('utf-8'))
+    assert stream(path, 4) == converted
+
+
+@pytest.mark.parametrize('chunk_size', [1, 2, 3, 5, 8])
+def test_raw_stream_keeps_phrases_across_chunk_boundaries(tmp_path, chunk_size):
+    # 純文字模式：每段結尾保留（最長詞長 - 1）個字元，詞彙不會在分段邊界被切開
+    text = ('数据详细内容，实现' * 40) + '\n' + '资料库' * 30
+    path = tmp_path / 'raw.md'
+    path.write_text(text, encoding='utf-8')
+    expected = convert_to_traditional.convert_text(text, False)[0]
+    assert expected != text
+    assert stream(path, chunk_size, markdown=False) == expected
@@ -0,0 +1,94 @@
+# -*- coding: utf-8 -*-
+"""convert_to_traditional：字典樹與編譯轉換表的匹配規則、批次轉換的輸出訊息"""
+
+import random
+
+import pytest
+
+import convert_to_traditional
+from build_convert_dict import prune_entries
+from convert_table import CompiledTable, write_table
+from convert_to_traditional import CONVERT_DICT, PhraseMatcher
+
+
+def test_failures_are_reported_by_relative_path(tmp_path, monkeypatch, capsys):
+    for ch in ('ch1', 'ch2'):
+        (tmp_path / ch).mkdir()
+        (tmp_path / ch / 'README.md').write_text('数据\n', encoding='utf-8')
+    convert_data = convert_to_traditional._convert_data
+
+    def flaky(data, *args, **kwargs):
+        if data.startswith(b'\xe6\x95\xb0') and flaky.calls == 0:
+            flaky.calls += 1
+            raise ValueError('boom')
+        return convert_data(data, *args, **kwargs)
+
+    flaky.calls = 0
+    monkeypatch.setattr(convert_to_traditional, '_convert_data', flaky)
+    convert_to_traditional.convert_md_files(str(tmp_path), exclude_patterns=[], manifest_path=False, jobs=1)
+    out = capsys.readouterr().out
+    failed = [line for line in out.splitlines() if line.startswith('[FAIL]')]
+    assert len(failed) == 1
+    assert failed[0] in ('[FAIL] 失敗: ch1/README.md - boom', '[FAIL] 失敗: ch2/README.md - boom')
+
+
+# ---- 字典樹與編譯轉換表 ----
+
+MAPPING = {'数': '數', '据': '據', '数据': '資料', '数据库': '資料庫', '头': '頭', '头发': '頭髮',
+           '发': '發', '发现': '發現', '现': '現', '库存': '庫存'}
+
+
+@pytest.fixture(params=['trie', 'table'])
+def matcher(request, tmp_path):
+    if request.param == 'trie':
+        yield PhraseMatcher(MAPPING)
+    else:
+        table = CompiledTable(write_table(MAPPING, tmp_path / 'test.ctd'))
+        yield table
+        table.close()
+
+
+def test_longest_match_wins(matcher):
+    assert matcher.convert('数据库存') == '資料庫存'
+    assert matcher.convert('头发现') == '頭髮現'
+    assert matcher.convert('x数据y数z') == 'x資料y數z'
+    assert matcher.max_key_len == 3
+
+
+def test_prefix_without_full_match_is_kept(matcher):
+    # 「数据」走到「库」的前綴節點後失敗，要退回最後一個完整的詞
+    assert matcher.convert('数据库') == '資料庫'
+    assert matcher.convert('数据么') == '資料么'
+    assert matcher.convert('') == ''
+
+
+def test_scan_stops_before_stop_and_resumes(matcher):
+    text = '数据头发'
+    head, resume = matcher.scan(text, 2)
+    assert (head, resume) == ('資料', 2)
+    assert head + matcher.convert(text[resume:]) == matcher.convert(text)
+
+
+def test_compiled_table_matches_trie_on_random_text(tmp_path):
+    table = CompiledTable(write_table(MAPPING, tmp_path / 'test.ctd'))
+    trie = PhraseMatcher(MAPPING)
+    alphabet = ''.join(sorted({ch for key in MAPPING for ch in key})) + 'ab '
+    rnd = random.Random(0)
+    for _ in range(500):
+        text = ''.join(rnd.choice(alphabet) for _ in range(rnd.randint(0, 30)))
+        assert table.convert(text) == trie.convert(text)
+    table.close()
+
+
+def test_pruned_compiled_table_converts_like_full_dictionary(tmp_path):
+    kept, identity, shadowed = prune_entries(CONVERT_DICT)
+    assert len(kept) + len(identity) + len(shadowed) == len(CONVERT_DICT)
+    table = CompiledTable(write_table(kept, tmp_path / 'full.ctd'))
+    trie = PhraseMatcher(CONVERT_DICT)
+    keys = sorted(CONVERT_DICT)
+    rnd = random.Random(1)
+    for _ in range(300):
+        text = ''.join(rnd.choice(keys) if rnd.random() < 0.8 else rnd.choice('，。 a\n')
+                       for _ in range(rnd.randint(1, 20)))
+        assert table.convert(text) == trie.convert(text)
+    table.close()
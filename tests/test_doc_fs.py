@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""doc_fs：走訪時無法列出的子目錄略過並回報，不中斷整個走訪"""
+
+import errno
+from pathlib import Path
+
+import pytest
+
+import doc_fs
+
+
+@pytest.fixture
+def tree(tmp_path, monkeypatch):
+    for rel in ('a/x.md', 'b/y.md', 'c/z.md'):
+        (tmp_path / rel).parent.mkdir(exist_ok=True)
+        (tmp_path / rel).write_text('# T\n', encoding='utf-8')
+    list_dir = doc_fs._list_dir
+
+    def failing(path, stat_suffix=''):
+        name = Path(path).name
+        if name == 'a':
+            raise PermissionError(errno.EACCES, 'Permission denied', str(path))
+        if name == 'b':
+            raise FileNotFoundError(errno.ENOENT, 'No such file or directory', str(path))
+        return list_dir(path, stat_suffix)
+
+    monkeypatch.setattr(doc_fs, '_list_dir', failing)
+    return tmp_path
+
+
+def test_walk_skips_unreadable_and_vanished_directories(tree):
+    errors = []
+    with doc_fs.FileIO(workers=2, retries=0) as io:
+        files, dirs = io.walk(tree, onerror=errors.append)
+    assert list(files) == ['c/z.md']
+    assert dirs == {'a', 'c'}  # 沒有權限的目錄仍存在，被刪除的不列入
+    assert sorted(type(e).__name__ for e in errors) == ['FileNotFoundError', 'PermissionError']
+
+
+def test_walk_raises_when_root_cannot_be_listed(tmp_path):
+    with doc_fs.FileIO(retries=0) as io, pytest.raises(FileNotFoundError):
+        io.walk(tmp_path / 'missing')
@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+"""doc_pipeline：階段順序、舊格式備份與每個文件只讀一次"""
+
+import builtins
+import io
+from pathlib import Path
+
+from backup_store import BackupStore
+from doc_pipeline import STAGES, BackupLegacyStage, ConvertStage, FormatStage, order_stages, run_pipeline
+
+
+def test_convert_runs_after_rename_and_format():
+    names = [s.name for s in order_stages([STAGES[n]() for n in ('convert', 'format', 'backup', 'verify')])]
+    assert names.index('format') < names.index('convert') < names.index('verify')
+
+
+def test_pipeline_converts_formatted_titles_and_keeps_old_backups(tmp_path):
+    ch = tmp_path / 'ch1'
+    ch.mkdir()
+    # 檔名與標題都是簡體：格式化寫入的標題也要經過轉換
+    (ch / 'ch1-1-详细功能.md').write_text('## 1.1 详细功能\n\n内容\n', encoding='utf-8')
+    (ch / 'ch1-2.md').write_text('旧内容\n', encoding='utf-8')
+    old_backup = tmp_path / '_backup_legacy' / 'ch3' / 'ch3-1.md'
+    old_backup.parent.mkdir(parents=True)
+    old_backup.write_text('先前的備份\n', encoding='utf-8')
+
+    report = run_pipeline(tmp_path, [ConvertStage(), FormatStage(), BackupLegacyStage()], jobs=1)
+
+    text = (ch / 'ch1-1-详细功能.md').read_text(encoding='utf-8')
+    assert '## 1.1 詳細功能' in text and '**1.1 詳細功能**' in text
+    assert not (ch / 'ch1-2.md').exists()
+    assert report['backup']['imported'] == 1
+    assert old_backup.read_text(encoding='utf-8') == '先前的備份\n'
+    assert BackupStore(tmp_path / '_backup_legacy').latest('ch1/ch1-2.md') is not None
+
+
+def test_format_titles_come_from_documents_read_once(tmp_path, monkeypatch):
+    ch = tmp_path / 'ch1'
+    ch.mkdir()
+    (ch / 'ch1-1-概述.md').write_text('# 第1章：概述\n\n## 1.1 概述\n', encoding='utf-8')
+    (ch / 'ch1-2-架構.md').write_text('# 第1章：概述\n\n## 1.2 系統架構\n', encoding='utf-8')
+    reads = []
+    real_open = io.open
+
+    def recording_open(file, mode='r', *args, **kwargs):
+        if 'r' in mode and str(file).endswith('.md'):
+            reads.append(Path(file).name)
+        return real_open(file, mode, *args, **kwargs)
+
+    monkeypatch.setattr(io, 'open', recording_open)
+    monkeypatch.setattr(builtins, 'open', recording_open)
+
+    run_pipeline(tmp_path, [FormatStage()], jobs=1)
+
+    assert sorted(reads) == ['ch1-1-概述.md', 'ch1-2-架構.md']
+    assert '[1.2 系統架構](ch1-2-架構.md)' in (ch / 'ch1-1-概述.md').read_text(encoding='utf-8')
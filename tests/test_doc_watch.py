@@ -0,0 +1,117 @@
+# -*- coding: utf-8 -*-
+"""doc_watch：錯誤文件與處理途中消失的文件不應結束常駐程式"""
+
+import pytest
+
+from doc_watch import DocWatcher, PollingWatcher
+
+
+@pytest.fixture
+def daemon(tmp_path):
+    (tmp_path / 'a.md').write_text('# 内容\n\n[b](b.md)\n', encoding='utf-8')
+    (tmp_path / 'b.md').write_text('# B\n', encoding='utf-8')
+    watcher = DocWatcher(tmp_path, format_nav=False)
+    yield watcher
+    watcher.close()
+
+
+class FakeWatcher:
+    """依序回傳事件，事件用完後以 KeyboardInterrupt 結束主迴圈"""
+
+    def __init__(self, *batches):
+        self.batches = list(batches)
+
+    def wait(self, timeout):
+        if not self.batches:
+            raise KeyboardInterrupt
+        return self.batches.pop(0)
+
+
+def test_non_utf8_file_is_reported_not_fatal(daemon, tmp_path):
+    (tmp_path / 'bad.md').write_bytes(b'# \xff\xfe broken\n')
+    (tmp_path / 'a.md').write_text('# 详细内容\n', encoding='utf-8')
+    result = daemon.process({'bad.md', 'a.md'})
+    assert [e['path'] for e in result['errors']] == ['bad.md']
+    assert result['written'] == ['a.md']
+    assert (tmp_path / 'a.md').read_text(encoding='utf-8') == '# 詳細內容\n'
+
+
+def test_vanished_file_is_treated_as_deleted(daemon, tmp_path):
+    (tmp_path / 'b.md').unlink()
+    result = daemon.process({'b.md'})
+    assert result['changed'] == ['b.md'] and result['errors'] == []
+    assert 'b.md' not in daemon.index.documents()
+    assert [p['source'] for p in result['problems']] == ['a.md']
+
+
+def test_run_survives_failing_batches(daemon, tmp_path, capsys):
+    (tmp_path / 'bad.md').write_bytes(b'\xff')
+    calls = []
+    process = daemon.process
+
+    def flaky(changed):
+        calls.append(changed)
+        if len(calls) == 1:
+            raise RuntimeError('boom')
+        return process(changed)
+
+    daemon.process = flaky
+    with pytest.raises(KeyboardInterrupt):
+        daemon.run(FakeWatcher({'a.md'}, set(), {'bad.md'}, set()), debounce=0)
+    assert len(calls) == 2
+    out = capsys.readouterr().out
+    assert 'boom' in out and 'bad.md' in out
+
+
+def test_polling_scan_skips_files_removed_during_scan(tmp_path, monkeypatch):
+    (tmp_path / 'a.md').write_text('a', encoding='utf-8')
+    watcher = PollingWatcher(tmp_path, interval=0)
+    real_scandir = __import__('os').scandir
+
+    class VanishingEntry:
+        def __init__(self, entry):
+            self._entry = entry
+            self.name = entry.name
+
+        def is_dir(self, follow_symlinks=True):
+            return False
+
+        def stat(self):
+            raise FileNotFoundError(self.name)
+
+    class Listing:
+        def __init__(self, path):
+            self._it = real_scandir(path)
+
+        def __enter__(self):
+            return self
+
+        def __iter__(self):
+            return (VanishingEntry(e) for e in self._it)
+
+        def __exit__(self, *exc):
+            self._it.close()
+
+    monkeypatch.setattr('doc_watch.os.scandir', Listing)
+    assert watcher.wait(0) == {'a.md'}
+
+
+def test_edited_section_heading_survives_and_updates_neighbours(tmp_path):
+    ch = tmp_path / 'ch1'
+    ch.mkdir()
+    for i, title in enumerate(['概述', '技術架構', '部署'], 1):
+        (ch / f'ch1-{i}-{title}.md').write_text(f'# 第1章：概述\n\n## 1.{i} {title}\n\n正文\n', encoding='utf-8')
+    watcher = DocWatcher(tmp_path, check=False)
+    try:
+        watcher.process({p.relative_to(tmp_path).as_posix() for p in ch.iterdir()})
+        second = ch / 'ch1-2-技術架構.md'
+        second.write_text(second.read_text(encoding='utf-8').replace('## 1.2 技術架構', '## 1.2 技術架構与部署'),
+                          encoding='utf-8')
+        result = watcher.process({'ch1/ch1-2-技術架構.md'})
+        assert '## 1.2 技術架構與部署' in second.read_text(encoding='utf-8')
+        assert '**1.2 技術架構與部署**' in second.read_text(encoding='utf-8')
+        for name in ('ch1-1-概述.md', 'ch1-3-部署.md'):
+            assert '[1.2 技術架構與部署](ch1-2-技術架構.md)' in (ch / name).read_text(encoding='utf-8')
+        assert sorted(result['written']) == ['ch1/ch1-1-概述.md', 'ch1/ch1-2-技術架構.md', 'ch1/ch1-3-部署.md']
+    finally:
+        watcher.close()
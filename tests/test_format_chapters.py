@@ -0,0 +1,59 @@
+# -*- coding: utf-8 -*-
+"""format_chapters：標題來源、導航去重、跨章鏈接與換行符號"""
+
+from format_chapters import NAV_HEADING, format_chapters, read_text
+
+
+def write(path, text, newline='\n'):
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(text.replace('\n', newline).encode('utf-8'))
+
+
+def make_chapter(root, newline='\n'):
+    ch = root / 'ch1'
+    write(ch / 'ch1-1-模組概述.md', '# 第1章：舊標題\n\n## 1.1 模組概述\n\n正文一\n', newline)
+    # 檔名尚未轉換為繁體，文件中的標題已轉換
+    write(ch / 'ch1-2-最佳实践指南.md',
+          '# 第1章：舊標題\n\n## 1.2 最佳實踐指南\n\n正文二\n\n'
+          f'{NAV_HEADING}\n\n'
+          '| 前序 | 當前 | 後續 |\n|-----|------|------|\n'
+          '| [1.1 模組概述](ch1-1-模組概述.md) | **1.2 最佳實踐指南** | [2.1 下一章](../ch2/ch2-1-概述.md) |\n\n'
+          '**快速鏈接：**\n'
+          '- [1.1 模組概述](ch1-1-模組概述.md)\n'
+          '- [1.1 舊名稱](ch1-1-舊名稱.md)\n'
+          '- [外部文件](../README.md)\n', newline)
+    return ch
+
+
+def test_titles_come_from_existing_headings(tmp_path):
+    ch = make_chapter(tmp_path)
+    format_chapters(tmp_path)
+    second = read_text(ch / 'ch1-2-最佳实践指南.md')
+    assert '## 1.2 最佳實踐指南' in second
+    assert '最佳实践' not in second.replace('ch1-2-最佳实践指南.md', '')
+    first = read_text(ch / 'ch1-1-模組概述.md')
+    assert '[1.2 最佳實踐指南](ch1-2-最佳实践指南.md)' in first
+
+
+def test_nav_dedupes_sibling_links_and_keeps_cross_chapter_cells(tmp_path):
+    ch = make_chapter(tmp_path)
+    format_chapters(tmp_path)
+    text = read_text(ch / 'ch1-2-最佳实践指南.md')
+    assert 'ch1-1-舊名稱.md' not in text
+    assert text.count('](ch1-1-模組概述.md)') == 2  # 表格與快速鏈接各一次
+    assert '| [1.1 模組概述](ch1-1-模組概述.md) | **1.2 最佳實踐指南** | [2.1 下一章](../ch2/ch2-1-概述.md) |' in text
+    assert '- [外部文件](../README.md)' in text
+
+
+def test_format_is_idempotent(tmp_path):
+    make_chapter(tmp_path)
+    assert format_chapters(tmp_path)
+    assert format_chapters(tmp_path) == []
+
+
+def test_crlf_files_keep_crlf(tmp_path):
+    ch = make_chapter(tmp_path, newline='\r\n')
+    format_chapters(tmp_path)
+    data = (ch / 'ch1-2-最佳实践指南.md').read_bytes()
+    assert b'\r\n' in data
+    assert data.count(b'\n') == data.count(b'\r\n')
@@ -0,0 +1,111 @@
+# -*- coding: utf-8 -*-
+"""rename_engine：鏈狀與循環重命名、連結改寫、預寫日誌的繼續與還原"""
+
+import pytest
+
+import rename_engine
+from rename_engine import JOURNAL_DIR, RenameJournal, apply_renames, rollback_renames, resume_renames
+
+RENAMES = {'ch1/a.md': 'ch1/b.md', 'ch1/b.md': 'ch1/a.md',  # 循環
+           'ch1/c.md': 'ch1/d.md', 'ch1/d.md': 'ch2/e.md'}   # 鏈狀，含跨目錄
+
+
+def make_tree(root):
+    (root / 'ch1').mkdir()
+    files = {
+        'ch1/a.md': '# A\n\n[到 B](b.md) [到 C](c.md#c)\n',
+        'ch1/b.md': '# B\n\n[到 A](a.md)\n',
+        'ch1/c.md': '# C\n\n[到 D](d.md)\n',
+        'ch1/d.md': '# D\n\n[到 A](a.md)\n',
+        'index.md': '[A](ch1/a.md) [D](ch1/d.md)\n',
+    }
+    for rel, text in files.items():
+        (root / rel).write_text(text, encoding='utf-8')
+
+
+def snapshot(root):
+    return {p.relative_to(root).as_posix(): p.read_bytes()
+            for p in sorted(root.rglob('*')) if p.is_file() and JOURNAL_DIR not in p.parts}
+
+
+def expected_tree(tmp_path):
+    root = tmp_path / 'expected'
+    root.mkdir()
+    make_tree(root)
+    apply_renames(root, RENAMES)
+    return snapshot(root)
+
+
+def test_cycles_and_chains_move_files_and_rewrite_links(tmp_path):
+    tree = expected_tree(tmp_path)
+    assert tree['ch1/a.md'].startswith('# B'.encode()) and tree['ch1/b.md'].startswith('# A'.encode())
+    assert tree['ch2/e.md'] == '# D\n\n[到 A](../ch1/b.md)\n'.encode('utf-8')
+    assert tree['index.md'] == '[A](ch1/b.md) [D](ch2/e.md)\n'.encode('utf-8')
+    assert '[到 C](d.md#c)' in tree['ch1/b.md'].decode('utf-8')
+
+
+def test_rewritten_links_keep_query_and_fragment(tmp_path):
+    (tmp_path / 'ch1').mkdir()
+    (tmp_path / 'ch1' / 'x.md').write_text('# X\n', encoding='utf-8')
+    (tmp_path / 'index.md').write_text('[X](ch1/x.md?raw=1#a) [Y](ch1/x.md?raw=1)\n', encoding='utf-8')
+    apply_renames(tmp_path, {'ch1/x.md': 'ch2/y.md'})
+    assert (tmp_path / 'index.md').read_text(encoding='utf-8') == '[X](ch2/y.md?raw=1#a) [Y](ch2/y.md?raw=1)\n'
+
+
+@pytest.fixture
+def interrupted(tmp_path, monkeypatch):
+    """在第 3 個步驟執行後、記錄完成前中斷"""
+    root = tmp_path / 'root'
+    root.mkdir()
+    make_tree(root)
+    original = snapshot(root)
+    mark = RenameJournal.mark
+
+    def crash(self, key, i):
+        if key == 'done' and i == 2:
+            raise KeyboardInterrupt
+        mark(self, key, i)
+
+    monkeypatch.setattr(RenameJournal, 'mark', crash)
+    with pytest.raises(KeyboardInterrupt):
+        apply_renames(root, RENAMES)
+    monkeypatch.setattr(RenameJournal, 'mark', mark)
+    assert RenameJournal(root).exists()
+    return root, original
+
+
+def test_resume_finishes_without_repeating_the_unrecorded_step(interrupted, tmp_path):
+    root, _original = interrupted
+    with pytest.raises(RuntimeError):
+        apply_renames(root, {'index.md': 'x.md'})  # 有未完成的日誌時拒絕新的重命名
+    resume_renames(root)
+    assert not (root / JOURNAL_DIR).exists()
+    assert snapshot(root) == expected_tree(tmp_path)
+
+
+def test_rollback_restores_the_original_tree(interrupted):
+    root, original = interrupted
+    assert rollback_renames(root) == 3
+    assert not (root / JOURNAL_DIR).exists()
+    assert snapshot(root) == original
+
+
+def test_interrupted_rollback_can_be_finished(interrupted, monkeypatch):
+    root, original = interrupted
+    undo = rename_engine._undo_step
+    calls = []
+
+    def crash(*args):
+        calls.append(args)
+        if len(calls) == 2:
+            raise KeyboardInterrupt
+        undo(*args)
+
+    monkeypatch.setattr(rename_engine, '_undo_step', crash)
+    with pytest.raises(KeyboardInterrupt):
+        rollback_renames(root)
+    monkeypatch.setattr(rename_engine, '_undo_step', undo)
+    with pytest.raises(RuntimeError):
+        resume_renames(root)  # 已開始還原的日誌不能再往前執行
+    rollback_renames(root)
+    assert snapshot(root) == original
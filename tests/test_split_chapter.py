@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+"""split_chapter：章節導航區塊留在導引頁與目錄，不切成獨立的部分"""
+
+from format_chapters import NAV_HEADING
+from split_chapter import ChapterSplitter
+
+NAV = (f'{NAV_HEADING}\n\n'
+       '| 前序 | 當前 | 後續 |\n|-----|------|------|\n'
+       '| [6.3 架構](ch6-3-架構.md) | **6.4 組件** | [6.5 模型](ch6-5-模型.md) |\n\n'
+       '**快速鏈接：**\n'
+       '- [← 返回第6章首頁](ch6-index.md)\n')
+
+
+def make_source(tmp_path):
+    source = tmp_path / 'ch6' / 'ch6-4-組件.md'
+    source.parent.mkdir()
+    body = ''.join(f'#### 6.4.{k} 服務{k}\n\n' + '內容。\n' * 40 + '\n' for k in range(1, 5))
+    source.write_text(f'# 第6章\n\n## 6.4 組件\n\n{body}---\n\n{NAV}', encoding='utf-8')
+    return source
+
+
+def test_nav_block_is_not_a_part(tmp_path):
+    source = make_source(tmp_path)
+    result = ChapterSplitter(source, budget=400).split()
+
+    names = [p['name'] for p in result['parts']]
+    assert len(names) == 4 and not any('相關章節' in n for n in names)
+    out = tmp_path / 'ch6' / 'ch6-4'
+    for name in names:
+        assert NAV_HEADING not in (out / name).read_text(encoding='utf-8')
+
+    index = (out / 'ch6-4-index.md').read_text(encoding='utf-8')
+    assert index.count(NAV_HEADING) == 1 and '相關章節](' not in index
+    assert '[6.3 架構](../ch6-3-架構.md)' in index and '(../ch6-index.md)' in index
+
+    stub = source.read_text(encoding='utf-8')
+    assert stub.rstrip().endswith('- [← 返回第6章首頁](ch6-index.md)')
+    assert '| [6.3 架構](ch6-3-架構.md) | **6.4 組件** | [6.5 模型](ch6-5-模型.md) |' in stub
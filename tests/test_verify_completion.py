@@ -0,0 +1,42 @@
+# -*- coding: utf-8 -*-
+"""VERIFY-COMPLETION：以 link_checker 檢查文件樹，共用同一份快取"""
+
+import importlib
+
+from doc_pipeline import VerifyStage, run_pipeline
+from link_checker import CACHE_NAME
+
+verifier = importlib.import_module('VERIFY-COMPLETION')
+
+
+def make_tree(tmp_path):
+    root = tmp_path / 'book'
+    (root / 'ch1').mkdir(parents=True)
+    (tmp_path / 'README.md').write_text('# 說明\n', encoding='utf-8')
+    (root / 'ch1' / 'ch1-1-概述.md').write_text(
+        '# 概述\n\n## 目標\n\n'
+        '[目標](#目標) [缺少](#不存在) [下一節](ch1-2-架構.md#架構) [外部](../../README.md)\n'
+        '[遺失](ch1-3-遺失.md) [網站](/index.html)\n', encoding='utf-8')
+    (root / 'ch1' / 'ch1-2-架構.md').write_text('# 架構\n', encoding='utf-8')
+    return root
+
+
+def test_verify_uses_link_checker_cache(tmp_path):
+    root = make_tree(tmp_path)
+    report = verifier.verify(root, jobs=1)
+    assert [b['target'] for b in report['broken_links']] == ['ch1-3-遺失.md']
+    assert [b['target'] for b in report['broken_anchors']] == ['#不存在']
+    assert report['exit_code'] == verifier.EXIT_BROKEN_LINKS | verifier.EXIT_BROKEN_ANCHORS
+    assert (root / CACHE_NAME).exists() and not (root / '.verify_cache.json').exists()
+
+    again = verifier.verify(root, jobs=1)
+    assert again['reparsed'] == 0
+    assert again['broken_links'] == report['broken_links']
+
+
+def test_pipeline_verify_stage_matches_verify_completion(tmp_path):
+    root = make_tree(tmp_path)
+    result = run_pipeline(root, [VerifyStage()], jobs=1)['verify']
+    report = verifier.verify(root, jobs=1)
+    for key in ('links_checked', 'broken_links', 'broken_anchors'):
+        assert result[key] == report[key]